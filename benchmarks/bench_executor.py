@@ -0,0 +1,78 @@
+"""
+Scaling of the indicator executor from 1 to N threads, compared with a
+process pool computing the same jobs
+
+Usage: python -m benchmarks.bench_executor [n_bars] [n_symbols]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sk_fx.indicators.executor import IndicatorExecutor
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils.test_utils import random_ohlcv
+
+JOBS = {
+    "chaikin": ChaikinOscillator(),
+    "demarker": DeMarkerOscillator(),
+    "macd": MACD(),
+    "stochastic": StochasticOscillator(),
+    "rsi": RSIOscillator(),
+}
+
+
+def _process_job(args):
+    ohlcv, oscillator = args
+    oscillator.ohlcv = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+    return oscillator.calculate()
+
+
+def bench_threads(universe, n_workers: int) -> float:
+    start = time.perf_counter()
+    with IndicatorExecutor(max_workers=n_workers) as executor:
+        executor.run_universe(universe, JOBS)
+    return time.perf_counter() - start
+
+
+def bench_processes(universe, n_workers: int) -> float:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        list(
+            executor.map(
+                _process_job,
+                [
+                    (ohlcv, oscillator)
+                    for ohlcv in universe.values()
+                    for oscillator in JOBS.values()
+                ],
+            )
+        )
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_symbols = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    universe = {
+        f"SYMBOL{i}": random_ohlcv(n_bars, seed=i, freq="m") for i in range(n_symbols)
+    }
+
+    print(f"{n_symbols} symbols x {n_bars:,} bars x {len(JOBS)} indicators")
+    print(f"{'workers':>8} {'threads (s)':>12} {'speedup':>8} {'processes (s)':>14}")
+
+    baseline = None
+    for n_workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        threads = bench_threads(universe, n_workers)
+        processes = bench_processes(universe, n_workers)
+        baseline = baseline or threads
+        print(
+            f"{n_workers:>8} {threads:>12.3f} {baseline / threads:>8.2f} {processes:>14.3f}"
+        )
@@ -0,0 +1,84 @@
+"""
+Replay of a bar (or tick) file through the oscillators, the Fibonacci
+confluence and the SK-FX signal fusion, reporting throughput, per stage
+latency percentiles and memory
+
+Usage: python -m benchmarks.bench_replay [path] [speed] [baseline.json]
+
+Without a path, a random walk of 20000 H1 bars is replayed. A tick file is
+recognized by its 'bid' column. The speed is a multiple of real time, 0 (the
+default) replays as fast as possible. The report is written next to the
+input as `<path>.replay.json`; with a baseline report, slowdowns are listed.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+from sk_fx.data.replay import (
+    ReplayHarness,
+    fib_stage,
+    oscillator_stage,
+    read_bars,
+    read_tick_bars,
+    strategy_stage,
+)
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.strategy.signal_fusion import FibConfluence, Indicator, Rule, SignalFusion
+from sk_fx.strategy.trend_indicator import TrendIndicator
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def sk_fx_stages() -> dict:
+    trend = Indicator(TrendIndicator())
+    rsi = Indicator(RSIOscillator())
+    fib = FibConfluence(lookback=50, tolerance=0.5)
+    fusion = SignalFusion(
+        [
+            Rule("long", 1, (trend > 0) & (fib > 0) & (rsi < 50), {fib: 1.0}),
+            Rule("short", -1, (trend < 0) & (fib > 0) & (rsi > 50), {fib: 1.0}),
+        ]
+    )
+
+    return {
+        "rsi": oscillator_stage(RSIOscillator()),
+        "macd": oscillator_stage(MACD()),
+        "stochastic": oscillator_stage(StochasticOscillator()),
+        "demarker": oscillator_stage(DeMarkerOscillator()),
+        "fib": fib_stage(lookback=50, tolerance=0.5),
+        "strategy": strategy_stage(fusion),
+    }
+
+
+def main(path: str = None, speed: float = 0, baseline: str = None) -> None:
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "random-H1.csv")
+        random_ohlcv(20_000).to_csv(path)
+
+    with open(path) as file:
+        header = file.readline()
+    bars = read_tick_bars(path) if "bid" in header else read_bars(path)
+
+    report = ReplayHarness(sk_fx_stages(), speed=speed or None).run(bars)
+    print(report.summary())
+
+    with open(f"{path}.replay.json", "w") as file:
+        json.dump(report.to_dict(), file, indent=2)
+    if baseline is not None:
+        for regression in report.regressions(baseline):
+            print(f"REGRESSION {regression}")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    main(
+        arguments[0] if len(arguments) > 0 else None,
+        float(arguments[1]) if len(arguments) > 1 else 0,
+        arguments[2] if len(arguments) > 2 else None,
+    )
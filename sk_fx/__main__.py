@@ -0,0 +1,5 @@
+import sys
+
+from sk_fx.cli import main
+
+sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Command line batch computation of indicators over CSV/Parquet exports
+
+    python -m sk_fx "exports/*.csv" -i rsi:period=14 -i macd -i ema:length=[9,21]
+
+Every input file is read block by block (see `sk_fx.data.replay.read_ohlcv`),
+the indicators are computed with the NumPy kernels and written next to the
+input as `<name>.<indicator>.sk-fx.<format>`. Files are spread over a process
+pool, and the throughput is printed at the end.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from sk_fx.data.replay import read_ohlcv
+from sk_fx.service.engine import INDICATORS, Result, parse_spec
+
+INPUT_EXTENSIONS = (".csv", ".parquet")
+OUTPUT_FORMATS = ("parquet", "csv", "arrow")
+_OUTPUT_MARK = ".sk-fx."
+
+Spec = Tuple[str, Dict[str, Any]]
+
+
+class FileStats(NamedTuple):
+    path: str
+    n_bars: int
+    n_bytes: int
+    seconds: float
+    outputs: Tuple[str, ...]
+    error: str = None
+
+
+def expand_inputs(patterns: Sequence[str]) -> List[str]:
+    """
+    CSV/Parquet files of directories and glob patterns, without earlier outputs
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        paths.update(glob.glob(pattern, recursive=True))
+
+    return sorted(
+        path
+        for path in paths
+        if path.endswith(INPUT_EXTENSIONS)
+        and _OUTPUT_MARK not in os.path.basename(path)
+    )
+
+
+def spec_label(indicator: str, params: Dict[str, Any]) -> str:
+    """
+    File name part of a spec, e.g. 'rsi_period=14'
+    """
+    parts = [indicator] + [
+        f"{key}={'-'.join(map(str, value)) if isinstance(value, list) else value}"
+        for key, value in sorted(params.items())
+    ]
+    return "_".join(parts)
+
+
+def output_path(path: str, indicator: str, params: Dict[str, Any], fmt: str) -> str:
+    stem = os.path.splitext(path)[0]
+    return f"{stem}.{spec_label(indicator, params)}{_OUTPUT_MARK}{fmt}"
+
+
+def result_table(fields: Dict[str, np.ndarray], indicator: str, result: Result):
+    """
+    Arrow table of an indicator result: 'time' (when known) then 'value', or
+    'value_0', 'value_1', ... for several lines (MACD, lists of lengths) and
+    'level_0', ... for the Fib levels
+    """
+    columns = {}
+    if "time" in fields:
+        columns["time"] = pa.array(fields["time"].astype("datetime64[ns]"))
+
+    if isinstance(result, tuple):
+        lines = {f"value_{i}": line for i, line in enumerate(result)}
+    elif np.ndim(result) == 1:
+        lines = {"value": result}
+    elif INDICATORS[indicator].bars_axis == -2:
+        lines = {f"level_{i}": result[:, i] for i in range(result.shape[1])}
+    else:
+        lines = {f"value_{i}": line for i, line in enumerate(result)}
+
+    columns.update({name: pa.array(np.asarray(line)) for name, line in lines.items()})
+    return pa.table(columns)
+
+
+def write_table(table: pa.Table, path: str, fmt: str) -> None:
+    temporary = f"{path}.tmp"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, temporary)
+    elif fmt == "csv":
+        import pyarrow.csv as pa_csv
+
+        pa_csv.write_csv(table, temporary)
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, temporary, compression="uncompressed")
+    os.replace(temporary, path)
+
+
+def process_file(
+    path: str, specs: Sequence[Spec], fmt: str = "parquet", overwrite: bool = True
+) -> FileStats:
+    """
+    Compute every indicator spec of one file and write the results next to it
+    """
+    start = time.perf_counter()
+    outputs = [output_path(path, indicator, params, fmt) for indicator, params in specs]
+    if not overwrite and all(os.path.exists(output) for output in outputs):
+        return FileStats(path, 0, 0, time.perf_counter() - start, ())
+
+    try:
+        fields = read_ohlcv(path)
+        for (indicator, params), output in zip(specs, outputs):
+            result = INDICATORS[indicator].compute(fields, dict(params))
+            write_table(result_table(fields, indicator, result), output, fmt)
+    except Exception as error:
+        return FileStats(
+            path,
+            0,
+            0,
+            time.perf_counter() - start,
+            (),
+            f"{type(error).__name__}: {error}",
+        )
+
+    return FileStats(
+        path,
+        len(fields["close"]),
+        os.path.getsize(path),
+        time.perf_counter() - start,
+        tuple(outputs),
+    )
+
+
+def run(
+    paths: Sequence[str],
+    specs: Sequence[Spec],
+    fmt: str = "parquet",
+    workers: int = None,
+    overwrite: bool = True,
+    progress=None,
+) -> List[FileStats]:
+    """
+    Process the files on a pool of `workers` processes (inline for 1)
+
+    Parameters
+    ----------
+    paths : Sequence[str]
+        Input files
+    specs : Sequence[Spec]
+        (indicator, parameters) pairs, see `parse_spec`
+    fmt : str, optional
+        Output format in `OUTPUT_FORMATS`, by default 'parquet'
+    workers : int, optional
+        Number of processes, by default the CPU count
+    overwrite : bool, optional
+        Recompute files whose outputs all exist, by default True
+    progress : optional
+        Called with the `FileStats` of every finished file
+
+    Returns
+    -------
+    List[FileStats]
+        Statistics of every file, in completion order
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = []
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            stats.append(process_file(path, specs, fmt, overwrite))
+            if progress is not None:
+                progress(stats[-1])
+        return stats
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        futures = [
+            pool.submit(process_file, path, specs, fmt, overwrite) for path in paths
+        ]
+        for future in as_completed(futures):
+            stats.append(future.result())
+            if progress is not None:
+                progress(stats[-1])
+
+    return stats
+
+
+def summary(stats: Sequence[FileStats], seconds: float) -> str:
+    n_bars = sum(file.n_bars for file in stats)
+    n_bytes = sum(file.n_bytes for file in stats)
+    n_errors = sum(file.error is not None for file in stats)
+    n_outputs = sum(len(file.outputs) for file in stats)
+    seconds = max(seconds, 1e-9)
+
+    return (
+        f"{len(stats)} files ({n_errors} failed), {n_outputs} outputs, "
+        f"{n_bars} bars, {n_bytes / 1e6:.1f} MB in {seconds:.2f} s: "
+        f"{n_bars / seconds:,.0f} bars/s, {n_bytes / 1e6 / seconds:.1f} MB/s, "
+        f"{len(stats) / seconds:.1f} files/s"
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="sk-fx",
+        description="Compute indicators over CSV/Parquet bar files",
+        epilog=f"Indicators: {', '.join(sorted(INDICATORS))}",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Directories or glob patterns of CSV/Parquet files"
+    )
+    parser.add_argument(
+        "-i",
+        "--indicator",
+        action="append",
+        required=True,
+        help="Indicator spec, e.g. rsi:period=14 or ema:length=[9,21]",
+    )
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="parquet")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Skip the files whose outputs all exist",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        specs = [parse_spec(spec) for spec in args.indicator]
+    except ValueError as error:
+        parser.error(str(error))
+
+    paths = expand_inputs(args.inputs)
+    if len(paths) == 0:
+        parser.error("No CSV/Parquet file matches the inputs")
+
+    def progress(file: FileStats) -> None:
+        if file.error is not None:
+            print(f"FAILED {file.path}: {file.error}", file=sys.stderr)
+        elif args.verbose:
+            print(f"{file.path}: {file.n_bars} bars in {file.seconds:.3f} s")
+
+    start = time.perf_counter()
+    stats = run(
+        paths, specs, args.format, args.workers, not args.skip_existing, progress
+    )
+    print(summary(stats, time.perf_counter() - start))
+
+    return int(any(file.error is not None for file in stats))
@@ -0,0 +1,3 @@
+"""
+Modules contains the market data handling (ticks, bars and buffers) for the system
+"""
@@ -0,0 +1,206 @@
+"""
+FX trading calendar: weekly closure, holidays and trading sessions
+
+The FX market opens on Sunday 22:00 UTC and closes on Friday 22:00 UTC. The
+calendar works on bar times only: every query is arithmetic on the `int64`
+nanoseconds of the times, through the market clock (the open market time
+elapsed since a reference week), so no full calendar of expected bars is ever
+built and the cost stays proportional to the number of real bars.
+
+Example
+-------
+>>> calendar = FXCalendar(holidays=["2024-12-25", "2025-01-01"])
+>>> calendar.missing_bars(ohlcv.index, TimeFrame.H1)  # Expected bars absent before each bar
+>>> calendar.sessions(ohlcv.index) & Session.LONDON
+"""
+
+import enum
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from sk_fx.indicators.idtypes import TimeFrame
+
+_HOUR = 3600 * 10**9
+_DAY = 24 * _HOUR
+_WEEK = 7 * _DAY
+# * 1970-01-04, the first Sunday of the epoch
+_FIRST_SUNDAY = 3 * _DAY
+
+
+class Session(enum.IntFlag):
+    SYDNEY = 1
+    TOKYO = 2
+    LONDON = 4
+    NEW_YORK = 8
+
+
+class SessionHours(NamedTuple):
+    session: Session
+    open_hour: int  # UTC hour, a session opening after it closes spans midnight
+    close_hour: int
+
+
+DEFAULT_SESSIONS = (
+    SessionHours(Session.SYDNEY, 21, 6),
+    SessionHours(Session.TOKYO, 0, 9),
+    SessionHours(Session.LONDON, 7, 16),
+    SessionHours(Session.NEW_YORK, 12, 21),
+)
+
+
+def _nanoseconds(times) -> np.ndarray:
+    return np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+
+
+class FXCalendar:
+    """
+    Weekly FX market hours with full-day holidays and session hours
+
+    A holiday closes the trading day ending at the daily roll on its date,
+    e.g. '2024-12-25' closes from 2024-12-24 22:00 to 2024-12-25 22:00 UTC.
+    Session hours are fixed in UTC (no daylight saving shift).
+    """
+
+    week_open: int  # Open time after Sunday 00:00 UTC, in nanoseconds
+    open_duration: int  # Open time per week, in nanoseconds
+    holidays: np.ndarray  # Sorted starts of the closed trading days
+    sessions_hours: Tuple[SessionHours, ...]
+
+    def __init__(
+        self,
+        holidays: Sequence = (),
+        week_open: np.timedelta64 = np.timedelta64(22, "h"),
+        open_duration: np.timedelta64 = np.timedelta64(5, "D"),
+        sessions: Sequence[SessionHours] = DEFAULT_SESSIONS,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        holidays : Sequence, optional
+            Dates of the closed trading days, by default none
+        week_open : np.timedelta64, optional
+            Weekly open after Sunday 00:00 UTC, by default 22 hours
+        open_duration : np.timedelta64, optional
+            Open time per week, by default 5 days
+        sessions : Sequence[SessionHours], optional
+            Trading sessions, by default Sydney, Tokyo, London and New York
+        """
+        self.week_open = int(week_open / np.timedelta64(1, "ns"))
+        self.open_duration = int(open_duration / np.timedelta64(1, "ns"))
+        self.sessions_hours = tuple(sessions)
+
+        # * Trading day of a date: from the previous daily roll to its own
+        roll = self.week_open % _DAY
+        starts = np.unique(
+            np.asarray(holidays, dtype="datetime64[D]").astype("datetime64[ns]")
+        ).view(np.int64) + (roll - _DAY)
+        # Only the days inside the open week close the market
+        self.holidays = starts[self._week_position(starts) <= self.open_duration - _DAY]
+
+    def _week_position(self, ns: np.ndarray) -> np.ndarray:
+        """
+        Time since the last weekly open, in nanoseconds
+        """
+        return (ns - (_FIRST_SUNDAY + self.week_open)) % _WEEK
+
+    def market_time(self, times) -> np.ndarray:
+        """
+        Open market time elapsed since the weekly open of the epoch
+
+        Constant while the market is closed, so the market time between two
+        bars is their distance without the closures.
+
+        Returns
+        -------
+        np.ndarray
+            Market time of every bar time, int64 nanoseconds
+        """
+        ns = _nanoseconds(times)
+        since_open = ns - (_FIRST_SUNDAY + self.week_open)
+        weeks, position = np.divmod(since_open, _WEEK)
+        elapsed = weeks * self.open_duration + np.minimum(position, self.open_duration)
+
+        # * Holidays passed: whole days, and the part of a current one
+        if len(self.holidays):
+            passed = np.searchsorted(self.holidays, ns, side="right")
+            closed = np.where(passed > 0, passed * _DAY, 0)
+            current = self.holidays[np.maximum(passed - 1, 0)]
+            closed -= np.where(passed > 0, np.maximum(current + _DAY - ns, 0), 0)
+            elapsed -= closed
+
+        return elapsed
+
+    def is_open(self, times) -> np.ndarray:
+        """
+        Whether the market is open at every time
+        """
+        ns = _nanoseconds(times)
+        open_ = self._week_position(ns) < self.open_duration
+        if len(self.holidays):
+            passed = np.searchsorted(self.holidays, ns, side="right")
+            current = self.holidays[np.maximum(passed - 1, 0)]
+            open_ &= ~((passed > 0) & (ns < current + _DAY))
+
+        return open_
+
+    def sessions(self, times) -> np.ndarray:
+        """
+        `Session` flags active at every time, 0 while the market is closed
+        """
+        hours = (_nanoseconds(times) % _DAY) // _HOUR
+        flags = np.zeros(hours.shape, dtype=np.uint8)
+        for hours_range in self.sessions_hours:
+            if hours_range.open_hour <= hours_range.close_hour:
+                active = (hours >= hours_range.open_hour) & (
+                    hours < hours_range.close_hour
+                )
+            else:
+                active = (hours >= hours_range.open_hour) | (
+                    hours < hours_range.close_hour
+                )
+            flags[active] |= int(hours_range.session)
+        flags[~self.is_open(times)] = 0
+
+        return flags
+
+    def trading_days(self, times) -> np.ndarray:
+        """
+        Trading day of every time, the date of the next daily roll
+        """
+        roll = self.week_open % _DAY
+        ns = _nanoseconds(times)
+        return ((ns - roll) // _DAY + 1).astype("datetime64[D]")
+
+    def expected_bars(self, start, end, time_frame: TimeFrame) -> np.ndarray:
+        """
+        Number of bar opens of the time frame in the open market time
+        between `start` (included) and `end` (excluded)
+        """
+        step = time_frame.seconds * 10**9
+        return (self.market_time(end) - self.market_time(start) + step - 1) // step
+
+    def missing_bars(self, times, time_frame: TimeFrame) -> np.ndarray:
+        """
+        Number of open market bars absent before every bar
+
+        Parameters
+        ----------
+        times : array of datetime64
+            Sorted open times of the bars
+        time_frame : TimeFrame
+            Time frame of the bars
+
+        Returns
+        -------
+        np.ndarray
+            0 for a bar following its predecessor, or the first bar, and the
+            closures (weekends, holidays) are not counted
+        """
+        market = self.market_time(times)
+        step = time_frame.seconds * 10**9
+        missing = np.zeros(market.shape, dtype=np.int64)
+        if len(market) > 1:
+            np.maximum(np.diff(market) // step - 1, 0, out=missing[1:])
+
+        return missing
@@ -0,0 +1,182 @@
+"""
+Out-of-core indicator computation over histories larger than memory
+
+A history is read block by block from a memory-mapped or file source and fed
+to an oscillator together with its carried state (see
+`DivergenceOscillator.calculate`), so every block continues the EMA, Wilder
+and rolling window states of the previous one. Results are written to a
+preallocated array or streamed to a `.npy` file.
+"""
+
+import os
+from typing import Dict, Iterator, Mapping, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.data.ring_buffer import OHLCV_FIELDS
+from sk_fx.indicators.oscillators.divergence_oscillator import DivergenceOscillator
+
+OHLCVSource = Union[str, os.PathLike, Mapping[str, np.ndarray]]
+
+
+def open_npy_directory(
+    path: Union[str, os.PathLike], fields: Sequence[str] = OHLCV_FIELDS
+) -> Dict[str, np.ndarray]:
+    """
+    Memory map the `<field>.npy` files of a directory (e.g. `close.npy`)
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        Directory holding one `.npy` file per field
+    fields : Sequence[str], optional
+        Fields to map, by default the OHLCV fields
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        Read-only memory maps of the available fields
+    """
+    return {
+        field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r")
+        for field in fields
+        if os.path.exists(os.path.join(path, f"{field}.npy"))
+    }
+
+
+def _count_csv_rows(path: Union[str, os.PathLike]) -> int:
+    n_lines, last_byte = 0, b"\n"
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 24), b""):
+            block = block.replace(b"\r", b"")
+            if len(block) == 0:
+                continue
+            # * Blank lines (a newline after a newline) are skipped by pandas
+            newline = np.frombuffer(block, dtype=np.uint8) == ord("\n")
+            n_lines += int(newline.sum())
+            n_lines -= int((newline[1:] & newline[:-1]).sum())
+            n_lines -= bool(newline[0] and last_byte == b"\n")
+            last_byte = block[-1:]
+
+    # Header line, and a last line without a trailing newline
+    return n_lines - 1 + (last_byte != b"\n")
+
+
+def source_length(source: OHLCVSource) -> int:
+    """
+    Number of bars of a chunked source
+    """
+    if isinstance(source, Mapping):
+        return len(next(iter(source.values())))
+    if os.path.isdir(source):
+        return len(next(iter(open_npy_directory(source).values())))
+
+    return _count_csv_rows(source)
+
+
+def iter_blocks(
+    source: OHLCVSource, block_size: int = 1 << 16
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Iterate over a history in fixed-size blocks of field arrays
+
+    Parameters
+    ----------
+    source : OHLCVSource
+        A mapping of field name to arrays (e.g. `np.memmap`), a directory of
+        `<field>.npy` files or a CSV file with lowercase OHLCV columns
+    block_size : int, optional
+        Number of bars per block, by default 65536
+
+    Yields
+    ------
+    Dict[str, np.ndarray]
+        The fields of the next block, views for memory-mapped sources
+    """
+    if not isinstance(source, Mapping) and os.path.isdir(source):
+        source = open_npy_directory(source)
+
+    if isinstance(source, Mapping):
+        n_bars = source_length(source)
+        for start in range(0, n_bars, block_size):
+            yield {
+                field: np.asarray(values[start : start + block_size])
+                for field, values in source.items()
+            }
+        return
+
+    reader = pd.read_csv(
+        source, chunksize=block_size, usecols=lambda column: column in OHLCV_FIELDS
+    )
+    for chunk in reader:
+        yield {field: chunk[field].to_numpy(np.float64) for field in chunk.columns}
+
+
+def calculate_chunked(
+    oscillator: DivergenceOscillator,
+    source: OHLCVSource,
+    block_size: int = 1 << 16,
+    output: Union[str, os.PathLike] = None,
+    dtype=None,
+    **options,
+) -> np.ndarray:
+    """
+    Calculate an oscillator over a history one block at a time
+
+    The output is identical to a single in-memory pass of the NumPy path.
+
+    Parameters
+    ----------
+    oscillator : DivergenceOscillator
+        The configured oscillator, its `ohlcv` is restored afterwards
+    source : OHLCVSource
+        See `iter_blocks`
+    block_size : int, optional
+        Number of bars per block, by default 65536
+    output : Union[str, os.PathLike], optional
+        `.npy` file the results are streamed to, by default kept in memory
+    dtype : optional
+        Dtype of the calculation and of the results, by default float64
+    **options
+        Extra options of the oscillator `calculate`, e.g. `average_demarker`
+
+    Returns
+    -------
+    np.ndarray
+        The results, a memory map of `output` when given. Oscillators with
+        several lines (MACD) give one row per line.
+    """
+    n_bars = source_length(source)
+    state = {}
+    result = None
+    start = 0
+
+    ohlcv = oscillator.ohlcv
+    try:
+        for block in iter_blocks(source, block_size):
+            oscillator.ohlcv = block
+            values = oscillator.calculate(dtype=dtype, state=state, **options)
+            values = np.asarray(values)
+
+            if result is None:
+                shape = values.shape[:-1] + (n_bars,)
+                result = (
+                    np.empty(shape, dtype=values.dtype)
+                    if output is None
+                    else np.lib.format.open_memmap(
+                        output, mode="w+", dtype=values.dtype, shape=shape
+                    )
+                )
+
+            result[..., start : start + values.shape[-1]] = values
+            start += values.shape[-1]
+    finally:
+        oscillator.ohlcv = ohlcv
+
+    if result is None:
+        return np.empty(0)
+    if isinstance(result, np.memmap):
+        result.flush()
+
+    return result
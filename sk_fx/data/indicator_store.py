@@ -0,0 +1,248 @@
+"""
+Incremental columnar persistence of computed indicator values
+
+Values are stored per symbol, indicator and parameter set as uncompressed
+Arrow IPC (Feather v2) segments, which are read back through memory mapping
+without copy. Each update only computes and appends the bars newer than the
+stored ones, resuming the oscillator from its stored state (see
+`DivergenceOscillator.calculate`). A JSON manifest lists the committed
+segments and the state; it is replaced atomically after the segment is
+written, so an interrupted update never leaves partial data visible.
+"""
+
+import json
+import os
+import uuid
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from sk_fx.indicators.oscillators.divergence_oscillator import DivergenceOscillator
+
+_MANIFEST = "manifest.json"
+
+
+def _encode_state(state):
+    if isinstance(state, dict):
+        return {key: _encode_state(value) for key, value in state.items()}
+    if isinstance(state, np.ndarray):
+        return {"__array__": state.tolist(), "dtype": str(state.dtype)}
+
+    return state
+
+
+def _decode_state(state):
+    if isinstance(state, dict):
+        if "__array__" in state:
+            return np.array(state["__array__"], dtype=state["dtype"])
+        return {key: _decode_state(value) for key, value in state.items()}
+
+    return state
+
+
+def parameter_key(oscillator: DivergenceOscillator, **options) -> str:
+    """
+    Stable directory name of an oscillator parameter set
+
+    Parameters
+    ----------
+    oscillator : DivergenceOscillator
+        The configured oscillator
+    **options
+        Extra options passed to `calculate`
+
+    Returns
+    -------
+    str
+        e.g. 'time_frame=D1,period=14'
+    """
+    parameters = {
+        key: value
+        for key, value in vars(oscillator).items()
+        if key not in ("name", "ohlcv")
+    }
+    parameters.update(options)
+
+    return ",".join(
+        f"{key}={getattr(value, 'name', value)}" for key, value in parameters.items()
+    )
+
+
+class IndicatorStore:
+    """
+    Append-only store of indicator values on disk
+
+    Example
+    -------
+    >>> store = IndicatorStore("indicator-cache")
+    >>> store.update("EURUSD", RSIOscillator(period=14), ohlcv)
+    >>> rsi = store.load("EURUSD", RSIOscillator(period=14))
+    """
+
+    root: str
+    max_segments: int = 64
+
+    def __init__(self, root: str, max_segments: int = 64) -> None:
+        self.root = root
+        self.max_segments = max_segments
+
+    def path(self, symbol: str, oscillator: DivergenceOscillator, **options) -> str:
+        """
+        Directory holding the values of one symbol, indicator and parameter set
+        """
+        return os.path.join(
+            self.root,
+            symbol,
+            type(oscillator).__name__,
+            parameter_key(oscillator, **options),
+        )
+
+    def update(
+        self,
+        symbol: str,
+        oscillator: DivergenceOscillator,
+        ohlcv: pd.DataFrame,
+        **options,
+    ) -> int:
+        """
+        Compute and append the values of the bars newer than the stored ones
+
+        Parameters
+        ----------
+        symbol : str
+            Market symbol, e.g. 'EURUSD'
+        oscillator : DivergenceOscillator
+            The configured oscillator, its `ohlcv` is restored afterwards
+        ohlcv : pd.DataFrame
+            Bars indexed by time, only the bars after the last stored one are used
+        **options
+            Extra options passed to `calculate`, e.g. `average_demarker`
+
+        Returns
+        -------
+        int
+            The number of appended bars
+        """
+        path = self.path(symbol, oscillator, **options)
+        manifest = self._read_manifest(path)
+
+        new_bars = ohlcv
+        if manifest["last_time"] is not None:
+            new_bars = ohlcv[ohlcv.index > pd.Timestamp(manifest["last_time"])]
+        if len(new_bars) == 0:
+            return 0
+
+        # * Resume the oscillator from its stored state
+        state = _decode_state(manifest["state"])
+        fields = {field: new_bars[field].to_numpy() for field in new_bars.columns}
+        previous_ohlcv, oscillator.ohlcv = oscillator.ohlcv, fields
+        try:
+            values = oscillator.calculate(state=state, **options)
+        finally:
+            oscillator.ohlcv = previous_ohlcv
+
+        # * Write the new segment, then commit it in the manifest
+        os.makedirs(path, exist_ok=True)
+        segment = f"segment-{uuid.uuid4().hex}.arrow"
+        self._write_segment(
+            os.path.join(path, segment), self._to_table(new_bars.index, values)
+        )
+
+        manifest["segments"].append(segment)
+        manifest["last_time"] = str(new_bars.index[-1])
+        manifest["n_bars"] += len(new_bars)
+        manifest["state"] = _encode_state(state)
+        self._write_manifest(path, manifest)
+
+        if len(manifest["segments"]) > self.max_segments:
+            self.compact(symbol, oscillator, **options)
+
+        return len(new_bars)
+
+    def table(
+        self, symbol: str, oscillator: DivergenceOscillator, **options
+    ) -> pa.Table:
+        """
+        Memory-mapped Arrow table of the stored values (no copy)
+        """
+        path = self.path(symbol, oscillator, **options)
+        return self._read_segments(path, self._read_manifest(path)["segments"])
+
+    def load(
+        self, symbol: str, oscillator: DivergenceOscillator, **options
+    ) -> pd.DataFrame:
+        """
+        Stored values as a data frame indexed by time
+
+        Returns
+        -------
+        pd.DataFrame
+            A `value` column, or `value_0`, `value_1`, ... for oscillators with
+            several lines (MACD)
+        """
+        return self.table(symbol, oscillator, **options).to_pandas().set_index("time")
+
+    def compact(self, symbol: str, oscillator: DivergenceOscillator, **options) -> None:
+        """
+        Merge every stored segment into a single one
+        """
+        path = self.path(symbol, oscillator, **options)
+        manifest = self._read_manifest(path)
+        old_segments = manifest["segments"]
+        if len(old_segments) <= 1:
+            return
+
+        segment = f"segment-{uuid.uuid4().hex}.arrow"
+        table = self._read_segments(path, old_segments).combine_chunks()
+        self._write_segment(os.path.join(path, segment), table)
+
+        manifest["segments"] = [segment]
+        self._write_manifest(path, manifest)
+        for old_segment in old_segments:
+            os.remove(os.path.join(path, old_segment))
+
+    @staticmethod
+    def _to_table(index: pd.DatetimeIndex, values) -> pa.Table:
+        columns = {"time": pa.array(index.values.astype("datetime64[ns]"))}
+        if isinstance(values, tuple):
+            for i, line in enumerate(values):
+                columns[f"value_{i}"] = pa.array(np.asarray(line))
+        else:
+            columns["value"] = pa.array(np.asarray(values))
+
+        return pa.table(columns)
+
+    @staticmethod
+    def _write_segment(path: str, table: pa.Table) -> None:
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def _read_segments(path: str, segments: List[str]) -> pa.Table:
+        if len(segments) == 0:
+            raise FileNotFoundError(f"No stored values in {path}")
+
+        tables = [
+            pa.ipc.open_file(pa.memory_map(os.path.join(path, segment))).read_all()
+            for segment in segments
+        ]
+        return pa.concat_tables(tables)
+
+    @staticmethod
+    def _read_manifest(path: str) -> dict:
+        manifest_path = os.path.join(path, _MANIFEST)
+        if not os.path.exists(manifest_path):
+            return dict(segments=[], last_time=None, n_bars=0, state={})
+
+        with open(manifest_path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def _write_manifest(path: str, manifest: dict) -> None:
+        manifest_path = os.path.join(path, _MANIFEST)
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(manifest, file)
+        os.replace(manifest_path + ".tmp", manifest_path)
@@ -0,0 +1,238 @@
+"""
+Instrument metadata: pip size, contract size and currencies per symbol
+
+The registry stores one row per symbol in NumPy arrays so pip arithmetic runs
+over many symbols (or a panel of bars) at once. Symbol arguments are a name,
+a sequence of names or an array of row indices (see `InstrumentRegistry.index`);
+their values broadcast along the leading axis of the price arrays, so a
+(n_symbols, n_bars) panel pairs each row with its symbol.
+"""
+
+from typing import Dict, NamedTuple, Sequence, Union
+
+import numpy as np
+
+Symbols = Union[str, Sequence[str], np.ndarray]
+
+
+class Instrument(NamedTuple):
+    symbol: str
+    pip_size: float
+    contract_size: float
+    quote_currency: str
+    base_currency: str
+
+
+DEFAULT_INSTRUMENTS = (
+    Instrument("EURUSD", 0.0001, 100_000, "USD", "EUR"),
+    Instrument("GBPUSD", 0.0001, 100_000, "USD", "GBP"),
+    Instrument("AUDUSD", 0.0001, 100_000, "USD", "AUD"),
+    Instrument("NZDUSD", 0.0001, 100_000, "USD", "NZD"),
+    Instrument("USDCAD", 0.0001, 100_000, "CAD", "USD"),
+    Instrument("USDCHF", 0.0001, 100_000, "CHF", "USD"),
+    Instrument("USDJPY", 0.01, 100_000, "JPY", "USD"),
+    Instrument("EURGBP", 0.0001, 100_000, "GBP", "EUR"),
+    Instrument("EURJPY", 0.01, 100_000, "JPY", "EUR"),
+    Instrument("GBPJPY", 0.01, 100_000, "JPY", "GBP"),
+    Instrument("XAUUSD", 0.01, 100, "USD", "XAU"),
+    Instrument("XAGUSD", 0.001, 5_000, "USD", "XAG"),
+    Instrument("USOIL", 0.001, 1_000, "USD", "USOIL"),
+)
+
+
+class InstrumentRegistry:
+    """
+    Array backed table of instrument metadata
+
+    Examples
+    --------
+    >>> registry = InstrumentRegistry.default()
+    >>> registry.to_pips(["EURUSD", "USDJPY"], [0.0012, 0.12])
+    array([12., 12.])
+    """
+
+    symbols: np.ndarray
+    pip_sizes: np.ndarray
+    contract_sizes: np.ndarray
+    quote_currencies: np.ndarray
+    base_currencies: np.ndarray
+
+    def __init__(self, instruments: Sequence[Instrument] = ()) -> None:
+        # * Columns are views of buffers growing geometrically
+        self._buffers = {
+            "symbols": np.empty(0, dtype=object),
+            "pip_sizes": np.empty(0),
+            "contract_sizes": np.empty(0),
+            "quote_currencies": np.empty(0, dtype=object),
+            "base_currencies": np.empty(0, dtype=object),
+        }
+        self._index: Dict[str, int] = {}
+        self._resize(0)
+
+        self.register(*instruments)
+
+    @classmethod
+    def default(cls) -> "InstrumentRegistry":
+        """
+        Registry of the common FX pairs and commodities
+        """
+        return cls(DEFAULT_INSTRUMENTS)
+
+    def register(self, *instruments: Instrument) -> None:
+        """
+        Add instruments, replacing the rows of already registered symbols
+        """
+        rows = [
+            self._index.setdefault(instrument.symbol, len(self._index))
+            for instrument in instruments
+        ]
+        self._resize(len(self._index))
+
+        for row, instrument in zip(rows, instruments):
+            self.symbols[row] = instrument.symbol
+            self.pip_sizes[row] = instrument.pip_size
+            self.contract_sizes[row] = instrument.contract_size
+            self.quote_currencies[row] = instrument.quote_currency
+            self.base_currencies[row] = instrument.base_currency
+
+    def _resize(self, n_rows: int) -> None:
+        capacity = len(self._buffers["symbols"])
+        if n_rows > capacity:
+            capacity = max(n_rows, 2 * capacity)
+            for name, buffer in self._buffers.items():
+                grown = np.empty(capacity, dtype=buffer.dtype)
+                grown[: len(buffer)] = buffer
+                self._buffers[name] = grown
+
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:n_rows])
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    def __getitem__(self, symbol: str) -> Instrument:
+        row = self.index(symbol)
+        return Instrument(
+            self.symbols[row],
+            float(self.pip_sizes[row]),
+            float(self.contract_sizes[row]),
+            self.quote_currencies[row],
+            self.base_currencies[row],
+        )
+
+    def index(self, symbols: Symbols) -> Union[int, np.ndarray]:
+        """
+        Rows of the symbols, integer arrays are returned unchanged
+
+        Parameters
+        ----------
+        symbols : Symbols
+            A symbol, a sequence of symbols or an array of rows
+
+        Returns
+        -------
+        Union[int, np.ndarray]
+            The row of a symbol or an array of rows
+
+        Raises
+        ------
+        KeyError
+            When a symbol is not registered
+        """
+        if isinstance(symbols, str):
+            return self._index[symbols]
+        if isinstance(symbols, np.ndarray) and np.issubdtype(symbols.dtype, np.integer):
+            return symbols
+
+        return np.fromiter(
+            (self._index[symbol] for symbol in symbols),
+            dtype=np.intp,
+            count=len(symbols),
+        )
+
+    def _column(self, column: np.ndarray, symbols: Symbols, values) -> np.ndarray:
+        """
+        Column values of the symbols, shaped to broadcast along the leading
+        axis of `values`
+        """
+        column = column[self.index(symbols)]
+        values = np.asarray(values)
+        if np.ndim(column) and values.ndim > np.ndim(column):
+            column = column.reshape(column.shape + (1,) * (values.ndim - column.ndim))
+
+        return column
+
+    def pip_size(self, symbols: Symbols) -> Union[float, np.ndarray]:
+        return self.pip_sizes[self.index(symbols)]
+
+    def to_pips(self, symbols: Symbols, price_diff) -> np.ndarray:
+        """
+        Convert price differences to pips
+        """
+        return np.asarray(price_diff) / self._column(
+            self.pip_sizes, symbols, price_diff
+        )
+
+    def to_price(self, symbols: Symbols, pips) -> np.ndarray:
+        """
+        Convert pips to price differences
+        """
+        return np.asarray(pips) * self._column(self.pip_sizes, symbols, pips)
+
+    def within_pips(
+        self, symbols: Symbols, real_price, calculated_price, pips: float = 3
+    ) -> np.ndarray:
+        """
+        Whether the calculated prices are less than `pips` pips from the real ones
+
+        Parameters
+        ----------
+        symbols : Symbols
+            Symbols of the prices
+        real_price
+            The real prices on chart
+        calculated_price
+            The calculated prices from formulas
+        pips : float, optional
+            The tolerance in pips, by default 3
+
+        Returns
+        -------
+        np.ndarray
+            Whether each error is acceptable or not
+        """
+        error = np.abs(np.asarray(real_price) - np.asarray(calculated_price))
+
+        return error < self.to_price(symbols, np.full(error.shape, pips))
+
+    def pip_value(self, symbols: Symbols, lots=1.0) -> np.ndarray:
+        """
+        Value of one pip for `lots` lots, in the quote currency
+        """
+        return (
+            np.asarray(lots)
+            * self._column(self.pip_sizes, symbols, lots)
+            * self._column(self.contract_sizes, symbols, lots)
+        )
+
+    def position_value(self, symbols: Symbols, price, lots=1.0) -> np.ndarray:
+        """
+        Notional value of positions of `lots` lots at `price`, in the quote currency
+        """
+        price, lots = np.broadcast_arrays(np.asarray(price), np.asarray(lots))
+
+        return price * lots * self._column(self.contract_sizes, symbols, price)
+
+    def profit(self, symbols: Symbols, entry_price, exit_price, lots=1.0) -> np.ndarray:
+        """
+        Profit of positions in the quote currency, negative `lots` for shorts
+        """
+        return self.position_value(
+            symbols, np.asarray(exit_price) - np.asarray(entry_price), lots
+        )
+
+
+INSTRUMENTS = InstrumentRegistry.default()
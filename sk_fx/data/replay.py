@@ -0,0 +1,451 @@
+"""
+Market replay harness for offline throughput and latency testing
+
+Historical bars (CSV, Parquet or a directory of `<field>.npy` files) or ticks
+(aggregated with `TickAggregator`) are fed bar by bar into a chain of stages
+(oscillators, Fibonacci confluence, the strategy) in real time, accelerated
+(`speed=100`) or as fast as possible (`speed=None`). The harness records the
+throughput, the latency percentiles of every stage and the resident memory
+over time.
+"""
+
+import copy
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Union
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.data.chunked import open_npy_directory, source_length
+from sk_fx.data.ring_buffer import OHLCV_FIELDS
+from sk_fx.data.tick_aggregator import BarCloseEvent, TickAggregator
+from sk_fx.indicators.idtypes import TimeFrame
+from sk_fx.strategy.signal_fusion import FibConfluence, SignalFusion
+
+Stage = Callable[[BarCloseEvent], object]
+
+_TICK_FIELDS = ("time", "bid", "ask", "volume")
+
+
+def _read_blocks(
+    path: Union[str, os.PathLike], columns: tuple, block_size: int
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Blocks of the `columns` (those present) of a CSV, Parquet or `.npy` directory
+    """
+    path = os.fspath(path)
+    if os.path.isdir(path):
+        source = open_npy_directory(path, columns)
+        for start in range(0, source_length(source), block_size):
+            block = {
+                column: np.asarray(values[start : start + block_size])
+                for column, values in source.items()
+            }
+            if "time" in block:
+                block["time"] = block["time"].astype("datetime64[ns]", copy=False)
+            yield block
+        return
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        names = [column for column in columns if column in parquet.schema_arrow.names]
+        chunks = (
+            batch.to_pandas(ignore_metadata=True)
+            for batch in parquet.iter_batches(batch_size=block_size, columns=names)
+        )
+    else:
+        chunks = pd.read_csv(
+            path, chunksize=block_size, usecols=lambda column: column in columns
+        )
+
+    for chunk in chunks:
+        block = {
+            column: chunk[column].to_numpy(np.float64)
+            for column in chunk.columns
+            if column != "time"
+        }
+        if "time" in chunk:
+            block["time"] = pd.to_datetime(chunk["time"]).to_numpy("datetime64[ns]")
+        yield block
+
+
+def read_ohlcv(
+    path: Union[str, os.PathLike], block_size: int = 1 << 16
+) -> Dict[str, np.ndarray]:
+    """
+    Read the whole OHLCV history of a local file, see `read_bars`
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        The 'time' (when present) and OHLCV fields of the file
+    """
+    blocks = list(_read_blocks(path, ("time",) + OHLCV_FIELDS, block_size))
+    if len(blocks) == 0:
+        return {field: np.empty(0) for field in OHLCV_FIELDS}
+
+    return {
+        field: np.concatenate([block[field] for block in blocks]) for field in blocks[0]
+    }
+
+
+def read_bars(
+    path: Union[str, os.PathLike],
+    time_frame: TimeFrame = TimeFrame.H1,
+    block_size: int = 1 << 16,
+) -> Iterator[BarCloseEvent]:
+    """
+    Stream the bars of a local file one at a time, reading it block by block
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        CSV or Parquet file with a 'time' column and lowercase OHLCV columns,
+        or a directory of `<field>.npy` files (including `time.npy`)
+    time_frame : TimeFrame, optional
+        Time frame of the bars, by default H1
+    block_size : int, optional
+        Number of bars read at once, by default 65536
+
+    Yields
+    ------
+    BarCloseEvent
+        The bars in file order
+    """
+    for block in _read_blocks(path, ("time",) + OHLCV_FIELDS, block_size):
+        n_bars = len(block["close"])
+        times = block.get("time", np.full(n_bars, np.datetime64("NaT", "ns")))
+        volume = block.get("volume", np.zeros(n_bars))
+        for i in range(n_bars):
+            yield BarCloseEvent(
+                time_frame,
+                times[i],
+                float(block["open"][i]),
+                float(block["high"][i]),
+                float(block["low"][i]),
+                float(block["close"][i]),
+                float(volume[i]),
+                0,
+            )
+
+
+def read_tick_bars(
+    path: Union[str, os.PathLike],
+    time_frame: TimeFrame = TimeFrame.M1,
+    block_size: int = 1 << 16,
+) -> Iterator[BarCloseEvent]:
+    """
+    Stream the bars aggregated from the ticks of a local file
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        CSV or Parquet file (or `.npy` directory) with 'time', 'bid', 'ask'
+        and optionally 'volume' columns
+    time_frame : TimeFrame, optional
+        Time frame of the replayed bars, by default M1
+    block_size : int, optional
+        Number of ticks aggregated at once, by default 65536
+
+    Yields
+    ------
+    BarCloseEvent
+        The closed bars, the last forming bar included
+    """
+    aggregator = TickAggregator(time_frames=(time_frame,), capacity=2)
+    for block in _read_blocks(path, _TICK_FIELDS, block_size):
+        yield from aggregator.update(
+            block["time"], block["bid"], block["ask"], block.get("volume", 0.0)
+        )
+    yield from aggregator.flush()
+
+
+def _bar_fields(bar: BarCloseEvent) -> Dict[str, np.ndarray]:
+    return {
+        field: np.array([getattr(bar, field)], dtype=np.float64)
+        for field in OHLCV_FIELDS
+    }
+
+
+def oscillator_stage(oscillator, **options) -> Stage:
+    """
+    Stage updating an oscillator with each bar, resumed from its kernel state
+    """
+    oscillator = copy.copy(oscillator)
+    state = {}
+
+    def update(bar: BarCloseEvent):
+        oscillator.ohlcv = _bar_fields(bar)
+        return oscillator.calculate(state=state, **options)
+
+    return update
+
+
+def fib_stage(lookback: int = 50, tolerance: float = 0.001, **options) -> Stage:
+    """
+    Stage updating the Fibonacci confluence of the rolling swing, see
+    `FibConfluence`
+    """
+    confluence = FibConfluence(lookback=lookback, tolerance=tolerance, **options)
+    state = {}
+
+    def update(bar: BarCloseEvent):
+        return confluence.compute(_bar_fields(bar), state)
+
+    return update
+
+
+def strategy_stage(fusion: SignalFusion) -> Stage:
+    """
+    Stage evaluating the entry rules of a signal fusion on each bar
+    """
+    stream = fusion.stream()
+
+    def update(bar: BarCloseEvent):
+        return stream.update(
+            bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume
+        )
+
+    return update
+
+
+def resident_memory() -> int:
+    """
+    Resident set size of the process in bytes (peak size off Linux)
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentiles(latencies: np.ndarray) -> Dict[str, float]:
+    """
+    Latency percentiles in microseconds
+    """
+    if len(latencies) == 0:
+        return {}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) / 1e3
+
+    return {
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(latencies.max() / 1e3),
+    }
+
+
+class ReplayReport:
+    """
+    Throughput, latency and memory of a replay
+    """
+
+    n_bars: int
+    elapsed: float
+    busy: float
+    latencies: Dict[str, np.ndarray]
+    memory: np.ndarray
+
+    def __init__(
+        self,
+        n_bars: int,
+        elapsed: float,
+        busy: float,
+        latencies: Dict[str, np.ndarray],
+        memory: np.ndarray,
+    ) -> None:
+        self.n_bars = n_bars
+        self.elapsed = elapsed
+        self.busy = busy
+        self.latencies = latencies
+        self.memory = memory
+
+    @property
+    def bars_per_second(self) -> float:
+        """
+        Replayed bars per wall clock second, pacing included
+        """
+        return self.n_bars / self.elapsed if self.elapsed else float("inf")
+
+    @property
+    def capacity(self) -> float:
+        """
+        Bars per second the stages could sustain, pacing excluded
+        """
+        return self.n_bars / self.busy if self.busy else float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "n_bars": self.n_bars,
+            "elapsed": self.elapsed,
+            "bars_per_second": self.bars_per_second,
+            "capacity": self.capacity,
+            "latency_us": {
+                stage: _percentiles(latencies)
+                for stage, latencies in self.latencies.items()
+            },
+            "peak_memory": int(self.memory[:, 1].max()) if len(self.memory) else 0,
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.n_bars} bars in {self.elapsed:.3f} s: "
+            f"{self.bars_per_second:,.0f} bars/s (capacity {self.capacity:,.0f} bars/s)"
+        ]
+        for stage, stats in self.to_dict()["latency_us"].items():
+            lines.append(
+                f"  {stage:<20} "
+                + "  ".join(f"{key} {value:8.1f} us" for key, value in stats.items())
+            )
+        if len(self.memory):
+            lines.append(f"  peak memory {self.memory[:, 1].max() / 2**20:.1f} MiB")
+
+        return "\n".join(lines)
+
+    def regressions(self, baseline: Mapping, tolerance: float = 0.25) -> List[str]:
+        """
+        Compare with the `to_dict` of a previous run
+
+        Parameters
+        ----------
+        baseline : Mapping
+            A previous report, e.g. loaded from JSON
+        tolerance : float, optional
+            Allowed relative slowdown, by default 0.25 (25 %)
+
+        Returns
+        -------
+        List[str]
+            Description of every metric slower than the baseline
+        """
+        if isinstance(baseline, (str, os.PathLike)):
+            with open(baseline) as file:
+                baseline = json.load(file)
+
+        current = self.to_dict()
+        found = []
+        if current["capacity"] < baseline["capacity"] * (1 - tolerance):
+            found.append(
+                f"capacity {current['capacity']:,.0f} < {baseline['capacity']:,.0f} bars/s"
+            )
+        for stage, stats in baseline["latency_us"].items():
+            latency = current["latency_us"].get(stage, {}).get("p95")
+            if latency is not None and latency > stats["p95"] * (1 + tolerance):
+                found.append(f"{stage} p95 {latency:.1f} > {stats['p95']:.1f} us")
+
+        return found
+
+
+class ReplayHarness:
+    """
+    Feed bars into a chain of stages at a given speed and measure them
+
+    Example
+    -------
+    >>> harness = ReplayHarness(
+    ...     {
+    ...         "rsi": oscillator_stage(RSIOscillator()),
+    ...         "fib": fib_stage(lookback=50),
+    ...         "strategy": strategy_stage(fusion),
+    ...     },
+    ...     speed=100,
+    ... )
+    >>> print(harness.run(read_bars("EURUSD-H1.csv")).summary())
+    """
+
+    stages: Dict[str, Stage]
+    speed: float
+    memory_every: int
+
+    def __init__(
+        self,
+        stages: Dict[str, Stage],
+        speed: float = None,
+        memory_every: int = 1000,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        stages : Dict[str, Stage]
+            Stages called in order with each bar
+        speed : float, optional
+            Replay speed relative to the bar times, 1 for real time, 100 for
+            100x, by default None (as fast as possible)
+        memory_every : int, optional
+            Bars between two memory samples, by default 1000
+        """
+        self.stages = stages
+        self.speed = speed
+        self.memory_every = memory_every
+
+    def run(self, bars: Iterable[BarCloseEvent], max_bars: int = None) -> ReplayReport:
+        """
+        Replay the bars through every stage
+
+        Parameters
+        ----------
+        bars : Iterable[BarCloseEvent]
+            The bars, e.g. from `read_bars` or `read_tick_bars`
+        max_bars : int, optional
+            Stop after this number of bars, by default all of them
+
+        Returns
+        -------
+        ReplayReport
+            The measurements of the replay
+        """
+        latencies = {name: [] for name in self.stages}
+        latencies["total"] = []
+        memory = []
+        busy = 0
+
+        start = time.perf_counter_ns()
+        first_time = None
+        n_bars = 0
+        for bar in bars:
+            if max_bars is not None and n_bars >= max_bars:
+                break
+
+            # * Wait until the bar is due at the replay speed, bars without
+            # * a time are not paced
+            if self.speed is not None and not np.isnat(bar.time):
+                if first_time is None:
+                    first_time = bar.time
+                due = start + int(
+                    (bar.time - first_time) / np.timedelta64(1, "ns") / self.speed
+                )
+                delay = due - time.perf_counter_ns()
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+
+            bar_start = time.perf_counter_ns()
+            stage_start = bar_start
+            for name, stage in self.stages.items():
+                stage(bar)
+                stage_end = time.perf_counter_ns()
+                latencies[name].append(stage_end - stage_start)
+                stage_start = stage_end
+            latencies["total"].append(stage_start - bar_start)
+            busy += stage_start - bar_start
+
+            if n_bars % self.memory_every == 0:
+                memory.append((n_bars, resident_memory()))
+            n_bars += 1
+
+        elapsed = (time.perf_counter_ns() - start) / 1e9
+        memory.append((n_bars, resident_memory()))
+
+        return ReplayReport(
+            n_bars,
+            elapsed,
+            busy / 1e9,
+            {name: np.asarray(values) for name, values in latencies.items()},
+            np.asarray(memory, dtype=np.int64).reshape(-1, 2),
+        )
@@ -0,0 +1,140 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class OHLCVRingBuffer:
+    """
+    Fixed capacity OHLCV bar storage backed by NumPy arrays
+
+    Once the capacity is reached, the oldest bars are overwritten so that the
+    memory used by the buffer never grows. Every bar is written twice, at
+    `pos` and `pos + capacity`, so the latest bars always form one contiguous
+    slice and can be handed out as zero-copy views. Views are only valid
+    until the next write to the buffer.
+
+    The buffer can be used in place of an `ohlcv` data frame: indexing it by
+    a field name returns a time indexed `pd.Series` viewing the stored bars.
+    """
+
+    __slots__ = ("capacity", "_time", "_data", "_head", "_size")
+
+    capacity: int
+
+    def __init__(self, capacity: int = 5000) -> None:
+        assert capacity > 0, "Capacity must be positive"
+
+        self.capacity = capacity
+        self._time = np.zeros(2 * capacity, dtype="datetime64[ns]")
+        self._data = np.full((len(OHLCV_FIELDS), 2 * capacity), np.nan)
+        self._head = 0  # Next write position, always in [0, capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, field: str) -> pd.Series:
+        """
+        Zero-copy series of one OHLCV field over the stored bars
+        """
+        if field not in OHLCV_FIELDS:
+            raise KeyError(field)
+
+        window = self._slice(self._size)
+
+        return pd.Series(
+            self._data[OHLCV_FIELDS.index(field), window],
+            index=pd.DatetimeIndex(self._time[window], copy=False, name="time"),
+            name=field,
+            copy=False,
+        )
+
+    def __contains__(self, field: str) -> bool:
+        return field in OHLCV_FIELDS
+
+    def append(
+        self,
+        time: np.datetime64,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+    ) -> None:
+        """
+        Append a single bar to the buffer, overwriting the oldest bar when full
+        """
+        pos = self._head
+        mirror = pos + self.capacity
+        self._time[pos] = self._time[mirror] = time
+        self._data[:, pos] = self._data[:, mirror] = (open, high, low, close, volume)
+
+        self._head = (pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(
+        self,
+        time: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ) -> None:
+        """
+        Append a block of bars to the buffer
+        """
+        n_bars = len(time)
+        if n_bars == 0:
+            return
+
+        # Only the last `capacity` bars can survive the write
+        skip = max(n_bars - self.capacity, 0)
+        positions = (self._head + skip + np.arange(n_bars - skip)) % self.capacity
+        values = np.vstack((open, high, low, close, volume))[:, skip:]
+        for offset in (0, self.capacity):
+            self._time[positions + offset] = np.asarray(time)[skip:]
+            self._data[:, positions + offset] = values
+
+        self._head = (self._head + n_bars) % self.capacity
+        self._size = min(self._size + n_bars, self.capacity)
+
+    def window(self, n_bars: int = None) -> Dict[str, np.ndarray]:
+        """
+        Get zero-copy views of the latest bars in chronological order
+
+        Parameters
+        ----------
+        n_bars : int, optional
+            Number of latest bars to return, by default all stored bars
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            Contiguous views of `time` and the OHLCV fields
+        """
+        n_bars = self._size if n_bars is None else min(n_bars, self._size)
+        window = self._slice(n_bars)
+
+        views = {"time": self._time[window]}
+        for i, field in enumerate(OHLCV_FIELDS):
+            views[field] = self._data[i, window]
+
+        return views
+
+    def to_frame(self, n_bars: int = None) -> pd.DataFrame:
+        """
+        Get a copy of the latest bars as an `ohlcv` data frame indexed by the bar time
+        """
+        window = self.window(n_bars)
+        time = window.pop("time")
+
+        return pd.DataFrame(window, index=pd.DatetimeIndex(time, name="time"))
+
+    def _slice(self, n_bars: int) -> slice:
+        end = self._head + self.capacity
+
+        return slice(end - n_bars, end)
@@ -0,0 +1,273 @@
+"""
+Versioned binary snapshots of streaming indicator states
+
+The states carried by the kernels (see `DivergenceOscillator.calculate`) are
+nested dicts of numbers, lists and NumPy arrays. A snapshot stores the
+structure as a small JSON header and every array as raw bytes after it, so a
+restore is one read plus zero-copy `np.frombuffer` views instead of a replay of
+the bar history.
+
+Layout (little endian)::
+
+    b"SKFXSNAP" | version: u16 | header size: u32 | header (JSON)
+    | padding to 64 bytes | array 0 | padding | array 1 | ...
+"""
+
+import copy
+import json
+import os
+import struct
+import time
+from typing import Any, Dict, NamedTuple
+
+import numpy as np
+
+MAGIC = b"SKFXSNAP"
+VERSION = 1
+
+_PREFIX = struct.Struct("<8sHI")
+_ALIGNMENT = 64
+
+
+class Snapshot(NamedTuple):
+    version: int
+    created: int  # Unix time in nanoseconds
+    metadata: Dict[str, Any]
+    state: Any
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _encode(state, arrays: list):
+    if isinstance(state, dict):
+        return {key: _encode(value, arrays) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        encoded = [_encode(value, arrays) for value in state]
+        return {"__tuple__": encoded} if isinstance(state, tuple) else encoded
+    if isinstance(state, np.ndarray):
+        arrays.append(np.ascontiguousarray(state))
+        return {"__array__": len(arrays) - 1}
+    if isinstance(state, np.generic):
+        return state.item()
+
+    return state
+
+
+def _decode(state, arrays: list):
+    if isinstance(state, dict):
+        if "__array__" in state:
+            return arrays[state["__array__"]]
+        if "__tuple__" in state:
+            return tuple(_decode(value, arrays) for value in state["__tuple__"])
+        return {key: _decode(value, arrays) for key, value in state.items()}
+    if isinstance(state, list):
+        return [_decode(value, arrays) for value in state]
+
+    return state
+
+
+def dumps_snapshot(state, metadata: Dict[str, Any] = None) -> bytes:
+    """
+    Serialize a state into snapshot bytes
+
+    Parameters
+    ----------
+    state
+        Nested dicts, lists and tuples of numbers, strings and NumPy arrays
+    metadata : Dict[str, Any], optional
+        JSON serializable information stored with the state, e.g. the last
+        bar time, by default None
+
+    Returns
+    -------
+    bytes
+        The snapshot
+    """
+    arrays = []
+    encoded = _encode(state, arrays)
+
+    layout, offset = [], 0
+    for array in arrays:
+        layout.append(
+            {"dtype": array.dtype.str, "shape": array.shape, "offset": offset}
+        )
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps(
+        {
+            "created": time.time_ns(),
+            "metadata": {} if metadata is None else metadata,
+            "state": encoded,
+            "arrays": layout,
+        }
+    ).encode()
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    buffer = bytearray(data_start + offset)
+    _PREFIX.pack_into(buffer, 0, MAGIC, VERSION, len(header))
+    buffer[_PREFIX.size : _PREFIX.size + len(header)] = header
+    for array, entry in zip(arrays, layout):
+        start = data_start + entry["offset"]
+        buffer[start : start + array.nbytes] = array.tobytes()
+
+    return bytes(buffer)
+
+
+def loads_snapshot(data: bytes, copy: bool = False) -> Snapshot:
+    """
+    Deserialize snapshot bytes
+
+    Parameters
+    ----------
+    data : bytes
+        The snapshot
+    copy : bool, optional
+        Copy the arrays instead of returning read-only views of `data`, by
+        default False; the kernels replace state arrays rather than writing
+        into them, so views are enough to resume a calculation
+
+    Returns
+    -------
+    Snapshot
+        The version, creation time, metadata and state
+
+    Raises
+    ------
+    ValueError
+        When the data is not a snapshot or has an unsupported version
+    """
+    if len(data) < _PREFIX.size:
+        raise ValueError("Not an indicator state snapshot")
+    magic, version, header_size = _PREFIX.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an indicator state snapshot")
+    if version > VERSION:
+        raise ValueError(f"Unsupported snapshot version {version} > {VERSION}")
+
+    header = json.loads(bytes(data[_PREFIX.size : _PREFIX.size + header_size]))
+    data_start = _aligned(_PREFIX.size + header_size)
+
+    arrays = []
+    for entry in header["arrays"]:
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        array = np.frombuffer(
+            data, dtype=dtype, count=count, offset=data_start + entry["offset"]
+        ).reshape(entry["shape"])
+        arrays.append(array.copy() if copy else array)
+
+    return Snapshot(
+        version, header["created"], header["metadata"], _decode(header["state"], arrays)
+    )
+
+
+def save_snapshot(path: str, state, metadata: Dict[str, Any] = None) -> None:
+    """
+    Write a snapshot file atomically, a reader never sees a partial file
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(dumps_snapshot(state, metadata))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def load_snapshot(path: str, copy: bool = False) -> Snapshot:
+    """
+    Read a snapshot file, see `loads_snapshot`
+    """
+    with open(path, "rb") as file:
+        return loads_snapshot(file.read(), copy=copy)
+
+
+class PeriodicSnapshot:
+    """
+    Save a streaming state every `every_bars` bars and/or `every_seconds`
+
+    Example
+    -------
+    >>> snapshots = PeriodicSnapshot("rsi.snap", every_bars=500)
+    >>> for block in blocks:
+    ...     rsi = RSIOscillator(ohlcv=block).calculate(state=state)
+    ...     snapshots.update(state, n_bars=len(block["close"]))
+    """
+
+    path: str
+    every_bars: int
+    every_seconds: float
+
+    def __init__(
+        self, path: str, every_bars: int = None, every_seconds: float = None
+    ) -> None:
+        assert (
+            every_bars is not None or every_seconds is not None
+        ), "Snapshot period must be given in bars or seconds"
+
+        self.path = path
+        self.every_bars = every_bars
+        self.every_seconds = every_seconds
+        self._bars = 0
+        self._saved_at = time.monotonic()
+
+    def update(self, state, n_bars: int = 1, metadata: Dict[str, Any] = None) -> bool:
+        """
+        Count the processed bars and save the state when a period elapsed
+
+        Returns
+        -------
+        bool
+            Whether a snapshot was written
+        """
+        self._bars += n_bars
+        due = (self.every_bars is not None and self._bars >= self.every_bars) or (
+            self.every_seconds is not None
+            and time.monotonic() - self._saved_at >= self.every_seconds
+        )
+        if due:
+            save_snapshot(self.path, state, metadata)
+            self._bars = 0
+            self._saved_at = time.monotonic()
+
+        return due
+
+
+def verify_restore(indicator, state, next_ohlcv, **options) -> bool:
+    """
+    Check that a snapshot of `state` resumes exactly like the live state
+
+    The next block is computed once from a copy of the live state and once
+    from the state restored from a snapshot; the values must be identical,
+    NaN included.
+
+    Parameters
+    ----------
+    indicator
+        Oscillator (or any indicator with `ohlcv` and `calculate(state=...)`)
+    state
+        The live state after the bars processed so far, left unchanged
+    next_ohlcv
+        The next bars
+    **options
+        Extra options passed to `calculate`
+
+    Returns
+    -------
+    bool
+        Whether the restored instance produces the same next values
+    """
+    restored = loads_snapshot(dumps_snapshot(state)).state
+
+    results = []
+    for resumed_state in (copy.deepcopy(state), restored):
+        resumed = copy.copy(indicator)
+        resumed.ohlcv = next_ohlcv
+        results.append(resumed.calculate(state=resumed_state, **options))
+
+    live, from_snapshot = (np.asarray(result, dtype=np.float64) for result in results)
+
+    return live.shape == from_snapshot.shape and bool(
+        np.array_equal(live, from_snapshot, equal_nan=True)
+    )
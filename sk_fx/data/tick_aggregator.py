@@ -0,0 +1,353 @@
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from sk_fx.data.ring_buffer import OHLCVRingBuffer
+from sk_fx.indicators.idtypes import TimeFrame
+
+DEFAULT_TIME_FRAMES = (
+    TimeFrame.M1,
+    TimeFrame.M5,
+    TimeFrame.M15,
+    TimeFrame.M30,
+    TimeFrame.H1,
+    TimeFrame.H4,
+    TimeFrame.D1,
+)
+
+_NS_PER_SECOND = 1_000_000_000
+# * 1970-01-04, the first Sunday of the epoch
+_FIRST_SUNDAY = 3 * 24 * 3600 * _NS_PER_SECOND
+
+
+class BarCloseEvent(NamedTuple):
+    time_frame: TimeFrame
+    time: np.datetime64  # Open time of the bar
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    ticks: int
+
+
+class _BarGroups(NamedTuple):
+    bucket: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    ticks: np.ndarray
+
+
+def _group_bars(
+    bucket: np.ndarray,
+    open: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    ticks: np.ndarray,
+) -> _BarGroups:
+    """
+    Reduce consecutive rows sharing the same (sorted) bucket into bars
+    """
+    starts = np.flatnonzero(bucket[1:] != bucket[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    ends = np.concatenate((starts[1:], [len(bucket)])) - 1
+
+    return _BarGroups(
+        bucket=bucket[starts],
+        open=open[starts],
+        high=np.maximum.reduceat(high, starts),
+        low=np.minimum.reduceat(low, starts),
+        close=close[ends],
+        volume=np.add.reduceat(volume, starts),
+        ticks=np.add.reduceat(ticks, starts),
+    )
+
+
+class TickAggregator:
+    """
+    Aggregate bid/ask/volume ticks into OHLCV bars of several time frames at once
+
+    Bars are built on the mid price and stored per time frame in a
+    `OHLCVRingBuffer`. Ticks can be pushed one by one or in NumPy blocks, the
+    block path is fully vectorized: ticks are reduced once into bars of the
+    finest time frame and every coarser time frame is built from those bars.
+
+    Bars are aligned on the Unix epoch, except the weekly bars which open with
+    the FX week (`week_open`, Sunday 22:00 UTC as in `sk_fx.data.calendar`).
+    """
+
+    time_frames: tuple
+
+    def __init__(
+        self,
+        time_frames: Iterable[TimeFrame] = DEFAULT_TIME_FRAMES,
+        capacity: int = 5000,
+        week_open: np.timedelta64 = np.timedelta64(22, "h"),
+    ) -> None:
+        """
+        Parameters
+        ----------
+        time_frames : Iterable[TimeFrame], optional
+            Time frames of the bars, by default M1 to D1
+        capacity : int, optional
+            Closed bars kept per time frame, by default 5000
+        week_open : np.timedelta64, optional
+            Open of the weekly bars after Sunday 00:00 UTC, by default 22 hours
+        """
+        self.time_frames = tuple(sorted(time_frames, key=lambda tf: tf.seconds))
+        assert len(self.time_frames) > 0, "At least one time frame is required"
+
+        self._steps = {tf: tf.seconds * _NS_PER_SECOND for tf in self.time_frames}
+        week_origin = _FIRST_SUNDAY + int(week_open / np.timedelta64(1, "ns"))
+        self._origins = {
+            tf: week_origin % step if tf is TimeFrame.W1 else 0
+            for tf, step in self._steps.items()
+        }
+        self._base_step = self._steps[self.time_frames[0]]
+        self._base_origin = self._origins[self.time_frames[0]]
+        for tf, step in self._steps.items():
+            assert (
+                step % self._base_step == 0
+            ), f"{tf} is not a multiple of {self.time_frames[0]}"
+            assert (
+                self._origins[tf] - self._base_origin
+            ) % self._base_step == 0, (
+                f"{tf} bars do not open on {self.time_frames[0]} bars"
+            )
+
+        self._bars = {tf: OHLCVRingBuffer(capacity) for tf in self.time_frames}
+        self._open_bars: Dict[TimeFrame, Optional[list]] = {
+            tf: None for tf in self.time_frames
+        }
+        self._last_time: Optional[int] = None
+        self._callbacks: List[tuple] = []
+
+    def bars(self, time_frame: TimeFrame) -> OHLCVRingBuffer:
+        """
+        Closed bars of the given time frame
+        """
+        return self._bars[time_frame]
+
+    def current_bar(self, time_frame: TimeFrame) -> Optional[BarCloseEvent]:
+        """
+        The bar of the given time frame that is still forming, if any
+        """
+        open_bar = self._open_bars[time_frame]
+        if open_bar is None:
+            return None
+
+        return self._to_event(time_frame, open_bar)
+
+    def subscribe(
+        self,
+        callback: Callable[[BarCloseEvent], None],
+        time_frames: Iterable[TimeFrame] = None,
+    ) -> None:
+        """
+        Register a callback receiving the bar-close events
+
+        Parameters
+        ----------
+        callback : Callable[[BarCloseEvent], None]
+            Function called once for each closed bar
+        time_frames : Iterable[TimeFrame], optional
+            Time frames the callback listens to, by default all of them
+        """
+        listened = set(self.time_frames if time_frames is None else time_frames)
+        self._callbacks.append((callback, listened))
+
+    def update(self, time, bid, ask, volume=0.0) -> List[BarCloseEvent]:
+        """
+        Push a single tick or a block of ticks into the aggregator
+
+        Subscribers are notified after the whole block has been aggregated, so
+        the bar buffers already contain every bar closed by the block.
+
+        Parameters
+        ----------
+        time : datetime64 or array of datetime64
+            Tick times, must be non-decreasing
+        bid : float or np.ndarray
+            Bid prices
+        ask : float or np.ndarray
+            Ask prices
+        volume : float or np.ndarray, optional
+            Tick volumes, by default 0.0
+
+        Returns
+        -------
+        List[BarCloseEvent]
+            The bars closed by the ticks, ordered by their close time
+
+        Raises
+        ------
+        ValueError
+            When the ticks are not ordered in time
+        """
+        time = np.atleast_1d(np.asarray(time, dtype="datetime64[ns]")).view(np.int64)
+        if len(time) == 0:
+            return []
+
+        bid = np.atleast_1d(np.asarray(bid, dtype=np.float64))
+        ask = np.atleast_1d(np.asarray(ask, dtype=np.float64))
+        volume = np.broadcast_to(np.asarray(volume, dtype=np.float64), time.shape)
+
+        if len(time) == 1 and self._update_forming(
+            int(time[0]), bid[0], ask[0], volume[0]
+        ):
+            return []
+
+        if (self._last_time is not None and time[0] < self._last_time) or np.any(
+            time[1:] < time[:-1]
+        ):
+            raise ValueError("Ticks must be pushed in chronological order")
+        self._last_time = int(time[-1])
+
+        # * Reduce ticks into bars of the finest time frame
+        price = (bid + ask) * 0.5
+        base_groups = _group_bars(
+            (time - self._base_origin) // self._base_step,
+            price,
+            price,
+            price,
+            price,
+            volume,
+            np.ones(len(time), dtype=np.int64),
+        )
+
+        # * Coarser time frames are built from the finest bars
+        events = []
+        base_time = base_groups.bucket * self._base_step + self._base_origin
+        for tf in self.time_frames:
+            groups = (
+                base_groups
+                if self._steps[tf] == self._base_step
+                else _group_bars(
+                    (base_time - self._origins[tf]) // self._steps[tf],
+                    *base_groups[1:],
+                )
+            )
+            events.extend(self._merge(tf, groups))
+
+        events.sort(
+            key=lambda event: event.time + np.timedelta64(event.time_frame.seconds, "s")
+        )
+
+        self._notify(events)
+        return events
+
+    def flush(self) -> List[BarCloseEvent]:
+        """
+        Close every forming bar, e.g. at the end of a historical tick file
+
+        Returns
+        -------
+        List[BarCloseEvent]
+            The bars closed by the flush
+        """
+        events = []
+        for tf in self.time_frames:
+            open_bar = self._open_bars[tf]
+            if open_bar is None:
+                continue
+
+            self._store(tf, [np.asarray([value]) for value in open_bar])
+            self._open_bars[tf] = None
+            events.append(self._to_event(tf, open_bar))
+
+        self._notify(events)
+        return events
+
+    def _update_forming(self, time: int, bid: float, ask: float, volume: float) -> bool:
+        """
+        Fast path for a single tick falling inside the forming bars
+
+        Time frames are aligned multiples of the finest one, so a tick inside
+        the forming bar of the finest time frame is inside every forming bar.
+        """
+        base_bar = self._open_bars[self.time_frames[0]]
+        if (
+            base_bar is None
+            or (time - self._base_origin) // self._base_step != base_bar[0]
+            or time < self._last_time
+        ):
+            return False
+
+        price = (float(bid) + float(ask)) * 0.5
+        volume = float(volume)
+        for open_bar in self._open_bars.values():
+            if price > open_bar[2]:
+                open_bar[2] = price
+            elif price < open_bar[3]:
+                open_bar[3] = price
+            open_bar[4] = price
+            open_bar[5] += volume
+            open_bar[6] += 1
+        self._last_time = time
+
+        return True
+
+    def _merge(self, tf: TimeFrame, groups: _BarGroups) -> List[BarCloseEvent]:
+        """
+        Merge a block of bars with the forming bar of the time frame
+        """
+        columns = [np.array(column) for column in groups]
+
+        open_bar = self._open_bars[tf]
+        if open_bar is not None:
+            bucket, open, high, low, _, volume, ticks = columns
+            if bucket[0] == open_bar[0]:
+                open[0] = open_bar[1]
+                high[0] = max(high[0], open_bar[2])
+                low[0] = min(low[0], open_bar[3])
+                volume[0] += open_bar[5]
+                ticks[0] += open_bar[6]
+            else:
+                columns = [
+                    np.concatenate(([value], column))
+                    for value, column in zip(open_bar, columns)
+                ]
+
+        self._open_bars[tf] = [column[-1].item() for column in columns]
+
+        closed = [column[:-1] for column in columns]
+        self._store(tf, closed)
+
+        return [self._to_event(tf, row) for row in zip(*closed)]
+
+    def _store(self, tf: TimeFrame, columns: List[np.ndarray]) -> None:
+        bucket, open, high, low, close, volume, _ = columns
+        if len(bucket) == 0:
+            return
+
+        self._bars[tf].extend(
+            (bucket * self._steps[tf] + self._origins[tf]).view("datetime64[ns]"),
+            open,
+            high,
+            low,
+            close,
+            volume,
+        )
+
+    def _to_event(self, tf: TimeFrame, row: list) -> BarCloseEvent:
+        return BarCloseEvent(
+            time_frame=tf,
+            time=np.datetime64(int(row[0]) * self._steps[tf] + self._origins[tf], "ns"),
+            open=float(row[1]),
+            high=float(row[2]),
+            low=float(row[3]),
+            close=float(row[4]),
+            volume=float(row[5]),
+            ticks=int(row[6]),
+        )
+
+    def _notify(self, events: List[BarCloseEvent]) -> None:
+        for callback, listened in self._callbacks:
+            for event in events:
+                if event.time_frame in listened:
+                    callback(event)
@@ -0,0 +1,224 @@
+"""
+Vectorized candlestick pattern recognition
+
+All patterns are evaluated with boolean operations over the OHLC arrays and
+their one and two bar shifts, and packed into one `uint16` bitmask per bar
+(see `CandlePattern`). Arrays may be a single history `(n_bars,)` or a panel
+`(n_symbols, n_bars)`; long histories are processed block by block to keep the
+temporaries small, and a `state` dict carries the last two bars across calls
+for streaming updates.
+"""
+
+import enum
+from typing import Dict, Tuple
+
+import numpy as np
+
+from sk_fx.utils import kernels
+
+
+class CandlePattern(enum.IntFlag):
+    DOJI = 1 << 0
+    BULLISH_PIN_BAR = 1 << 1
+    BEARISH_PIN_BAR = 1 << 2
+    BULLISH_ENGULFING = 1 << 3
+    BEARISH_ENGULFING = 1 << 4
+    INSIDE_BAR = 1 << 5
+    MORNING_STAR = 1 << 6
+    EVENING_STAR = 1 << 7
+
+    @classmethod
+    def bullish(cls) -> "CandlePattern":
+        return cls.BULLISH_PIN_BAR | cls.BULLISH_ENGULFING | cls.MORNING_STAR
+
+    @classmethod
+    def bearish(cls) -> "CandlePattern":
+        return cls.BEARISH_PIN_BAR | cls.BEARISH_ENGULFING | cls.EVENING_STAR
+
+
+_HISTORY = 2  # Bars before the current one used by the patterns
+
+
+def _candles(
+    open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray
+) -> Dict[str, np.ndarray]:
+    body_top = np.maximum(open, close)
+    body_bottom = np.minimum(open, close)
+
+    return {
+        "open": open,
+        "high": high,
+        "low": low,
+        "close": close,
+        "body": body_top - body_bottom,
+        "range": high - low,
+        "upper": high - body_top,
+        "lower": body_bottom - low,
+        "body_top": body_top,
+        "body_bottom": body_bottom,
+    }
+
+
+def _shift(candles: Dict[str, np.ndarray], bars: int) -> Dict[str, np.ndarray]:
+    """
+    Views of the candles `bars` bars before the last `n - 2` bars
+    """
+    stop = candles["close"].shape[-1] - bars
+    return {key: values[..., _HISTORY - bars : stop] for key, values in candles.items()}
+
+
+def _patterns(
+    candles: Dict[str, np.ndarray],
+    doji_body: float,
+    pin_wick: float,
+    star_body: float,
+) -> np.ndarray:
+    """
+    Bitmask of the bars after the first two of the candles
+    """
+    current, previous, first = (
+        _shift(candles, 0),
+        _shift(candles, 1),
+        _shift(candles, 2),
+    )
+    mask = np.zeros(current["close"].shape, dtype=np.uint16)
+
+    def mark(pattern: CandlePattern, condition: np.ndarray) -> None:
+        mask[condition] |= np.uint16(pattern)
+
+    body, candle_range = current["body"], current["range"]
+    bullish = current["close"] > current["open"]
+    bearish = current["close"] < current["open"]
+    previous_bullish = previous["close"] > previous["open"]
+    previous_bearish = previous["close"] < previous["open"]
+
+    # * Single bar patterns
+    mark(CandlePattern.DOJI, (candle_range > 0) & (body <= doji_body * candle_range))
+    nose = (1 - pin_wick) / 2 * candle_range
+    mark(
+        CandlePattern.BULLISH_PIN_BAR,
+        (candle_range > 0)
+        & (current["lower"] >= pin_wick * candle_range)
+        & (current["upper"] <= nose),
+    )
+    mark(
+        CandlePattern.BEARISH_PIN_BAR,
+        (candle_range > 0)
+        & (current["upper"] >= pin_wick * candle_range)
+        & (current["lower"] <= nose),
+    )
+
+    # * Two bar patterns
+    engulfs = (current["body_top"] >= previous["body_top"]) & (
+        current["body_bottom"] <= previous["body_bottom"]
+    )
+    engulfs &= body > previous["body"]
+    mark(CandlePattern.BULLISH_ENGULFING, previous_bearish & bullish & engulfs)
+    mark(CandlePattern.BEARISH_ENGULFING, previous_bullish & bearish & engulfs)
+    mark(
+        CandlePattern.INSIDE_BAR,
+        (current["high"] <= previous["high"]) & (current["low"] >= previous["low"]),
+    )
+
+    # * Three bar patterns: long first candle, small star, reversal past the midpoint
+    long_first = first["body"] > 0.5 * first["range"]
+    small_star = previous["body"] <= star_body * previous["range"]
+    first_middle = (first["open"] + first["close"]) / 2
+    mark(
+        CandlePattern.MORNING_STAR,
+        long_first
+        & (first["close"] < first["open"])
+        & small_star
+        & (previous["body_bottom"] <= first["close"])
+        & bullish
+        & (current["close"] > first_middle),
+    )
+    mark(
+        CandlePattern.EVENING_STAR,
+        long_first
+        & (first["close"] > first["open"])
+        & small_star
+        & (previous["body_top"] >= first["close"])
+        & bearish
+        & (current["close"] < first_middle),
+    )
+
+    return mask
+
+
+def candle_patterns(
+    open: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    doji_body: float = 0.1,
+    pin_wick: float = 0.6,
+    star_body: float = 0.3,
+    state: dict = None,
+    block_size: int = 1 << 18,
+) -> np.ndarray:
+    """
+    Candlestick patterns of every bar as a `CandlePattern` bitmask
+
+    Parameters
+    ----------
+    open, high, low, close : np.ndarray
+        Prices, bars along the last axis
+    doji_body : float, optional
+        Largest body of a doji as a fraction of the range, by default 0.1
+    pin_wick : float, optional
+        Smallest wick of a pin bar as a fraction of the range, by default 0.6;
+        the opposite wick is at most half of the remaining range
+    star_body : float, optional
+        Largest body of the star of a morning/evening star as a fraction of
+        its range, by default 0.3
+    state : dict, optional
+        The last two bars of the previous call, updated in place, by default None
+    block_size : int, optional
+        Bars evaluated at once, by default 262144
+
+    Returns
+    -------
+    np.ndarray
+        `uint16` bitmask of the same shape as `close`, test a pattern with
+        `mask & CandlePattern.DOJI`
+    """
+    prices = np.stack(
+        [np.asarray(values, dtype=np.float64) for values in (open, high, low, close)]
+    )
+    tail = None if state is None else state.get("tail")
+    if tail is None:
+        # * No history: two NaN bars make every multi bar pattern False
+        tail = np.full(prices.shape[:-1] + (_HISTORY,), np.nan)
+
+    n_bars = prices.shape[-1]
+    mask = kernels.prepare_out(None, prices.shape[1:], dtype=np.uint16)
+    for start in range(0, n_bars, block_size):
+        stop = min(start + block_size, n_bars)
+        block = np.concatenate((tail, prices[..., start:stop]), axis=-1)
+        mask[..., start:stop] = _patterns(
+            _candles(*block), doji_body, pin_wick, star_body
+        )
+        tail = block[..., -_HISTORY:]
+
+    if state is not None:
+        state["tail"] = np.array(tail)
+
+    return mask
+
+
+def pattern_counts(mask: np.ndarray) -> Dict[str, int]:
+    """
+    Number of bars showing each pattern
+    """
+    return {
+        pattern.name: int(np.count_nonzero(mask & np.uint16(pattern)))
+        for pattern in CandlePattern
+    }
+
+
+def pattern_names(bits: int) -> Tuple[str, ...]:
+    """
+    Names of the patterns of one bar, e.g. ('DOJI', 'INSIDE_BAR')
+    """
+    return tuple(pattern.name for pattern in CandlePattern if bits & pattern)
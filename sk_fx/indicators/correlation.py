@@ -0,0 +1,212 @@
+"""
+Rolling cross-pair correlation and currency strength
+
+The engine keeps the last `window` log returns of N pairs with their running
+sums and cross products, so each new bar updates the N x N covariance in
+O(N^2): the outer product of the new returns is added and the one of the
+returns leaving the window is subtracted. The sums are rebuilt from the window
+every `recompute_every` bars to stop the float drift of the updates.
+
+The currency strength of a currency is the average window return of the pairs
+it is part of, counted positive as the base and negative as the quote.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.data.instruments import INSTRUMENTS, InstrumentRegistry
+
+
+class CrossPairCorrelation:
+    """
+    Rolling N x N correlation of pair returns and currency strength index
+
+    The state arrays live in `state`, so they can be snapshotted with
+    `sk_fx.data.snapshot` and assigned back to resume.
+
+    Example
+    -------
+    >>> engine = CrossPairCorrelation(["EURUSD", "GBPUSD", "USDJPY"], window=100)
+    >>> for close in closes.T:  # one close per pair and bar
+    ...     correlation = engine.update(close)
+    ...     strength = engine.strength()
+    """
+
+    symbols: List[str]
+    currencies: List[str]
+    window: int
+    recompute_every: int
+    state: Dict[str, np.ndarray]
+
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        window: int = 100,
+        instruments: InstrumentRegistry = INSTRUMENTS,
+        recompute_every: int = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        symbols : Sequence[str]
+            Pairs of the universe, registered in `instruments`
+        window : int, optional
+            Number of returns in the rolling window, by default 100
+        instruments : InstrumentRegistry, optional
+            Registry giving the base and quote currencies, by default `INSTRUMENTS`
+        recompute_every : int, optional
+            Bars between two exact rebuilds of the sums, by default `window`,
+            keeping the amortized cost of a bar O(N^2)
+        """
+        assert window > 1, "Correlation window must be larger than 1"
+
+        self.symbols = list(symbols)
+        self.window = window
+        self.recompute_every = window if recompute_every is None else recompute_every
+
+        # * Incidence of the currencies in the pairs: +1 base, -1 quote
+        rows = instruments.index(self.symbols)
+        base = instruments.base_currencies[rows]
+        quote = instruments.quote_currencies[rows]
+        self.currencies = sorted(set(base) | set(quote))
+        self._incidence = np.zeros((len(self.currencies), len(self.symbols)))
+        for j, (base_currency, quote_currency) in enumerate(zip(base, quote)):
+            self._incidence[self.currencies.index(base_currency), j] = 1
+            self._incidence[self.currencies.index(quote_currency), j] = -1
+        self._incidence /= np.abs(self._incidence).sum(axis=1, keepdims=True)
+
+        n_symbols = len(self.symbols)
+        self.state = {
+            "returns": np.zeros((window, n_symbols)),
+            "sum": np.zeros(n_symbols),
+            "cross": np.zeros((n_symbols, n_symbols)),
+            "last_close": np.full(n_symbols, np.nan),
+            "head": 0,
+            "count": 0,
+            "since_recompute": 0,
+        }
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the window is full
+        """
+        return self.state["count"] >= self.window
+
+    def update(self, close: np.ndarray) -> np.ndarray:
+        """
+        Add the closes of a new bar
+
+        A missing close (NaN) counts as no move of its pair.
+
+        Parameters
+        ----------
+        close : np.ndarray
+            Close of every pair, in `symbols` order
+
+        Returns
+        -------
+        np.ndarray
+            The N x N correlation matrix, NaN until the window is full
+        """
+        state = self.state
+        close = np.asarray(close, dtype=np.float64)
+        last_close = state["last_close"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.log(close / last_close)
+        returns[~np.isfinite(returns)] = 0.0
+        state["last_close"] = np.where(np.isnan(close), last_close, close)
+        if np.isnan(last_close).all():
+            return self.correlation()
+
+        head = state["head"]
+        if state["count"] == self.window:
+            leaving = state["returns"][head]
+            state["sum"] -= leaving
+            state["cross"] -= np.outer(leaving, leaving)
+        state["returns"][head] = returns
+        state["sum"] += returns
+        state["cross"] += np.outer(returns, returns)
+        state["head"] = (head + 1) % self.window
+        state["count"] = min(state["count"] + 1, self.window)
+
+        state["since_recompute"] += 1
+        if state["since_recompute"] >= self.recompute_every:
+            self._recompute()
+
+        return self.correlation()
+
+    def _recompute(self) -> None:
+        window = self.state["returns"]
+        self.state["sum"] = window.sum(axis=0)
+        self.state["cross"] = window.T @ window
+        self.state["since_recompute"] = 0
+
+    def covariance(self) -> np.ndarray:
+        """
+        Sample covariance matrix of the window returns
+        """
+        count = self.state["count"]
+        if count < 2:
+            return np.full(self.state["cross"].shape, np.nan)
+
+        mean = self.state["sum"] / count
+        return (self.state["cross"] - count * np.outer(mean, mean)) / (count - 1)
+
+    def correlation(self) -> np.ndarray:
+        """
+        Correlation matrix of the window returns, NaN until the window is full
+        or for pairs that did not move
+        """
+        if not self.ready:
+            return np.full(self.state["cross"].shape, np.nan)
+
+        covariance = self.covariance()
+        deviation = np.sqrt(np.clip(np.diag(covariance), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = covariance / np.outer(deviation, deviation)
+
+        return np.clip(correlation, -1, 1)
+
+    def strength(self) -> np.ndarray:
+        """
+        Currency strength: average window log return (%) of the pairs of each
+        currency, in `currencies` order, NaN until the window is full
+        """
+        if not self.ready:
+            return np.full(len(self.currencies), np.nan)
+
+        return 100 * self._incidence @ self.state["sum"]
+
+    def calculate(
+        self, close: np.ndarray, index: pd.Index = None
+    ) -> Tuple[np.ndarray, pd.DataFrame]:
+        """
+        Run the engine over a history
+
+        Parameters
+        ----------
+        close : np.ndarray
+            Closes of shape (n_symbols, n_bars), the panel layout of the oscillators
+        index : pd.Index, optional
+            Bar times of the strength frame, by default the bar positions
+
+        Returns
+        -------
+        Tuple[np.ndarray, pd.DataFrame]
+            Correlations of shape (n_bars, n_symbols, n_symbols) and the
+            currency strength per bar
+        """
+        close = np.asarray(close, dtype=np.float64)
+        correlations = np.empty((close.shape[1],) + self.state["cross"].shape)
+        strength = np.empty((close.shape[1], len(self.currencies)))
+        for i in range(close.shape[1]):
+            correlations[i] = self.update(close[:, i])
+            strength[i] = self.strength()
+
+        return correlations, pd.DataFrame(
+            strength, index=index, columns=self.currencies
+        )
@@ -0,0 +1,135 @@
+"""
+Concurrent computation of independent indicators on shared OHLCV data
+
+The NumPy kernels behind the oscillators release the GIL while they work on
+whole arrays, so independent indicators scale on a thread pool without
+copying the market data into worker processes. The OHLCV fields are shared
+by every job as read-only views.
+"""
+
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.indicators.oscillators.divergence_oscillator import DivergenceOscillator
+
+IndicatorJobs = Mapping[
+    Hashable, Union[DivergenceOscillator, Tuple[DivergenceOscillator, dict]]
+]
+
+
+def read_only_fields(ohlcv: Union[pd.DataFrame, Mapping]) -> Dict[str, np.ndarray]:
+    """
+    Read-only NumPy views of the `ohlcv` fields, shared by concurrent jobs
+    """
+    fields = {}
+    for field in ohlcv.keys():
+        view = np.asarray(ohlcv[field]).view()
+        view.flags.writeable = False
+        fields[field] = view
+
+    return fields
+
+
+class IndicatorExecutor:
+    """
+    Run independent indicator computations on a thread pool
+
+    Example
+    -------
+    >>> with IndicatorExecutor(max_workers=4) as executor:
+    ...     results = executor.run(
+    ...         ohlcv,
+    ...         {
+    ...             "rsi": RSIOscillator(period=14),
+    ...             "demarker": (DeMarkerOscillator(), {"average_demarker": True}),
+    ...         },
+    ...     )
+    """
+
+    max_workers: int
+    max_pending: int
+
+    def __init__(self, max_workers: int = None, max_pending: int = None) -> None:
+        """
+        Parameters
+        ----------
+        max_workers : int, optional
+            Number of threads, by default the `ThreadPoolExecutor` default
+            (the number of CPUs plus 4, at most 32)
+        max_pending : int, optional
+            Maximum number of submitted but unfinished jobs, bounding the
+            memory held by results in flight, by default twice the workers
+        """
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="sk-fx-indicator"
+        )
+        self.max_pending = max_pending or 2 * self.max_workers
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def __enter__(self) -> "IndicatorExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def run(
+        self, ohlcv: Union[pd.DataFrame, Mapping], jobs: IndicatorJobs
+    ) -> Dict[Hashable, Any]:
+        """
+        Compute every job on the same market data
+
+        Parameters
+        ----------
+        ohlcv : Union[pd.DataFrame, Mapping]
+            Market data shared read-only by every job
+        jobs : IndicatorJobs
+            Key to oscillator, or to (oscillator, `calculate` options)
+
+        Returns
+        -------
+        Dict[Hashable, Any]
+            Key to the NumPy result of the oscillator
+        """
+        results = self.run_universe({None: ohlcv}, jobs)
+        return {key: result for (_, key), result in results.items()}
+
+    def run_universe(
+        self,
+        universe: Mapping[str, Union[pd.DataFrame, Mapping]],
+        jobs: IndicatorJobs,
+    ) -> Dict[Hashable, Any]:
+        """
+        Compute every job for every symbol of a universe
+
+        Returns
+        -------
+        Dict[Hashable, Any]
+            (symbol, key) to the NumPy result of the oscillator
+        """
+        submitted = []
+        for symbol, ohlcv in universe.items():
+            fields = read_only_fields(ohlcv)
+            for key, job in jobs.items():
+                oscillator, options = job if isinstance(job, tuple) else (job, {})
+                oscillator = copy.copy(oscillator)
+                oscillator.ohlcv = fields
+
+                # * Bound the number of jobs in flight
+                self._slots.acquire()
+                future = self._pool.submit(oscillator.calculate, **options)
+                future.add_done_callback(lambda _: self._slots.release())
+
+                submitted.append(((symbol, key), future))
+
+        # Results are gathered on the calling thread, re-raising job failures
+        return {result_key: future.result() for result_key, future in submitted}
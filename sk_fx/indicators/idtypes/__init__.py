@@ -15,3 +15,62 @@ class TimeFrame(Enum):
     D1 = "1 day"
     W1 = "1 week"
     M_1 = "1 month"
+
+    @property
+    def seconds(self) -> int:
+        """
+        Fixed duration of one bar of the time frame in seconds
+
+        Returns
+        -------
+        int
+            Number of seconds covered by one bar
+
+        Raises
+        ------
+        ValueError
+            When the time frame does not have a fixed duration (monthly bars)
+        """
+        if self is TimeFrame.M_1:
+            raise ValueError("Monthly bars do not have a fixed duration")
+
+        return _TIME_FRAME_SECONDS[self.name]
+
+
+_TIME_FRAME_SECONDS = {
+    "M1": 60,
+    "M5": 5 * 60,
+    "M15": 15 * 60,
+    "M30": 30 * 60,
+    "H1": 60 * 60,
+    "H4": 4 * 60 * 60,
+    "D1": 24 * 60 * 60,
+    "W1": 7 * 24 * 60 * 60,
+}
+
+
+class GapPolicy(Enum):
+    """
+    Handling of the bars with a NaN input field
+
+    Missing bars (absent from the data) are never materialized: every policy
+    computes over the real bars only, see `sk_fx.data.calendar`.
+    """
+
+    # NaN inputs go through the kernels as they are
+    PROPAGATE = "propagate"
+    # The bar is left out, as if absent, and its output is NaN
+    SKIP = "skip"
+    # NaN fields take the last valid value, leading NaN bars are skipped
+    FFILL = "ffill"
+
+
+class AdaptiveMeasure(Enum):
+    """
+    Market measure driving the period of the adaptive oscillators
+    """
+
+    # Kaufman efficiency ratio, net move over the path travelled
+    EFFICIENCY_RATIO = "er"
+    # Short ATR against a four times longer one
+    ATR = "atr"
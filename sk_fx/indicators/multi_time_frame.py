@@ -0,0 +1,147 @@
+"""
+Alignment of higher time frame indicators onto lower time frame bars
+
+Bars are stamped with their open time. A higher time frame value becomes
+known when its bar closes, so each lower time frame bar is mapped to the last
+higher time frame bar closed at or before the lower bar's own close. This
+avoids reading a higher bar that is still forming (lookahead).
+"""
+
+from collections import deque
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.indicators.idtypes import TimeFrame
+
+
+def _close_time(open_time, time_frame: TimeFrame) -> np.ndarray:
+    open_time = np.asarray(open_time, dtype="datetime64[ns]").view(np.int64)
+    return open_time + time_frame.seconds * 1_000_000_000
+
+
+def asof_positions(
+    higher_time,
+    lower_time,
+    higher_time_frame: TimeFrame,
+    lower_time_frame: TimeFrame,
+) -> np.ndarray:
+    """
+    Position of the last closed higher time frame bar for every lower time frame bar
+
+    Parameters
+    ----------
+    higher_time : array of datetime64
+        Sorted open times of the higher time frame bars
+    lower_time : array of datetime64
+        Sorted open times of the lower time frame bars
+    higher_time_frame : TimeFrame
+        Time frame of the higher bars
+    lower_time_frame : TimeFrame
+        Time frame of the lower bars
+
+    Returns
+    -------
+    np.ndarray
+        Positions into the higher bars, -1 when no higher bar is closed yet
+    """
+    higher_close = _close_time(higher_time, higher_time_frame)
+    lower_close = _close_time(lower_time, lower_time_frame)
+
+    return np.searchsorted(higher_close, lower_close, side="right") - 1
+
+
+def align_to_lower(
+    higher: Union[pd.Series, pd.DataFrame],
+    lower_index: pd.DatetimeIndex,
+    higher_time_frame: TimeFrame,
+    lower_time_frame: TimeFrame,
+) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Map a higher time frame indicator onto lower time frame bars without lookahead
+
+    Parameters
+    ----------
+    higher : Union[pd.Series, pd.DataFrame]
+        Higher time frame indicator values indexed by the bar open time
+    lower_index : pd.DatetimeIndex
+        Open times of the lower time frame bars
+    higher_time_frame : TimeFrame
+        Time frame of the indicator, e.g. `TimeFrame.D1`
+    lower_time_frame : TimeFrame
+        Time frame of the traded bars, e.g. `TimeFrame.H1`
+
+    Returns
+    -------
+    Union[pd.Series, pd.DataFrame]
+        The last closed higher time frame values indexed like `lower_index`,
+        NaN before the first higher bar closes
+
+    Example
+    -------
+    >>> daily_rsi = RSIOscillator(ohlcv=daily, time_frame=TimeFrame.D1).calculate()
+    >>> hourly["d1_rsi"] = align_to_lower(daily_rsi, hourly.index, TimeFrame.D1, TimeFrame.H1)
+    """
+    positions = asof_positions(
+        higher.index.values, lower_index.values, higher_time_frame, lower_time_frame
+    )
+
+    values = higher.to_numpy(dtype=np.float64)
+    aligned = values.take(np.maximum(positions, 0), axis=0)
+    aligned[positions < 0] = np.nan
+
+    if isinstance(higher, pd.DataFrame):
+        return pd.DataFrame(aligned, index=lower_index, columns=higher.columns)
+
+    return pd.Series(aligned, index=lower_index, name=higher.name)
+
+
+class MultiTimeFrameAligner:
+    """
+    Streaming counterpart of `align_to_lower`
+
+    Push higher time frame values as their bars close (e.g. from the
+    `TickAggregator` bar-close events) and query the value visible to each
+    lower time frame bar as it closes. Every call is O(1) amortized.
+    """
+
+    higher_time_frame: TimeFrame
+    lower_time_frame: TimeFrame
+
+    def __init__(
+        self, higher_time_frame: TimeFrame, lower_time_frame: TimeFrame
+    ) -> None:
+        assert (
+            higher_time_frame.seconds >= lower_time_frame.seconds
+        ), "Higher time frame must not be shorter than the lower time frame"
+
+        self.higher_time_frame = higher_time_frame
+        self.lower_time_frame = lower_time_frame
+        self._pending: deque = deque()  # (close time, value) not visible yet
+        self._value: Optional[float] = None
+
+    def push_higher(self, open_time: np.datetime64, value) -> None:
+        """
+        Record the value of a higher time frame bar opened at `open_time`
+        """
+        close_time = int(_close_time(open_time, self.higher_time_frame))
+        if self._pending and close_time < self._pending[-1][0]:
+            raise ValueError("Higher time frame bars must be pushed in order")
+
+        self._pending.append((close_time, value))
+
+    def value(self, open_time: np.datetime64):
+        """
+        Higher time frame value visible to the lower bar opened at `open_time`
+
+        Returns
+        -------
+        The value of the last higher bar closed at or before the lower bar
+        close, None when no higher bar is closed yet
+        """
+        close_time = int(_close_time(open_time, self.lower_time_frame))
+        while self._pending and self._pending[0][0] <= close_time:
+            self._value = self._pending.popleft()[1]
+
+        return self._value
@@ -10,4 +10,9 @@ I. DIVERGENCE
     4. Stochastic
     5. RSI
     6. Volume Oscillator
+
+II. ADAPTIVE
+    1. Adaptive RSI
+    2. Adaptive Stochastic
+    3. Adaptive DeMarker
 """
@@ -0,0 +1,313 @@
+"""
+Adaptive oscillators, whose period follows the market
+
+The period of every bar moves between `min_period` and `max_period` with a
+measure of the market (`AdaptiveMeasure`): the Kaufman efficiency ratio or
+the ratio of a short to a long ATR. Efficient or volatile markets shorten
+the period, noisy or quiet ones lengthen it. One adaptive output replaces a
+set of fixed-period oscillators computed side by side, in a single pass of
+recursive (`adaptive_average`) or sparse table (`adaptive_rolling_max`)
+kernels.
+
+Currently supported oscillators:
+    1. Adaptive RSI
+    2. Adaptive Stochastic
+    3. Adaptive DeMarker
+"""
+
+from abc import abstractmethod
+
+import numpy as np
+import pandas as pd
+from pandas.core.api import Series as Series
+
+from sk_fx.indicators.idtypes import AdaptiveMeasure, GapPolicy, TimeFrame
+from sk_fx.indicators.oscillators.divergence_oscillator import DivergenceOscillator
+from sk_fx.utils import kernels
+from sk_fx.utils.profiling import stage
+
+
+class AdaptiveOscillator(DivergenceOscillator):
+    name: str = "Adaptive Oscillator"
+    ohlcv: pd.DataFrame
+    input_fields = ("high", "low", "close")
+    # A NaN input would blank the measure and price windows it enters
+    gap_policy = GapPolicy.SKIP
+    measure: AdaptiveMeasure = AdaptiveMeasure.EFFICIENCY_RATIO
+    measure_period: int = 10
+    min_period: int = 7
+    max_period: int = 28
+
+    def __init__(
+        self,
+        name: str = None,
+        time_frame: TimeFrame = TimeFrame.D1,
+        ohlcv: pd.DataFrame = None,
+        measure: AdaptiveMeasure = AdaptiveMeasure.EFFICIENCY_RATIO,
+        measure_period: int = 10,
+        min_period: int = 7,
+        max_period: int = 28,
+        gap_policy: GapPolicy = None,
+    ) -> None:
+        if not 2 <= min_period <= max_period:
+            raise ValueError(
+                f"Periods must satisfy 2 <= min_period <= max_period, "
+                f"got {min_period} and {max_period}"
+            )
+
+        super(AdaptiveOscillator, self).__init__(name, time_frame, gap_policy)
+        self.ohlcv = ohlcv
+        self.measure = AdaptiveMeasure(measure)
+        self.measure_period = measure_period
+        self.min_period = min_period
+        self.max_period = max_period
+
+    def calculate(
+        self, out: np.ndarray = None, dtype=None, state: dict = None
+    ) -> Series:
+        """
+        Calculate the oscillator in one pass over the bars
+
+        The NumPy kernels serve both paths: a `pd.Series` indexed like
+        `ohlcv` is returned for data frame inputs, an array otherwise or
+        when `out`, `dtype` or `state` is given (see `DivergenceOscillator`).
+        """
+        fields, valid = self._gap_fields(dtype, state)
+        result = self._calculate_numpy(*fields, valid, out, state)
+        if self._use_numpy(out, dtype, state):
+            return result
+
+        return pd.Series(result, index=self.ohlcv["close"].index)
+
+    def periods(self, dtype=None, state: dict = None) -> np.ndarray:
+        """
+        Effective period of every bar, NaN until the measure is known
+        """
+        (high, low, close), valid = self._gap_fields(dtype, state)
+        return self._periods(high, low, close, valid, state)
+
+    def _periods(
+        self,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        valid: np.ndarray,
+        state: dict,
+    ) -> np.ndarray:
+        # * A fixed period range is the fixed-period oscillator
+        if self.min_period == self.max_period:
+            return np.full(close.shape, float(self.max_period))
+
+        with stage("measure"):
+            if self.measure is AdaptiveMeasure.EFFICIENCY_RATIO:
+                ratio = kernels.efficiency_ratio(
+                    close,
+                    self.measure_period,
+                    state=self._kernel_state(state, "efficiency_ratio"),
+                    valid=valid,
+                )
+            else:
+                true_range = kernels.true_range(
+                    high,
+                    low,
+                    close,
+                    state=self._kernel_state(state, "true_range"),
+                    valid=valid,
+                )
+                fast_atr = kernels.ema(
+                    true_range,
+                    alpha=1.0 / self.measure_period,
+                    min_periods=self.measure_period,
+                    state=self._kernel_state(state, "fast_atr"),
+                )
+                slow_atr = kernels.ema(
+                    true_range,
+                    alpha=1.0 / (4 * self.measure_period),
+                    min_periods=self.measure_period,
+                    state=self._kernel_state(state, "slow_atr"),
+                )
+                # * 1/2 at the usual volatility, towards 1 as it expands
+                slow_atr += fast_atr
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    ratio = np.divide(fast_atr, slow_atr, out=fast_atr)
+                ratio[slow_atr == 0] = 0.5
+                if valid is not None:
+                    ratio[~valid] = np.nan
+
+        # * Period from max_period (ratio 0) down to min_period (ratio 1)
+        ratio *= self.min_period - self.max_period
+        ratio += self.max_period
+
+        return ratio
+
+    @abstractmethod
+    def _calculate_numpy(
+        self,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        valid: np.ndarray,
+        out: np.ndarray,
+        state: dict,
+    ) -> np.ndarray:
+        """
+        Oscillator values of the (gap-filtered) high, low and close arrays
+        """
+
+
+class AdaptiveRSIOscillator(AdaptiveOscillator):
+    name: str = "Adaptive RSI"
+
+    def _calculate_numpy(self, high, low, close, valid, out, state) -> np.ndarray:
+        periods = self._periods(high, low, close, valid, state)
+
+        # Gain, Loss on close price
+        diff = kernels.diff(
+            close, state=self._kernel_state(state, "close_diff"), valid=valid
+        )
+        gain = np.maximum(diff, 0)
+        loss = np.minimum(diff, 0, out=diff)
+        np.negative(loss, out=loss)
+
+        # Wilder averages over the period of every bar
+        with stage("average"):
+            alpha = np.divide(1.0, periods, out=periods)
+            avg_gain = kernels.adaptive_average(
+                gain,
+                alpha,
+                min_periods=self.min_period,
+                state=self._kernel_state(state, "avg_gain"),
+                valid=valid,
+            )
+            avg_loss = kernels.adaptive_average(
+                loss,
+                alpha,
+                min_periods=self.min_period,
+                out=loss,
+                state=self._kernel_state(state, "avg_loss"),
+                valid=valid,
+            )
+
+        # RSI value, 100 * gain / (gain + loss)
+        rsi = kernels.prepare_out(out, close.shape, dtype=close.dtype)
+        avg_loss += avg_gain
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(avg_gain, avg_loss, out=rsi)
+        rsi *= 100
+
+        return rsi
+
+
+class AdaptiveStochasticOscillator(AdaptiveOscillator):
+    name: str = "Adaptive Stochastic"
+    d_length: int = 3
+
+    def __init__(
+        self,
+        name: str = None,
+        time_frame: TimeFrame = TimeFrame.D1,
+        ohlcv: pd.DataFrame = None,
+        measure: AdaptiveMeasure = AdaptiveMeasure.EFFICIENCY_RATIO,
+        measure_period: int = 10,
+        min_period: int = 7,
+        max_period: int = 28,
+        d_length: int = 3,
+        gap_policy: GapPolicy = None,
+    ) -> None:
+        super(AdaptiveStochasticOscillator, self).__init__(
+            name,
+            time_frame,
+            ohlcv,
+            measure,
+            measure_period,
+            min_period,
+            max_period,
+            gap_policy,
+        )
+        self.d_length = d_length
+
+    def _calculate_numpy(self, high, low, close, valid, out, state) -> np.ndarray:
+        periods = self._periods(high, low, close, valid, state)
+
+        # * Highest high and lowest low over the period of every bar
+        with stage("high_low"):
+            n_high = kernels.adaptive_rolling_max(
+                high,
+                periods,
+                self.max_period,
+                state=self._kernel_state(state, "n_high"),
+                valid=valid,
+            )
+            n_low = kernels.adaptive_rolling_min(
+                low,
+                periods,
+                self.max_period,
+                out=periods,
+                state=self._kernel_state(state, "n_low"),
+                valid=valid,
+            )
+            n_high -= n_low
+
+        # * Calculate the percentage using the min/max values
+        with stage("percentage"):
+            percentage = np.subtract(close, n_low, out=n_low)
+            percentage *= 100
+            with np.errstate(divide="ignore", invalid="ignore"):
+                percentage /= n_high
+
+        # * Calculate percentage sma ~ stochastic
+        with stage("sma"):
+            return kernels.rolling_mean(
+                percentage,
+                self.d_length,
+                out=kernels.prepare_out(out, close.shape, dtype=close.dtype),
+                state=self._kernel_state(state, "percentage_sma"),
+                valid=valid,
+            )
+
+
+class AdaptiveDeMarkerOscillator(AdaptiveOscillator):
+    name: str = "Adaptive DeMarker"
+
+    def _calculate_numpy(self, high, low, close, valid, out, state) -> np.ndarray:
+        periods = self._periods(high, low, close, valid, state)
+
+        # * DeMax, DeMin calculation
+        with stage("demax_demin"):
+            demax = kernels.diff(
+                high, state=self._kernel_state(state, "high_diff"), valid=valid
+            )
+            np.maximum(demax, 0, out=demax)
+            demin = kernels.diff(
+                low, state=self._kernel_state(state, "low_diff"), valid=valid
+            )
+            np.negative(demin, out=demin)
+            np.maximum(demin, 0, out=demin)
+
+        # * DeMax, DeMin with EMA over the period of every bar
+        with stage("ema"):
+            periods += 1
+            alpha = np.divide(2.0, periods, out=periods)
+            demax_ema = kernels.adaptive_average(
+                demax,
+                alpha,
+                out=demax,
+                state=self._kernel_state(state, "demax_ema"),
+                valid=valid,
+            )
+            demin_ema = kernels.adaptive_average(
+                demin,
+                alpha,
+                out=demin,
+                state=self._kernel_state(state, "demin_ema"),
+                valid=valid,
+            )
+
+        # * DeMarker Calculation
+        with stage("demarker"):
+            demarker = kernels.prepare_out(out, close.shape, dtype=close.dtype)
+            demin_ema += demax_ema
+            with np.errstate(divide="ignore", invalid="ignore"):
+                np.divide(demax_ema, demin_ema, out=demarker)
+
+        return demarker
@@ -9,21 +9,33 @@ Currently supported oscillators:
     5. RSI
     6. Volume Oscillator
 """
+
+import copy
 from abc import abstractmethod
-from typing import Tuple
+from typing import List, Tuple
 
+import numpy as np
 import pandas as pd
 from pandas.core.api import Series as Series
 
 from sk_fx.indicators.oscillators.base_oscillator import Oscillator
-from sk_fx.indicators.idtypes import TimeFrame
+from sk_fx.indicators.idtypes import GapPolicy, TimeFrame
+from sk_fx.utils import kernels
+from sk_fx.utils.profiling import stage
 
 
 class DivergenceOscillator(Oscillator):
     name: str = "Divergence Oscillator"
     time_frame: TimeFrame = TimeFrame.D1
+    gap_policy: GapPolicy = GapPolicy.PROPAGATE
+    input_fields: Tuple[str, ...] = ("open", "high", "low", "close", "volume")
 
-    def __init__(self, name: str = None, time_frame: TimeFrame = TimeFrame.D1) -> None:
+    def __init__(
+        self,
+        name: str = None,
+        time_frame: TimeFrame = TimeFrame.D1,
+        gap_policy: GapPolicy = None,
+    ) -> None:
         if name is not None:
             self.name = name
         self.time_frame = time_frame
@@ -31,12 +43,36 @@ class DivergenceOscillator(Oscillator):
         super(DivergenceOscillator, self).__init__(
             name=self.name, time_frame=self.time_frame
         )
+        self.gap_policy = GapPolicy(
+            type(self).gap_policy if gap_policy is None else gap_policy
+        )
 
     @abstractmethod
     def calculate(self) -> pd.Series:
         """
         Calculation of the oscillator
 
+        The `ohlcv` source is either a data frame (or any source returning
+        `pd.Series` per field) computed with pandas, or a mapping of field
+        name to NumPy arrays / buffer-protocol objects computed with the NumPy
+        kernels of `sk_fx.utils.kernels`. The NumPy path is also used when
+        `out` or `dtype` is given; it builds no intermediate pandas object
+        and returns NumPy arrays.
+
+        The DeMarker and Stochastic oscillators also take a `kernels.Scratch`
+        holding their single work array: with `out` and `scratch` reused
+        across calls, a calculation allocates no array of the history size.
+        Their stages are reported by `sk_fx.utils.profiling`.
+
+        With a `state` dict (empty for the first block), `ohlcv` is treated as
+        the next block of a longer history: the EMA, Wilder, rolling window
+        and running sum states are read from and written back to `state`, so
+        block by block results equal a single pass over the whole history.
+
+        Bars with a NaN in one of the `input_fields` follow the `gap_policy`
+        of the oscillator. Under `SKIP` and `FFILL` the result equals the
+        calculation over the bars without NaN alone, reindexed onto every bar.
+
         Returns
         -------
         pd.Series
@@ -49,9 +85,119 @@ class DivergenceOscillator(Oscillator):
         """
         raise Exception("Not implemented")
 
+    def _use_numpy(
+        self,
+        out: np.ndarray = None,
+        dtype=None,
+        state: dict = None,
+        scratch: kernels.Scratch = None,
+    ) -> bool:
+        """
+        Whether the calculation runs on the NumPy kernels instead of pandas
+        """
+        return (
+            out is not None
+            or dtype is not None
+            or state is not None
+            or scratch is not None
+            or not isinstance(self.ohlcv[self.input_fields[0]], pd.Series)
+        )
+
+    @staticmethod
+    def _kernel_state(state: dict, key: str) -> dict:
+        """
+        State of one kernel inside the oscillator state, None when not chunked
+        """
+        return None if state is None else state.setdefault(key, {})
+
+    @staticmethod
+    def _work(scratch: kernels.Scratch, name: str, like: np.ndarray) -> np.ndarray:
+        """
+        Work array shaped like `like`, from `scratch` when given
+        """
+        if scratch is None:
+            return np.empty_like(like)
+
+        return scratch.get(name, like.shape, like.dtype)
+
+    def _gap_fields(
+        self, dtype=None, state: dict = None
+    ) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        The `input_fields` after the gap policy, NaN on every field of a
+        skipped bar, and the mask of the computed bars (None for `PROPAGATE`)
+        """
+        fields = [self._field(field, dtype) for field in self.input_fields]
+        if self.gap_policy is GapPolicy.PROPAGATE:
+            return fields, None
+
+        if self.gap_policy is GapPolicy.FFILL:
+            fields = [
+                kernels.ffill(values, state=self._kernel_state(state, f"ffill_{field}"))
+                for field, values in zip(self.input_fields, fields)
+            ]
+        valid = ~np.isnan(fields[0])
+        for values in fields[1:]:
+            valid &= ~np.isnan(values)
+        if not valid.all():
+            fields = [np.where(valid, values, np.nan) for values in fields]
+
+        return fields, valid
+
+    def _calculate_gaps(self, **options):
+        """
+        pandas calculation under the `SKIP` and `FFILL` policies, over the
+        bars without NaN input and reindexed onto every bar
+        """
+        valid = np.logical_and.reduce(
+            [self.ohlcv[field].notna().to_numpy() for field in self.input_fields]
+        )
+        oscillator = copy.copy(self)
+        oscillator.gap_policy = GapPolicy.PROPAGATE
+        if valid.all():
+            return oscillator.calculate(**options)
+
+        frame = pd.DataFrame({field: self.ohlcv[field] for field in self.input_fields})
+        if self.gap_policy is GapPolicy.FFILL:
+            frame = frame.ffill()
+            valid = frame.notna().all(axis=1).to_numpy()
+        oscillator.ohlcv = frame[valid]
+        result = oscillator.calculate(**options)
+
+        def expand(line: pd.Series) -> pd.Series:
+            values = np.full(len(frame), np.nan)
+            values[valid] = line.to_numpy()
+            return pd.Series(values, index=frame.index, name=line.name)
+
+        if isinstance(result, tuple):
+            return tuple(expand(line) for line in result)
+
+        return expand(result)
+
+    def _field(self, field: str, dtype=None) -> np.ndarray:
+        """
+        NumPy view of an `ohlcv` field, copied only when the dtype differs
+
+        Parameters
+        ----------
+        field : str
+            Name of the field, e.g. 'close'
+        dtype : optional
+            Dtype of the returned array, by default float64
+
+        Returns
+        -------
+        np.ndarray
+            The field values
+        """
+        return np.asarray(
+            self.ohlcv[field], dtype=np.float64 if dtype is None else dtype
+        )
+
 
 class ChaikinOscillator(DivergenceOscillator):
     ohlcv: pd.DataFrame
+    input_fields = ("high", "low", "close", "volume")
     fast_length: int = 3
     slow_length: int = 10
 
@@ -62,39 +208,52 @@ class ChaikinOscillator(DivergenceOscillator):
         ohlcv: pd.DataFrame = None,
         fast_length: int = 3,
         slow_length: int = 10,
+        gap_policy: GapPolicy = None,
     ) -> None:
-        super(ChaikinOscillator, self).__init__(name, time_frame)
+        super(ChaikinOscillator, self).__init__(name, time_frame, gap_policy)
         self.ohlcv = ohlcv
         self.fast_length = fast_length
         self.slow_length = slow_length
 
     # Override functions
-    def _money_flow_multi(self, high: float, low: float, close: float) -> float:
+    def _money_flow_multi(
+        self, high: pd.Series, low: pd.Series, close: pd.Series
+    ) -> pd.Series:
         """
         Calculation of money flow multiplier -> Close Location Value (CLV)
 
         Parameters
         ----------
-        high : float
-            High price
-        low : float
-            Low price
-        close : float
-            Close price
+        high : pd.Series
+            High prices
+        low : pd.Series
+            Low prices
+        close : pd.Series
+            Close prices
 
         Returns
         -------
-        float
+        pd.Series
             Money flow multiplier
         """
         clv = ((close - low) - (high - close)) / (high - low)
         return clv
 
-    def calculate(self, normalized: bool = False) -> Series:
+    def calculate(
+        self,
+        normalized: bool = False,
+        out: np.ndarray = None,
+        dtype=None,
+        state: dict = None,
+    ) -> Series:
+        if self._use_numpy(out, dtype, state):
+            return self._calculate_numpy(normalized, out, dtype, state)
+        if self.gap_policy is not GapPolicy.PROPAGATE:
+            return self._calculate_gaps(normalized=normalized)
+
         # * Money Flow Multiplier -> CLV
-        clv: pd.Series = self.ohlcv.apply(
-            lambda row: self._money_flow_multi(row["high"], row["low"], row["close"]),
-            axis="columns",
+        clv: pd.Series = self._money_flow_multi(
+            self.ohlcv["high"], self.ohlcv["low"], self.ohlcv["close"]
         )
 
         # * Money Flow Volume
@@ -117,9 +276,46 @@ class ChaikinOscillator(DivergenceOscillator):
 
         return co_osc
 
+    def _calculate_numpy(
+        self, normalized: bool, out: np.ndarray, dtype, state: dict
+    ) -> np.ndarray:
+        if normalized and state is not None:
+            raise ValueError("Normalization needs the whole history at once")
+
+        (high, low, close, volume), valid = self._gap_fields(dtype, state)
+
+        # * Money Flow Volume -> CLV * volume
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mfv = self._money_flow_multi(high, low, close)
+        mfv *= volume
+
+        # * Accumulation/Distribution Line -> ADL, accumulated in float64
+        adl = kernels.cumsum(mfv, state=self._kernel_state(state, "adl"))
+
+        # * Chaikin Oscillator -> CO
+        co_osc = kernels.prepare_out(out, adl.shape, dtype=mfv.dtype)
+        kernels.ema(
+            adl,
+            span=self.fast_length,
+            out=co_osc,
+            state=self._kernel_state(state, "adl_ma_fast"),
+        )
+        co_osc -= kernels.ema(
+            adl, span=self.slow_length, state=self._kernel_state(state, "adl_ma_slow")
+        )
+        if valid is not None:
+            co_osc[~valid] = np.nan
+
+        if normalized:
+            co_osc -= np.nanmean(co_osc, axis=-1, keepdims=True)
+            co_osc /= np.nanstd(co_osc, axis=-1, ddof=1, keepdims=True)
+
+        return co_osc
+
 
 class DeMarkerOscillator(DivergenceOscillator):
     ohlcv: pd.DataFrame
+    input_fields = ("high", "low")
     period: int = 14
 
     def __init__(
@@ -128,32 +324,112 @@ class DeMarkerOscillator(DivergenceOscillator):
         time_frame: TimeFrame = TimeFrame.D1,
         ohlcv: pd.DataFrame = None,
         period: int = 14,
+        gap_policy: GapPolicy = None,
     ) -> None:
-        super(DeMarkerOscillator, self).__init__(name, time_frame)
+        super(DeMarkerOscillator, self).__init__(name, time_frame, gap_policy)
         self.ohlcv = ohlcv
         self.period = period
 
-    def calculate(self, average_demarker: bool = False) -> Series:
+    def calculate(
+        self,
+        average_demarker: bool = False,
+        out: np.ndarray = None,
+        dtype=None,
+        state: dict = None,
+        scratch: kernels.Scratch = None,
+    ) -> Series:
+        if self._use_numpy(out, dtype, state, scratch):
+            return self._calculate_numpy(average_demarker, out, dtype, state, scratch)
+        if self.gap_policy is not GapPolicy.PROPAGATE:
+            return self._calculate_gaps(average_demarker=average_demarker)
+
         # * DeMax, DeMin calculation
-        demax = self.ohlcv["high"].diff(periods=1).clip(lower=0)
-        demin = (self.ohlcv["low"].shift(1) - self.ohlcv["low"]).clip(lower=0)
+        with stage("demax_demin"):
+            demax = self.ohlcv["high"].diff(periods=1).clip(lower=0)
+            demin = (self.ohlcv["low"].shift(1) - self.ohlcv["low"]).clip(lower=0)
 
         # * DeMax, DeMin with MA
-        demax_ema = demax.ewm(span=self.period, adjust=False, ignore_na=True).mean()
-        demin_ema = demin.ewm(span=self.period, adjust=False, ignore_na=True).mean()
+        with stage("ema"):
+            demax_ema = demax.ewm(span=self.period, adjust=False, ignore_na=True).mean()
+            demin_ema = demin.ewm(span=self.period, adjust=False, ignore_na=True).mean()
 
         # * DeMarker Calculation
-        demarker = demax_ema / (demax_ema + demin_ema)
+        with stage("demarker"):
+            demarker = demax_ema / (demax_ema + demin_ema)
         if average_demarker:
-            demarker = demarker.ewm(
-                span=self.period, adjust=False, ignore_na=True
-            ).mean()
+            with stage("average"):
+                demarker = demarker.ewm(
+                    span=self.period, adjust=False, ignore_na=True
+                ).mean()
+
+        return demarker
+
+    def _calculate_numpy(
+        self,
+        average_demarker: bool,
+        out: np.ndarray,
+        dtype,
+        state: dict,
+        scratch: kernels.Scratch,
+    ) -> np.ndarray:
+        (high, low), valid = self._gap_fields(dtype, state)
+        demax = kernels.prepare_out(out, high.shape, dtype=high.dtype)
+        demin = self._work(scratch, "demin", demax)
+
+        # * DeMax, DeMin calculation, DeMax in the output array
+        with stage("demax_demin"):
+            kernels.diff(
+                high,
+                out=demax,
+                state=self._kernel_state(state, "high_diff"),
+                valid=valid,
+            )
+            np.maximum(demax, 0, out=demax)
+            kernels.diff(
+                low, out=demin, state=self._kernel_state(state, "low_diff"), valid=valid
+            )
+            np.negative(demin, out=demin)
+            np.maximum(demin, 0, out=demin)
+
+        # * DeMax, DeMin with MA
+        with stage("ema"):
+            demax_ema = kernels.ema(
+                demax,
+                span=self.period,
+                out=demax,
+                state=self._kernel_state(state, "demax_ema"),
+            )
+            demin_ema = kernels.ema(
+                demin,
+                span=self.period,
+                out=demin,
+                state=self._kernel_state(state, "demin_ema"),
+            )
+
+        # * DeMarker Calculation
+        with stage("demarker"):
+            denominator = np.add(demax_ema, demin_ema, out=demin_ema)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                demarker = np.divide(demax_ema, denominator, out=demax_ema)
+            if valid is not None:
+                demarker[~valid] = np.nan
+        if average_demarker:
+            with stage("average"):
+                kernels.ema(
+                    demarker,
+                    span=self.period,
+                    out=demarker,
+                    state=self._kernel_state(state, "demarker_ema"),
+                )
+                if valid is not None:
+                    demarker[~valid] = np.nan
 
         return demarker
 
 
 class MACD(DivergenceOscillator):
     ohlcv: pd.DataFrame
+    input_fields = ("close",)
     fast_length: int = 12
     slow_length: int = 26
     signal_length: int = 9
@@ -166,14 +442,25 @@ class MACD(DivergenceOscillator):
         fast_length: int = 12,
         slow_length: int = 26,
         signal_length: int = 9,
+        gap_policy: GapPolicy = None,
     ) -> None:
-        super(MACD, self).__init__(name, time_frame)
+        super(MACD, self).__init__(name, time_frame, gap_policy)
         self.ohlcv = ohlcv
         self.fast_length = fast_length
         self.slow_length = slow_length
         self.signal_length = signal_length
 
-    def calculate(self) -> Tuple[Series, Series, Series]:
+    def calculate(
+        self,
+        out: Tuple[np.ndarray, np.ndarray, np.ndarray] = None,
+        dtype=None,
+        state: dict = None,
+    ) -> Tuple[Series, Series, Series]:
+        if self._use_numpy(out, dtype, state):
+            return self._calculate_numpy(out, dtype, state)
+        if self.gap_policy is not GapPolicy.PROPAGATE:
+            return self._calculate_gaps()
+
         # * Calculate EMA line
         fast_ema = (
             self.ohlcv["close"]
@@ -208,9 +495,53 @@ class MACD(DivergenceOscillator):
 
         return macd, macd_signal, macd_diff
 
+    def _calculate_numpy(
+        self, out: Tuple[np.ndarray, np.ndarray, np.ndarray], dtype, state: dict
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        (close,), valid = self._gap_fields(dtype, state)
+        macd_out, signal_out, diff_out = (None, None, None) if out is None else out
+
+        # * Calculate EMA line
+        fast_ema = kernels.ema(
+            close,
+            span=self.fast_length,
+            min_periods=self.fast_length,
+            state=self._kernel_state(state, "fast_ema"),
+        )
+        slow_ema = kernels.ema(
+            close,
+            span=self.slow_length,
+            min_periods=self.slow_length,
+            out=kernels.prepare_out(macd_out, close.shape, dtype=close.dtype),
+            state=self._kernel_state(state, "slow_ema"),
+        )
+
+        # * Calculate macd, signal and difference lines
+        macd = np.subtract(fast_ema, slow_ema, out=slow_ema)
+        if valid is not None:
+            macd[~valid] = np.nan
+        macd_signal = kernels.ema(
+            macd,
+            span=self.signal_length,
+            min_periods=self.signal_length,
+            out=kernels.prepare_out(signal_out, close.shape, dtype=close.dtype),
+            state=self._kernel_state(state, "signal_ema"),
+        )
+        macd_diff = np.subtract(
+            macd,
+            macd_signal,
+            out=kernels.prepare_out(diff_out, close.shape, dtype=close.dtype),
+        )
+        if valid is not None:
+            macd_signal[~valid] = np.nan
+            macd_diff[~valid] = np.nan
+
+        return macd, macd_signal, macd_diff
+
 
 class StochasticOscillator(DivergenceOscillator):
     ohlcv: pd.DataFrame
+    input_fields = ("high", "low", "close")
     k_length: int = 14
     d_length: int = 3
 
@@ -221,28 +552,88 @@ class StochasticOscillator(DivergenceOscillator):
         ohlcv: pd.DataFrame = None,
         k_length: int = 14,
         d_length: int = 3,
+        gap_policy: GapPolicy = None,
     ) -> None:
-        super(StochasticOscillator, self).__init__(name, time_frame)
+        super(StochasticOscillator, self).__init__(name, time_frame, gap_policy)
         self.ohlcv = ohlcv
         self.k_length = k_length
         self.d_length = d_length
 
-    def calculate(self) -> Series:
+    def calculate(
+        self,
+        out: np.ndarray = None,
+        dtype=None,
+        state: dict = None,
+        scratch: kernels.Scratch = None,
+    ) -> Series:
+        if self._use_numpy(out, dtype, state, scratch):
+            return self._calculate_numpy(out, dtype, state, scratch)
+        if self.gap_policy is not GapPolicy.PROPAGATE:
+            return self._calculate_gaps()
+
         # * Calculate high low in k periods
-        n_high = self.ohlcv["high"].rolling(self.k_length).max()
-        n_low = self.ohlcv["low"].rolling(self.k_length).min()
+        with stage("high_low"):
+            n_high = self.ohlcv["high"].rolling(self.k_length).max()
+            n_low = self.ohlcv["low"].rolling(self.k_length).min()
 
         # * Calculate the percentage using the min/max values
-        percentage = (self.ohlcv["close"] - n_low) * 100 / (n_high - n_low)
+        with stage("percentage"):
+            percentage = (self.ohlcv["close"] - n_low) * 100 / (n_high - n_low)
 
         # * Calculate percentage sma ~ stochastic
-        percentage_sma = percentage.rolling(self.d_length).mean()
+        with stage("sma"):
+            percentage_sma = percentage.rolling(self.d_length).mean()
 
         return percentage_sma
 
+    def _calculate_numpy(
+        self, out: np.ndarray, dtype, state: dict, scratch: kernels.Scratch
+    ) -> np.ndarray:
+        (high, low, close), valid = self._gap_fields(dtype, state)
+        n_range = kernels.prepare_out(out, close.shape, dtype=close.dtype)
+        n_low = self._work(scratch, "n_low", n_range)
+
+        # * Calculate high low in k periods, the range in the output array
+        with stage("high_low"):
+            kernels.rolling_max(
+                high,
+                self.k_length,
+                out=n_range,
+                state=self._kernel_state(state, "n_high"),
+                valid=valid,
+            )
+            kernels.rolling_min(
+                low,
+                self.k_length,
+                out=n_low,
+                state=self._kernel_state(state, "n_low"),
+                valid=valid,
+            )
+            n_range -= n_low
+
+        # * Calculate the percentage using the min/max values
+        with stage("percentage"):
+            percentage = np.subtract(close, n_low, out=n_low)
+            percentage *= 100
+            with np.errstate(divide="ignore", invalid="ignore"):
+                percentage /= n_range
+
+        # * Calculate percentage sma ~ stochastic, over the range
+        with stage("sma"):
+            return kernels.rolling_mean(
+                percentage,
+                self.d_length,
+                out=n_range,
+                state=self._kernel_state(state, "percentage_sma"),
+                valid=valid,
+            )
+
 
 class RSIOscillator(DivergenceOscillator):
     ohlcv: pd.DataFrame
+    input_fields = ("close",)
+    # The seeded Wilder average never recovers from a NaN input
+    gap_policy = GapPolicy.SKIP
     period: int = 14
 
     def __init__(
@@ -251,8 +642,9 @@ class RSIOscillator(DivergenceOscillator):
         time_frame: TimeFrame = TimeFrame.D1,
         ohlcv: pd.DataFrame = None,
         period: int = 14,
+        gap_policy: GapPolicy = None,
     ) -> None:
-        super(RSIOscillator, self).__init__(name, time_frame)
+        super(RSIOscillator, self).__init__(name, time_frame, gap_policy)
         self.ohlcv = ohlcv
         self.period = period
 
@@ -281,7 +673,14 @@ class RSIOscillator(DivergenceOscillator):
 
         return rsi
 
-    def calculate(self) -> Series:
+    def calculate(
+        self, out: np.ndarray = None, dtype=None, state: dict = None
+    ) -> Series:
+        if self._use_numpy(out, dtype, state):
+            return self._calculate_numpy(out, dtype, state)
+        if self.gap_policy is not GapPolicy.PROPAGATE:
+            return self._calculate_gaps()
+
         # Calculate diff
         diff = self.ohlcv["close"].diff(1)
 
@@ -296,3 +695,44 @@ class RSIOscillator(DivergenceOscillator):
         rsi = self._rsi_value(avg_gain, avg_loss)
 
         return rsi
+
+    def _calculate_numpy(self, out: np.ndarray, dtype, state: dict) -> np.ndarray:
+        (close,), valid = self._gap_fields(dtype, state)
+
+        # Calculate diff
+        diff = kernels.diff(
+            close, state=self._kernel_state(state, "close_diff"), valid=valid
+        )
+
+        # Gain, Loss on close price
+        gain = np.maximum(diff, 0)
+        np.round(gain, 2, out=gain)
+        loss = np.minimum(diff, 0, out=diff)
+        np.abs(loss, out=loss)
+        np.round(loss, 2, out=loss)
+
+        # Average gain, loss seeded by the first full window after the diff
+        avg_gain = kernels.wilder(
+            gain,
+            self.period,
+            start=self.period,
+            state=self._kernel_state(state, "avg_gain"),
+            valid=valid,
+        )
+        avg_loss = kernels.wilder(
+            loss,
+            self.period,
+            start=self.period,
+            state=self._kernel_state(state, "avg_loss"),
+            valid=valid,
+        )
+
+        # RSI value
+        rsi = kernels.prepare_out(out, close.shape, dtype=close.dtype)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(avg_gain, avg_loss, out=rsi)
+        rsi += 1
+        np.divide(100, rsi, out=rsi)
+        np.subtract(100, rsi, out=rsi)
+
+        return rsi
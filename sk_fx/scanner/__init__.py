@@ -0,0 +1,3 @@
+"""
+Modules contains the universe scanner evaluating alert rules across many symbols
+"""
@@ -0,0 +1,161 @@
+"""
+Alert rules evaluated on a panel of symbols
+
+Every rule runs the NumPy path of an oscillator on `(n_symbols, n_bars)`
+field arrays and flags the symbols whose last bar enters a condition, e.g.
+RSI crossing below its oversold level.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+
+
+def _cross_below(values: np.ndarray, level: float) -> np.ndarray:
+    return (values[..., -2] > level) & (values[..., -1] <= level)
+
+
+def _cross_above(values: np.ndarray, level: float) -> np.ndarray:
+    return (values[..., -2] < level) & (values[..., -1] >= level)
+
+
+class ScanRule:
+    """
+    Base class of the scanner rules
+    """
+
+    name: str = "Scan Rule"
+    window: int = 250  # Bars needed to warm the oscillator up
+
+    def evaluate(self, fields: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evaluate the rule on the last bar of every symbol
+
+        Parameters
+        ----------
+        fields : Dict[str, np.ndarray]
+            OHLCV field arrays of shape (n_symbols, n_bars)
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            Condition name to boolean mask over the symbols
+
+        Raises
+        ------
+        Exception
+            When the function is not implemented in the derived class
+        """
+        raise Exception("Not implemented")
+
+
+class RSIThresholdRule(ScanRule):
+    name: str = "RSI Threshold"
+
+    def __init__(
+        self,
+        period: int = 14,
+        oversold: float = 30,
+        overbought: float = 70,
+        window: int = 250,
+    ) -> None:
+        self.period = period
+        self.oversold = oversold
+        self.overbought = overbought
+        self.window = window
+
+    def evaluate(self, fields: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        rsi = RSIOscillator(ohlcv=fields, period=self.period).calculate()
+
+        return {
+            "rsi_oversold": _cross_below(rsi, self.oversold),
+            "rsi_overbought": _cross_above(rsi, self.overbought),
+        }
+
+
+class MACDCrossRule(ScanRule):
+    name: str = "MACD Signal Cross"
+
+    def __init__(
+        self,
+        fast_length: int = 12,
+        slow_length: int = 26,
+        signal_length: int = 9,
+        window: int = 250,
+    ) -> None:
+        self.fast_length = fast_length
+        self.slow_length = slow_length
+        self.signal_length = signal_length
+        self.window = window
+
+    def evaluate(self, fields: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        _, _, macd_diff = MACD(
+            ohlcv=fields,
+            fast_length=self.fast_length,
+            slow_length=self.slow_length,
+            signal_length=self.signal_length,
+        ).calculate()
+
+        return {
+            "macd_bullish_cross": (macd_diff[..., -2] <= 0) & (macd_diff[..., -1] > 0),
+            "macd_bearish_cross": (macd_diff[..., -2] >= 0) & (macd_diff[..., -1] < 0),
+        }
+
+
+class StochasticExtremeRule(ScanRule):
+    name: str = "Stochastic Extreme"
+
+    def __init__(
+        self,
+        k_length: int = 14,
+        d_length: int = 3,
+        oversold: float = 20,
+        overbought: float = 80,
+        window: int = 50,
+    ) -> None:
+        self.k_length = k_length
+        self.d_length = d_length
+        self.oversold = oversold
+        self.overbought = overbought
+        self.window = window
+
+    def evaluate(self, fields: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        stochastic = StochasticOscillator(
+            ohlcv=fields, k_length=self.k_length, d_length=self.d_length
+        ).calculate()
+
+        return {
+            "stochastic_oversold": _cross_below(stochastic, self.oversold),
+            "stochastic_overbought": _cross_above(stochastic, self.overbought),
+        }
+
+
+class DeMarkerZoneRule(ScanRule):
+    name: str = "DeMarker Zone"
+
+    def __init__(
+        self,
+        period: int = 14,
+        oversold: float = 0.3,
+        overbought: float = 0.7,
+        window: int = 250,
+    ) -> None:
+        self.period = period
+        self.oversold = oversold
+        self.overbought = overbought
+        self.window = window
+
+    def evaluate(self, fields: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        demarker = DeMarkerOscillator(ohlcv=fields, period=self.period).calculate()
+
+        return {
+            "demarker_oversold": _cross_below(demarker, self.oversold),
+            "demarker_overbought": _cross_above(demarker, self.overbought),
+        }
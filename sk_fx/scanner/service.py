@@ -0,0 +1,267 @@
+"""
+Multi-process universe scanner
+
+The service owns a `SharedOHLCVPanel`; each worker process attaches to it and
+scans a fixed slice of the symbols. On every bar close the service writes the
+bars once and sends a small task (sequence, head, timestamps) to each worker,
+which evaluates every rule on its slice and pushes the alerts back through a
+single queue. No bar data is pickled between processes.
+"""
+
+import multiprocessing as mp
+from time import perf_counter_ns
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from sk_fx.scanner.rules import ScanRule
+from sk_fx.scanner.shared_panel import SharedOHLCVPanel
+
+
+class Alert(NamedTuple):
+    symbol: str
+    condition: str
+    time: np.datetime64
+    latency: float  # Seconds from the bar close to the alert emission
+
+
+class _ScanTask(NamedTuple):
+    sequence: int
+    head: int
+    time: np.datetime64
+    closed: int  # perf_counter_ns() at the bar close
+
+
+def scan_rows(
+    fields: Dict[str, np.ndarray],
+    rules: Sequence[ScanRule],
+    symbols: Sequence[str],
+) -> List[Tuple[str, str]]:
+    """
+    Evaluate the rules on the last bar of a panel window
+
+    Parameters
+    ----------
+    fields : Dict[str, np.ndarray]
+        OHLCV field arrays of shape (n_symbols, n_bars)
+    rules : Sequence[ScanRule]
+        The rules to evaluate
+    symbols : Sequence[str]
+        Symbol of each row of the fields
+
+    Returns
+    -------
+    List[Tuple[str, str]]
+        The triggered (symbol, condition) pairs
+    """
+    triggered = []
+    for rule in rules:
+        window = {field: values[:, -rule.window :] for field, values in fields.items()}
+        for condition, mask in rule.evaluate(window).items():
+            triggered.extend((symbols[row], condition) for row in np.flatnonzero(mask))
+
+    return triggered
+
+
+def _scan_worker(
+    panel_name: str,
+    n_symbols: int,
+    capacity: int,
+    rows: slice,
+    symbols: Sequence[str],
+    rules: Sequence[ScanRule],
+    tasks: mp.Queue,
+    alerts: mp.Queue,
+) -> None:
+    panel = SharedOHLCVPanel.attach(panel_name, n_symbols, capacity)
+    n_bars = min(max(rule.window for rule in rules), capacity - 1)
+    try:
+        while (task := tasks.get()) is not None:
+            fields = panel.window(n_bars, head=task.head, rows=rows)
+            del fields["time"]
+
+            triggered = scan_rows(fields, rules, symbols)
+            latency = (perf_counter_ns() - task.closed) / 1e9
+            alerts.put(
+                (
+                    task.sequence,
+                    [
+                        Alert(symbol, condition, task.time, latency)
+                        for symbol, condition in triggered
+                    ],
+                )
+            )
+    finally:
+        panel.close()
+
+
+class ScannerService:
+    """
+    Scan a universe of symbols with worker processes on every bar close
+
+    Examples
+    --------
+    >>> with ScannerService(symbols, [RSIThresholdRule()], n_workers=4) as scanner:
+    ...     scanner.load_history(times, history)  # (5, n_symbols, n_bars)
+    ...     alerts = scanner.publish(bar_time, bars)  # (5, n_symbols)
+    """
+
+    symbols: List[str]
+    rules: List[ScanRule]
+    n_workers: int
+    latencies: List[float]
+
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        rules: Sequence[ScanRule],
+        capacity: int = None,
+        n_workers: int = None,
+        timeout: float = 10.0,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        symbols : Sequence[str]
+            Symbols of the universe, one panel row each
+        rules : Sequence[ScanRule]
+            The rules evaluated on every bar close
+        capacity : int, optional
+            Bars kept in the panel, by default one more than the largest rule window
+        n_workers : int, optional
+            Worker processes, by default the number of CPUs
+        timeout : float, optional
+            Seconds to wait for the workers of a bar, by default 10
+        """
+        self.symbols = list(symbols)
+        self.rules = list(rules)
+        self.n_workers = min(n_workers or mp.cpu_count(), len(self.symbols))
+        self.timeout = timeout
+        self.latencies = []
+
+        if capacity is None:
+            capacity = max(rule.window for rule in self.rules) + 1
+        self.panel = SharedOHLCVPanel(len(self.symbols), capacity)
+
+        context = mp.get_context()
+        self._alerts = context.Queue()
+        self._tasks = []
+        self._workers = []
+        bounds = np.linspace(0, len(self.symbols), self.n_workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            tasks = context.Queue()
+            worker = context.Process(
+                target=_scan_worker,
+                args=(
+                    self.panel.name,
+                    len(self.symbols),
+                    capacity,
+                    slice(start, stop),
+                    self.symbols[start:stop],
+                    self.rules,
+                    tasks,
+                    self._alerts,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            self._tasks.append(tasks)
+            self._workers.append(worker)
+
+    def __enter__(self) -> "ScannerService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def load_history(self, time: np.ndarray, bars: np.ndarray) -> None:
+        """
+        Write past bars of shape (5, n_symbols, n_bars) without scanning them
+        """
+        self.panel.extend(time, bars)
+
+    def publish(
+        self, time: np.datetime64, bars: np.ndarray, closed: int = None
+    ) -> List[Alert]:
+        """
+        Write the closed bars of every symbol and scan them
+
+        Parameters
+        ----------
+        time : np.datetime64
+            Open time of the bars
+        bars : np.ndarray
+            Array of shape (5, n_symbols) in OHLCV order
+        closed : int, optional
+            `time.perf_counter_ns()` at the bar close, the start of the
+            latencies, by default the call of `publish`
+
+        Returns
+        -------
+        List[Alert]
+            The alerts of the bar, sorted by symbol order
+
+        Raises
+        ------
+        queue.Empty
+            When a worker does not answer within the timeout, its late
+            alerts are discarded by the next bars
+        """
+        closed = perf_counter_ns() if closed is None else closed
+        sequence = self.panel.append(time, bars)
+        task = _ScanTask(sequence, self.panel.head, np.datetime64(time, "ns"), closed)
+        for tasks in self._tasks:
+            tasks.put(task)
+
+        return self._collect(sequence, closed)
+
+    def _collect(self, sequence: int, closed: int) -> List[Alert]:
+        alerts = []
+        n_answers = 0
+        deadline = perf_counter_ns() + int(self.timeout * 1e9)
+        while n_answers < len(self._workers):
+            timeout = max(deadline - perf_counter_ns(), 0) / 1e9
+            alert_sequence, worker_alerts = self._alerts.get(timeout=timeout)
+            # * Late answers of a bar that timed out
+            if alert_sequence < sequence:
+                continue
+            if alert_sequence > sequence:
+                raise RuntimeError(
+                    f"Alerts of bar {alert_sequence} received while scanning "
+                    f"bar {sequence}"
+                )
+            alerts.extend(worker_alerts)
+            n_answers += 1
+        self.latencies.append((perf_counter_ns() - closed) / 1e9)
+
+        order = {symbol: i for i, symbol in enumerate(self.symbols)}
+        return sorted(alerts, key=lambda alert: order[alert.symbol])
+
+    def latency_stats(self) -> Dict[str, float]:
+        """
+        Bar close to alert latency percentiles in seconds
+        """
+        latencies = np.asarray(self.latencies)
+        return {
+            "count": len(latencies),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        }
+
+    def close(self) -> None:
+        """
+        Stop the workers and free the shared memory
+        """
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=self.timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._tasks = []
+        self._workers = []
+
+        self.panel.close()
+        self.panel.unlink()
@@ -0,0 +1,153 @@
+from multiprocessing import shared_memory
+from typing import Dict
+
+import numpy as np
+
+from sk_fx.data.ring_buffer import OHLCV_FIELDS
+
+_HEADER_SIZE = 4  # head, size, sequence, reserved
+
+
+class SharedOHLCVPanel:
+    """
+    OHLCV bars of a whole universe in `multiprocessing.shared_memory`
+
+    The panel holds the latest `capacity` bars of `n_symbols` symbols that
+    close together (one time axis). Like `OHLCVRingBuffer`, every bar is
+    written twice so the latest bars are a contiguous slice; a field window is
+    a `(n_symbols, n_bars)` view usable by the NumPy path of the oscillators.
+
+    One process writes, any number of processes attach by name and read.
+    Readers take the `head` of the bar they scan and read at most
+    `capacity - 1` bars, so the next write never touches their window.
+    """
+
+    n_symbols: int
+    capacity: int
+
+    def __init__(
+        self, n_symbols: int, capacity: int, name: str = None, create: bool = True
+    ) -> None:
+        self.n_symbols = n_symbols
+        self.capacity = capacity
+
+        time_offset = _HEADER_SIZE * 8
+        data_offset = time_offset + 2 * capacity * 8
+        size = data_offset + len(OHLCV_FIELDS) * n_symbols * 2 * capacity * 8
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+
+        buffer = self._shm.buf
+        self._header = np.ndarray((_HEADER_SIZE,), np.int64, buffer, 0)
+        self._time = np.ndarray((2 * capacity,), "datetime64[ns]", buffer, time_offset)
+        self._data = np.ndarray(
+            (len(OHLCV_FIELDS), n_symbols, 2 * capacity),
+            np.float64,
+            buffer,
+            data_offset,
+        )
+        if create:
+            self._header[:] = 0
+            self._data[:] = np.nan
+
+    @classmethod
+    def attach(cls, name: str, n_symbols: int, capacity: int) -> "SharedOHLCVPanel":
+        """
+        Attach to a panel created by another process
+        """
+        return cls(n_symbols, capacity, name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def head(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def size(self) -> int:
+        return int(self._header[1])
+
+    @property
+    def sequence(self) -> int:
+        """
+        Number of bars appended since the creation of the panel
+        """
+        return int(self._header[2])
+
+    def append(self, time: np.datetime64, bars: np.ndarray) -> int:
+        """
+        Append the bars closing at `time` for every symbol
+
+        Parameters
+        ----------
+        time : np.datetime64
+            Open time of the bars
+        bars : np.ndarray
+            Array of shape (5, n_symbols) in OHLCV order
+
+        Returns
+        -------
+        int
+            The sequence number of the appended bar
+        """
+        return self.extend(np.atleast_1d(time), np.asarray(bars)[..., None])
+
+    def extend(self, time: np.ndarray, bars: np.ndarray) -> int:
+        """
+        Append a block of bars of shape (5, n_symbols, n_bars), e.g. the history
+        """
+        n_bars = len(time)
+        skip = max(n_bars - self.capacity, 0)
+        positions = (self.head + skip + np.arange(n_bars - skip)) % self.capacity
+        for offset in (0, self.capacity):
+            self._time[positions + offset] = np.asarray(time)[skip:]
+            self._data[:, :, positions + offset] = bars[:, :, skip:]
+
+        self._header[0] = (self.head + n_bars) % self.capacity
+        self._header[1] = min(self.size + n_bars, self.capacity)
+        self._header[2] += n_bars
+
+        return self.sequence
+
+    def window(
+        self, n_bars: int, head: int = None, rows: slice = slice(None)
+    ) -> Dict[str, np.ndarray]:
+        """
+        Zero-copy views of the latest bars
+
+        Parameters
+        ----------
+        n_bars : int
+            Number of bars, at most `capacity - 1` when read concurrently
+        head : int, optional
+            Head of the bar to read up to, by default the current head
+        rows : slice, optional
+            Symbols to read, by default all of them
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            `time` of shape (n_bars,) and OHLCV fields of shape (n_symbols, n_bars)
+        """
+        end = (self.head if head is None else head) + self.capacity
+        window = slice(end - min(n_bars, self.size), end)
+
+        views = {"time": self._time[window]}
+        for i, field in enumerate(OHLCV_FIELDS):
+            views[field] = self._data[i, rows, window]
+
+        return views
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory, the views must not be used afterwards
+        """
+        del self._header, self._time, self._data
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """
+        Free the shared memory, called once by the creating process
+        """
+        self._shm.unlink()
@@ -0,0 +1,3 @@
+"""
+Modules contains the local indicator service shared by the internal tools
+"""
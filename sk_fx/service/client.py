@@ -0,0 +1,246 @@
+"""
+Clients of the local indicator service and a load test driver
+
+`ServiceClient` talks HTTP with a keep-alive connection, `WebSocketClient`
+pipelines requests over one WebSocket. `load_test` runs many clients on
+threads against a running server and reports the throughput and latency
+percentiles, together with the coalescing/batching counters of the service.
+"""
+
+import http.client
+import itertools
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, NamedTuple, Sequence
+from urllib.parse import urlencode
+
+import numpy as np
+
+from sk_fx.service import websocket
+
+
+class ServiceClient:
+    """
+    HTTP client of an `IndicatorServer`, one connection per instance
+
+    Example
+    -------
+    >>> client = ServiceClient("127.0.0.1", 8765)
+    >>> rsi = client.indicator("EURUSD", "rsi", bars=100, period=14)["values"]
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self._connection = http.client.HTTPConnection(host, port)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _request(self, method: str, path: str, body: dict = None):
+        data = None if body is None else json.dumps(body).encode()
+        headers = {} if data is None else {"Content-Type": "application/json"}
+        self._connection.request(method, path, body=data, headers=headers)
+        response = self._connection.getresponse()
+        payload = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(payload.get("error", response.reason))
+
+        return payload
+
+    def indicator(
+        self, symbol: str, indicator: str, bars: int = None, **params
+    ) -> Dict[str, Any]:
+        """
+        Values (and times) of an indicator, the last `bars` only when given
+        """
+        query = {"symbol": symbol, "indicator": indicator, **params}
+        if bars is not None:
+            query["bars"] = bars
+        query = {
+            key: json.dumps(value) if not isinstance(value, str) else value
+            for key, value in query.items()
+        }
+
+        return self._request("GET", f"/indicator?{urlencode(query)}")
+
+    def batch(self, requests: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Answers of several requests sent at once, in order
+        """
+        return self._request("POST", "/batch", {"requests": list(requests)})
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/stats")
+
+
+class WebSocketClient:
+    """
+    WebSocket client of an `IndicatorServer`
+
+    Requests are sent without waiting (`send`) and answered in completion
+    order (`receive`); `request` does both for a single request.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self._socket = socket.create_connection((host, port))
+        self._stream = self._socket.makefile("rwb")
+        self._ids = itertools.count()
+
+        key = websocket.new_key()
+        self._stream.write(
+            (
+                f"GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode()
+        )
+        self._stream.flush()
+
+        status = self._stream.readline()
+        headers = {}
+        while (line := self._stream.readline().strip()) != b"":
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if b" 101 " not in status or headers.get(
+            "sec-websocket-accept"
+        ) != websocket.accept_key(key):
+            raise ConnectionError(f"WebSocket handshake failed: {status!r}")
+
+    def close(self) -> None:
+        try:
+            self._stream.write(websocket.encode_frame(b"", websocket.CLOSE, True))
+            self._stream.flush()
+        finally:
+            self._stream.close()
+            self._socket.close()
+
+    def send(self, symbol: str, indicator: str, bars: int = None, **params) -> int:
+        """
+        Send a request without waiting for the answer
+
+        Returns
+        -------
+        int
+            The id carried by the answer
+        """
+        request_id = next(self._ids)
+        request = dict(id=request_id, symbol=symbol, indicator=indicator, params=params)
+        if bars is not None:
+            request["bars"] = bars
+        self._stream.write(
+            websocket.encode_frame(json.dumps(request).encode(), masked=True)
+        )
+        self._stream.flush()
+
+        return request_id
+
+    def receive(self) -> Dict[str, Any]:
+        """
+        Next answer, of any request in flight
+        """
+        while True:
+            opcode, payload = websocket.read_frame(self._stream)
+            if opcode == websocket.TEXT:
+                return json.loads(payload)
+            if opcode == websocket.CLOSE:
+                raise ConnectionError("WebSocket closed by the server")
+
+    def request(self, symbol: str, indicator: str, bars: int = None, **params):
+        self.send(symbol, indicator, bars=bars, **params)
+        return self.receive()
+
+
+class LoadReport(NamedTuple):
+    n_requests: int
+    n_errors: int
+    seconds: float
+    latencies: np.ndarray  # Seconds per request
+    stats: Dict[str, Any]  # Service counters after the test
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.n_requests / self.seconds if self.seconds > 0 else float("inf")
+
+    def percentile(self, q: float) -> float:
+        return float(np.percentile(self.latencies, q)) if len(self.latencies) else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.n_requests} requests ({self.n_errors} errors) in "
+            f"{self.seconds:.2f} s, {self.requests_per_second:.0f} req/s, latency "
+            f"p50 {self.percentile(50) * 1e3:.2f} ms p99 "
+            f"{self.percentile(99) * 1e3:.2f} ms, service {self.stats}"
+        )
+
+
+def load_test(
+    host: str,
+    port: int,
+    requests: Sequence[Mapping[str, Any]],
+    n_clients: int = 8,
+    n_requests: int = 1000,
+    use_websocket: bool = False,
+) -> LoadReport:
+    """
+    Send `n_requests` requests from `n_clients` concurrent clients
+
+    Parameters
+    ----------
+    host, port
+        Address of the running `IndicatorServer`
+    requests : Sequence[Mapping[str, Any]]
+        Request templates (symbol, indicator, params, bars) cycled through
+    n_clients : int, optional
+        Concurrent clients, each on its own thread and connection, by default 8
+    n_requests : int, optional
+        Total number of requests, by default 1000
+    use_websocket : bool, optional
+        Use WebSocket clients instead of HTTP ones, by default False
+
+    Returns
+    -------
+    LoadReport
+        Throughput, latencies and service counters
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def run_client(client_index: int) -> None:
+        client = (WebSocketClient if use_websocket else ServiceClient)(host, port)
+        own_latencies, own_errors = [], 0
+        try:
+            for i in range(client_index, n_requests, n_clients):
+                request = requests[i % len(requests)]
+                start = time.perf_counter()
+                try:
+                    answer = (client.request if use_websocket else client.indicator)(
+                        request["symbol"],
+                        request["indicator"],
+                        bars=request.get("bars"),
+                        **request.get("params", {}),
+                    )
+                    own_errors += "error" in answer
+                except ValueError:
+                    own_errors += 1
+                own_latencies.append(time.perf_counter() - start)
+        finally:
+            client.close()
+
+        with lock:
+            latencies.extend(own_latencies)
+            errors[0] += own_errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_clients) as pool:
+        list(pool.map(run_client, range(n_clients)))
+    seconds = time.perf_counter() - start
+
+    stats_client = ServiceClient(host, port)
+    try:
+        stats = stats_client.stats()
+    finally:
+        stats_client.close()
+
+    return LoadReport(n_requests, errors[0], seconds, np.array(latencies), stats)
@@ -0,0 +1,451 @@
+"""
+Request coalescing, batching and caching behind the indicator service
+
+A request names a symbol, an indicator of `INDICATORS` and its parameters.
+Identical concurrent requests share one future; new requests are queued for a
+short `batch_window` so that requests for the same indicator and parameters on
+symbols of the same length are stacked into one `(n_symbols, n_bars)` panel
+and computed with a single kernel pass. Results are kept in a shared LRU cache
+until the data of their symbol is replaced.
+"""
+
+import inspect
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.indicators.executor import read_only_fields
+from sk_fx.indicators.oscillators.adaptive_oscillator import (
+    AdaptiveDeMarkerOscillator,
+    AdaptiveRSIOscillator,
+    AdaptiveStochasticOscillator,
+)
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    MACD,
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.tools.fib_extension import FibExtension
+from sk_fx.tools.fib_retracement import FibRetracement
+from sk_fx.utils import kernels
+from sk_fx.utils.indicators import TA
+
+Result = Union[np.ndarray, Tuple[np.ndarray, ...]]
+
+
+class IndicatorSpec(NamedTuple):
+    compute: Callable[[Mapping[str, np.ndarray], dict], Result]
+    batchable: bool = True  # Whether the computation accepts symbol panels
+    bars_axis: int = -1  # Axis of the bars in a single symbol result
+
+
+def _oscillator(oscillator_class) -> IndicatorSpec:
+    """
+    Parameters of the constructor configure the oscillator, the others are
+    options of `calculate`, e.g. `average_demarker`
+    """
+    constructor = set(inspect.signature(oscillator_class.__init__).parameters)
+
+    def compute(fields: Mapping[str, np.ndarray], params: dict) -> Result:
+        options = {key: value for key, value in params.items() if key in constructor}
+        oscillator = oscillator_class(ohlcv=fields, **options)
+        return oscillator.calculate(
+            **{key: value for key, value in params.items() if key not in constructor}
+        )
+
+    return IndicatorSpec(compute)
+
+
+def _moving_average(name: str) -> IndicatorSpec:
+    def compute(fields: Mapping[str, np.ndarray], params: dict) -> Result:
+        return getattr(TA, name)(fields, **params)
+
+    return IndicatorSpec(compute)
+
+
+def _swing(fields: Mapping[str, np.ndarray], lookback: int):
+    return (
+        kernels.rolling_min(fields["low"], lookback),
+        kernels.rolling_max(fields["high"], lookback),
+    )
+
+
+def _fib_retracement(fields: Mapping[str, np.ndarray], params: dict) -> Result:
+    low, high = _swing(fields, params.get("lookback", 50))
+    return FibRetracement().fib_level_prices(
+        low, high, is_increase=params.get("is_increase", True)
+    )
+
+
+def _fib_extension(fields: Mapping[str, np.ndarray], params: dict) -> Result:
+    low, high = _swing(fields, params.get("lookback", 50))
+    return FibExtension().fib_level_prices(
+        fields["close"], low, high, is_increase=params.get("is_increase", True)
+    )
+
+
+INDICATORS: Dict[str, IndicatorSpec] = {
+    "rsi": _oscillator(RSIOscillator),
+    "stochastic": _oscillator(StochasticOscillator),
+    "demarker": _oscillator(DeMarkerOscillator),
+    "macd": _oscillator(MACD),
+    "chaikin": _oscillator(ChaikinOscillator),
+    "adaptive_rsi": _oscillator(AdaptiveRSIOscillator),
+    "adaptive_stochastic": _oscillator(AdaptiveStochasticOscillator),
+    "adaptive_demarker": _oscillator(AdaptiveDeMarkerOscillator),
+    **{
+        name: _moving_average(name)
+        for name in ("sma", "ema", "wma", "hma", "dema", "tema")
+    },
+    # * Anchored sessions depend on the times of each symbol
+    "vwap": IndicatorSpec(lambda fields, params: TA.vwap(fields, **params), False),
+    # * Levels of the swing of the last `lookback` bars, shape (n_bars, n_levels)
+    "fib_retracement": IndicatorSpec(_fib_retracement, bars_axis=-2),
+    "fib_extension": IndicatorSpec(_fib_extension, bars_axis=-2),
+}
+
+
+def parse_value(text: str):
+    """
+    Parameter value written as text: JSON (numbers, booleans, lists) or a string
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_spec(spec: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Indicator name and parameters of a spec like 'rsi:period=14' or
+    'ema:length=[9,21]'
+
+    Raises
+    ------
+    ValueError
+        When the indicator is unknown or a parameter has no value
+    """
+    indicator, _, text = spec.partition(":")
+    if indicator not in INDICATORS:
+        raise ValueError(f"Unknown indicator {indicator!r}")
+
+    params = {}
+    for item in filter(None, re.split(r",(?![^\[]*\])", text)):
+        key, equal, value = item.partition("=")
+        if not equal:
+            raise ValueError(f"Parameter {item!r} of {spec!r} has no value")
+        params[key.strip()] = parse_value(value.strip())
+
+    return indicator, params
+
+
+def parameter_items(params: Mapping[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """
+    Hashable, order independent form of request parameters
+    """
+    return tuple(
+        sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in params.items()
+        )
+    )
+
+
+class _Key(NamedTuple):
+    symbol: str
+    version: int
+    indicator: str
+    params: Tuple[Tuple[str, Any], ...]
+
+
+def _read_only(result: Result) -> Result:
+    if isinstance(result, tuple):
+        return tuple(_read_only(line) for line in result)
+
+    result = np.asarray(result)
+    result.flags.writeable = False
+    return result
+
+
+class IndicatorService:
+    """
+    Shared indicator computations with coalescing, batching and caching
+
+    Example
+    -------
+    >>> service = IndicatorService({"EURUSD": eurusd, "GBPUSD": gbpusd})
+    >>> rsi = service.compute("EURUSD", "rsi", period=14)
+    >>> futures = [service.submit(symbol, "rsi", period=14) for symbol in service.symbols]
+    >>> service.close()
+    """
+
+    cache_size: int
+    batch_window: float
+    max_batch: int
+
+    def __init__(
+        self,
+        universe: Mapping[str, Union[pd.DataFrame, Mapping]] = None,
+        cache_size: int = 1024,
+        batch_window: float = 0.002,
+        max_batch: int = 256,
+        max_workers: int = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        universe : Mapping[str, Union[pd.DataFrame, Mapping]], optional
+            Initial OHLCV data per symbol, by default None
+        cache_size : int, optional
+            Maximum number of cached results, by default 1024
+        batch_window : float, optional
+            Seconds a new request waits for compatible ones, by default 0.002
+        max_batch : int, optional
+            Maximum number of symbols of one panel computation, by default 256
+        max_workers : int, optional
+            Threads computing the batches, by default the `ThreadPoolExecutor`
+            default
+        """
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self._fields: Dict[str, Dict[str, np.ndarray]] = {}
+        self._times: Dict[str, np.ndarray] = {}
+        self._versions: Dict[str, int] = {}
+        self._cache: "OrderedDict[_Key, Result]" = OrderedDict()
+        self._in_flight: Dict[_Key, Future] = {}
+        # * Requests waiting for a batch, with the fields of their version
+        self._pending: List[Tuple[_Key, Dict[str, np.ndarray]]] = []
+        self._stats = dict(
+            requests=0, cache_hits=0, coalesced=0, computed=0, batches=0, errors=0
+        )
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sk-fx-service"
+        )
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="sk-fx-service-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+
+        for symbol, ohlcv in (universe or {}).items():
+            self.set_data(symbol, ohlcv)
+
+    def __enter__(self) -> "IndicatorService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._fields)
+
+    def set_data(self, symbol: str, ohlcv: Union[pd.DataFrame, Mapping]) -> None:
+        """
+        Replace the bars of a symbol, invalidating its cached results
+
+        Parameters
+        ----------
+        symbol : str
+            Market symbol, e.g. 'EURUSD'
+        ohlcv : Union[pd.DataFrame, Mapping]
+            Bars indexed by time, or a mapping of fields with an optional 'time'
+        """
+        fields = read_only_fields(ohlcv)
+        if isinstance(ohlcv, pd.DataFrame) and isinstance(
+            ohlcv.index, pd.DatetimeIndex
+        ):
+            fields["time"] = read_only_fields({"time": ohlcv.index})["time"]
+
+        with self._lock:
+            self._fields[symbol] = fields
+            self._times[symbol] = fields.get("time")
+            self._versions[symbol] = self._versions.get(symbol, 0) + 1
+            for key in [key for key in self._cache if key.symbol == symbol]:
+                del self._cache[key]
+
+    def times(self, symbol: str) -> np.ndarray:
+        """
+        Bar times of a symbol, None when its data has no times
+        """
+        return self._times[symbol]
+
+    def submit(self, symbol: str, indicator: str, **params) -> Future:
+        """
+        Request an indicator, answered from the cache, a computation in
+        flight or a new (batched) computation
+
+        Parameters
+        ----------
+        symbol : str
+            Symbol with data in the service
+        indicator : str
+            Name in `INDICATORS`
+        **params
+            Indicator parameters, e.g. `period=14`
+
+        Returns
+        -------
+        Future
+            Result of the indicator: an array with the bars along the last
+            axis (the Fib levels last), or a tuple of arrays (MACD)
+
+        Raises
+        ------
+        ValueError
+            When the symbol or the indicator is unknown
+        """
+        if indicator not in INDICATORS:
+            raise ValueError(f"Unknown indicator {indicator!r}")
+
+        with self._lock:
+            if symbol not in self._fields:
+                raise ValueError(f"Unknown symbol {symbol!r}")
+
+            self._stats["requests"] += 1
+            key = _Key(
+                symbol, self._versions[symbol], indicator, parameter_items(params)
+            )
+
+            if key in self._cache:
+                self._stats["cache_hits"] += 1
+                self._cache.move_to_end(key)
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+
+            if key in self._in_flight:
+                self._stats["coalesced"] += 1
+                return self._in_flight[key]
+
+            future = self._in_flight[key] = Future()
+            self._pending.append((key, self._fields[symbol]))
+            self._wake.notify()
+
+            return future
+
+    def compute(self, symbol: str, indicator: str, timeout: float = None, **params):
+        """
+        Blocking `submit`
+        """
+        return self.submit(symbol, indicator, **params).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters of the requests and computations, and the cache size
+        """
+        with self._lock:
+            return dict(self._stats, cached=len(self._cache), symbols=len(self._fields))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._wake.wait()
+                if not self._pending:
+                    return
+
+            # * Let compatible requests arrive, then take every pending one
+            time.sleep(self.batch_window)
+            with self._lock:
+                pending, self._pending = self._pending, []
+            fields = dict(pending)
+
+            for batch in self._batches(list(fields), fields):
+                self._pool.submit(self._run, batch, [fields[key] for key in batch])
+
+    def _batches(
+        self, keys: List[_Key], fields: Dict[_Key, Dict[str, np.ndarray]]
+    ) -> List[List[_Key]]:
+        groups: Dict[tuple, List[_Key]] = {}
+        for key in keys:
+            # * Lists of lengths put the lengths before the symbols, not stacked
+            batchable = not any(isinstance(value, tuple) for _, value in key.params)
+            if INDICATORS[key.indicator].batchable and batchable:
+                group = (key.indicator, key.params, len(fields[key]["close"]))
+            else:
+                group = key
+            groups.setdefault(group, []).append(key)
+
+        return [
+            keys[start : start + self.max_batch]
+            for keys in groups.values()
+            for start in range(0, len(keys), self.max_batch)
+        ]
+
+    def _run(self, keys: List[_Key], fields: List[Dict[str, np.ndarray]]) -> None:
+        spec = INDICATORS[keys[0].indicator]
+        try:
+            if len(keys) == 1:
+                results = [spec.compute(dict(fields[0]), dict(keys[0].params))]
+            else:
+                panel = {
+                    field: np.stack([symbol_fields[field] for symbol_fields in fields])
+                    for field in fields[0]
+                    if field != "time"
+                }
+                result = spec.compute(panel, dict(keys[0].params))
+                results = [self._panel_row(result, row) for row in range(len(keys))]
+        except Exception as error:
+            if len(keys) == 1:
+                self._finish(keys, [error])
+                return
+            # * Symbol by symbol, so that only the failing symbols fail
+            for key, symbol_fields in zip(keys, fields):
+                self._run([key], [symbol_fields])
+        else:
+            self._finish(keys, [_read_only(result) for result in results])
+
+    @staticmethod
+    def _panel_row(result: Result, row: int) -> Result:
+        if isinstance(result, tuple):
+            return tuple(line[row] for line in result)
+
+        return np.asarray(result)[row]
+
+    def _finish(
+        self, keys: List[_Key], results: List[Union[Result, Exception]]
+    ) -> None:
+        """
+        Answer the requests with their results or exceptions, caching the
+        results of the current data of their symbol
+        """
+        with self._lock:
+            self._stats["batches"] += 1
+            futures = [self._in_flight.pop(key) for key in keys]
+            for key, result in zip(keys, results):
+                if isinstance(result, Exception):
+                    self._stats["errors"] += 1
+                    continue
+                self._stats["computed"] += 1
+                if key.version == self._versions.get(key.symbol):
+                    self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        for future, result in zip(futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,300 @@
+"""
+Local HTTP/WebSocket front end of the indicator service
+
+Endpoints (JSON):
+
+    GET  /indicators                       names of the indicators
+    GET  /symbols                          symbols with data
+    GET  /stats                            service counters
+    GET  /indicator?symbol=EURUSD&indicator=rsi&period=14&bars=100
+    POST /batch  {"requests": [{"symbol", "indicator", "params", "bars"}, ...]}
+    GET  /ws                               WebSocket, one request per text message
+
+Every HTTP request runs on its own thread and blocks on the shared
+`IndicatorService`, so concurrent clients are coalesced and batched together.
+WebSocket clients may pipeline requests; answers carry the request "id" and
+are sent as soon as they are ready, possibly out of order.
+
+Run with ``python -m sk_fx.service.server EURUSD.csv GBPUSD.parquet --port 8765``.
+"""
+
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import Future, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Mapping, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from sk_fx.data.replay import read_ohlcv
+from sk_fx.service import websocket
+from sk_fx.service.engine import INDICATORS, IndicatorService, Result, parse_value
+
+
+def _json_values(values: np.ndarray) -> list:
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def result_payload(
+    service: IndicatorService, request: Mapping[str, Any], result: Result
+) -> Dict[str, Any]:
+    """
+    JSON answer of a request: the last `bars` values (NaN as null) and times
+    """
+    bars = request.get("bars")
+    axis = INDICATORS[request["indicator"]].bars_axis
+
+    def tail(values: np.ndarray) -> np.ndarray:
+        if bars is None:
+            return values
+        index = [slice(None)] * values.ndim
+        index[axis] = slice(max(values.shape[axis] - bars, 0), None)
+        return values[tuple(index)]
+
+    payload = {
+        key: request[key] for key in ("id", "symbol", "indicator") if key in request
+    }
+    payload["params"] = request.get("params", {})
+    if isinstance(result, tuple):
+        payload["values"] = [_json_values(tail(line)) for line in result]
+    else:
+        payload["values"] = _json_values(tail(result))
+
+    times = service.times(request["symbol"])
+    if times is not None:
+        times = times if bars is None else times[max(len(times) - bars, 0) :]
+        payload["time"] = np.datetime_as_string(times, unit="s").tolist()
+
+    return payload
+
+
+class IndicatorRequestHandler(BaseHTTPRequestHandler):
+    server: "IndicatorServer"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, Nagle would delay the body
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args) -> None:
+        # Requests are counted in the service stats instead of logged
+        pass
+
+    def _send_json(self, payload, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _submit(self, request: Mapping[str, Any]) -> Future:
+        try:
+            return self.server.service.submit(
+                request["symbol"], request["indicator"], **request.get("params", {})
+            )
+        except Exception as error:
+            # * A rejected request is answered like a failed computation
+            future = Future()
+            future.set_exception(error)
+            return future
+
+    def _answer(self, request: Mapping[str, Any], future) -> Tuple[Dict[str, Any], int]:
+        """
+        JSON answer of a request and its HTTP status: an error answer with
+        400 when the request or its computation failed, 504 on timeout
+        """
+        try:
+            result = future.result(self.server.request_timeout)
+            return result_payload(self.server.service, request, result), 200
+        except TimeoutError:
+            error = f"No result after {self.server.request_timeout} seconds"
+            status = 504
+        except Exception as exception:
+            error, status = str(exception) or type(exception).__name__, 400
+
+        return {"id": request.get("id"), "error": error}, status
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        service = self.server.service
+        try:
+            if (
+                url.path == "/ws"
+                and "websocket" in self.headers.get("Upgrade", "").lower()
+            ):
+                self._websocket()
+            elif url.path == "/indicators":
+                self._send_json(sorted(INDICATORS))
+            elif url.path == "/symbols":
+                self._send_json(service.symbols)
+            elif url.path == "/stats":
+                self._send_json(service.stats())
+            elif url.path == "/indicator":
+                query = {key: parse_value(value) for key, value in parse_qsl(url.query)}
+                request = {
+                    "symbol": str(query.pop("symbol", "")),
+                    "indicator": str(query.pop("indicator", "")),
+                    "bars": query.pop("bars", None),
+                    "params": query,
+                }
+                self._send_json(*self._answer(request, self._submit(request)))
+            else:
+                self._send_json({"error": f"Unknown path {url.path}"}, 404)
+        except ValueError as error:
+            self._send_json({"error": str(error)}, 400)
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != "/batch":
+            self._send_json({"error": f"Unknown path {self.path}"}, 404)
+            return
+
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            requests: List[dict] = json.loads(body)["requests"]
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json({"error": str(error)}, 400)
+            return
+
+        # * Submit every request before waiting, so that they are batched
+        futures = [self._submit(request) for request in requests]
+        # * A failed request has an error entry, as over WebSocket
+        self._send_json(
+            [
+                self._answer(request, future)[0]
+                for request, future in zip(requests, futures)
+            ]
+        )
+
+    def _websocket(self) -> None:
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header(
+            "Sec-WebSocket-Accept",
+            websocket.accept_key(self.headers["Sec-WebSocket-Key"]),
+        )
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        send_lock = threading.Lock()
+
+        def send(payload, opcode: int = websocket.TEXT) -> None:
+            data = (
+                payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            )
+            with send_lock:
+                try:
+                    self.wfile.write(websocket.encode_frame(data, opcode))
+                    self.wfile.flush()
+                except (OSError, ValueError):
+                    # The client left before an answer in flight was ready
+                    pass
+
+        def answer(request: dict, future) -> None:
+            try:
+                send(result_payload(self.server.service, request, future.result()))
+            except Exception as error:
+                send({"id": request.get("id"), "error": str(error)})
+
+        while True:
+            try:
+                opcode, payload = websocket.read_frame(self.rfile)
+            except (ConnectionError, ValueError):
+                return
+
+            if opcode == websocket.CLOSE:
+                send(payload, websocket.CLOSE)
+                return
+            if opcode == websocket.PING:
+                send(payload, websocket.PONG)
+                continue
+            if opcode != websocket.TEXT:
+                continue
+
+            request = {}
+            try:
+                request = json.loads(payload)
+                future = self._submit(request)
+            except ValueError as error:
+                send({"id": request.get("id"), "error": str(error)})
+                continue
+            future.add_done_callback(
+                lambda future, request=request: answer(request, future)
+            )
+
+
+class IndicatorServer(ThreadingHTTPServer):
+    """
+    HTTP/WebSocket server of an `IndicatorService`
+
+    Example
+    -------
+    >>> with IndicatorServer(service, port=0) as server:
+    ...     server.serve_in_background()
+    ...     host, port = server.server_address
+    """
+
+    daemon_threads = True
+    service: IndicatorService
+    request_timeout: float
+
+    def __init__(
+        self,
+        service: IndicatorService,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        request_timeout: float = 30.0,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        service : IndicatorService
+            The shared service answering the requests
+        host : str, optional
+            Interface to listen on, by default the local loopback
+        port : int, optional
+            Port to listen on, 0 for any free port, by default 8765
+        request_timeout : float, optional
+            Seconds a request waits for its result, by default 30
+        """
+        self.service = service
+        self.request_timeout = request_timeout
+        super().__init__((host, port), IndicatorRequestHandler)
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.serve_forever, name="sk-fx-server", daemon=True
+        )
+        thread.start()
+        return thread
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local SK-FX indicator service")
+    parser.add_argument(
+        "files", nargs="*", help="CSV/Parquet bars, the symbol is the file name"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    universe = {
+        os.path.splitext(os.path.basename(path))[0]: read_ohlcv(path)
+        for path in args.files
+    }
+    with IndicatorService(universe, cache_size=args.cache_size) as service:
+        with IndicatorServer(service, args.host, args.port) as server:
+            print(f"Serving {len(universe)} symbols on {args.host}:{args.port}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Minimal WebSocket (RFC 6455) framing for the local indicator service
+
+Only what the service and its clients exchange is supported: unfragmented
+text frames, ping/pong and close. Client frames are masked, server frames
+are not.
+"""
+
+import base64
+import hashlib
+import os
+import struct
+from typing import BinaryIO, Tuple
+
+import numpy as np
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+TEXT = 0x1
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+
+def accept_key(key: str) -> str:
+    """
+    `Sec-WebSocket-Accept` answer to a client `Sec-WebSocket-Key`
+    """
+    digest = hashlib.sha1(key.encode() + _GUID).digest()
+    return base64.b64encode(digest).decode()
+
+
+def new_key() -> str:
+    return base64.b64encode(os.urandom(16)).decode()
+
+
+def _apply_mask(payload: bytes, mask: bytes) -> bytes:
+    data = np.frombuffer(payload, dtype=np.uint8)
+    key = np.resize(np.frombuffer(mask, dtype=np.uint8), len(data))
+    return np.bitwise_xor(data, key).tobytes()
+
+
+def encode_frame(payload: bytes, opcode: int = TEXT, masked: bool = False) -> bytes:
+    """
+    Single final frame carrying the payload
+    """
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if masked else 0
+    if len(payload) < 126:
+        header += bytes([mask_bit | len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", len(payload))
+
+    if not masked:
+        return header + payload
+
+    mask = os.urandom(4)
+    return header + mask + _apply_mask(payload, mask)
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) < size:
+        raise ConnectionError("WebSocket closed in the middle of a frame")
+
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Tuple[int, bytes]:
+    """
+    Read one frame
+
+    Returns
+    -------
+    Tuple[int, bytes]
+        The opcode and the unmasked payload
+
+    Raises
+    ------
+    ConnectionError
+        When the stream ends
+    ValueError
+        On fragmented frames
+    """
+    first, second = _read_exactly(stream, 2)
+    if not first & 0x80:
+        raise ValueError("Fragmented WebSocket frames are not supported")
+
+    size = second & 0x7F
+    if size == 126:
+        (size,) = struct.unpack("!H", _read_exactly(stream, 2))
+    elif size == 127:
+        (size,) = struct.unpack("!Q", _read_exactly(stream, 8))
+
+    mask = _read_exactly(stream, 4) if second & 0x80 else None
+    payload = _read_exactly(stream, size)
+
+    return first & 0x0F, payload if mask is None else _apply_mask(payload, mask)
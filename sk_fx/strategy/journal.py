@@ -0,0 +1,487 @@
+"""
+Event-sourced journal of the signals, orders and fills of a strategy
+
+Every event is appended once and never modified. Events are buffered in
+memory and written as typed columnar blocks, uncompressed Arrow IPC segments
+sorted by time and read back through memory mapping. A JSON manifest lists the
+committed segments with their time range and symbols, the time index used to
+skip segments outside a query. It is replaced atomically after a segment is
+written, so a crash never leaves a partial block visible and loses at most
+the events appended since the last `flush`.
+
+The state of the strategy (positions, open orders, last signals) is a fold
+over the events: `TradeJournal.state` rebuilds it from the journal alone,
+without reprocessing any market data.
+
+Example
+-------
+>>> with TradeJournal("journal") as journal:
+...     journal.record_signals("EURUSD", fusion.stream().update(time, *bar))
+...     journal.order(time, "EURUSD", order_id=1, direction=1, quantity=10_000)
+...     journal.fill(time, "EURUSD", order_id=1, direction=1, quantity=10_000, price=1.0841)
+>>> TradeJournal("journal").state().positions
+"""
+
+import enum
+import json
+import os
+import uuid
+from typing import Dict, Iterator, NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from sk_fx.strategy.signal_fusion import Signal
+
+_MANIFEST = "manifest.json"
+
+
+class EventKind(enum.IntEnum):
+    SIGNAL = 0
+    ORDER = 1
+    FILL = 2
+    CANCEL = 3
+
+
+class Event(NamedTuple):
+    time: pd.Timestamp  # Naive times are taken as UTC
+    symbol: str
+    kind: EventKind
+    order_id: int = -1  # -1 for signals
+    rule: str = ""  # Rule of a signal, or tag of an order
+    direction: int = 0  # 1 buy / long, -1 sell / short
+    price: float = np.nan  # Fill price, limit price of an order (NaN at market)
+    quantity: float = np.nan
+    score: float = np.nan  # Score of a signal
+    seq: int = -1  # Append position in the journal
+
+
+SCHEMA = pa.schema(
+    [
+        ("seq", pa.int64()),
+        ("time", pa.timestamp("ns")),
+        ("symbol", pa.dictionary(pa.int32(), pa.string())),
+        ("kind", pa.int8()),
+        ("order_id", pa.int64()),
+        ("rule", pa.dictionary(pa.int32(), pa.string())),
+        ("direction", pa.int8()),
+        ("price", pa.float64()),
+        ("quantity", pa.float64()),
+        ("score", pa.float64()),
+    ]
+)
+_COLUMNS = [field.name for field in SCHEMA if field.name != "seq"]
+_ORDER_COLUMNS = [
+    "time",
+    "symbol",
+    "rule",
+    "direction",
+    "price",
+    "quantity",
+    "filled",
+    "remaining",
+]
+
+
+class JournalState(NamedTuple):
+    positions: pd.Series  # Net filled quantity per symbol, signed
+    open_orders: pd.DataFrame  # Orders neither filled nor cancelled, by order_id
+    last_signals: pd.DataFrame  # Last signal of every symbol and rule
+    next_order_id: int
+    last_seq: int  # Sequence number of the last event folded, -1 when empty
+
+
+class TradeJournal:
+    """
+    Append-only journal of strategy events on disk
+
+    Parameters
+    ----------
+    root : str
+        Directory of the journal, created on the first flush
+    block_size : int, optional
+        Buffered events written as one block, by default 4096
+    max_segments : int, optional
+        Segments before an automatic `compact`, by default 64
+    """
+
+    root: str
+    block_size: int = 4096
+    max_segments: int = 64
+
+    def __init__(
+        self, root: str, block_size: int = 4096, max_segments: int = 64
+    ) -> None:
+        self.root = root
+        self.block_size = block_size
+        self.max_segments = max_segments
+        self._manifest = self._read_manifest()
+        self._buffer: Dict[str, list] = {column: [] for column in _COLUMNS}
+
+    def __enter__(self) -> "TradeJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def __len__(self) -> int:
+        return self._manifest["next_seq"] + len(self._buffer["time"])
+
+    # * Appending
+
+    def append(self, event: Event) -> int:
+        """
+        Append one event, its `seq` is ignored
+
+        Returns
+        -------
+        int
+            Sequence number of the event
+        """
+        seq = len(self)
+        for column in _COLUMNS:
+            self._buffer[column].append(getattr(event, column))
+        if len(self._buffer["time"]) >= self.block_size:
+            self.flush()
+
+        return seq
+
+    def append_frame(self, events: pd.DataFrame) -> None:
+        """
+        Append the rows of a data frame with the `Event` columns as one
+        block, e.g. the signals of `SignalFusion.rank` with a `symbol`
+        column (kind `SIGNAL` when absent)
+        """
+        self.flush()
+        defaults = dict(Event._field_defaults, kind=EventKind.SIGNAL)
+        columns = {
+            column: (
+                events[column].to_numpy()
+                if column in events
+                else np.full(len(events), defaults[column])
+            )
+            for column in _COLUMNS
+        }
+        self._write(columns)
+
+    def record_signals(self, symbol: str, signals: Sequence[Signal]) -> None:
+        """
+        Append the signals of `StreamingFusion.update`
+        """
+        for signal in signals:
+            self.append(
+                Event(
+                    signal.time,
+                    symbol,
+                    EventKind.SIGNAL,
+                    rule=signal.rule,
+                    direction=signal.direction,
+                    score=signal.score,
+                )
+            )
+
+    def order(
+        self,
+        time,
+        symbol: str,
+        order_id: int,
+        direction: int,
+        quantity: float,
+        price: float = np.nan,
+        rule: str = "",
+    ) -> int:
+        """
+        Append a new order, at market unless a limit `price` is given
+        """
+        return self.append(
+            Event(
+                time,
+                symbol,
+                EventKind.ORDER,
+                order_id,
+                rule,
+                direction,
+                price,
+                quantity,
+            )
+        )
+
+    def fill(
+        self,
+        time,
+        symbol: str,
+        order_id: int,
+        direction: int,
+        quantity: float,
+        price: float,
+    ) -> int:
+        """
+        Append a (partial) fill of an order
+        """
+        return self.append(
+            Event(
+                time, symbol, EventKind.FILL, order_id, "", direction, price, quantity
+            )
+        )
+
+    def cancel(self, time, symbol: str, order_id: int) -> int:
+        """
+        Append the cancellation of the unfilled part of an order
+        """
+        return self.append(Event(time, symbol, EventKind.CANCEL, order_id))
+
+    def flush(self) -> None:
+        """
+        Write the buffered events as one block and commit it
+        """
+        if len(self._buffer["time"]) == 0:
+            return
+
+        buffer, self._buffer = self._buffer, {column: [] for column in _COLUMNS}
+        self._write(buffer)
+
+    # * Queries
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        symbols: Sequence[str] = None,
+        kinds: Sequence[EventKind] = None,
+    ) -> pa.Table:
+        """
+        Events of a time range and symbols, sorted by time then sequence
+
+        Segments outside the range or without the symbols are not read,
+        the others are cut by binary search on their sorted times.
+
+        Parameters
+        ----------
+        start, end : optional
+            Time range, `start` included and `end` excluded, by default all
+        symbols : Sequence[str], optional
+            Symbols to keep, by default all
+        kinds : Sequence[EventKind], optional
+            Event kinds to keep, by default all
+
+        Returns
+        -------
+        pa.Table
+            Columns of `SCHEMA`, buffered events included
+        """
+        start = None if start is None else pd.Timestamp(start).value
+        end = None if end is None else pd.Timestamp(end).value
+        tables = []
+        for segment in self._manifest["segments"]:
+            if start is not None and segment["end"] < start:
+                continue
+            if end is not None and segment["start"] >= end:
+                continue
+            if symbols is not None and not set(symbols) & set(segment["symbols"]):
+                continue
+            tables.append(self._read_segment(segment["file"]))
+        if len(self._buffer["time"]) > 0:
+            # * The buffer is in append order, sort it like a segment
+            buffered = self._to_table(self._buffer, self._manifest["next_seq"])
+            tables.append(self._sort_by_time(buffered))
+
+        selected = [self._select(table, start, end, symbols, kinds) for table in tables]
+        if len(selected) == 0:
+            return SCHEMA.empty_table()
+
+        return self._sort_by_time(pa.concat_tables(selected).unify_dictionaries())
+
+    def events(self, start=None, end=None, symbols=None, kinds=None) -> pd.DataFrame:
+        """
+        `query` as a data frame with string symbols and rules
+        """
+        frame = self.query(start, end, symbols, kinds).to_pandas()
+        for column in ("symbol", "rule"):
+            frame[column] = frame[column].astype(object)
+
+        return frame
+
+    def replay(self, start=None, end=None, symbols=None) -> Iterator[Event]:
+        """
+        Events in append order, to feed a strategy that folds them itself
+        """
+        frame = self.events(start, end, symbols).sort_values("seq")
+        for row in frame.itertuples(index=False):
+            yield Event(
+                row.time,
+                row.symbol,
+                EventKind(row.kind),
+                int(row.order_id),
+                row.rule,
+                int(row.direction),
+                row.price,
+                row.quantity,
+                row.score,
+                int(row.seq),
+            )
+
+    def state(self, end=None) -> JournalState:
+        """
+        Strategy state after the events before `end` (every event by default),
+        folded in one vectorized pass
+
+        Returns
+        -------
+        JournalState
+            Net positions, open orders with their filled and remaining
+            quantities, last signal per symbol and rule, next free order id
+        """
+        events = self.events(end=end)
+        kind = events["kind"].to_numpy()
+
+        # * Positions: signed sum of the fills
+        fills = events[kind == EventKind.FILL]
+        positions = (
+            (fills["direction"] * fills["quantity"]).groupby(fills["symbol"]).sum()
+        )
+
+        # * Open orders: quantity left after the fills, unless cancelled
+        orders = events[kind == EventKind.ORDER].set_index("order_id")
+        filled = fills.groupby("order_id")["quantity"].sum()
+        cancelled = events.loc[kind == EventKind.CANCEL, "order_id"]
+        orders = orders.assign(
+            filled=filled.reindex(orders.index, fill_value=0.0).to_numpy()
+        )
+        orders["remaining"] = orders["quantity"] - orders["filled"]
+        is_open = (orders["remaining"] > 0) & ~orders.index.isin(cancelled)
+        open_orders = orders.loc[is_open, _ORDER_COLUMNS]
+
+        # * Last signal of every symbol and rule, in append order
+        signals = events[kind == EventKind.SIGNAL].sort_values("seq")
+        last_signals = signals.groupby(["symbol", "rule"], sort=True).last()[
+            ["time", "direction", "score", "seq"]
+        ]
+
+        order_ids = events.loc[kind != EventKind.SIGNAL, "order_id"]
+        return JournalState(
+            positions,
+            open_orders,
+            last_signals,
+            int(order_ids.max()) + 1 if len(order_ids) else 0,
+            int(events["seq"].max()) if len(events) else -1,
+        )
+
+    # * Maintenance
+
+    def compact(self) -> None:
+        """
+        Merge every segment into a single one sorted by time
+        """
+        segments = self._manifest["segments"]
+        if len(segments) <= 1:
+            return
+
+        table = pa.concat_tables(
+            [self._read_segment(segment["file"]) for segment in segments]
+        )
+        table = self._sort_by_time(table.unify_dictionaries())
+        segment = self._write_segment(table.combine_chunks())
+
+        self._manifest["segments"] = [segment]
+        self._write_manifest()
+        for old_segment in segments:
+            os.remove(os.path.join(self.root, old_segment["file"]))
+
+    def _write(self, columns: Dict[str, Sequence]) -> None:
+        table = self._to_table(columns, self._manifest["next_seq"])
+        if table.num_rows == 0:
+            return
+
+        segment = self._write_segment(self._sort_by_time(table))
+        self._manifest["segments"].append(segment)
+        self._manifest["next_seq"] += table.num_rows
+        self._write_manifest()
+
+        if len(self._manifest["segments"]) > self.max_segments:
+            self.compact()
+
+    @staticmethod
+    def _to_table(columns: Dict[str, Sequence], first_seq: int) -> pa.Table:
+        # * Times in UTC, naive times taken as UTC
+        times = pd.to_datetime(pd.Index(columns["time"]), utc=True, cache=False)
+        times = times.tz_localize(None).as_unit("ns")
+        arrays = {
+            "seq": pa.array(np.arange(first_seq, first_seq + len(times))),
+            "time": pa.array(times.to_numpy()),
+            "symbol": pa.array(columns["symbol"], pa.string()).dictionary_encode(),
+            "kind": pa.array(np.asarray(columns["kind"], dtype=np.int8)),
+            "order_id": pa.array(np.asarray(columns["order_id"], dtype=np.int64)),
+            "rule": pa.array(columns["rule"], pa.string()).dictionary_encode(),
+            "direction": pa.array(np.asarray(columns["direction"], dtype=np.int8)),
+        }
+        for column in ("price", "quantity", "score"):
+            arrays[column] = pa.array(np.asarray(columns[column], dtype=np.float64))
+
+        return pa.table(arrays, schema=SCHEMA)
+
+    @staticmethod
+    def _sort_by_time(table: pa.Table) -> pa.Table:
+        order = np.lexsort(
+            (table.column("seq").to_numpy(), table.column("time").to_numpy())
+        )
+        return table.take(order)
+
+    @staticmethod
+    def _select(table: pa.Table, start, end, symbols, kinds) -> pa.Table:
+        """
+        Rows of a time sorted block in the range, symbols and kinds
+        """
+        times = table.column("time").to_numpy().view(np.int64)
+        first = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        last = len(times) if end is None else int(np.searchsorted(times, end, "left"))
+        table = table.slice(first, max(last - first, 0))
+
+        mask = np.ones(table.num_rows, dtype=bool)
+        if symbols is not None and table.num_rows > 0:
+            # * Compare the dictionary codes, not the strings
+            symbol = table.column("symbol").combine_chunks()
+            codes = np.flatnonzero(np.isin(symbol.dictionary.to_numpy(False), symbols))
+            mask &= np.isin(symbol.indices.to_numpy(False), codes)
+        if kinds is not None:
+            mask &= np.isin(
+                table.column("kind").to_numpy(), [int(kind) for kind in kinds]
+            )
+
+        return table if mask.all() else table.filter(pa.array(mask))
+
+    def _write_segment(self, table: pa.Table) -> dict:
+        os.makedirs(self.root, exist_ok=True)
+        file = f"events-{uuid.uuid4().hex}.arrow"
+        with pa.OSFile(os.path.join(self.root, file), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        times = table.column("time").to_numpy().view(np.int64)
+        symbol = table.column("symbol").combine_chunks()
+        used = np.unique(symbol.indices.to_numpy(False))
+        return dict(
+            file=file,
+            n_events=table.num_rows,
+            start=int(times.min()),
+            end=int(times.max()),
+            symbols=sorted(symbol.dictionary.take(used).to_pylist()),
+        )
+
+    def _read_segment(self, file: str) -> pa.Table:
+        source = pa.memory_map(os.path.join(self.root, file))
+        return pa.ipc.open_file(source).read_all()
+
+    def _read_manifest(self) -> dict:
+        manifest_path = os.path.join(self.root, _MANIFEST)
+        if not os.path.exists(manifest_path):
+            return dict(segments=[], next_seq=0)
+
+        with open(manifest_path) as file:
+            return json.load(file)
+
+    def _write_manifest(self) -> None:
+        manifest_path = os.path.join(self.root, _MANIFEST)
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(self._manifest, file)
+        os.replace(manifest_path + ".tmp", manifest_path)
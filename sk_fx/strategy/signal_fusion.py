@@ -0,0 +1,540 @@
+"""
+Signal fusion of the SK-FX setup
+
+Entry rules combine trend state, Fibonacci confluence and oscillator
+confirmation. Features turn bars into arrays, conditions are comparisons of
+features combined with `&`, `|` and `~`, and a rule scores the bars where its
+condition holds. The same rules are evaluated either over whole bar arrays
+(`SignalFusion.scores` / `SignalFusion.rank`) or bar by bar
+(`SignalFusion.stream`), the features carrying their kernel states between
+bars.
+"""
+
+import copy
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.data.instruments import INSTRUMENTS, InstrumentRegistry, Symbols
+from sk_fx.data.ring_buffer import OHLCV_FIELDS
+from sk_fx.indicators.candle_patterns import CandlePattern, candle_patterns
+from sk_fx.tools.fib_retracement import FibRetracement
+from sk_fx.utils import kernels
+
+
+def _sub_state(state: dict, key: str) -> dict:
+    return None if state is None else state.setdefault(key, {})
+
+
+class Feature:
+    """
+    Base class of the values the conditions are built from
+    """
+
+    def compute(self, fields: Mapping[str, np.ndarray], state: dict = None):
+        """
+        Compute the feature over the bars of the fields
+
+        Parameters
+        ----------
+        fields : Mapping[str, np.ndarray]
+            OHLCV arrays, bars along the last axis
+        state : dict, optional
+            State carried between consecutive blocks of bars, by default None
+
+        Returns
+        -------
+        np.ndarray
+            One float per bar, NaN while the feature warms up
+
+        Raises
+        ------
+        Exception
+            When the function is not implemented in the derived class
+        """
+        raise Exception("Not implemented")
+
+    def _compare(self, other, ufunc: np.ufunc) -> "Condition":
+        return Compare(self, ufunc, other)
+
+    def __gt__(self, other) -> "Condition":
+        return self._compare(other, np.greater)
+
+    def __ge__(self, other) -> "Condition":
+        return self._compare(other, np.greater_equal)
+
+    def __lt__(self, other) -> "Condition":
+        return self._compare(other, np.less)
+
+    def __le__(self, other) -> "Condition":
+        return self._compare(other, np.less_equal)
+
+
+class Field(Feature):
+    """
+    Raw OHLCV field, e.g. `Field("close")`
+    """
+
+    def __init__(self, field: str = "close") -> None:
+        self.field = field
+
+    def compute(self, fields: Mapping[str, np.ndarray], state: dict = None):
+        return np.asarray(fields[self.field], dtype=np.float64)
+
+
+class Indicator(Feature):
+    """
+    Output of an indicator such as a `DivergenceOscillator` or `TrendIndicator`
+
+    Parameters
+    ----------
+    indicator
+        Any object with an `ohlcv` attribute and a `calculate(state=...)` method
+    output : int, optional
+        Line of a multi output indicator, e.g. 1 for the MACD signal line
+    options
+        Keyword arguments of `calculate`, e.g. `average_demarker=True`
+    """
+
+    def __init__(self, indicator, output: int = None, **options) -> None:
+        self.indicator = indicator
+        self.output = output
+        self.options = options
+
+    def compute(self, fields: Mapping[str, np.ndarray], state: dict = None):
+        indicator = copy.copy(self.indicator)
+        indicator.ohlcv = fields
+        values = indicator.calculate(state=state, **self.options)
+
+        return values if self.output is None else values[self.output]
+
+
+class FibConfluence(Feature):
+    """
+    Proximity of the close to the nearest Fibonacci retracement level of the
+    swing spanned by the last `lookback` bars
+
+    1 on a level, decreasing linearly to 0 at `tolerance` away. The tolerance
+    is in price, or in pips of `symbols` (one per panel row) looked up in the
+    instrument registry.
+    """
+
+    def __init__(
+        self,
+        lookback: int = 50,
+        tolerance: float = 0.001,
+        is_increase: bool = True,
+        fib: FibRetracement = None,
+        symbols: Symbols = None,
+        instruments: InstrumentRegistry = INSTRUMENTS,
+    ) -> None:
+        self.lookback = lookback
+        self.tolerance = tolerance
+        self.is_increase = is_increase
+        self.fib = FibRetracement() if fib is None else fib
+        self.symbols = symbols
+        self.instruments = instruments
+
+    def compute(self, fields: Mapping[str, np.ndarray], state: dict = None):
+        high = kernels.rolling_max(
+            np.asarray(fields["high"], dtype=np.float64),
+            self.lookback,
+            state=_sub_state(state, "swing_high"),
+        )
+        low = kernels.rolling_min(
+            np.asarray(fields["low"], dtype=np.float64),
+            self.lookback,
+            state=_sub_state(state, "swing_low"),
+        )
+        levels = self.fib.fib_level_prices(low, high, is_increase=self.is_increase)
+        close = np.asarray(fields["close"], dtype=np.float64)
+
+        distance = np.abs(levels - close[..., None]).min(axis=-1)
+        if self.symbols is not None:
+            distance = self.instruments.to_pips(self.symbols, distance)
+
+        return np.clip(1 - distance / self.tolerance, 0, 1)
+
+
+class Divergence(Feature):
+    """
+    Divergence between the close and an oscillator over `lookback` bars
+
+    Bullish (1) when the close makes a new `lookback` low while the
+    oscillator stays above its own low, bearish when mirrored on the highs.
+    """
+
+    def __init__(self, oscillator: Feature, lookback: int = 14, bullish: bool = True):
+        self.oscillator = oscillator
+        self.lookback = lookback
+        self.bullish = bullish
+
+    def compute(self, fields: Mapping[str, np.ndarray], state: dict = None):
+        close = np.asarray(fields["close"], dtype=np.float64)
+        oscillator = np.asarray(
+            self.oscillator.compute(fields, _sub_state(state, "oscillator")),
+            dtype=np.float64,
+        )
+        extreme = kernels.rolling_min if self.bullish else kernels.rolling_max
+        close_extreme = extreme(
+            close, self.lookback, state=_sub_state(state, "close_extreme")
+        )
+        oscillator_extreme = extreme(
+            oscillator, self.lookback, state=_sub_state(state, "oscillator_extreme")
+        )
+
+        if self.bullish:
+            divergence = (close <= close_extreme) & (oscillator > oscillator_extreme)
+        else:
+            divergence = (close >= close_extreme) & (oscillator < oscillator_extreme)
+
+        return divergence.astype(np.float64)
+
+
+class CandlePatterns(Feature):
+    """
+    1 on the bars showing any of `patterns`, e.g.
+    `(CandlePatterns(CandlePattern.bullish()) > 0) & (FibConfluence() > 0.5)` for
+    bullish candles at a Fibonacci level
+
+    Parameters
+    ----------
+    patterns : CandlePattern
+        Patterns to look for
+    options
+        Keyword arguments of `candle_patterns`, e.g. `pin_wick=0.66`
+    """
+
+    def __init__(self, patterns: CandlePattern, **options) -> None:
+        self.patterns = patterns
+        self.options = options
+
+    def compute(self, fields: Mapping[str, np.ndarray], state: dict = None):
+        mask = candle_patterns(
+            fields["open"],
+            fields["high"],
+            fields["low"],
+            fields["close"],
+            state=state,
+            **self.options,
+        )
+
+        return ((mask & np.uint16(self.patterns)) != 0).astype(np.float64)
+
+
+class Condition:
+    """
+    Boolean expression over features, combined with `&`, `|` and `~`
+    """
+
+    def features(self) -> Iterator[Feature]:
+        raise Exception("Not implemented")
+
+    def evaluate(self, values: Dict[int, np.ndarray]) -> np.ndarray:
+        """
+        Evaluate the condition from the computed features
+
+        Parameters
+        ----------
+        values : Dict[int, np.ndarray]
+            Feature values keyed by `id(feature)`
+
+        Returns
+        -------
+        np.ndarray
+            Boolean per bar, False while a feature warms up
+        """
+        raise Exception("Not implemented")
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return Combine(np.logical_and, self, other)
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return Combine(np.logical_or, self, other)
+
+    def __invert__(self) -> "Condition":
+        return Not(self)
+
+
+class Compare(Condition):
+    def __init__(
+        self, left: Feature, ufunc: np.ufunc, right: Union[Feature, float]
+    ) -> None:
+        self.left = left
+        self.ufunc = ufunc
+        self.right = right
+
+    def features(self) -> Iterator[Feature]:
+        yield self.left
+        if isinstance(self.right, Feature):
+            yield self.right
+
+    def evaluate(self, values: Dict[int, np.ndarray]) -> np.ndarray:
+        right = (
+            values[id(self.right)] if isinstance(self.right, Feature) else self.right
+        )
+
+        # * Comparisons with NaN are False, so warming features never trigger
+        return self.ufunc(values[id(self.left)], right)
+
+
+class Combine(Condition):
+    def __init__(self, ufunc: np.ufunc, *conditions: Condition) -> None:
+        self.ufunc = ufunc
+        self.conditions = conditions
+
+    def features(self) -> Iterator[Feature]:
+        for condition in self.conditions:
+            yield from condition.features()
+
+    def evaluate(self, values: Dict[int, np.ndarray]) -> np.ndarray:
+        return self.ufunc.reduce([c.evaluate(values) for c in self.conditions])
+
+
+class Not(Condition):
+    def __init__(self, condition: Condition) -> None:
+        self.condition = condition
+
+    def features(self) -> Iterator[Feature]:
+        return self.condition.features()
+
+    def evaluate(self, values: Dict[int, np.ndarray]) -> np.ndarray:
+        return ~self.condition.evaluate(values)
+
+
+class Rule:
+    """
+    Entry rule: a required condition and a weighted score of the entry
+
+    Parameters
+    ----------
+    name : str
+        Name of the rule
+    direction : int
+        1 for long entries, -1 for short entries
+    condition : Condition
+        Bars where the rule triggers
+    weights : Dict[Union[Condition, Feature], float], optional
+        Score terms; a condition counts 1 when true, a feature (e.g. a
+        `FibConfluence` proximity) counts its value. By default every
+        triggered bar scores 1
+    """
+
+    def __init__(
+        self,
+        name: str,
+        direction: int,
+        condition: Condition,
+        weights: Dict[Union[Condition, Feature], float] = None,
+    ) -> None:
+        self.name = name
+        self.direction = direction
+        self.condition = condition
+        self.weights = {} if weights is None else weights
+
+    def features(self) -> Iterator[Feature]:
+        yield from self.condition.features()
+        for term in self.weights:
+            if isinstance(term, Feature):
+                yield term
+            else:
+                yield from term.features()
+
+    def score(self, values: Dict[int, np.ndarray]) -> np.ndarray:
+        """
+        Score of every bar, NaN where the rule does not trigger
+        """
+        triggered = self.condition.evaluate(values)
+        score = np.ones(triggered.shape) if not self.weights else 0.0
+        for term, weight in self.weights.items():
+            value = (
+                np.nan_to_num(values[id(term)])
+                if isinstance(term, Feature)
+                else term.evaluate(values)
+            )
+            score = score + weight * value
+
+        return np.where(triggered, score, np.nan)
+
+
+class Signal(NamedTuple):
+    time: object
+    rule: str
+    direction: int
+    score: float
+    rank: int
+
+
+class SignalFusion:
+    """
+    Rank the entries of several rules evaluated on the same bars
+
+    Examples
+    --------
+    >>> trend = Indicator(TrendIndicator())
+    >>> rsi = Indicator(RSIOscillator(period=14))
+    >>> fib = FibConfluence(lookback=50, tolerance=0.0015)
+    >>> long_entry = Rule(
+    ...     "long", 1, (trend > 0) & (fib > 0) & (rsi < 40), {fib: 1.0, rsi < 30: 0.5}
+    ... )
+    >>> SignalFusion([long_entry]).rank(ohlcv)
+    """
+
+    rules: List[Rule]
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = list(rules)
+
+        # * Compute each feature once whatever the number of rules using it
+        features = {}
+        for rule in self.rules:
+            for feature in rule.features():
+                features.setdefault(id(feature), feature)
+        self._features = list(features.values())
+
+    def _values(
+        self, fields: Mapping[str, np.ndarray], states: List[dict] = None
+    ) -> Dict[int, np.ndarray]:
+        return {
+            id(feature): feature.compute(fields, None if states is None else states[i])
+            for i, feature in enumerate(self._features)
+        }
+
+    @staticmethod
+    def _fields(ohlcv) -> Dict[str, np.ndarray]:
+        return {
+            field: np.asarray(ohlcv[field], dtype=np.float64)
+            for field in OHLCV_FIELDS
+            if field in ohlcv
+        }
+
+    def scores(self, ohlcv) -> np.ndarray:
+        """
+        Score of every rule on every bar
+
+        Parameters
+        ----------
+        ohlcv : pd.DataFrame | Mapping[str, np.ndarray]
+            The bars, a field array may also be a (n_symbols, n_bars) panel
+
+        Returns
+        -------
+        np.ndarray
+            Scores of shape (n_rules, ...bars), NaN where a rule does not trigger
+        """
+        values = self._values(self._fields(ohlcv))
+
+        return np.stack([rule.score(values) for rule in self.rules])
+
+    def rank(self, ohlcv) -> pd.DataFrame:
+        """
+        Entry signals ranked by score within each bar
+
+        Parameters
+        ----------
+        ohlcv : pd.DataFrame | Mapping[str, np.ndarray]
+            The bars of one symbol; the data frame index (or a 'time' field)
+            gives the signal times, the bar positions otherwise
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns time, rule, direction, score, rank (1 is the best entry
+            of its bar), sorted by time then rank
+        """
+        scores = self.scores(ohlcv)
+        if isinstance(ohlcv, pd.DataFrame):
+            times = ohlcv.index.values
+        elif "time" in ohlcv:
+            times = np.asarray(ohlcv["time"])
+        else:
+            times = np.arange(scores.shape[-1])
+
+        rule_index, bar_index = np.nonzero(~np.isnan(scores))
+        score = scores[rule_index, bar_index]
+        order = np.lexsort((-score, bar_index))
+        rule_index, bar_index, score = (
+            rule_index[order],
+            bar_index[order],
+            score[order],
+        )
+
+        # * Rank within a bar: position minus the position of the bar's first signal
+        first = np.r_[True, bar_index[1:] != bar_index[:-1]]
+        starts = np.maximum.accumulate(np.where(first, np.arange(len(first)), 0))
+
+        return pd.DataFrame(
+            {
+                "time": times[bar_index],
+                "rule": np.array([rule.name for rule in self.rules])[rule_index],
+                "direction": np.array([rule.direction for rule in self.rules])[
+                    rule_index
+                ],
+                "score": score,
+                "rank": np.arange(len(first)) - starts + 1,
+            }
+        )
+
+    def stream(self, states: List[dict] = None) -> "StreamingFusion":
+        """
+        Per bar evaluation of the rules, see `StreamingFusion`
+        """
+        return StreamingFusion(self, states)
+
+
+class StreamingFusion:
+    """
+    Evaluate the rules of a `SignalFusion` one closed bar at a time
+
+    Every feature keeps its kernel states, so a bar costs O(1) per feature and
+    the signals equal those of `SignalFusion.rank` on the whole history.
+    The states can be snapshotted (`sk_fx.data.snapshot`) and passed back to
+    resume the stream without replaying the history.
+    """
+
+    def __init__(self, fusion: SignalFusion, states: List[dict] = None) -> None:
+        self.fusion = fusion
+        self._states = [{} for _ in fusion._features] if states is None else states
+
+    @property
+    def states(self) -> List[dict]:
+        """
+        Kernel states of the features, one dict per feature
+        """
+        return self._states
+
+    def update(
+        self,
+        time,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = 0.0,
+    ) -> List[Signal]:
+        """
+        Evaluate the rules on a closed bar
+
+        Returns
+        -------
+        List[Signal]
+            The triggered entries, best score first
+        """
+        fields = {
+            field: np.array([value], dtype=np.float64)
+            for field, value in zip(OHLCV_FIELDS, (open, high, low, close, volume))
+        }
+        values = self.fusion._values(fields, self._states)
+
+        signals = [
+            (float(score[0]), rule)
+            for rule in self.fusion.rules
+            if not np.isnan(score := rule.score(values))[0]
+        ]
+        signals.sort(key=lambda signal: -signal[0])
+
+        return [
+            Signal(time, rule.name, rule.direction, score, rank)
+            for rank, (score, rule) in enumerate(signals, start=1)
+        ]
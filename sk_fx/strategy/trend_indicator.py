@@ -1,5 +1,88 @@
-from typing import Dict
+import numpy as np
+import pandas as pd
+
+from sk_fx.indicators.idtypes import TimeFrame
+from sk_fx.utils import kernels
+from sk_fx.utils.indicators import TA
 
 
 class TrendIndicator:
-    stock_market: str = "AAPL"
+    """
+    Trend state of the SK-FX setup from a fast and a slow `TA.ma` line
+
+        - 1 (uptrend) when close > fast MA > slow MA
+        - -1 (downtrend) when close < fast MA < slow MA
+        - 0 otherwise
+    """
+
+    name: str = "Trend Indicator"
+    time_frame: TimeFrame = TimeFrame.D1
+    ohlcv: pd.DataFrame
+    fast_length: int = 9
+    slow_length: int = 21
+
+    def __init__(
+        self,
+        name: str = None,
+        time_frame: TimeFrame = TimeFrame.D1,
+        ohlcv: pd.DataFrame = None,
+        fast_length: int = 9,
+        slow_length: int = 21,
+    ) -> None:
+        if name is not None:
+            self.name = name
+        self.time_frame = time_frame
+        self.ohlcv = ohlcv
+        self.fast_length = fast_length
+        self.slow_length = slow_length
+
+    @staticmethod
+    def _trend_state(close, fast_ma, slow_ma):
+        up = (close > fast_ma) & (fast_ma > slow_ma)
+        down = (close < fast_ma) & (fast_ma < slow_ma)
+
+        return up.astype(np.float64) - down.astype(np.float64)
+
+    def calculate(self, state: dict = None):
+        """
+        Calculation of the trend state
+
+        A data frame source goes through `TA.ma`, whose first bars average
+        the available history. A mapping of NumPy arrays (or a `state` dict
+        for block by block / per bar updates) uses full MA windows instead,
+        leaving the state NaN until the slow MA is warm; both agree afterwards.
+
+        Parameters
+        ----------
+        state : dict, optional
+            State carried between consecutive blocks, by default None
+
+        Returns
+        -------
+        pd.Series | np.ndarray
+            The trend state of each bar
+        """
+        close = self.ohlcv["close"]
+        if state is None and isinstance(close, pd.Series):
+            return self._trend_state(
+                close,
+                TA.ma(self.ohlcv, length=self.fast_length),
+                TA.ma(self.ohlcv, length=self.slow_length),
+            )
+
+        close = np.asarray(close, dtype=np.float64)
+        fast_ma = kernels.rolling_mean(
+            close,
+            self.fast_length,
+            state=None if state is None else state.setdefault("fast_ma", {}),
+        )
+        slow_ma = kernels.rolling_mean(
+            close,
+            self.slow_length,
+            state=None if state is None else state.setdefault("slow_ma", {}),
+        )
+
+        trend = self._trend_state(close, fast_ma, slow_ma)
+        trend[np.isnan(slow_ma)] = np.nan
+
+        return trend
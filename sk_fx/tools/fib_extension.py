@@ -40,6 +40,41 @@ class FibExtension:
 
         return dict(zip(self.__levels, fib_prices))
 
+    def fib_level_prices(
+        self,
+        start_price: np.ndarray,
+        low_price: np.ndarray,
+        high_price: np.ndarray,
+        is_increase: bool = True,
+    ) -> np.ndarray:
+        """
+        Vectorized `fib_level_price` over arrays of swings
+
+        Parameters
+        ----------
+        start_price : np.ndarray
+            Prices the extensions are projected from
+        low_price : np.ndarray
+            Low prices of the swings, same shape as `start_price`
+        high_price : np.ndarray
+            High prices of the swings, same shape as `start_price`
+        is_increase : bool, optional
+            Whether the swings are increasing, by default True
+
+        Returns
+        -------
+        np.ndarray
+            Prices of shape `start_price.shape + (n_levels,)`
+        """
+        start_price = np.asarray(start_price, dtype=np.float64)[..., None]
+        low_price = np.asarray(low_price, dtype=np.float64)[..., None]
+        high_price = np.asarray(high_price, dtype=np.float64)[..., None]
+
+        if is_increase:
+            return low_price + np.abs(high_price - start_price) * self.__levels
+
+        return high_price - np.abs(start_price - low_price) * self.__levels
+
 
 if __name__ == "__main__":
     fib_test = FibExtension()
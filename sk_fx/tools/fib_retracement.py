@@ -33,6 +33,36 @@ class FibRetracement:
 
         return dict(zip(self.__levels, fib_prices))
 
+    def fib_level_prices(
+        self, low_price: np.ndarray, high_price: np.ndarray, is_increase: bool = True
+    ) -> np.ndarray:
+        """
+        Vectorized `fib_level_price` over arrays of swing lows and highs
+
+        Parameters
+        ----------
+        low_price : np.ndarray
+            Low prices of the swings
+        high_price : np.ndarray
+            High prices of the swings, same shape as `low_price`
+        is_increase : bool, optional
+            Whether the swings are increasing, by default True
+
+        Returns
+        -------
+        np.ndarray
+            Prices of shape `low_price.shape + (n_levels,)`
+        """
+        low_price = np.asarray(low_price, dtype=np.float64)[..., None]
+        high_price = np.asarray(high_price, dtype=np.float64)[..., None]
+        price_diff = np.abs(high_price - low_price)
+
+        return (
+            low_price + price_diff * self.__levels
+            if is_increase
+            else high_price - price_diff * self.__levels
+        )
+
 
 if __name__ == "__main__":
     fib_test = FibRetracement()
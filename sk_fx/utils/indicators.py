@@ -1,7 +1,23 @@
+from typing import Sequence, Union
+
+import numpy as np
 import pandas as pd
 
+from sk_fx.utils import kernels
+
+Lengths = Union[int, Sequence[int]]
+
 
 class TA:
+    """
+    Technical analysis helpers
+
+    The moving averages accept a single length or a list of lengths. A single
+    length on a data frame returns a `pd.Series` aligned with the data; a list
+    of lengths (or array sources) returns a NumPy array of shape
+    `(n_lengths, n_bars)` computed in one pass with `sk_fx.utils.kernels`.
+    """
+
     @staticmethod
     def ma(data: pd.DataFrame, length: int = 9, source: str = "close") -> pd.Series:
         """
@@ -10,7 +26,8 @@ class TA:
         Parameters
         ----------
         data : pd.DataFrame
-            Input market data prices
+            Input market data prices, or any `ohlcv` source indexed by field
+            name such as `OHLCVRingBuffer`
         length : int, optional
             MA length, by default 9
         source : str, optional
@@ -21,9 +38,126 @@ class TA:
         pd.Series
             The series of the ma line
         """
-        return (
-            data[source]
-            .rolling(window=length, min_periods=1)
-            .mean()
-            .fillna(method="backfill")
-        )
+        return data[source].rolling(window=length, min_periods=1).mean().bfill()
+
+    @staticmethod
+    def _moving_average(kernel, data, length: Lengths, source: str):
+        values = data[source]
+        result = kernel(np.asarray(values, dtype=np.float64), length)
+        if np.ndim(length) == 0 and isinstance(values, pd.Series):
+            return pd.Series(result, index=values.index, name=values.name)
+
+        return result
+
+    @staticmethod
+    def sma(
+        data: pd.DataFrame, length: Lengths = 9, source: str = "close"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Simple moving average, NaN until the window is full
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Input market data prices, or any `ohlcv` source indexed by field name
+        length : Lengths, optional
+            MA length or list of lengths, by default 9
+        source : str, optional
+            The source for MA, by default 'close'
+
+        Returns
+        -------
+        Union[pd.Series, np.ndarray]
+            The series of the MA line, or an array of one line per length
+        """
+        return TA._moving_average(kernels.sma, data, length, source)
+
+    @staticmethod
+    def ema(
+        data: pd.DataFrame, length: Lengths = 9, source: str = "close"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Exponential moving average with span `length`, see `TA.sma`
+        """
+        return TA._moving_average(kernels.emas, data, length, source)
+
+    @staticmethod
+    def wma(
+        data: pd.DataFrame, length: Lengths = 9, source: str = "close"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Linearly weighted moving average, see `TA.sma`
+        """
+        return TA._moving_average(kernels.wma, data, length, source)
+
+    @staticmethod
+    def hma(
+        data: pd.DataFrame, length: Lengths = 9, source: str = "close"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Hull moving average, see `TA.sma`
+        """
+        return TA._moving_average(kernels.hma, data, length, source)
+
+    @staticmethod
+    def dema(
+        data: pd.DataFrame, length: Lengths = 9, source: str = "close"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Double exponential moving average, see `TA.sma`
+        """
+        return TA._moving_average(kernels.dema, data, length, source)
+
+    @staticmethod
+    def tema(
+        data: pd.DataFrame, length: Lengths = 9, source: str = "close"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Triple exponential moving average, see `TA.sma`
+        """
+        return TA._moving_average(kernels.tema, data, length, source)
+
+    @staticmethod
+    def vwap(
+        data: pd.DataFrame, length: Lengths = None, anchor: str = "D"
+    ) -> Union[pd.Series, np.ndarray]:
+        """
+        Volume weighted average of the typical price `(high + low + close) / 3`
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Input market data prices indexed by time, or any `ohlcv` source
+            with a 'time' field
+        length : Lengths, optional
+            Rolling window length(s), by default None for a VWAP anchored
+            to the start of each session
+        anchor : str, optional
+            Session of the anchored VWAP as a NumPy datetime unit, by default
+            'D' (daily)
+
+        Returns
+        -------
+        Union[pd.Series, np.ndarray]
+            The series of the VWAP line, or an array of one line per length
+        """
+        price = (
+            np.asarray(data["high"], dtype=np.float64)
+            + np.asarray(data["low"], dtype=np.float64)
+            + np.asarray(data["close"], dtype=np.float64)
+        ) / 3
+        volume = np.asarray(data["volume"], dtype=np.float64)
+
+        if length is None:
+            time = data.index if isinstance(data, pd.DataFrame) else data["time"]
+            session = np.asarray(time, dtype="datetime64[ns]").astype(
+                f"datetime64[{anchor}]"
+            )
+            result = kernels.anchored_vwap(price, volume, session)
+        else:
+            result = kernels.vwap(price, volume, length)
+
+        if np.ndim(length) == 0 and isinstance(data["close"], pd.Series):
+            return pd.Series(result, index=data["close"].index, name="vwap")
+
+        return result
@@ -0,0 +1,1089 @@
+"""
+NumPy kernels shared by the indicators
+
+Every kernel works along the last axis, on a single series of shape
+`(n_bars,)` or on a panel of shape `(n_symbols, n_bars)`. Kernels never build
+pandas objects and accept an optional preallocated `out` array (any float
+dtype). Recursive filters are evaluated block by block in closed form so that
+no Python loop runs per element or per symbol.
+
+Kernels taking a `state` dict continue a previous call on the next block of
+the same history and update the dict in place.
+
+Kernels taking a `valid` mask skip the other bars (see `GapPolicy.SKIP`): the
+result equals the kernel over the valid bars alone, and skipped bars output
+NaN. Their state only holds valid bars, so it must not be mixed with the state
+of calls without mask.
+
+The moving averages (`sma`, `wma`, `hma`, `emas`, `dema`, `tema`, `vwap`)
+take one window length or a sequence of lengths, returning one line per
+length stacked along a new leading axis.
+"""
+
+from typing import Tuple, Union
+
+import numpy as np
+
+
+def prepare_out(
+    out: np.ndarray, shape: Union[int, Tuple[int, ...]], dtype=np.float64
+) -> np.ndarray:
+    """
+    Allocate the output array or check the given one
+
+    Parameters
+    ----------
+    out : np.ndarray
+        Preallocated output array, or None to allocate a new one
+    shape : Union[int, Tuple[int, ...]]
+        Expected shape
+    dtype : optional
+        Dtype of the allocated array, by default float64
+
+    Returns
+    -------
+    np.ndarray
+        The array to write the results into
+    """
+    shape = (shape,) if isinstance(shape, int) else tuple(shape)
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+
+    if out.shape != shape:
+        raise ValueError(f"Output array must have shape {shape}, got {out.shape}")
+
+    return out
+
+
+class Scratch:
+    """
+    Work arrays reused across calculations, for workers computing many
+    histories one after another without reallocating their temporaries
+
+    A buffer keeps the largest size requested under its name; the returned
+    arrays are views of it, valid until the next request of the same name.
+    Not thread-safe: use one instance per worker thread.
+
+    Example
+    -------
+    >>> scratch = Scratch()
+    >>> for ohlcv in histories:
+    ...     DeMarkerOscillator(ohlcv=ohlcv).calculate(out=out, scratch=scratch)
+    """
+
+    def __init__(self) -> None:
+        self._buffers = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def get(
+        self, name: str, shape: Union[int, Tuple[int, ...]], dtype=np.float64
+    ) -> np.ndarray:
+        """
+        Uninitialized work array of the given shape and dtype
+        """
+        shape = (shape,) if np.ndim(shape) == 0 else tuple(shape)
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape, dtype=np.int64))
+
+        buffer = self._buffers.get((name, dtype))
+        if buffer is None or buffer.size < size:
+            buffer = self._buffers[(name, dtype)] = np.empty(size, dtype=dtype)
+
+        return buffer[:size].reshape(shape)
+
+
+def _state_value(values: np.ndarray):
+    """
+    Copy of a per series value, a float for a single series
+    """
+    values = np.array(values, dtype=np.float64)
+    return values.item() if values.ndim == 0 else values
+
+
+def _block_size(decay: float) -> int:
+    # Keep decay ** -block below 1e100, far from the float64 overflow
+    return max(1, int(230 / -np.log(decay)))
+
+
+def recursive_filter(
+    x: np.ndarray,
+    alpha: float,
+    initial,
+    out: np.ndarray = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    First order recursive filter `y[t] = alpha * x[t] + (1 - alpha) * y[t - 1]`
+
+    Inside each block the recursion is solved in closed form,
+    `y[t] = d ** c[t] * (y[-1] + alpha * cumsum(x[j] * d ** -c[j]))` with
+    `d = 1 - alpha` and `c` the running count of filtered inputs. Without a
+    `valid` mask NaN inputs propagate to every later output, with it the
+    masked inputs are skipped and output the previous value.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Input values
+    alpha : float
+        Smoothing factor in (0, 1]
+    initial : float or np.ndarray
+        Filter value before the first input `y[-1]`, one per series
+    out : np.ndarray, optional
+        Preallocated output array
+    valid : np.ndarray, optional
+        Mask of the inputs to filter, by default every input
+
+    Returns
+    -------
+    np.ndarray
+        The filtered values
+    """
+    out = prepare_out(out, x.shape)
+    n_bars = x.shape[-1]
+    state = np.asarray(initial, dtype=np.float64)
+
+    decay = 1.0 - alpha
+    if decay <= 0:
+        if valid is None:
+            out[...] = x
+            return out
+        # Plain forward fill of the valid inputs
+        last = np.where(valid, np.arange(n_bars), -1)
+        np.maximum.accumulate(last, axis=-1, out=last)
+        filled = np.take_along_axis(x, np.maximum(last, 0), axis=-1)
+        out[...] = np.where(last < 0, state[..., None], filled)
+        return out
+
+    block = min(_block_size(decay), max(n_bars, 1))
+    powers = decay ** np.arange(block + 1, dtype=np.float64)
+    inv_powers = 1.0 / powers
+
+    for start in range(0, n_bars, block):
+        values = x[..., start : start + block]
+        size = values.shape[-1]
+
+        if valid is None:
+            filtered = np.cumsum(values * inv_powers[1 : size + 1], axis=-1)
+            scale = powers[1 : size + 1]
+        else:
+            block_valid = valid[..., start : start + block]
+            block_counts = np.cumsum(block_valid, axis=-1)
+            filtered = np.where(block_valid, values, 0.0) * inv_powers[block_counts]
+            np.cumsum(filtered, axis=-1, out=filtered)
+            scale = powers[block_counts]
+
+        filtered *= alpha
+        filtered += state[..., None]
+        filtered *= scale
+
+        out[..., start : start + size] = filtered
+        state = filtered[..., -1]
+
+    return out
+
+
+def ema(
+    x: np.ndarray,
+    span: float = None,
+    alpha: float = None,
+    min_periods: int = 0,
+    out: np.ndarray = None,
+    state: dict = None,
+) -> np.ndarray:
+    """
+    Exponential moving average, same as
+    `pd.Series.ewm(span, adjust=False, ignore_na=True, min_periods).mean()`
+
+    NaN inputs are skipped and output the previous average. Like pandas,
+    infinite inputs are skipped too.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Input values
+    span : float, optional
+        EMA span, `alpha = 2 / (span + 1)`
+    alpha : float, optional
+        Smoothing factor, used when `span` is not given
+    min_periods : int, optional
+        Minimum number of valid values before outputting, by default 0
+    out : np.ndarray, optional
+        Preallocated output array
+    state : dict, optional
+        Carried state (`value`, `count`) when `x` continues a previous call,
+        updated in place
+
+    Returns
+    -------
+    np.ndarray
+        The EMA values
+    """
+    if span is not None:
+        alpha = 2.0 / (span + 1.0)
+    state = {} if state is None else state
+    out = prepare_out(out, x.shape)
+    count = np.asarray(state.get("count", 0))
+    value = np.asarray(state.get("value", np.nan), dtype=np.float64)
+    min_count = max(min_periods, 1)
+
+    valid = np.isfinite(x)
+    all_valid = bool(valid.all())
+    if x.shape[-1] > 0:
+        # * Series without history start from their first valid input
+        first = np.take_along_axis(x, valid.argmax(axis=-1)[..., None], axis=-1)
+        initial = np.where(count > 0, value, first[..., 0])
+        recursive_filter(x, alpha, initial, out=out, valid=None if all_valid else valid)
+        value = out[..., -1].copy()
+
+    # * Not enough valid inputs yet
+    if all_valid and count.ndim == 0:
+        out[..., : max(min_count - int(count) - 1, 0)] = np.nan
+        n_valid = x.shape[-1]
+    elif min_count == 1:
+        # * Only the bars before the first valid input of a new series
+        n_valid = valid.sum(axis=-1)
+        before = np.logical_or.accumulate(valid, axis=-1)
+        before |= (count > 0)[..., None]
+        np.logical_not(before, out=before)
+        out[before] = np.nan
+    else:
+        seen = np.cumsum(valid, axis=-1)
+        seen += count[..., None]
+        out[seen < min_count] = np.nan
+        n_valid = valid.sum(axis=-1)
+
+    state["count"] = (count + n_valid).tolist()
+    state["value"] = _state_value(value)
+
+    return out
+
+
+def wilder(
+    x: np.ndarray,
+    period: int,
+    start: int = None,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Wilder smoothing seeded with a simple average
+
+    `y[start]` is the mean of the `period` values ending at `start`, then
+    `y[t] = (y[t - 1] * (period - 1) + x[t]) / period`. Earlier outputs are
+    NaN and NaN inputs propagate to every later output.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Input values
+    period : int
+        Smoothing period
+    start : int, optional
+        Position of the seed average, by default `period - 1`
+    out : np.ndarray, optional
+        Preallocated output array
+    state : dict, optional
+        Carried state (`seen`, `value`, `history`) when `x` continues a
+        previous call, updated in place
+    valid : np.ndarray, optional
+        Mask of the bars to smooth, `start` then counts valid bars only, by
+        default every bar
+
+    Returns
+    -------
+    np.ndarray
+        The smoothed values
+    """
+    start = period - 1 if start is None else start
+    state = {} if state is None else state
+    out = prepare_out(out, x.shape)
+    if valid is not None:
+        return _wilder_valid(x, period, start, out, state, valid)
+
+    n_bars = x.shape[-1]
+    seen = state.get("seen", 0)
+    state["seen"] = seen + n_bars
+
+    # * Already seeded, only the recursion is left
+    if seen > start:
+        if n_bars > 0:
+            recursive_filter(x, 1.0 / period, state["value"], out=out)
+            state["value"] = _state_value(out[..., -1])
+        return out
+
+    # * Seed position relative to this block
+    seed_at = start - seen
+    history = np.concatenate(
+        (state.get("history", np.empty(x.shape[:-1] + (0,))), x[..., : seed_at + 1]),
+        axis=-1,
+    )
+    if seed_at >= n_bars:
+        out[...] = np.nan
+        state["history"] = history[..., -period:]
+        return out
+
+    state.pop("history", None)
+    out[..., :seed_at] = np.nan
+    out[..., seed_at] = history[..., -period:].mean(axis=-1)
+    recursive_filter(
+        x[..., seed_at + 1 :],
+        1.0 / period,
+        out[..., seed_at],
+        out=out[..., seed_at + 1 :],
+    )
+    state["value"] = _state_value(out[..., -1])
+
+    return out
+
+
+def _wilder_valid(
+    x: np.ndarray,
+    period: int,
+    start: int,
+    out: np.ndarray,
+    state: dict,
+    valid: np.ndarray,
+) -> np.ndarray:
+    """
+    `wilder` over the valid bars, every series seeded at its own bar
+
+    The seed enters the recursion as an input equal to `seed * period` after
+    a zero value, so a single masked `recursive_filter` pass serves series
+    seeded before, inside or after the block.
+    """
+    seen = np.asarray(state.get("seen", 0))
+    # * Valid bar number of every bar in the whole history
+    number = np.cumsum(valid, axis=-1)
+    number += seen[..., None] - 1
+
+    with np.errstate(invalid="ignore"):
+        in_seed = valid & (number > start - period) & (number <= start)
+        seed_sum = np.asarray(state.get("seed_sum", 0.0)) + np.where(
+            in_seed, x, 0.0
+        ).sum(axis=-1)
+    smoothed = valid & (number >= start)
+    inputs = np.where(valid & (number == start), seed_sum[..., None], x)
+    initial = np.where(seen > start, np.asarray(state.get("value", 0.0)), 0.0)
+
+    recursive_filter(inputs, 1.0 / period, initial, out=out, valid=smoothed)
+    if x.shape[-1] > 0:
+        state["value"] = _state_value(out[..., -1])
+        state["seen"] = (number[..., -1] + 1).tolist()
+    state["seed_sum"] = _state_value(seed_sum)
+    out[~smoothed] = np.nan
+
+    return out
+
+
+def adaptive_average(
+    x: np.ndarray,
+    alpha: np.ndarray,
+    min_periods: int = 0,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Exponential average with a smoothing factor per bar,
+    `y[t] = alpha[t] * x[t] + (1 - alpha[t]) * y[t - 1]`, as in Kaufman's
+    adaptive moving average
+
+    Like `ema`, a series starts from its first input and bars with a NaN
+    input or smoothing factor output the previous average. The recursion is
+    solved in closed form over blocks short enough for the smallest decay.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Input values
+    alpha : np.ndarray
+        Smoothing factor of every bar in (0, 1), broadcast to `x`
+    min_periods : int, optional
+        Minimum number of averaged inputs before outputting, by default 0
+    out : np.ndarray, optional
+        Preallocated output array
+    state : dict, optional
+        Carried state (`value`, `count`) when `x` continues a previous call,
+        updated in place
+    valid : np.ndarray, optional
+        Mask of the bars to average, the others output NaN
+
+    Returns
+    -------
+    np.ndarray
+        The adaptive average values
+    """
+    state = {} if state is None else state
+    out = prepare_out(out, x.shape)
+    alpha = np.broadcast_to(alpha, x.shape)
+    count = np.asarray(state.get("count", 0))
+    value = np.asarray(state.get("value", np.nan), dtype=np.float64)
+
+    averaged = np.isfinite(x) & np.isfinite(alpha)
+    if valid is not None:
+        averaged &= valid
+    decay = np.where(averaged, 1.0 - alpha, 1.0)
+    if ((decay <= 0) | (decay > 1)).any():
+        raise ValueError("Smoothing factors must be in (0, 1)")
+
+    n_bars = x.shape[-1]
+    if n_bars > 0:
+        # * Series without history start from their first input
+        first = np.take_along_axis(x, averaged.argmax(axis=-1)[..., None], axis=-1)
+        value = np.where(count > 0, value, first[..., 0])
+
+        block = min(_block_size(decay.min()) if decay.min() < 1 else n_bars, n_bars)
+        weighted = np.where(averaged, alpha * x, 0.0)
+        for start in range(0, n_bars, block):
+            scale = np.cumprod(decay[..., start : start + block], axis=-1)
+            filtered = np.cumsum(weighted[..., start : start + block] / scale, axis=-1)
+            filtered += value[..., None]
+            filtered *= scale
+            out[..., start : start + block] = filtered
+            value = filtered[..., -1]
+
+    seen = np.cumsum(averaged, axis=-1)
+    seen += count[..., None]
+    out[seen < max(min_periods, 1)] = np.nan
+    if valid is not None:
+        out[~valid] = np.nan
+
+    state["count"] = (count + averaged.sum(axis=-1)).tolist()
+    state["value"] = _state_value(value)
+
+    return out
+
+
+def _fold(x: np.ndarray, window: int, ufunc: np.ufunc, result: np.ndarray) -> None:
+    """
+    Reduce the full windows of `x` into `result`, one offset at a time over
+    whole arrays, which keeps every pass vectorized across a panel
+    """
+    n = result.shape[-1]
+    np.copyto(result, x[..., :n])
+    for offset in range(1, window):
+        ufunc(result, x[..., offset : offset + n], out=result)
+
+
+def _rolling(
+    x: np.ndarray,
+    window: int,
+    ufunc: np.ufunc,
+    out: np.ndarray,
+    state: dict,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Reduce full sliding windows with a binary ufunc, carrying the last
+    `window - 1` inputs in `state["tail"]` across calls
+
+    Only the first `window - 1` inputs are joined with the tail, so a block
+    costs no copy of its inputs.
+    """
+    out = prepare_out(out, x.shape)
+    if valid is not None:
+        return _rolling_valid(x, window, ufunc, out, state, valid)
+
+    keep, n_bars = window - 1, x.shape[-1]
+    tail = None if state is None else state.get("tail")
+    if tail is None:
+        tail = np.empty(x.shape[:-1] + (0,), dtype=x.dtype)
+    first = keep - tail.shape[-1]
+
+    out[..., :first] = np.nan
+    # * Windows starting in the tail
+    head = np.concatenate((tail, x[..., :keep]), axis=-1)
+    if head.shape[-1] >= window:
+        _fold(head, window, ufunc, out[..., first : min(keep, n_bars)])
+    # * Windows inside the block
+    if n_bars >= window:
+        _fold(x, window, ufunc, out[..., keep:])
+    if state is not None:
+        tail = np.concatenate((tail, x[..., max(n_bars - keep, 0) :]), axis=-1)
+        state["tail"] = np.array(tail[..., max(tail.shape[-1] - keep, 0) :])
+
+    return out
+
+
+def _rolling_valid(
+    x: np.ndarray,
+    window: int,
+    ufunc: np.ufunc,
+    out: np.ndarray,
+    state: dict,
+    valid: np.ndarray,
+) -> np.ndarray:
+    """
+    `_rolling` over the last `window` valid bars
+
+    The valid inputs of every series are packed to the front of its row after
+    a NaN-padded tail of `window - 1` values, the windows are folded over the
+    packed rows and scattered back to the valid bars.
+    """
+    keep = window - 1
+    counts = valid.sum(axis=-1)
+    tail = None if state is None else state.get("tail")
+    packed = np.full(x.shape[:-1] + (keep + x.shape[-1],), np.nan)
+    if tail is not None:
+        packed[..., keep - tail.shape[-1] : keep] = tail
+    packed_valid = np.arange(x.shape[-1]) < counts[..., None]
+    packed[..., keep:][packed_valid] = x[valid]
+
+    windows = np.empty(x.shape)
+    _fold(packed, window, ufunc, windows)
+    out[...] = np.nan
+    out[valid] = windows[packed_valid]
+    if state is not None:
+        last = counts[..., None] + np.arange(keep)
+        state["tail"] = np.take_along_axis(packed, last, axis=-1)
+
+    return out
+
+
+def rolling_max(
+    x: np.ndarray,
+    window: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Rolling maximum over full windows, NaN when the window holds a NaN
+    """
+    return _rolling(x, window, np.maximum, out, state, valid)
+
+
+def rolling_min(
+    x: np.ndarray,
+    window: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Rolling minimum over full windows, NaN when the window holds a NaN
+    """
+    return _rolling(x, window, np.minimum, out, state, valid)
+
+
+def rolling_sum(
+    x: np.ndarray,
+    window: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Rolling sum over full windows folded offset by offset, without the
+    prefix-sum arrays of `window_sums`, NaN when the window holds a NaN
+    """
+    return _rolling(x, window, np.add, out, state, valid)
+
+
+def rolling_mean(
+    x: np.ndarray,
+    window: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Rolling mean over full windows, NaN when the window holds a NaN
+    """
+    if state is None and valid is None:
+        # * Prefix sums cost O(n) whatever the window
+        return sma(x, window, out=out)
+
+    out = rolling_sum(x, window, out=out, state=state, valid=valid)
+    out /= window
+
+    return out
+
+
+def _rolling_adaptive(
+    x: np.ndarray,
+    windows: np.ndarray,
+    max_window: int,
+    ufunc: np.ufunc,
+    out: np.ndarray,
+    state: dict,
+    valid: np.ndarray,
+) -> np.ndarray:
+    """
+    Reduce trailing windows of a length per bar with an idempotent ufunc
+
+    The inputs are packed after a NaN-padded tail of `max_window - 1` values
+    (the valid bars only with a `valid` mask), then every window is the
+    reduction of two overlapping power of two blocks of a sparse table, built
+    one level at a time so a single level is held in memory.
+    """
+    out = prepare_out(out, x.shape)
+    keep, n_bars = max_window - 1, x.shape[-1]
+    unknown = ~np.isfinite(windows)
+    windows = np.where(unknown, 1, np.clip(np.rint(windows), 1, max_window))
+    windows = windows.astype(np.intp)
+
+    tail = None if state is None else state.get("tail")
+    packed = np.full(x.shape[:-1] + (keep + n_bars,), np.nan)
+    if tail is not None:
+        packed[..., keep - tail.shape[-1] : keep] = tail
+    if valid is None:
+        counts = np.full(x.shape[:-1], n_bars)
+        packed[..., keep:] = x
+    else:
+        counts = valid.sum(axis=-1)
+        packed_valid = np.arange(n_bars) < counts[..., None]
+        packed[..., keep:][packed_valid] = x[valid]
+        packed_windows = np.ones(x.shape, dtype=np.intp)
+        packed_windows[packed_valid] = windows[valid]
+        windows = packed_windows
+
+    # * Window [end - w + 1, end] = blocks of 2 ** k at both ends, k = log2(w)
+    ends = keep + np.arange(n_bars)
+    levels = np.frexp(windows)[1] - 1
+    reduced = np.empty(x.shape)
+    table, size = packed, 1
+    for level in range(int(levels.max(initial=0)) + 1):
+        at_level = levels == level
+        if at_level.any():
+            first = np.take_along_axis(table, ends - windows + 1, axis=-1)
+            last = np.take_along_axis(
+                table, np.broadcast_to(ends - size + 1, x.shape), axis=-1
+            )
+            np.copyto(reduced, ufunc(first, last), where=at_level)
+        table = ufunc(table[..., : table.shape[-1] - size], table[..., size:])
+        table = np.concatenate(
+            (table, np.full(x.shape[:-1] + (size,), np.nan)), axis=-1
+        )
+        size *= 2
+
+    if valid is None:
+        out[...] = reduced
+    else:
+        out[...] = np.nan
+        out[valid] = reduced[packed_valid]
+    out[unknown] = np.nan
+    if state is not None:
+        last = counts[..., None] + np.arange(keep)
+        state["tail"] = np.take_along_axis(packed, last, axis=-1)
+
+    return out
+
+
+def adaptive_rolling_max(
+    x: np.ndarray,
+    windows: np.ndarray,
+    max_window: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Rolling maximum over a window length per bar (rounded, at most
+    `max_window`), NaN when the window holds a NaN or its length is NaN
+    """
+    return _rolling_adaptive(x, windows, max_window, np.maximum, out, state, valid)
+
+
+def adaptive_rolling_min(
+    x: np.ndarray,
+    windows: np.ndarray,
+    max_window: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Rolling minimum over a window length per bar, see `adaptive_rolling_max`
+    """
+    return _rolling_adaptive(x, windows, max_window, np.minimum, out, state, valid)
+
+
+def ffill(x: np.ndarray, out: np.ndarray = None, state: dict = None) -> np.ndarray:
+    """
+    Forward fill of the NaN inputs with the last valid one, leading NaN are
+    filled from `state["last"]` when it carries a previous valid input
+    """
+    out = prepare_out(out, x.shape, dtype=x.dtype)
+    if x.shape[-1] == 0:
+        return out
+
+    valid = ~np.isnan(x)
+    last = np.where(valid, np.arange(x.shape[-1]), -1)
+    np.maximum.accumulate(last, axis=-1, out=last)
+    filled = np.take_along_axis(x, np.maximum(last, 0), axis=-1)
+    previous = np.nan if state is None else np.asarray(state.get("last", np.nan))
+    np.copyto(out, np.where(last < 0, np.asarray(previous)[..., None], filled))
+    if state is not None:
+        state["last"] = _state_value(out[..., -1])
+
+    return out
+
+
+def diff(
+    x: np.ndarray,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    First difference, the first output is NaN unless `state["last"]` carries
+    the previous input. With a `valid` mask, the difference to the previous
+    valid input
+    """
+    out = prepare_out(out, x.shape, dtype=x.dtype)
+    if x.shape[-1] == 0:
+        return out
+
+    last = np.nan if state is None else np.asarray(state.get("last", np.nan))
+    if valid is not None:
+        previous = ffill(np.where(valid, x, np.nan), state={"last": last})
+        out[..., 0] = x[..., 0] - last
+        np.subtract(x[..., 1:], previous[..., :-1], out=out[..., 1:])
+        out[~valid] = np.nan
+        if state is not None:
+            state["last"] = _state_value(previous[..., -1])
+        return out
+
+    out[..., 0] = x[..., 0] - last
+    np.subtract(x[..., 1:], x[..., :-1], out=out[..., 1:])
+    if state is not None:
+        state["last"] = _state_value(x[..., -1])
+
+    return out
+
+
+def cumsum(x: np.ndarray, state: dict = None) -> np.ndarray:
+    """
+    Cumulative sum in float64 skipping NaN (kept NaN in the output) like
+    `pd.Series.cumsum`, continued from `state["total"]`
+    """
+    missing = np.isnan(x)
+    total = np.nancumsum(x, axis=-1, dtype=np.float64)
+    if state is not None:
+        total += np.asarray(state.get("total", 0.0))[..., None]
+        if total.shape[-1] > 0:
+            state["total"] = _state_value(total[..., -1])
+    total[missing] = np.nan
+
+    return total
+
+
+def _sub_state(state: dict, key: str) -> dict:
+    return None if state is None else state.setdefault(key, {})
+
+
+def true_range(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    True range, `max(high, previous close) - min(low, previous close)`, the
+    plain range without previous close (first bar unless `state["last"]`
+    carries it). With a `valid` mask, the close of the previous valid bar
+    """
+    out = prepare_out(out, close.shape)
+    if close.shape[-1] == 0:
+        return out
+
+    last = np.nan if state is None else np.asarray(state.get("last", np.nan))
+    if valid is not None:
+        close = ffill(np.where(valid, close, np.nan), state={"last": last})
+    previous = np.empty(close.shape)
+    previous[..., 0] = last
+    previous[..., 1:] = close[..., :-1]
+
+    np.subtract(np.fmax(high, previous), np.fmin(low, previous), out=out)
+    if valid is not None:
+        out[~valid] = np.nan
+    if state is not None:
+        state["last"] = _state_value(close[..., -1])
+
+    return out
+
+
+def efficiency_ratio(
+    x: np.ndarray,
+    period: int,
+    out: np.ndarray = None,
+    state: dict = None,
+    valid: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Kaufman efficiency ratio, the net change over `period` bars divided by
+    the sum of the absolute bar to bar changes
+
+    1 for a straight move, close to 0 for noise, 0 for a flat window. The
+    net change is the rolling sum of the changes, so both sums share one
+    rolling kernel and its chunk state.
+    """
+    change = diff(x, state=_sub_state(state, "diff"), valid=valid)
+    volatility = rolling_sum(
+        np.abs(change), period, state=_sub_state(state, "volatility"), valid=valid
+    )
+    out = rolling_sum(
+        change, period, out=out, state=_sub_state(state, "change"), valid=valid
+    )
+    np.abs(out, out=out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out /= volatility
+    out[volatility == 0] = 0.0
+
+    return out
+
+
+def _lengths(lengths) -> Tuple[np.ndarray, bool]:
+    """
+    Window lengths as a 1-D int array, and whether a single length was given
+    """
+    single = np.ndim(lengths) == 0
+    lengths = np.atleast_1d(np.asarray(lengths, dtype=np.intp))
+    if (lengths < 1).any():
+        raise ValueError(f"Window lengths must be positive, got {lengths}")
+
+    return lengths, single
+
+
+def _prefix_sums(values: np.ndarray, pad: int = 0) -> np.ndarray:
+    """
+    Cumulative sums along the last axis after `pad + 1` leading zeros
+    """
+    total = np.zeros(values.shape[:-1] + (pad + values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=total[..., pad + 1 :])
+
+    return total
+
+
+def window_sums(
+    x: np.ndarray,
+    lengths,
+    linear: bool = False,
+    block_size: int = None,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Sums over trailing windows of every length in one pass over `x`
+
+    Each block of `block_size` bars gets prefix sums of the deviations from a
+    reference price, restarted a window before the block, so the sums stay
+    O(n) per length without the float cancellation of prefix sums over the
+    whole history.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Input values, windows along the last axis
+    lengths : int | Sequence[int]
+        Window lengths
+    linear : bool, optional
+        Weight the window linearly, 1 for the oldest value up to `length`
+        for the latest one, by default False
+    block_size : int, optional
+        Bars per block, by default 4096 (1024 when `linear`, whose prefix
+        sums grow quadratically)
+    out : np.ndarray, optional
+        Preallocated output array of the returned shape
+
+    Returns
+    -------
+    np.ndarray
+        Shape `x.shape` for a single length, `(n_lengths,) + x.shape`
+        otherwise. NaN before a window is full or when it holds a
+        non-finite value
+    """
+    lengths, single = _lengths(lengths)
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    if single and out is not None:
+        single_out = prepare_out(out, x.shape)
+        out = single_out[None]
+    else:
+        single_out = None
+        out = prepare_out(out, (len(lengths),) + x.shape)
+
+    pad = int(lengths.max())
+    if block_size is None:
+        block_size = (1 << 10) if linear else (1 << 12)
+    block_size = max(block_size, pad)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        origin = max(start - pad, 0)
+
+        # * Sum deviations from a per row reference to keep the prefix sums small
+        segment = x[..., origin:stop]
+        invalid = ~np.isfinite(segment)
+        segment = np.where(invalid, 0.0, segment)
+        n_valid = np.maximum(segment.shape[-1] - invalid.sum(axis=-1, keepdims=True), 1)
+        reference = segment.sum(axis=-1, keepdims=True) / n_valid
+        segment -= reference
+        segment[invalid] = 0.0
+
+        sums_prefix = _prefix_sums(segment, pad)
+        n_invalid = _prefix_sums(invalid, pad)
+        if linear:
+            weighted_prefix = _prefix_sums(segment * np.arange(segment.shape[-1]), pad)
+
+        # * Window of bar t: prefix[end] - prefix[end - L], padded local positions
+        end = slice(pad + start - origin + 1, pad + stop - origin + 1)
+        for k, length in enumerate(lengths):
+            begin = slice(end.start - length, end.stop - length)
+            result = out[k, ..., start:stop]
+            np.subtract(sums_prefix[..., end], sums_prefix[..., begin], out=result)
+            if linear:
+                # * sum (i - (t - L)) x_i = sum i x_i - (t - L) sum x_i, local i
+                offset = np.arange(start - origin - length, stop - origin - length)
+                result *= -offset
+                result += weighted_prefix[..., end]
+                result -= weighted_prefix[..., begin]
+                result += reference * (length * (length + 1) / 2)
+            else:
+                result += reference * length
+
+            result[n_invalid[..., end] - n_invalid[..., begin] > 0] = np.nan
+            result[..., : max(length - 1 - start, 0)] = np.nan
+
+    if single_out is not None:
+        return single_out
+
+    return out[0] if single else out
+
+
+def sma(x: np.ndarray, lengths, out: np.ndarray = None) -> np.ndarray:
+    """
+    Simple moving averages of every length, see `window_sums`
+    """
+    sizes, single = _lengths(lengths)
+    out = window_sums(x, lengths, out=out)
+    out /= sizes[0] if single else sizes.reshape((-1,) + (1,) * np.ndim(x))
+
+    return out
+
+
+def wma(x: np.ndarray, lengths) -> np.ndarray:
+    """
+    Linearly weighted moving averages of every length, see `window_sums`
+    """
+    lengths, single = _lengths(lengths)
+    out = window_sums(x, lengths, linear=True)
+    out /= (lengths * (lengths + 1) / 2).reshape((-1,) + (1,) * np.ndim(x))
+
+    return out[0] if single else out
+
+
+def emas(x: np.ndarray, lengths) -> np.ndarray:
+    """
+    Exponential moving averages (spans) of every length, see `ema`
+    """
+    lengths, single = _lengths(lengths)
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty((len(lengths),) + x.shape)
+    for k, length in enumerate(lengths):
+        ema(x, span=length, out=out[k])
+
+    return out[0] if single else out
+
+
+def dema(x: np.ndarray, lengths) -> np.ndarray:
+    """
+    Double exponential moving averages, `2 EMA - EMA(EMA)`
+    """
+    lengths, single = _lengths(lengths)
+    out = np.empty((len(lengths),) + np.shape(x))
+    for k, length in enumerate(lengths):
+        first = emas(x, length)
+        np.subtract(2 * first, emas(first, length), out=out[k])
+
+    return out[0] if single else out
+
+
+def tema(x: np.ndarray, lengths) -> np.ndarray:
+    """
+    Triple exponential moving averages, `3 EMA - 3 EMA(EMA) + EMA(EMA(EMA))`
+    """
+    lengths, single = _lengths(lengths)
+    out = np.empty((len(lengths),) + np.shape(x))
+    for k, length in enumerate(lengths):
+        first = emas(x, length)
+        second = emas(first, length)
+        np.add(3 * (first - second), emas(second, length), out=out[k])
+
+    return out[0] if single else out
+
+
+def hma(x: np.ndarray, lengths) -> np.ndarray:
+    """
+    Hull moving averages, `WMA(2 WMA(x, L / 2) - WMA(x, L), sqrt(L))`
+
+    The inner WMAs of every length run in one `window_sums` pass, the outer
+    ones in one pass per distinct `sqrt(L)`.
+    """
+    lengths, single = _lengths(lengths)
+    halves = np.maximum(lengths // 2, 1)
+    roots = np.maximum(np.floor(np.sqrt(lengths)).astype(np.intp), 1)
+
+    inner = wma(x, np.concatenate((halves, lengths)))
+    raw = 2 * inner[: len(lengths)] - inner[len(lengths) :]
+
+    out = np.empty_like(raw)
+    for root in np.unique(roots):
+        rows = roots == root
+        out[rows] = wma(raw[rows], root)
+
+    return out[0] if single else out
+
+
+def vwap(price: np.ndarray, volume: np.ndarray, lengths) -> np.ndarray:
+    """
+    Rolling volume weighted average prices over every length
+    """
+    price_volume = window_sums(np.multiply(price, volume), lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return price_volume / window_sums(volume, lengths)
+
+
+def anchored_vwap(
+    price: np.ndarray, volume: np.ndarray, session: np.ndarray
+) -> np.ndarray:
+    """
+    Volume weighted average price since the start of each session
+
+    Parameters
+    ----------
+    price : np.ndarray
+        Prices, e.g. the typical price `(high + low + close) / 3`
+    volume : np.ndarray
+        Volumes, same shape as `price`
+    session : np.ndarray
+        Session label of each bar (last axis), a new session starts when it changes
+
+    Returns
+    -------
+    np.ndarray
+        The VWAP of each bar, NaN inputs are skipped
+    """
+    price_volume = np.nan_to_num(np.multiply(price, volume))
+    volume = np.nan_to_num(np.asarray(volume, dtype=np.float64))
+    session = np.asarray(session)
+
+    # * Totals before the first bar of each session
+    positions = np.arange(session.shape[-1])
+    starts = np.r_[True, session[1:] != session[:-1]]
+    first = np.maximum.accumulate(np.where(starts, positions, 0))
+
+    out = np.cumsum(price_volume, axis=-1)
+    out -= (out - price_volume)[..., first]
+    total_volume = np.cumsum(volume, axis=-1)
+    total_volume -= (total_volume - volume)[..., first]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out /= total_volume
+
+    return out
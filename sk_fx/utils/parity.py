@@ -0,0 +1,590 @@
+"""
+Golden-reference parity and performance harness of the oscillators
+
+Every case (an oscillator and its `calculate` options) is computed on
+randomized markets with weekend closures, missing bars, flat bars and NaN
+fields (see `random_market`) by the golden reference, the pandas path or a
+per-bar `ParityCase.reference` for the oscillators without one (adaptive), and
+by every execution mode:
+
+    numpy       arrays per field, the NumPy kernels
+    float32     float32 arrays and outputs
+    out         preallocated outputs (and a reused `Scratch` when supported)
+    chunked     `calculate_chunked` over odd-sized blocks
+    streaming   one bar per call, resumed from the kernel state
+    panel       all the symbols at once as (n_symbols, n_bars) arrays
+    executor    the symbols on the `IndicatorExecutor` thread pool
+
+Each mode must match the reference within the tolerance of the case, relative
+to the values and to their largest magnitude, NaN positions included. Modes
+are timed so that a faster mode is proven correct.
+
+    python -m sk_fx.utils.parity --bars 20000 --symbols 4 -o parity.json
+"""
+
+import argparse
+import copy
+import inspect
+import json
+import os
+import time
+from typing import Callable, Dict, List, Mapping, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sk_fx.data.chunked import calculate_chunked
+from sk_fx.indicators.executor import IndicatorExecutor
+from sk_fx.indicators.idtypes import AdaptiveMeasure, GapPolicy
+from sk_fx.indicators.oscillators.adaptive_oscillator import (
+    AdaptiveDeMarkerOscillator,
+    AdaptiveOscillator,
+    AdaptiveRSIOscillator,
+    AdaptiveStochasticOscillator,
+)
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    MACD,
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    DivergenceOscillator,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils import kernels
+from sk_fx.utils.test_utils import random_market
+
+Fields = Dict[str, np.ndarray]
+# * Mode: (oscillator, calculate options, fields per symbol) -> values per symbol
+Mode = Callable[[DivergenceOscillator, dict, List[Fields]], List[np.ndarray]]
+# * Reference: (oscillator, OHLCV frame of a symbol) -> values of the symbol
+Reference = Callable[[DivergenceOscillator, pd.DataFrame], np.ndarray]
+
+# * Relative tolerance of the float32 mode
+FLOAT32_TOLERANCE = 1e-4
+
+
+class ParityCase(NamedTuple):
+    name: str
+    oscillator: DivergenceOscillator
+    options: Mapping = {}
+    rtol: float = 1e-9
+    skip: Tuple[str, ...] = ()  # Modes the oscillator does not support
+    float32_rtol: float = FLOAT32_TOLERANCE
+    reference: Reference = None  # By default the pandas path
+
+
+# * Independent references of the adaptive oscillators, one bar at a time
+
+
+def _adaptive_average(x: np.ndarray, alpha: np.ndarray, min_periods: int = 1):
+    values, value, count = np.full(len(x), np.nan), np.nan, 0
+    for t in range(len(x)):
+        if np.isfinite(x[t]) and np.isfinite(alpha[t]):
+            value = x[t] if count == 0 else alpha[t] * x[t] + (1 - alpha[t]) * value
+            count += 1
+        if count >= min_periods:
+            values[t] = value
+
+    return values
+
+
+def _adaptive_window(x: np.ndarray, periods: np.ndarray, reduce) -> np.ndarray:
+    values = np.full(len(x), np.nan)
+    for t, period in enumerate(periods):
+        if np.isfinite(period) and t + 1 >= round(period):
+            values[t] = reduce(x[t + 1 - round(period) : t + 1])
+
+    return values
+
+
+def _adaptive_periods(oscillator: AdaptiveOscillator, bars: pd.DataFrame):
+    n, close = oscillator.measure_period, bars["close"].to_numpy()
+    if oscillator.min_period == oscillator.max_period:
+        return np.full(len(bars), float(oscillator.max_period))
+
+    ratio = np.full(len(bars), np.nan)
+    if oscillator.measure is AdaptiveMeasure.EFFICIENCY_RATIO:
+        for t in range(n, len(bars)):
+            volatility = np.abs(np.diff(close[t - n : t + 1])).sum()
+            change = abs(close[t] - close[t - n])
+            ratio[t] = change / volatility if volatility > 0 else 0.0
+    else:
+        previous = bars["close"].shift(1)
+        true_range = np.fmax(bars["high"], previous) - np.fmin(bars["low"], previous)
+        fast = true_range.ewm(alpha=1 / n, adjust=False, min_periods=n).mean()
+        slow = true_range.ewm(alpha=1 / (4 * n), adjust=False, min_periods=n).mean()
+        total = (fast + slow).to_numpy()
+        ratio = np.where(total == 0, 0.5, fast.to_numpy() / total)
+
+    return oscillator.max_period + ratio * (
+        oscillator.min_period - oscillator.max_period
+    )
+
+
+def adaptive_reference(
+    oscillator: AdaptiveOscillator, ohlcv: pd.DataFrame
+) -> np.ndarray:
+    """
+    Adaptive RSI, Stochastic or DeMarker computed bar by bar over the bars
+    without NaN input (the `SKIP` policy), NaN on the other bars
+    """
+    valid = ohlcv[["high", "low", "close"]].notna().all(axis=1).to_numpy()
+    bars = ohlcv[valid]
+    periods = _adaptive_periods(oscillator, bars)
+    high, low, close = (bars[field].to_numpy() for field in ("high", "low", "close"))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if isinstance(oscillator, AdaptiveRSIOscillator):
+            change = np.diff(close, prepend=np.nan)
+            gain = _adaptive_average(
+                np.maximum(change, 0), 1 / periods, oscillator.min_period
+            )
+            loss = _adaptive_average(
+                np.maximum(-change, 0), 1 / periods, oscillator.min_period
+            )
+            values = 100 * gain / (gain + loss)
+        elif isinstance(oscillator, AdaptiveStochasticOscillator):
+            highest = _adaptive_window(high, periods, np.max)
+            lowest = _adaptive_window(low, periods, np.min)
+            percentage = 100 * (close - lowest) / (highest - lowest)
+            values = (
+                pd.Series(percentage).rolling(oscillator.d_length).mean().to_numpy()
+            )
+        else:
+            alpha = 2 / (periods + 1)
+            demax = _adaptive_average(
+                np.maximum(np.diff(high, prepend=np.nan), 0), alpha
+            )
+            demin = _adaptive_average(
+                np.maximum(-np.diff(low, prepend=np.nan), 0), alpha
+            )
+            values = demax / (demax + demin)
+
+    result = np.full(len(ohlcv), np.nan)
+    result[valid] = values
+    return result
+
+
+DEFAULT_CASES: List[ParityCase] = [
+    ParityCase("chaikin", ChaikinOscillator()),
+    ParityCase(
+        "chaikin_normalized",
+        ChaikinOscillator(),
+        {"normalized": True},
+        skip=("chunked", "streaming"),
+    ),
+    ParityCase("demarker", DeMarkerOscillator()),
+    ParityCase("demarker_average", DeMarkerOscillator(), {"average_demarker": True}),
+    ParityCase("stochastic", StochasticOscillator()),
+    ParityCase("macd", MACD()),
+    # * float32 close differences keep about 4 digits, through the Wilder averages
+    ParityCase("rsi", RSIOscillator(), float32_rtol=1e-3),
+    ParityCase("stochastic_skip", StochasticOscillator(gap_policy=GapPolicy.SKIP)),
+    ParityCase(
+        "demarker_ffill",
+        DeMarkerOscillator(gap_policy=GapPolicy.FFILL),
+        {"average_demarker": True},
+    ),
+    ParityCase("macd_skip", MACD(gap_policy=GapPolicy.SKIP)),
+    ParityCase(
+        "chaikin_ffill",
+        ChaikinOscillator(gap_policy=GapPolicy.FFILL),
+        {"normalized": True},
+        skip=("chunked", "streaming"),
+    ),
+    ParityCase("adaptive_rsi", AdaptiveRSIOscillator(), reference=adaptive_reference),
+    ParityCase(
+        "adaptive_stochastic_atr",
+        AdaptiveStochasticOscillator(measure="atr"),
+        reference=adaptive_reference,
+    ),
+    ParityCase(
+        "adaptive_demarker", AdaptiveDeMarkerOscillator(), reference=adaptive_reference
+    ),
+]
+
+
+def _values(result) -> np.ndarray:
+    """
+    Result of any path as an array, one row per line for several lines
+    """
+    if isinstance(result, tuple):
+        return np.stack([_values(line) for line in result])
+
+    return np.asarray(result, dtype=np.float64)
+
+
+def _with_ohlcv(oscillator: DivergenceOscillator, ohlcv) -> DivergenceOscillator:
+    oscillator = copy.copy(oscillator)
+    oscillator.ohlcv = ohlcv
+    return oscillator
+
+
+def _accepts(oscillator: DivergenceOscillator, option: str) -> bool:
+    return option in inspect.signature(oscillator.calculate).parameters
+
+
+def _numpy(oscillator, options, symbols):
+    return [
+        _values(_with_ohlcv(oscillator, fields).calculate(**options))
+        for fields in symbols
+    ]
+
+
+def _float32(oscillator, options, symbols):
+    results = []
+    for fields in symbols:
+        fields = {field: values.astype(np.float32) for field, values in fields.items()}
+        result = _with_ohlcv(oscillator, fields).calculate(dtype=np.float32, **options)
+        results.append(_values(result))
+
+    return results
+
+
+def _out(oscillator, options, symbols):
+    scratch = kernels.Scratch() if _accepts(oscillator, "scratch") else None
+    extra = {} if scratch is None else {"scratch": scratch}
+    out = None
+    results = []
+    for fields in symbols:
+        if out is None:
+            shape = np.shape(fields["close"])
+            out = (
+                tuple(np.empty(shape) for _ in range(3))
+                if isinstance(oscillator, MACD)
+                else np.empty(shape)
+            )
+        result = _with_ohlcv(oscillator, fields).calculate(out=out, **extra, **options)
+        # * The next symbol reuses the output arrays
+        results.append(np.array(_values(result)))
+
+    return results
+
+
+def _chunked(oscillator, options, symbols, block_size: int = 997):
+    return [
+        np.array(calculate_chunked(oscillator, fields, block_size, **options))
+        for fields in symbols
+    ]
+
+
+def _streaming(oscillator, options, symbols):
+    results = []
+    for fields in symbols:
+        oscillator_copy, state = copy.copy(oscillator), {}
+        n_bars = len(fields["close"])
+        bars = []
+        for i in range(n_bars):
+            oscillator_copy.ohlcv = {
+                field: values[i : i + 1] for field, values in fields.items()
+            }
+            bars.append(_values(oscillator_copy.calculate(state=state, **options)))
+        results.append(np.concatenate(bars, axis=-1))
+
+    return results
+
+
+def _panel(oscillator, options, symbols):
+    panel = {
+        field: np.stack([fields[field] for fields in symbols]) for field in symbols[0]
+    }
+    values = _values(_with_ohlcv(oscillator, panel).calculate(**options))
+
+    # * (n_lines, n_symbols, n_bars) for several lines
+    return [values[..., i, :] for i in range(len(symbols))]
+
+
+def _executor(oscillator, options, symbols):
+    with IndicatorExecutor() as executor:
+        results = executor.run_universe(
+            dict(enumerate(symbols)), {"value": (oscillator, dict(options))}
+        )
+
+    return [_values(results[(i, "value")]) for i in range(len(symbols))]
+
+
+MODES: Dict[str, Mode] = {
+    "numpy": _numpy,
+    "float32": _float32,
+    "out": _out,
+    "chunked": _chunked,
+    "streaming": _streaming,
+    "panel": _panel,
+    "executor": _executor,
+}
+
+
+class ParityResult(NamedTuple):
+    case: str
+    mode: str
+    n_bars: int
+    seconds: float
+    max_error: float  # Largest difference to the reference, NaN mismatches excluded
+    nan_mismatches: int  # Bars NaN in only one of the mode and the reference
+    passed: bool
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.n_bars / self.seconds if self.seconds else float("inf")
+
+
+def compare(
+    values: np.ndarray,
+    reference: np.ndarray,
+    rtol: float = 1e-9,
+    atol: float = 0.0,
+) -> Tuple[float, int, bool]:
+    """
+    Compare a mode with the reference
+
+    Returns
+    -------
+    Tuple[float, int, bool]
+        Largest absolute difference, number of NaN mismatches and whether
+        the values match within `atol + rtol * |reference|`
+    """
+    if values.shape != reference.shape:
+        return float("inf"), reference.size, False
+
+    missing, reference_missing = np.isnan(values), np.isnan(reference)
+    nan_mismatches = int(np.count_nonzero(missing != reference_missing))
+    both = ~(missing | reference_missing)
+
+    values, reference = values[both], reference[both]
+    # * Equal infinities match
+    with np.errstate(invalid="ignore"):
+        error = np.where(values == reference, 0.0, np.abs(values - reference))
+        within = bool(((error == 0) | (error <= atol + rtol * np.abs(reference))).all())
+    max_error = float(error.max()) if error.size else 0.0
+
+    return max_error, nan_mismatches, within and nan_mismatches == 0
+
+
+class ParityReport:
+    """
+    Parity and timing of every mode of every case
+    """
+
+    results: List[ParityResult]
+    reference_seconds: Dict[str, float]
+
+    def __init__(
+        self, results: List[ParityResult], reference_seconds: Dict[str, float]
+    ) -> None:
+        self.results = results
+        self.reference_seconds = reference_seconds
+
+    @property
+    def failures(self) -> List[ParityResult]:
+        return [result for result in self.results if not result.passed]
+
+    def to_dict(self) -> dict:
+        cases = {}
+        for result in self.results:
+            reference = self.reference_seconds[result.case]
+            cases.setdefault(result.case, {"reference_seconds": reference})[
+                result.mode
+            ] = {
+                "seconds": result.seconds,
+                "bars_per_second": result.bars_per_second,
+                "speedup": reference / result.seconds if result.seconds else None,
+                "max_error": result.max_error,
+                "nan_mismatches": result.nan_mismatches,
+                "passed": result.passed,
+            }
+
+        return {"passed": not self.failures, "cases": cases}
+
+    def summary(self) -> str:
+        # * Columns as wide as the longest name, and a space
+        width = 1 + max([len("case")] + [len(result.case) for result in self.results])
+        mode_width = 1 + max(
+            [len("mode")] + [len(result.mode) for result in self.results]
+        )
+        lines = [
+            f"{'case':<{width}}{'mode':<{mode_width}}{'bars/s':>14}{'speedup':>9}"
+            f"{'max error':>11}{'NaN diff':>9}"
+        ]
+        for result in self.results:
+            speedup = self.reference_seconds[result.case] / max(result.seconds, 1e-12)
+            lines.append(
+                f"{result.case:<{width}}{result.mode:<{mode_width}}"
+                f"{result.bars_per_second:>14,.0f}"
+                f"{speedup:>8.1f}x{result.max_error:>11.2e}{result.nan_mismatches:>9}"
+                + ("" if result.passed else "  FAILED")
+            )
+
+        return "\n".join(lines)
+
+    def regressions(self, baseline: Mapping, tolerance: float = 0.25) -> List[str]:
+        """
+        Compare with the `to_dict` of a previous run
+
+        Parameters
+        ----------
+        baseline : Mapping
+            A previous report, e.g. loaded from JSON, or its path
+        tolerance : float, optional
+            Allowed relative slowdown of a mode, by default 0.25 (25 %)
+
+        Returns
+        -------
+        List[str]
+            Every failed parity check and every mode slower than the baseline
+        """
+        if isinstance(baseline, (str, os.PathLike)):
+            with open(baseline) as file:
+                baseline = json.load(file)
+
+        found = [
+            f"{result.case} {result.mode}: max error {result.max_error:.2e}, "
+            f"{result.nan_mismatches} NaN mismatches"
+            for result in self.failures
+        ]
+        for result in self.results:
+            previous = baseline["cases"].get(result.case, {}).get(result.mode)
+            if previous is None:
+                continue
+            rate = previous["bars_per_second"]
+            if result.bars_per_second < rate * (1 - tolerance):
+                found.append(
+                    f"{result.case} {result.mode} {result.bars_per_second:,.0f} "
+                    f"< {rate:,.0f} bars/s"
+                )
+
+        return found
+
+
+def market_fields(
+    n_bars: int, n_symbols: int, seed: int = 0, **defects
+) -> List[Fields]:
+    """
+    Fields of `n_symbols` random markets, see `random_market` for the defects
+    """
+    return [
+        {
+            field: values.to_numpy()
+            for field, values in random_market(n_bars, seed=seed + i, **defects).items()
+        }
+        for i in range(n_symbols)
+    ]
+
+
+def run_parity(
+    cases: Sequence[ParityCase] = None,
+    modes: Sequence[str] = None,
+    n_bars: int = 5000,
+    n_symbols: int = 3,
+    seed: int = 0,
+    **defects,
+) -> ParityReport:
+    """
+    Compute every case with the reference and every mode, and compare them
+
+    Parameters
+    ----------
+    cases : Sequence[ParityCase], optional
+        The cases, by default `DEFAULT_CASES`
+    modes : Sequence[str], optional
+        Names of `MODES` to check, by default all of them
+    n_bars : int, optional
+        Bars per symbol, by default 5000
+    n_symbols : int, optional
+        Number of random markets, by default 3
+    seed : int, optional
+        Seed of the first market, by default 0
+    **defects
+        Rates of the market defects, see `random_market`
+
+    Returns
+    -------
+    ParityReport
+        Parity and timing of every mode of every case
+    """
+    cases = DEFAULT_CASES if cases is None else cases
+    modes = list(MODES) if modes is None else modes
+    symbols = market_fields(n_bars, n_symbols, seed, **defects)
+    frames = [pd.DataFrame(fields) for fields in symbols]
+
+    results = []
+    reference_seconds = {}
+    for case in cases:
+        options = dict(case.options)
+
+        start = time.perf_counter()
+        if case.reference is None:
+            references = [
+                _values(_with_ohlcv(case.oscillator, frame).calculate(**options))
+                for frame in frames
+            ]
+        else:
+            references = [case.reference(case.oscillator, frame) for frame in frames]
+        reference_seconds[case.name] = time.perf_counter() - start
+
+        for mode in modes:
+            if mode in case.skip:
+                continue
+
+            start = time.perf_counter()
+            values = MODES[mode](case.oscillator, options, symbols)
+            seconds = time.perf_counter() - start
+
+            max_error, nan_mismatches, passed = 0.0, 0, True
+            for result, reference in zip(values, references):
+                # * Values crossing zero (MACD) also get an absolute tolerance
+                scale = np.nanmax(np.abs(reference), initial=0.0)
+                rtol = case.float32_rtol if mode == "float32" else case.rtol
+                error, mismatches, within = compare(
+                    result, reference, rtol, rtol * scale
+                )
+                max_error = max(max_error, error)
+                nan_mismatches += mismatches
+                passed &= within
+
+            results.append(
+                ParityResult(
+                    case.name,
+                    mode,
+                    n_bars * n_symbols,
+                    seconds,
+                    max_error,
+                    nan_mismatches,
+                    passed,
+                )
+            )
+
+    return ParityReport(results, reference_seconds)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="SK-FX parity and timing harness")
+    parser.add_argument("-n", "--bars", type=int, default=5000)
+    parser.add_argument("-s", "--symbols", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-m", "--mode", action="append", choices=sorted(MODES))
+    parser.add_argument("-o", "--output", help="JSON report")
+    parser.add_argument("-b", "--baseline", help="JSON report of a previous run")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    report = run_parity(
+        modes=args.mode, n_bars=args.bars, n_symbols=args.symbols, seed=args.seed
+    )
+    print(report.summary())
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report.to_dict(), file, indent=2)
+
+    problems = (
+        report.regressions(args.baseline, args.tolerance)
+        if args.baseline
+        else [f"{result.case} {result.mode} FAILED" for result in report.failures]
+    )
+    for problem in problems:
+        print(problem)
+
+    return int(bool(problems))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
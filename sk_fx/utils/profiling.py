@@ -0,0 +1,231 @@
+"""
+Memory and allocation profiling of the indicator stages
+
+The oscillators mark their stages with `stage("name")`, a no-op unless a
+`MemoryProfiler` is active. Inside a profiler every stage records its time,
+the peak traced memory above the memory held when it started (temporaries
+included), the memory it retained, and the number of traced blocks it left
+allocated (outputs and kernel states). NumPy reports its array buffers to
+`tracemalloc`, so the figures cover the arrays of the kernels and of pandas.
+
+Example
+-------
+>>> report = profile_indicator(DeMarkerOscillator(ohlcv=ohlcv), average_demarker=True)
+>>> print(report.summary())
+"""
+
+import contextlib
+import time
+import tracemalloc
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+_ACTIVE: List["MemoryProfiler"] = []
+_NO_STAGE = contextlib.nullcontext()
+
+
+class StageStats(NamedTuple):
+    calls: int
+    seconds: float
+    peak: int  # Largest traced memory above the start of the stage, in bytes
+    retained: int  # Traced memory left allocated by the stage, in bytes
+    blocks: int  # Traced blocks left allocated by the stage
+
+
+class _Frame:
+    __slots__ = ("name", "start", "blocks", "peak", "time")
+
+    def __init__(self, name: str, start: int, blocks: int) -> None:
+        self.name = name
+        self.start = start
+        self.blocks = blocks
+        self.peak = start
+        self.time = time.perf_counter()
+
+
+def _traced_blocks() -> int:
+    return sum(
+        stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+    )
+
+
+class MemoryProfiler:
+    """
+    Collect the `StageStats` of the stages run inside the `with` block
+
+    Stages nest: the peak of a stage includes the peaks of its sub-stages,
+    whose names are joined with '/'.
+
+    Parameters
+    ----------
+    count_blocks : bool, optional
+        Count the blocks left allocated by every stage, which takes a
+        `tracemalloc` snapshot per stage boundary, by default True
+    """
+
+    stages: Dict[str, StageStats]
+    count_blocks: bool
+
+    def __init__(self, count_blocks: bool = True) -> None:
+        self.stages = {}
+        self.count_blocks = count_blocks
+        self._frames: List[_Frame] = []
+        self._started = False
+
+    def __enter__(self) -> "MemoryProfiler":
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _ACTIVE.remove(self)
+        if self._started:
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            parent = self._frames[-1]
+            parent.peak = max(parent.peak, peak)
+            name = f"{parent.name}/{name}"
+        blocks = _traced_blocks() if self.count_blocks else 0
+
+        frame = _Frame(name, current, blocks)
+        self._frames.append(frame)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            self._frames.pop()
+            seconds = time.perf_counter() - frame.time
+            current, peak = tracemalloc.get_traced_memory()
+            frame.peak = max(frame.peak, peak)
+            blocks = _traced_blocks() - frame.blocks if self.count_blocks else 0
+            self._record(
+                name, seconds, frame.peak - frame.start, current - frame.start, blocks
+            )
+
+            # * The parent peak continues from the peak of this stage
+            if self._frames:
+                self._frames[-1].peak = max(self._frames[-1].peak, frame.peak)
+
+    def _record(
+        self, name: str, seconds: float, peak: int, retained: int, blocks: int
+    ) -> None:
+        previous = self.stages.get(name, StageStats(0, 0.0, 0, 0, 0))
+        self.stages[name] = StageStats(
+            previous.calls + 1,
+            previous.seconds + seconds,
+            max(previous.peak, peak),
+            previous.retained + retained,
+            previous.blocks + blocks,
+        )
+
+
+def stage(name: str):
+    """
+    Context marking an indicator stage, recorded by the active profiler
+    """
+    if not _ACTIVE:
+        return _NO_STAGE
+
+    return _ACTIVE[-1].stage(name)
+
+
+class MemoryReport(NamedTuple):
+    indicator: str
+    input_bytes: int
+    output_bytes: int
+    preallocated: int  # Bytes of the `out` and `scratch` arrays given to the call
+    stages: Dict[str, StageStats]
+
+    @property
+    def peak(self) -> int:
+        """
+        Peak memory of the calculation above its inputs, output and
+        preallocated buffers included
+        """
+        return self.preallocated + self.stages["calculate"].peak
+
+    @property
+    def overhead(self) -> float:
+        """
+        Inputs plus peak memory as a multiple of the input plus output size,
+        1 for a calculation without any temporary
+        """
+        return (self.input_bytes + self.peak) / max(
+            self.input_bytes + self.output_bytes, 1
+        )
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.indicator}: input {self.input_bytes / 1e6:.1f} MB, output "
+            f"{self.output_bytes / 1e6:.1f} MB, peak {self.peak / 1e6:.1f} MB "
+            f"({self.overhead:.2f}x input + output)",
+            f"{'stage':<40}{'calls':>7}{'ms':>10}{'peak MB':>10}"
+            f"{'kept MB':>10}{'blocks':>8}",
+        ]
+        for name, stats in self.stages.items():
+            lines.append(
+                f"{name:<40}{stats.calls:>7}{stats.seconds * 1e3:>10.2f}"
+                f"{stats.peak / 1e6:>10.2f}{stats.retained / 1e6:>10.2f}"
+                f"{stats.blocks:>8}"
+            )
+
+        return "\n".join(lines)
+
+
+def _nbytes(values) -> int:
+    if values is None:
+        return 0
+    if isinstance(values, tuple):
+        return sum(_nbytes(line) for line in values)
+
+    return np.asarray(values).nbytes
+
+
+def profile_indicator(indicator, count_blocks: bool = True, **options) -> MemoryReport:
+    """
+    Profile one `calculate` call of an indicator
+
+    Parameters
+    ----------
+    indicator
+        Oscillator (or any indicator with `ohlcv` and `calculate`)
+    count_blocks : bool, optional
+        See `MemoryProfiler`, by default True
+    **options
+        Options of `calculate`, e.g. `out=..., scratch=...` for the
+        low-memory path
+
+    Returns
+    -------
+    MemoryReport
+        Input, output and preallocated sizes, and the stats of every stage;
+        the whole call is the 'calculate' stage
+    """
+    input_bytes = sum(
+        np.asarray(indicator.ohlcv[field]).nbytes
+        for field in ("open", "high", "low", "close", "volume")
+        if field in indicator.ohlcv
+    )
+
+    preallocated = _nbytes(options.get("out"))
+    if options.get("scratch") is not None:
+        preallocated += options["scratch"].nbytes
+
+    with MemoryProfiler(count_blocks=count_blocks) as profiler:
+        with profiler.stage("calculate"):
+            result = indicator.calculate(**options)
+
+    return MemoryReport(
+        type(indicator).__name__,
+        input_bytes,
+        _nbytes(result),
+        preallocated,
+        profiler.stages,
+    )
@@ -1,5 +1,15 @@
+import numpy as np
+import pandas as pd
+
+from sk_fx.data.calendar import FXCalendar
+from sk_fx.data.instruments import INSTRUMENTS
+
+
 def is_acceptable_error(
-    real_price: float, calculated_price: float, pip_value: float
+    real_price: float,
+    calculated_price: float,
+    pip_value: float = None,
+    symbol: str = None,
 ) -> bool:
     """
     Check whether the calculation is acceptable or not
@@ -12,13 +22,118 @@ def is_acceptable_error(
         The real price on chart
     calculated_price : float
         The calculated price from formulas
-    pip_value : float
-        The value of 1 pip on real market
+    pip_value : float, optional
+        The value of 1 pip on real market, by default taken from `symbol`
+    symbol : str, optional
+        Symbol of the instrument registry giving the pip size, by default None
 
     Returns
     -------
     bool
         Whether the error is acceptable or not
     """
+    if pip_value is None:
+        return INSTRUMENTS.within_pips(symbol, real_price, calculated_price, pips=3)
 
     return abs(real_price - calculated_price) < pip_value * 3
+
+
+def random_ohlcv(n_bars: int, seed: int = 0, freq: str = "h") -> pd.DataFrame:
+    """
+    Generate a random walk `ohlcv` data frame for tests without market data access
+
+    Parameters
+    ----------
+    n_bars : int
+        Number of bars
+    seed : int, optional
+        Seed of the random generator, by default 0
+    freq : str, optional
+        Bar duration as a NumPy timedelta unit, by default 'h'
+
+    Returns
+    -------
+    pd.DataFrame
+        Bars with open, high, low, close, volume columns indexed by time
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n_bars))
+    open = close + rng.normal(0, 0.5, n_bars)
+    high = np.maximum(open, close) + rng.random(n_bars)
+    low = np.minimum(open, close) - rng.random(n_bars)
+    volume = rng.integers(100, 1000, n_bars).astype(float)
+    index = pd.DatetimeIndex(
+        np.datetime64("2024-01-01", "ns") + np.arange(n_bars) * np.timedelta64(1, freq),
+        name="time",
+    )
+
+    return pd.DataFrame(
+        dict(open=open, high=high, low=low, close=close, volume=volume), index=index
+    )
+
+
+def random_market(
+    n_bars: int,
+    seed: int = 0,
+    freq: str = "h",
+    gap_rate: float = 0.01,
+    flat_rate: float = 0.01,
+    nan_rate: float = 0.005,
+    weekends: bool = True,
+) -> pd.DataFrame:
+    """
+    Random walk bars with the defects of real FX exports: weekend closures,
+    missing bars with price gaps, flat bars and NaN fields
+
+    Parameters
+    ----------
+    n_bars : int
+        Number of bars
+    seed : int, optional
+        Seed of the random generator, by default 0
+    freq : str, optional
+        Bar duration as a NumPy timedelta unit, by default 'h'
+    gap_rate : float, optional
+        Probability of a missing bar, by default 0.01
+    flat_rate : float, optional
+        Probability of a bar with open = high = low = close, by default 0.01
+    nan_rate : float, optional
+        Probability of a NaN field, by default 0.005
+    weekends : bool, optional
+        No bar from Friday 22:00 to Sunday 22:00 UTC, by default True
+
+    Returns
+    -------
+    pd.DataFrame
+        Bars with open, high, low, close, volume columns indexed by time
+    """
+    rng = np.random.default_rng(seed)
+    ohlcv = random_ohlcv(n_bars, seed=seed, freq=freq)
+
+    # * Bar times of an open market, some of them missing
+    step = np.timedelta64(1, freq).astype("timedelta64[ns]")
+    n_slots = int(n_bars * (1 + 2 * gap_rate) + 16)
+    if weekends:
+        n_slots = int(n_slots * 7 / 5) + int(np.timedelta64(2, "D") / step) + 1
+    slots = np.datetime64("2024-01-01", "ns") + np.arange(n_slots) * step
+    keep = rng.random(n_slots) >= gap_rate
+    if weekends:
+        keep &= FXCalendar().is_open(slots)
+    times = slots[keep][:n_bars]
+    assert len(times) == n_bars, "Not enough bar slots"
+    ohlcv.index = pd.DatetimeIndex(times, name="time")
+
+    # * Price jumps over the missing bars and closures
+    prices = ["open", "high", "low", "close"]
+    gaps = np.diff(times, prepend=times[0]) > step
+    jumps = np.cumsum(np.where(gaps, rng.normal(0, 3, n_bars), 0.0))
+    ohlcv[prices] = ohlcv[prices].to_numpy() + jumps[:, None]
+
+    # * Flat bars and NaN fields
+    flat = rng.random(n_bars) < flat_rate
+    for field in prices:
+        ohlcv.loc[flat, field] = ohlcv.loc[flat, "close"]
+    for field in ohlcv.columns:
+        ohlcv.loc[rng.random(n_bars) < nan_rate, field] = np.nan
+
+    return ohlcv
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest as pt
+
+from sk_fx.data.calendar import FXCalendar, Session
+from sk_fx.indicators.idtypes import TimeFrame
+from sk_fx.utils.test_utils import random_market
+
+
+def times(*values):
+    return np.array(values, dtype="datetime64[ns]")
+
+
+@pt.mark.calendar
+class TestCalendar:
+    """
+    Class for testing the FX trading calendar
+    """
+
+    def test_weekly_closure(self):
+        """
+        The market is closed from Friday 22:00 to Sunday 22:00 UTC
+        """
+        calendar = FXCalendar()
+        is_open = calendar.is_open(
+            times(
+                "2024-06-07T21:59",  # Friday
+                "2024-06-07T22:00",
+                "2024-06-08T12:00",
+                "2024-06-09T21:59",  # Sunday
+                "2024-06-09T22:00",
+            )
+        )
+        assert is_open.tolist() == [True, False, False, False, True]
+
+    def test_holidays(self):
+        """
+        A holiday closes its trading day, from the previous daily roll
+        """
+        calendar = FXCalendar(holidays=["2024-12-25", "2024-12-28"])
+        is_open = calendar.is_open(
+            times("2024-12-24T21:00", "2024-12-24T23:00", "2024-12-25T22:00")
+        )
+        assert is_open.tolist() == [True, False, True]
+        # * Saturday is not a trading day
+        assert len(calendar.holidays) == 1
+
+        start, end = times("2024-12-23T22:00"), times("2024-12-27T22:00")
+        assert calendar.expected_bars(start, end, TimeFrame.H1) == 3 * 24
+        assert FXCalendar().expected_bars(start, end, TimeFrame.H1) == 4 * 24
+
+    def test_missing_bars(self):
+        """
+        Missing bars are counted without the weekend closure
+        """
+        bar_times = times(
+            "2024-06-07T20:00",
+            "2024-06-07T21:00",
+            "2024-06-09T22:00",
+            "2024-06-10T01:00",
+        )
+        missing = FXCalendar().missing_bars(bar_times, TimeFrame.H1)
+        assert missing.tolist() == [0, 0, 0, 2]
+
+    def test_random_market(self):
+        """
+        The missing bars of a random market match its dropped slots, without
+        building the full calendar
+        """
+        ohlcv = random_market(5000, seed=4, gap_rate=0.02)
+        calendar = FXCalendar()
+        assert calendar.is_open(ohlcv.index).all()
+
+        missing = calendar.missing_bars(ohlcv.index, TimeFrame.H1)
+        span = calendar.expected_bars(ohlcv.index[0], ohlcv.index[-1], TimeFrame.H1)
+        assert missing.sum() == span + 1 - len(ohlcv)
+        assert 0 < missing.sum() < 0.05 * len(ohlcv)
+
+    def test_sessions(self):
+        """
+        Session flags overlap and are cleared while the market is closed
+        """
+        flags = FXCalendar().sessions(
+            times("2024-06-10T08:00", "2024-06-10T13:00", "2024-06-08T13:00")
+        )
+        assert flags[0] == Session.TOKYO | Session.LONDON
+        assert flags[1] == Session.LONDON | Session.NEW_YORK
+        assert flags[2] == 0
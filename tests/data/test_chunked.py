@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.data.chunked import calculate_chunked
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils.test_utils import random_ohlcv
+
+OSCILLATORS = [
+    (ChaikinOscillator(), {}),
+    (DeMarkerOscillator(), dict(average_demarker=True)),
+    (MACD(), {}),
+    (StochasticOscillator(), {}),
+    (RSIOscillator(), {}),
+]
+
+
+@pt.fixture
+def ohlcv():
+    ohlcv = random_ohlcv(10_000, seed=3)
+    ohlcv.iloc[[50, 51, 4000], ohlcv.columns.get_loc("high")] = np.nan
+    return ohlcv
+
+
+@pt.mark.chunked
+class TestChunkedCalculation:
+    """
+    Class for testing the block by block calculation with carried state
+    """
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    @pt.mark.parametrize("block_size", [1, 7, 1000, 20_000])
+    def test_memmap_source(self, tmp_path, ohlcv, oscillator, options, block_size):
+        """
+        Blocks read from memory-mapped files give the in-memory results
+        """
+        if block_size == 1:
+            ohlcv = ohlcv.iloc[:300]
+        for field in ohlcv.columns:
+            np.save(tmp_path / f"{field}.npy", ohlcv[field].to_numpy())
+
+        oscillator.ohlcv = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+        expected = np.asarray(oscillator.calculate(**options))
+
+        output = tmp_path / "result.npy"
+        result = calculate_chunked(
+            oscillator, tmp_path, block_size=block_size, output=output, **options
+        )
+
+        assert np.array_equal(np.load(output), result, equal_nan=True)
+        assert np.allclose(result, expected, rtol=1e-12, equal_nan=True)
+
+    def test_csv_source(self, tmp_path, ohlcv):
+        """
+        Blocks read from a CSV file give the in-memory results, trailing
+        blank lines and Windows line endings included
+        """
+        path = os.path.join(tmp_path, "ohlcv.csv")
+        expected = RSIOscillator(ohlcv=ohlcv).calculate()
+
+        for line_ending, trailer in [("\n", ""), ("\n", "\n\n"), ("\r\n", "\r\n")]:
+            ohlcv.to_csv(path, lineterminator=line_ending)
+            with open(path, "a", newline="") as file:
+                file.write(trailer)
+            result = calculate_chunked(RSIOscillator(), path, block_size=999)
+
+            assert result.shape == expected.shape
+            assert np.allclose(result, expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+    def test_normalized_chaikin(self, ohlcv):
+        """
+        Normalization needs the whole history and cannot run in blocks
+        """
+        source = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+        with pt.raises(ValueError):
+            calculate_chunked(ChaikinOscillator(), source, normalized=True)
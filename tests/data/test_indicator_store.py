@@ -0,0 +1,78 @@
+import numpy as np
+import pytest as pt
+
+pt.importorskip("pyarrow")
+
+from sk_fx.data.indicator_store import IndicatorStore
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+)
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+@pt.mark.indicator_store
+class TestIndicatorStore:
+    """
+    Class for testing the incremental persistence of indicator values
+    """
+
+    def test_incremental_updates(self, tmp_path):
+        """
+        Appending bars in several updates stores the full history values
+        """
+        ohlcv = random_ohlcv(5000)
+        store = IndicatorStore(str(tmp_path), max_segments=3)
+
+        appended = [
+            store.update("EURUSD", RSIOscillator(period=14), ohlcv.iloc[:end])
+            for end in (1000, 1000, 2500, 2501, 4000, 5000)
+        ]
+
+        stored = store.load("EURUSD", RSIOscillator(period=14))
+        expected = RSIOscillator(ohlcv=ohlcv, period=14).calculate()
+
+        assert appended == [1000, 0, 1500, 1, 1499, 1000]
+        assert stored.index.equals(ohlcv.index)
+        assert np.allclose(stored["value"], expected, rtol=1e-9, equal_nan=True)
+
+    def test_parameter_sets(self, tmp_path):
+        """
+        Parameter sets and options are stored separately
+        """
+        ohlcv = random_ohlcv(500, seed=1)
+        store = IndicatorStore(str(tmp_path))
+
+        store.update("EURUSD", DeMarkerOscillator(period=14), ohlcv)
+        store.update(
+            "EURUSD", DeMarkerOscillator(period=14), ohlcv, average_demarker=True
+        )
+        store.update("EURUSD", MACD(), ohlcv)
+
+        average = store.load(
+            "EURUSD", DeMarkerOscillator(period=14), average_demarker=True
+        )
+        macd = store.load("EURUSD", MACD())
+
+        assert np.allclose(
+            average["value"],
+            DeMarkerOscillator(ohlcv=ohlcv).calculate(average_demarker=True),
+            equal_nan=True,
+        )
+        assert list(macd.columns) == ["value_0", "value_1", "value_2"]
+        with pt.raises(FileNotFoundError):
+            store.load("EURUSD", DeMarkerOscillator(period=21))
+
+    def test_memory_mapped(self, tmp_path):
+        """
+        Stored values are read back from memory maps without copy
+        """
+        store = IndicatorStore(str(tmp_path))
+        store.update("EURUSD", RSIOscillator(), random_ohlcv(1000, seed=2))
+
+        table = store.table("EURUSD", RSIOscillator())
+
+        assert table.num_rows == 1000
+        assert table.column("value").chunk(0).buffers()[1].is_cpu
+        assert not table.column("value").chunk(0).buffers()[1].is_mutable
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest as pt
+
+from sk_fx.data.instruments import INSTRUMENTS, Instrument, InstrumentRegistry
+from sk_fx.strategy.signal_fusion import FibConfluence
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+@pt.mark.instruments
+class TestInstrumentRegistry:
+    """
+    Class for testing the instrument metadata table
+    """
+
+    def test_pip_conversion(self):
+        """
+        Prices and pips convert back and forth per symbol
+        """
+        symbols = ["EURUSD", "USDJPY", "XAUUSD"]
+
+        pips = INSTRUMENTS.to_pips(symbols, [0.0012, 0.12, 1.2])
+        assert np.allclose(pips, [12, 12, 120])
+        assert np.allclose(INSTRUMENTS.to_price(symbols, pips), [0.0012, 0.12, 1.2])
+
+        # * A panel pairs each row with its symbol
+        panel = np.array([[0.0001, 0.0002], [0.01, 0.02], [0.01, 0.02]])
+        assert np.allclose(INSTRUMENTS.to_pips(symbols, panel), [[1, 2]] * 3)
+
+    def test_within_pips(self):
+        """
+        The tolerance check matches the scalar pip value version
+        """
+        rows = INSTRUMENTS.index(["USOIL", "XAUUSD", "USOIL"])
+        real = np.array([92.430, 2032.85, 84.656])
+        calculated = np.array([92.432, 2032.90, 84.646])
+
+        assert list(INSTRUMENTS.within_pips(rows, real, calculated)) == [
+            True,
+            False,
+            False,
+        ]
+        assert INSTRUMENTS.within_pips("USOIL", 92.430, 92.432)
+
+    def test_position_math(self):
+        """
+        Pip values, notional values and profits use the contract sizes
+        """
+        symbols = ["EURUSD", "XAUUSD"]
+
+        assert np.allclose(INSTRUMENTS.pip_value(symbols), [10, 1])
+        assert np.allclose(INSTRUMENTS.pip_value(symbols, [0.5, 2]), [5, 2])
+        assert np.allclose(
+            INSTRUMENTS.position_value(symbols, [1.1, 2000], 0.1), [11_000, 20_000]
+        )
+        assert np.allclose(
+            INSTRUMENTS.profit(symbols, [1.1, 2000], [1.101, 1990], [1, -1]),
+            [100, 1000],
+        )
+
+    def test_register(self):
+        """
+        Registering a known symbol replaces its row
+        """
+        registry = InstrumentRegistry(
+            [Instrument("EURUSD", 0.0001, 1000, "USD", "EUR")]
+        )
+        registry.register(
+            Instrument("EURUSD", 0.0001, 100_000, "USD", "EUR"),
+            Instrument("BTCUSD", 1, 1, "USD", "BTC"),
+        )
+
+        assert len(registry) == 2
+        assert registry["EURUSD"].contract_size == 100_000
+        assert registry.quote_currencies[registry.index("BTCUSD")] == "USD"
+        with pt.raises(KeyError):
+            registry.index(["EURUSD", "UNKNOWN"])
+
+        # * One by one registrations grow the columns in place
+        for i in range(5000):
+            registry.register(Instrument(f"SYM{i}", 0.01, 100, "USD", f"S{i}"))
+        assert len(registry) == len(registry.pip_sizes) == 5002
+        assert registry["SYM4999"].base_currency == "S4999"
+        assert registry["EURUSD"].contract_size == 100_000
+
+    def test_fib_confluence_pips(self):
+        """
+        A tolerance in pips scales with the pip size of each panel row
+        """
+        frames = [random_ohlcv(300, seed=seed) for seed in range(2)]
+        panel = {
+            field: np.stack([frame[field].to_numpy() for frame in frames])
+            for field in frames[0].columns
+        }
+
+        in_pips = FibConfluence(tolerance=30, symbols=["EURUSD", "USDJPY"])
+        proximity = in_pips.compute(panel)
+
+        np.testing.assert_allclose(
+            proximity[0],
+            FibConfluence(tolerance=0.003).compute(frames[0]),
+            equal_nan=True,
+        )
+        np.testing.assert_allclose(
+            proximity[1],
+            FibConfluence(tolerance=0.3).compute(frames[1]),
+            equal_nan=True,
+        )
@@ -0,0 +1,155 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.data.replay import (
+    ReplayHarness,
+    fib_stage,
+    oscillator_stage,
+    read_bars,
+    read_ohlcv,
+    read_tick_bars,
+    strategy_stage,
+)
+from sk_fx.data.tick_aggregator import TickAggregator
+from sk_fx.indicators.idtypes import TimeFrame
+from sk_fx.indicators.oscillators.divergence_oscillator import MACD, RSIOscillator
+from sk_fx.strategy.signal_fusion import FibConfluence, Rule, SignalFusion
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+@pt.mark.replay
+class TestReplay:
+    """
+    Class for testing the market replay harness
+    """
+
+    def test_replay_bars(self, tmp_path):
+        """
+        Replayed stages give the batch values and every stage is measured
+        """
+        ohlcv = random_ohlcv(600)
+        ohlcv.to_csv(tmp_path / "bars.csv")
+
+        rsi, macd = [], []
+        rsi_stage = oscillator_stage(RSIOscillator())
+        macd_stage = oscillator_stage(MACD())
+        fib = FibConfluence(lookback=30, tolerance=0.5)
+        fusion = SignalFusion([Rule("long", 1, fib > 0, {fib: 1.0})])
+        harness = ReplayHarness(
+            {
+                "rsi": lambda bar: rsi.append(rsi_stage(bar)[0]),
+                "macd": lambda bar: macd.append(macd_stage(bar)[0][0]),
+                "fib": fib_stage(lookback=30, tolerance=0.5),
+                "strategy": strategy_stage(fusion),
+            },
+            memory_every=100,
+        )
+
+        report = harness.run(read_bars(tmp_path / "bars.csv"))
+        logging.info(report.summary())
+
+        assert report.n_bars == 600
+        np.testing.assert_allclose(
+            rsi, RSIOscillator(ohlcv=ohlcv).calculate(), equal_nan=True
+        )
+        np.testing.assert_allclose(
+            macd, MACD(ohlcv=ohlcv).calculate()[0], equal_nan=True
+        )
+        summary = report.to_dict()
+        assert set(summary["latency_us"]) == {"rsi", "macd", "fib", "strategy", "total"}
+        assert summary["capacity"] >= summary["bars_per_second"] > 0
+        assert report.memory.shape == (7, 2) and summary["peak_memory"] > 0
+
+    def test_speed(self, tmp_path):
+        """
+        An accelerated replay follows the bar times divided by the speed
+        """
+        ohlcv = random_ohlcv(21, freq="s")
+        ohlcv.to_parquet(tmp_path / "bars.parquet")
+
+        report = ReplayHarness(
+            {"rsi": oscillator_stage(RSIOscillator())}, speed=100
+        ).run(read_bars(tmp_path / "bars.parquet", time_frame=TimeFrame.M1))
+
+        # * 20 seconds of bars at 100x
+        assert 0.19 <= report.elapsed < 1
+        assert report.bars_per_second < 150
+
+        # * Bars without a time are replayed unpaced
+        bars = list(read_bars(tmp_path / "bars.parquet", time_frame=TimeFrame.M1))
+        bars[0] = bars[0]._replace(time=np.datetime64("NaT", "ns"))
+        bars[5] = bars[5]._replace(time=np.datetime64("NaT", "ns"))
+        report = ReplayHarness(
+            {"rsi": oscillator_stage(RSIOscillator())}, speed=100
+        ).run(bars)
+        assert report.n_bars == 21
+
+    def test_replay_ticks(self, tmp_path):
+        """
+        Tick files are aggregated into the bars of the time frame
+        """
+        rng = np.random.default_rng(0)
+        time = np.datetime64("2024-01-01", "ns") + np.cumsum(
+            rng.integers(1, 5_000_000_000, 5000)
+        ).astype("timedelta64[ns]")
+        bid = 1.1 + np.cumsum(rng.normal(0, 1e-5, 5000))
+        ticks = pd.DataFrame(
+            {"time": time, "bid": bid, "ask": bid + 1e-4, "volume": 1.0}
+        )
+        ticks.to_csv(tmp_path / "ticks.csv", index=False)
+
+        (tmp_path / "ticks").mkdir()
+        for field in ("time", "bid", "ask"):
+            np.save(tmp_path / "ticks" / f"{field}.npy", ticks[field].to_numpy())
+
+        aggregator = TickAggregator(time_frames=(TimeFrame.M1,))
+        expected = aggregator.update(time, bid, bid + 1e-4, 1.0) + aggregator.flush()
+        for path in ("ticks.csv", "ticks"):
+            replayed = list(read_tick_bars(tmp_path / path, block_size=700))
+
+            assert [bar.time for bar in replayed] == [bar.time for bar in expected]
+            assert np.allclose(
+                [bar.close for bar in replayed], [bar.close for bar in expected]
+            )
+
+    def test_npy_directory(self, tmp_path):
+        """
+        Bars of a `.npy` directory carry the times of `time.npy`
+        """
+        ohlcv = random_ohlcv(21, freq="s")
+        for field in ohlcv.columns:
+            np.save(tmp_path / f"{field}.npy", ohlcv[field].to_numpy())
+        np.save(tmp_path / "time.npy", ohlcv.index.to_numpy().astype("datetime64[s]"))
+
+        history = read_ohlcv(tmp_path, block_size=8)
+        np.testing.assert_array_equal(history["time"], ohlcv.index.to_numpy())
+        np.testing.assert_array_equal(history["close"], ohlcv["close"].to_numpy())
+
+        bars = list(read_bars(tmp_path, block_size=8))
+        assert [bar.time for bar in bars] == list(ohlcv.index.to_numpy())
+
+        # * The times pace the replay: 20 seconds of bars at 100x
+        report = ReplayHarness(
+            {"rsi": oscillator_stage(RSIOscillator())}, speed=100
+        ).run(iter(bars))
+        assert report.elapsed >= 0.19
+
+    def test_regressions(self, tmp_path):
+        """
+        Slower stages than the baseline are reported
+        """
+        ohlcv = random_ohlcv(200)
+        ohlcv.to_csv(tmp_path / "bars.csv")
+        report = ReplayHarness({"rsi": oscillator_stage(RSIOscillator())}).run(
+            read_bars(tmp_path / "bars.csv")
+        )
+
+        baseline = report.to_dict()
+        assert report.regressions(baseline) == []
+
+        baseline["capacity"] *= 10
+        baseline["latency_us"]["rsi"]["p95"] /= 10
+        assert len(report.regressions(baseline)) == 2
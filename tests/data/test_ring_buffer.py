@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.data.ring_buffer import OHLCVRingBuffer
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils.indicators import TA
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def fill_buffer(buffer: OHLCVRingBuffer, ohlcv: pd.DataFrame) -> None:
+    buffer.extend(ohlcv.index.values, *(ohlcv[field].values for field in ohlcv.columns))
+
+
+@pt.mark.ring_buffer
+class TestOHLCVRingBuffer:
+    """
+    Class for testing the bounded OHLCV ring buffer
+    """
+
+    def test_wrap_around(self):
+        """
+        The buffer keeps only the latest bars, in order, whatever the writes
+        """
+        ohlcv = random_ohlcv(250)
+
+        buffer = OHLCVRingBuffer(capacity=100)
+        fill_buffer(buffer, ohlcv.iloc[:130])
+        for time, bar in ohlcv.iloc[130:170].iterrows():
+            buffer.append(time, *bar)
+        fill_buffer(buffer, ohlcv.iloc[170:250])
+
+        assert len(buffer) == 100
+        pd.testing.assert_frame_equal(buffer.to_frame(), ohlcv.iloc[-100:])
+        pd.testing.assert_frame_equal(buffer.to_frame(10), ohlcv.iloc[-10:])
+
+    def test_zero_copy_views(self):
+        """
+        Windows and field series are contiguous views on the buffer memory
+        """
+        buffer = OHLCVRingBuffer(capacity=50)
+        fill_buffer(buffer, random_ohlcv(73))
+
+        window = buffer.window(20)
+        assert window["close"].flags["C_CONTIGUOUS"]
+        assert np.shares_memory(window["close"], buffer._data)
+        assert np.shares_memory(buffer["high"].to_numpy(), buffer._data)
+
+        with pt.raises(AttributeError):
+            buffer.extra = 1
+
+    def test_oscillators_accept_buffer(self):
+        """
+        Oscillators and TA give the same values on a buffer and on a data frame
+        """
+        ohlcv = random_ohlcv(400, seed=2)
+        buffer = OHLCVRingBuffer(capacity=300)
+        fill_buffer(buffer, ohlcv)
+        expected_ohlcv = ohlcv.iloc[-300:]
+
+        for oscillator in [
+            ChaikinOscillator,
+            DeMarkerOscillator,
+            StochasticOscillator,
+            RSIOscillator,
+        ]:
+            pd.testing.assert_series_equal(
+                oscillator(ohlcv=buffer).calculate(),
+                oscillator(ohlcv=expected_ohlcv).calculate(),
+                check_names=False,
+            )
+
+        for line, expected_line in zip(
+            MACD(ohlcv=buffer).calculate(), MACD(ohlcv=expected_ohlcv).calculate()
+        ):
+            pd.testing.assert_series_equal(line, expected_line, check_names=False)
+
+        pd.testing.assert_series_equal(
+            TA.ma(buffer, length=9),
+            TA.ma(expected_ohlcv, length=9),
+            check_names=False,
+        )
@@ -0,0 +1,170 @@
+import copy
+import logging
+import time
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.data.snapshot import (
+    PeriodicSnapshot,
+    dumps_snapshot,
+    load_snapshot,
+    loads_snapshot,
+    save_snapshot,
+    verify_restore,
+)
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.strategy.signal_fusion import FibConfluence, Indicator, Rule, SignalFusion
+from sk_fx.utils.test_utils import random_ohlcv
+
+OSCILLATORS = [
+    (ChaikinOscillator(), {}),
+    (DeMarkerOscillator(), dict(average_demarker=True)),
+    (MACD(), {}),
+    (StochasticOscillator(), {}),
+    (RSIOscillator(), {}),
+]
+
+
+def blocks(n_bars: int, splits, seed: int = 0):
+    ohlcv = random_ohlcv(n_bars, seed=seed)
+    fields = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+    bounds = [0, *splits, n_bars]
+
+    return [
+        {field: values[start:stop] for field, values in fields.items()}
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+@pt.mark.snapshot
+class TestSnapshot:
+    """
+    Class for testing the snapshots of streaming indicator states
+    """
+
+    def test_round_trip(self):
+        """
+        Nested numbers, lists, tuples and arrays survive a snapshot
+        """
+        state = {
+            "ema": {"count": [3, 0], "value": np.array([1.5, np.nan])},
+            "wilder": {"seen": 14, "value": 0.25, "history": np.arange(6.0)},
+            "window": {"tail": np.arange(12, dtype=np.float32).reshape(3, 4)},
+            "pending": (np.int64(7), None, "EURUSD"),
+        }
+
+        snapshot = loads_snapshot(
+            dumps_snapshot(state, metadata={"last_time": "2024-01-01T00:00"})
+        )
+
+        assert snapshot.metadata == {"last_time": "2024-01-01T00:00"}
+        assert snapshot.state["ema"]["count"] == [3, 0]
+        assert snapshot.state["pending"] == (7, None, "EURUSD")
+        np.testing.assert_array_equal(snapshot.state["ema"]["value"], [1.5, np.nan])
+        np.testing.assert_array_equal(
+            snapshot.state["window"]["tail"], state["window"]["tail"]
+        )
+        assert snapshot.state["window"]["tail"].dtype == np.float32
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_restore_resumes(self, oscillator, options, tmp_path):
+        """
+        A restored oscillator produces the same next values as a live one
+        """
+        first, second, third = blocks(3000, [1800, 1801])
+
+        state = {}
+        live = copy.copy(oscillator)
+        live.ohlcv = first
+        live.calculate(state=state, **options)
+        save_snapshot(tmp_path / "state.snap", state)
+
+        restored = load_snapshot(tmp_path / "state.snap").state
+        assert verify_restore(oscillator, state, second, **options)
+        for block in (second, third):
+            expected = copy.copy(oscillator)
+            expected.ohlcv = block
+            resumed = copy.copy(oscillator)
+            resumed.ohlcv = block
+            np.testing.assert_array_equal(
+                resumed.calculate(state=restored, **options),
+                expected.calculate(state=state, **options),
+            )
+
+    def test_fast_restore(self, tmp_path):
+        """
+        Universe wide states load in milliseconds
+        """
+        n_symbols = 3000
+        ohlcv = random_ohlcv(300)
+        panel = {
+            field: np.tile(ohlcv[field].to_numpy(), (n_symbols, 1))
+            for field in ohlcv.columns
+        }
+        states = {"rsi": {}, "macd": {}, "stochastic": {}}
+        RSIOscillator(ohlcv=panel).calculate(state=states["rsi"])
+        MACD(ohlcv=panel).calculate(state=states["macd"])
+        StochasticOscillator(ohlcv=panel).calculate(state=states["stochastic"])
+        save_snapshot(tmp_path / "universe.snap", states)
+
+        start = time.perf_counter()
+        restored = load_snapshot(tmp_path / "universe.snap").state
+        elapsed = time.perf_counter() - start
+
+        logging.info(f"Restored {n_symbols} symbols in {elapsed * 1e3:.2f} ms")
+        np.testing.assert_array_equal(
+            restored["rsi"]["avg_gain"]["value"], states["rsi"]["avg_gain"]["value"]
+        )
+
+    def test_streaming_fusion(self):
+        """
+        A signal stream resumes from the snapshot of its feature states
+        """
+        ohlcv = random_ohlcv(400, seed=2)
+        rsi = Indicator(RSIOscillator())
+        fib = FibConfluence(lookback=30, tolerance=0.5)
+        fusion = SignalFusion([Rule("long", 1, (fib > 0) & (rsi < 50), {fib: 1.0})])
+
+        live = fusion.stream()
+        bars = list(zip(ohlcv.index, ohlcv.to_numpy()))
+        for time_, bar in bars[:300]:
+            live.update(time_, *bar)
+        resumed = fusion.stream(loads_snapshot(dumps_snapshot(live.states)).state)
+
+        for time_, bar in bars[300:]:
+            assert resumed.update(time_, *bar) == live.update(time_, *bar)
+
+    def test_periodic(self, tmp_path):
+        """
+        States are saved every given number of bars
+        """
+        path = tmp_path / "rsi.snap"
+        snapshots = PeriodicSnapshot(path, every_bars=500)
+
+        state, saved = {}, []
+        for i, block in enumerate(blocks(2000, range(100, 2000, 100))):
+            RSIOscillator(ohlcv=block).calculate(state=state)
+            if snapshots.update(state, n_bars=len(block["close"]), metadata={"i": i}):
+                saved.append(i)
+
+        assert saved == [4, 9, 14, 19]
+        assert load_snapshot(path).metadata == {"i": 19}
+
+    def test_invalid(self):
+        """
+        Foreign data and newer versions are rejected
+        """
+        data = bytearray(dumps_snapshot({"value": 1.0}))
+
+        with pt.raises(ValueError):
+            loads_snapshot(b"not a snapshot")
+        data[8] = 99
+        with pt.raises(ValueError):
+            loads_snapshot(bytes(data))
@@ -0,0 +1,149 @@
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.data.tick_aggregator import TickAggregator
+from sk_fx.indicators.idtypes import TimeFrame
+
+
+def random_ticks(n_ticks: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    tick_time = np.datetime64("2024-01-01", "ns") + np.cumsum(
+        rng.integers(0, 400_000_000, n_ticks)
+    ).astype("timedelta64[ns]")
+    mid = 1.1 + np.cumsum(rng.normal(0, 1e-5, n_ticks))
+    volume = rng.random(n_ticks)
+
+    return tick_time, mid - 5e-5, mid + 5e-5, volume
+
+
+def same_events(events, other_events) -> bool:
+    return len(events) == len(other_events) and all(
+        event[:2] == other[:2] and np.allclose(event[2:], other[2:], rtol=1e-12, atol=0)
+        for event, other in zip(events, other_events)
+    )
+
+
+@pt.mark.tick_aggregator
+class TestTickAggregator:
+    """
+    Class for testing the tick to bar aggregation
+    """
+
+    def test_bars_match_pandas_resample(self):
+        """
+        Bars of every time frame must match a pandas resample of the mid price
+        """
+        tick_time, bid, ask, volume = random_ticks(200_000)
+
+        aggregator = TickAggregator(capacity=10_000)
+        for start in range(0, len(tick_time), 30_000):
+            block = slice(start, start + 30_000)
+            aggregator.update(tick_time[block], bid[block], ask[block], volume[block])
+        aggregator.flush()
+
+        ticks = pd.DataFrame(
+            {"price": (bid + ask) / 2, "volume": volume}, index=tick_time
+        )
+        for time_frame, rule in [
+            (TimeFrame.M1, "1min"),
+            (TimeFrame.M15, "15min"),
+            (TimeFrame.H4, "4h"),
+            (TimeFrame.D1, "1D"),
+        ]:
+            expected = ticks["price"].resample(rule).ohlc()
+            expected["volume"] = ticks["volume"].resample(rule).sum()
+            expected = expected.dropna()
+
+            bars = aggregator.bars(time_frame).to_frame()
+            logging.debug(f"{time_frame}: {len(bars)} bars")
+
+            assert bars.index.equals(expected.index)
+            assert np.allclose(bars.values, expected.values)
+
+    def test_weekly_bars_open_with_fx_week(self):
+        """
+        Weekly bars open on Sunday 22:00 UTC, the same as a shifted resample
+        """
+        n_ticks = 100_000
+        rng = np.random.default_rng(2)
+        tick_time = np.datetime64("2024-01-05", "ns") + np.sort(
+            rng.integers(0, 16 * 24 * 3600 * 10**9, n_ticks)
+        ).astype("timedelta64[ns]")
+        mid = 1.1 + np.cumsum(rng.normal(0, 1e-5, n_ticks))
+
+        aggregator = TickAggregator((TimeFrame.H1, TimeFrame.D1, TimeFrame.W1))
+        aggregator.update(tick_time, mid, mid)
+        aggregator.flush()
+
+        bars = aggregator.bars(TimeFrame.W1).to_frame()
+        expected = (
+            pd.Series(mid, index=tick_time)
+            .resample("168h", origin=pd.Timestamp("2023-12-31 22:00"))
+            .ohlc()
+        )
+
+        assert list(bars.index) == list(
+            pd.to_datetime(["2023-12-31 22:00", "2024-01-07 22:00", "2024-01-14 22:00"])
+        )
+        assert bars.index.equals(expected.index)
+        assert np.allclose(bars[["open", "high", "low", "close"]], expected)
+        # * Daily bars stay on the UTC day
+        assert (aggregator.bars(TimeFrame.D1).to_frame().index.hour == 0).all()
+
+    def test_single_ticks_match_blocks(self):
+        """
+        Pushing ticks one by one must emit the same bar-close events as a block
+        """
+        tick_time, bid, ask, volume = random_ticks(5_000, seed=1)
+
+        block_aggregator = TickAggregator()
+        block_events = block_aggregator.update(tick_time, bid, ask, volume)
+
+        tick_aggregator = TickAggregator()
+        received = []
+        tick_aggregator.subscribe(received.append, time_frames=[TimeFrame.M5])
+        tick_events = []
+        for i in range(len(tick_time)):
+            tick_events += tick_aggregator.update(
+                tick_time[i], bid[i], ask[i], volume[i]
+            )
+
+        assert same_events(tick_events, block_events)
+        assert same_events(
+            received, [e for e in block_events if e.time_frame is TimeFrame.M5]
+        )
+        assert same_events(
+            [tick_aggregator.current_bar(TimeFrame.M1)],
+            [block_aggregator.current_bar(TimeFrame.M1)],
+        )
+
+    def test_unordered_ticks(self):
+        """
+        Ticks going back in time are rejected
+        """
+        aggregator = TickAggregator()
+        aggregator.update(np.datetime64("2024-01-01T00:01"), 1.1, 1.1002)
+
+        with pt.raises(ValueError):
+            aggregator.update(np.datetime64("2024-01-01T00:00"), 1.1, 1.1002)
+
+    def test_throughput(self):
+        """
+        Log the block ingestion throughput
+        """
+        tick_time, bid, ask, volume = random_ticks(1_000_000)
+
+        aggregator = TickAggregator()
+        start = time.perf_counter()
+        for block in range(0, len(tick_time), 100_000):
+            block = slice(block, block + 100_000)
+            aggregator.update(tick_time[block], bid[block], ask[block], volume[block])
+        elapsed = time.perf_counter() - start
+
+        logging.info(f"Ingested {len(tick_time) / elapsed:,.0f} ticks/sec")
+
+        assert len(aggregator.bars(TimeFrame.M1)) > 0
@@ -0,0 +1,183 @@
+import logging
+import time
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.oscillators.adaptive_oscillator import (
+    AdaptiveDeMarkerOscillator,
+    AdaptiveRSIOscillator,
+    AdaptiveStochasticOscillator,
+)
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    DeMarkerOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils import kernels
+from sk_fx.utils.test_utils import random_market, random_ohlcv
+
+OSCILLATORS = [
+    AdaptiveRSIOscillator,
+    AdaptiveStochasticOscillator,
+    AdaptiveDeMarkerOscillator,
+]
+
+
+def field_arrays(ohlcv) -> dict:
+    return {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+
+@pt.mark.adaptive_oscillators
+class TestAdaptiveOscillators:
+    """
+    Class for testing the adaptive oscillators and their kernels
+    """
+
+    def test_adaptive_average(self):
+        """
+        The closed form matches the recursion, NaN inputs and factors skipped
+        """
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=3000).cumsum()
+        alpha = rng.uniform(0.02, 0.7, size=3000)
+        x[[5, 700]] = np.nan
+        alpha[[9, 1500]] = np.nan
+
+        expected, value, count = np.full(3000, np.nan), np.nan, 0
+        for t in range(3000):
+            if np.isfinite(x[t]) and np.isfinite(alpha[t]):
+                value = x[t] if count == 0 else alpha[t] * x[t] + (1 - alpha[t]) * value
+                count += 1
+            if count >= 4:
+                expected[t] = value
+
+        result = kernels.adaptive_average(x, alpha, min_periods=4)
+        np.testing.assert_allclose(result, expected, rtol=1e-10)
+
+        state, blocks = {}, []
+        for start in range(0, 3000, 211):
+            block = slice(start, start + 211)
+            blocks.append(
+                kernels.adaptive_average(
+                    x[block], alpha[block], min_periods=4, state=state
+                )
+            )
+        np.testing.assert_allclose(np.concatenate(blocks), expected, rtol=1e-10)
+
+        with pt.raises(ValueError):
+            kernels.adaptive_average(x, np.ones(3000))
+
+    def test_adaptive_rolling(self):
+        """
+        Windows of a length per bar match a direct slice, also over the
+        valid bars of a panel
+        """
+        rng = np.random.default_rng(1)
+        x = rng.normal(size=(2, 1000)).cumsum(axis=-1)
+        windows = rng.integers(1, 20, size=(2, 1000)).astype(float)
+        valid = rng.random((2, 1000)) > 0.1
+
+        result = kernels.adaptive_rolling_max(x, windows, 19, valid=valid)
+        for row in range(2):
+            values, lengths = x[row, valid[row]], windows[row, valid[row]]
+            expected = [
+                values[t + 1 - int(length) : t + 1].max() if t + 1 >= length else np.nan
+                for t, length in enumerate(lengths)
+            ]
+            np.testing.assert_array_equal(result[row, valid[row]], expected)
+            assert np.isnan(result[row, ~valid[row]]).all()
+
+        state, blocks = {}, []
+        for start in range(0, 1000, 97):
+            block = (..., slice(start, start + 97))
+            blocks.append(
+                kernels.adaptive_rolling_max(
+                    x[block], windows[block], 19, state=state, valid=valid[block]
+                )
+            )
+        np.testing.assert_array_equal(np.concatenate(blocks, axis=-1), result)
+
+    @pt.mark.parametrize(
+        "adaptive, fixed, period",
+        [
+            (AdaptiveStochasticOscillator, StochasticOscillator(k_length=14), 14),
+            (AdaptiveDeMarkerOscillator, DeMarkerOscillator(period=9), 9),
+        ],
+    )
+    def test_fixed_period_range(self, adaptive, fixed, period):
+        """
+        A period range of one period gives the fixed-period oscillator
+        """
+        fields = field_arrays(random_ohlcv(3000, seed=2))
+        fixed.ohlcv = fields
+
+        result = adaptive(ohlcv=fields, min_period=period, max_period=period)
+        np.testing.assert_allclose(
+            result.calculate(), fixed.calculate(), rtol=1e-12, equal_nan=True
+        )
+
+    @pt.mark.parametrize("oscillator", OSCILLATORS)
+    @pt.mark.parametrize("measure", ["er", "atr"])
+    def test_chunked(self, oscillator, measure):
+        """
+        Block by block results equal the single pass, on a gappy market
+        """
+        ohlcv = random_market(4000, seed=3)
+        expected = oscillator(ohlcv=ohlcv, measure=measure).calculate()
+        assert expected.index.equals(ohlcv.index)
+        assert expected.notna().mean() > 0.95
+
+        fields, state, blocks = field_arrays(ohlcv), {}, []
+        for start in range(0, 4000, 333):
+            block = {
+                field: values[start : start + 333] for field, values in fields.items()
+            }
+            blocks.append(
+                oscillator(ohlcv=block, measure=measure).calculate(state=state)
+            )
+        np.testing.assert_allclose(
+            np.concatenate(blocks), expected.to_numpy(), rtol=1e-9, equal_nan=True
+        )
+
+    @pt.mark.parametrize("measure", ["er", "atr"])
+    def test_periods(self, measure):
+        """
+        The period shortens in a trend (efficiency ratio) or as the
+        volatility expands (ATR), and stays within its range
+        """
+        ohlcv = random_ohlcv(3000, seed=4)
+        prices = ["open", "high", "low", "close"]
+        moves = ohlcv[prices].iloc[2500:] - ohlcv["close"].iloc[2500]
+        if measure == "er":
+            moves += np.linspace(0, 1000, 500)[:, None]
+        else:
+            moves *= 3
+        ohlcv.loc[ohlcv.index[2500:], prices] = ohlcv["close"].iloc[2500] + moves
+
+        oscillator = AdaptiveRSIOscillator(ohlcv=ohlcv, measure=measure)
+        periods = oscillator.periods()
+        known = periods[~np.isnan(periods)]
+        assert known.min() >= 7 and known.max() <= 28
+        # * The ATR ratio returns to 1/2 once the long ATR catches up
+        assert periods[2510:2560].mean() < periods[500:2500].mean() - 1
+
+    def test_one_pass_cost(self):
+        """
+        One adaptive Stochastic costs about the fixed-period set it replaces
+        """
+        fields = field_arrays(random_ohlcv(200_000, seed=5))
+
+        start = time.perf_counter()
+
+        for k_length in range(7, 29, 3):
+            StochasticOscillator(ohlcv=fields, k_length=k_length).calculate()
+        fixed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        AdaptiveStochasticOscillator(ohlcv=fields).calculate()
+        adaptive = time.perf_counter() - start
+
+        logging.info(
+            f"8 fixed periods {fixed * 1e3:.1f} ms, adaptive {adaptive * 1e3:.1f} ms"
+        )
+        assert adaptive < 2 * fixed
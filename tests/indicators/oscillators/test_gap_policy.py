@@ -0,0 +1,103 @@
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.idtypes import GapPolicy
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    MACD,
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils.test_utils import random_market
+
+OSCILLATORS = [
+    (ChaikinOscillator, {}),
+    (DeMarkerOscillator, dict(average_demarker=True)),
+    (StochasticOscillator, {}),
+    (MACD, {}),
+    (RSIOscillator, {}),
+]
+
+
+def values(result) -> np.ndarray:
+    if isinstance(result, tuple):
+        return np.stack([np.asarray(line) for line in result])
+
+    return np.asarray(result)
+
+
+@pt.mark.gap_policy
+class TestGapPolicy:
+    """
+    Class for testing the NaN gap policies of the oscillators
+    """
+
+    def test_rsi_nan(self):
+        """
+        RSI recovers after a NaN close, by default skipped
+        """
+        ohlcv = random_market(3000, seed=1, nan_rate=0.0)
+        ohlcv.iloc[500, ohlcv.columns.get_loc("close")] = np.nan
+
+        rsi = RSIOscillator(ohlcv=ohlcv).calculate()
+        assert RSIOscillator().gap_policy is GapPolicy.SKIP
+        assert np.isnan(rsi.iloc[500]) and rsi.iloc[501:].notna().all()
+
+        propagated = RSIOscillator(ohlcv=ohlcv, gap_policy="propagate").calculate()
+        assert propagated.iloc[501:].isna().all()
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_skip(self, oscillator, options):
+        """
+        Skipping equals the calculation over the bars without NaN, in both
+        paths and panels
+        """
+        ohlcv = random_market(4000, seed=2)
+        skipping = oscillator(gap_policy=GapPolicy.SKIP)
+        valid = ohlcv[list(skipping.input_fields)].notna().all(axis=1).to_numpy()
+
+        compressed = oscillator(ohlcv=ohlcv[valid], gap_policy="propagate")
+        expected = np.full(
+            (3, len(ohlcv)) if oscillator is MACD else len(ohlcv), np.nan
+        )
+        expected[..., valid] = values(compressed.calculate(**options))
+
+        skipping.ohlcv = ohlcv
+        np.testing.assert_allclose(values(skipping.calculate(**options)), expected)
+
+        fields = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+        skipping.ohlcv = fields
+        result = values(skipping.calculate(**options))
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+        skipping.ohlcv = {
+            field: np.stack([column, column[::-1]]) for field, column in fields.items()
+        }
+        panel = values(skipping.calculate(**options))
+        np.testing.assert_allclose(panel[..., 0, :], expected, rtol=1e-9)
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_ffill_chunked(self, oscillator, options):
+        """
+        Forward filling equals the calculation over the filled bars, also
+        block by block
+        """
+        ohlcv = random_market(3000, seed=3, nan_rate=0.01)
+        fields = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+        filled = {field: ohlcv[field].ffill().to_numpy() for field in ohlcv.columns}
+
+        expected = values(oscillator(ohlcv=filled).calculate(**options))
+        result = values(
+            oscillator(ohlcv=fields, gap_policy="ffill").calculate(**options)
+        )
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+        state, blocks = {}, []
+        for start in range(0, 3000, 401):
+            block = {
+                field: column[start : start + 401] for field, column in fields.items()
+            }
+            oscillator_block = oscillator(ohlcv=block, gap_policy=GapPolicy.FFILL)
+            blocks.append(values(oscillator_block.calculate(state=state, **options)))
+        np.testing.assert_allclose(np.concatenate(blocks, axis=-1), expected, rtol=1e-9)
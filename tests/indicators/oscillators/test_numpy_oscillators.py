@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    ChaikinOscillator,
+    DeMarkerOscillator,
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils.test_utils import random_ohlcv
+
+OSCILLATORS = [
+    (ChaikinOscillator, {}),
+    (ChaikinOscillator, dict(normalized=True)),
+    (DeMarkerOscillator, {}),
+    (DeMarkerOscillator, dict(average_demarker=True)),
+    (StochasticOscillator, {}),
+    (RSIOscillator, {}),
+]
+
+
+def field_arrays(ohlcv: pd.DataFrame) -> dict:
+    return {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+
+@pt.mark.numpy_oscillators
+class TestNumpyOscillators:
+    """
+    Class for testing the NumPy path of the divergence oscillators
+    """
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_numpy_matches_pandas(self, oscillator, options):
+        """
+        Arrays per field give the same values as the data frame path
+        """
+        ohlcv = random_ohlcv(3000)
+        ohlcv.iloc[100, ohlcv.columns.get_loc("high")] = np.nan
+
+        expected = oscillator(ohlcv=ohlcv).calculate(**options)
+        result = oscillator(ohlcv=field_arrays(ohlcv)).calculate(**options)
+
+        assert isinstance(result, np.ndarray)
+        assert np.allclose(result, expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+    def test_macd_out(self):
+        """
+        MACD writes its three lines into the preallocated arrays
+        """
+        ohlcv = random_ohlcv(2000, seed=1)
+        out = np.empty((3, len(ohlcv)))
+
+        lines = MACD(ohlcv=ohlcv).calculate(out=out)
+        expected = MACD(ohlcv=ohlcv).calculate()
+
+        for line, out_line, expected_line in zip(lines, out, expected):
+            assert np.shares_memory(line, out_line)
+            assert np.allclose(line, expected_line, rtol=1e-9, equal_nan=True)
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_float32_out(self, oscillator, options):
+        """
+        Float32 buffers are used without copy and filled in place
+        """
+        ohlcv = random_ohlcv(2000, seed=2).astype(np.float32)
+        fields = {
+            field: memoryview(values) for field, values in field_arrays(ohlcv).items()
+        }
+        out = np.empty(len(ohlcv), dtype=np.float32)
+
+        result = oscillator(ohlcv=fields).calculate(
+            out=out, dtype=np.float32, **options
+        )
+        expected = oscillator(ohlcv=ohlcv.astype(np.float64)).calculate(**options)
+        scale = np.nanmax(np.abs(expected))
+
+        assert result is out
+        assert np.allclose(result, expected, rtol=0, atol=1e-4 * scale, equal_nan=True)
@@ -0,0 +1,165 @@
+import logging
+import time
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.candle_patterns import (
+    CandlePattern,
+    candle_patterns,
+    pattern_counts,
+    pattern_names,
+)
+from sk_fx.strategy.signal_fusion import CandlePatterns, Rule, SignalFusion
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def reference_patterns(o, h, l, c):
+    """
+    Bar by bar definitions of the patterns
+    """
+    mask = np.zeros(len(c), dtype=np.uint16)
+    for i in range(len(c)):
+        top, bottom = max(o[i], c[i]), min(o[i], c[i])
+        body, size = top - bottom, h[i] - l[i]
+        bits = 0
+        if size > 0 and body <= 0.1 * size:
+            bits |= CandlePattern.DOJI
+        if size > 0 and bottom - l[i] >= 0.6 * size and h[i] - top <= 0.2 * size:
+            bits |= CandlePattern.BULLISH_PIN_BAR
+        if size > 0 and h[i] - top >= 0.6 * size and bottom - l[i] <= 0.2 * size:
+            bits |= CandlePattern.BEARISH_PIN_BAR
+
+        if i >= 1:
+            p_top, p_bottom = max(o[i - 1], c[i - 1]), min(o[i - 1], c[i - 1])
+            engulfs = top >= p_top and bottom <= p_bottom and body > p_top - p_bottom
+            if c[i - 1] < o[i - 1] and c[i] > o[i] and engulfs:
+                bits |= CandlePattern.BULLISH_ENGULFING
+            if c[i - 1] > o[i - 1] and c[i] < o[i] and engulfs:
+                bits |= CandlePattern.BEARISH_ENGULFING
+            if h[i] <= h[i - 1] and l[i] >= l[i - 1]:
+                bits |= CandlePattern.INSIDE_BAR
+
+        if i >= 2:
+            long_first = abs(c[i - 2] - o[i - 2]) > 0.5 * (h[i - 2] - l[i - 2])
+            small_star = p_top - p_bottom <= 0.3 * (h[i - 1] - l[i - 1])
+            middle = (o[i - 2] + c[i - 2]) / 2
+            if (
+                long_first
+                and small_star
+                and c[i - 2] < o[i - 2]
+                and p_bottom <= c[i - 2]
+                and c[i] > o[i]
+                and c[i] > middle
+            ):
+                bits |= CandlePattern.MORNING_STAR
+            if (
+                long_first
+                and small_star
+                and c[i - 2] > o[i - 2]
+                and p_top >= c[i - 2]
+                and c[i] < o[i]
+                and c[i] < middle
+            ):
+                bits |= CandlePattern.EVENING_STAR
+
+        mask[i] = bits
+
+    return mask
+
+
+def ohlc(data):
+    return data["open"], data["high"], data["low"], data["close"]
+
+
+@pt.mark.candle_patterns
+class TestCandlePatterns:
+    """
+    Class for testing the vectorized candlestick pattern recognizer
+    """
+
+    def test_known_candles(self):
+        """
+        Hand made candles show the expected patterns
+        """
+        # * Bearish long bar, doji star, bullish engulfing recovery
+        o = np.array([110.0, 101.0, 100.5, 100.0, 100.0])
+        c = np.array([101.0, 100.9, 108.0, 100.2, 99.5])
+        h = np.array([111.0, 102.0, 108.5, 100.3, 100.1])
+        l = np.array([100.0, 100.2, 100.0, 97.0, 96.0])
+
+        mask = candle_patterns(o, h, l, c)
+
+        assert pattern_names(mask[0]) == ()
+        assert pattern_names(mask[1]) == ("DOJI", "INSIDE_BAR")
+        assert pattern_names(mask[2]) == ("BULLISH_ENGULFING", "MORNING_STAR")
+        assert pattern_names(mask[3]) == ("DOJI", "BULLISH_PIN_BAR")
+        assert pattern_names(mask[4]) == ("BULLISH_PIN_BAR",)
+        assert mask.dtype == np.uint16
+
+    def test_matches_reference(self):
+        """
+        The vectorized pass equals the bar by bar definitions
+        """
+        data = random_ohlcv(3000, seed=3)
+
+        mask = candle_patterns(*ohlc(data))
+
+        np.testing.assert_array_equal(
+            mask, reference_patterns(*(np.asarray(x) for x in ohlc(data)))
+        )
+        assert all(count > 0 for count in pattern_counts(mask).values())
+
+    def test_blocks_panel_and_stream(self):
+        """
+        Blocked, panel and streaming evaluations equal the single pass
+        """
+        panel = [random_ohlcv(2000, seed=seed) for seed in range(4)]
+        fields = [np.stack([np.asarray(x) for x in f]) for f in zip(*map(ohlc, panel))]
+        expected = np.stack([candle_patterns(*ohlc(data)) for data in panel])
+
+        np.testing.assert_array_equal(candle_patterns(*fields), expected)
+        np.testing.assert_array_equal(
+            candle_patterns(*fields, block_size=333), expected
+        )
+
+        state, blocks = {}, []
+        for start in range(0, 2000, 125):
+            block = [x[:, start : start + 125] for x in fields]
+            blocks.append(candle_patterns(*block, state=state))
+        np.testing.assert_array_equal(np.concatenate(blocks, axis=-1), expected)
+
+    def test_signal_fusion_feature(self):
+        """
+        The fusion feature flags the bars of the selected patterns
+        """
+        data = random_ohlcv(500, seed=5)
+        rule = Rule("Bullish candle", 1, CandlePatterns(CandlePattern.bullish()) > 0)
+
+        scores = SignalFusion([rule]).scores(data)[0]
+
+        mask = candle_patterns(*ohlc(data))
+        np.testing.assert_array_equal(
+            scores > 0, (mask & np.uint16(CandlePattern.bullish())) != 0
+        )
+
+    def test_speed(self):
+        """
+        Multi-million bar histories are scanned in one pass
+        """
+        rng = np.random.default_rng(0)
+        n_bars = 2_000_000
+        c = 100 + np.cumsum(rng.normal(0, 1, n_bars))
+        o = c + rng.normal(0, 0.5, n_bars)
+        h = np.maximum(o, c) + rng.random(n_bars)
+        l = np.minimum(o, c) - rng.random(n_bars)
+
+        start = time.perf_counter()
+        mask = candle_patterns(o, h, l, c)
+        elapsed = time.perf_counter() - start
+
+        logging.info(
+            f"Candle patterns: {n_bars} bars in {elapsed * 1e3:.0f} ms, "
+            f"{pattern_counts(mask)}"
+        )
+        assert mask.shape == (n_bars,)
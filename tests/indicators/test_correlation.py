@@ -0,0 +1,104 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.data.instruments import DEFAULT_INSTRUMENTS
+from sk_fx.data.snapshot import dumps_snapshot, loads_snapshot
+from sk_fx.indicators.correlation import CrossPairCorrelation
+
+PAIRS = ["EURUSD", "GBPUSD", "USDJPY", "EURJPY", "AUDUSD", "USDCHF"]
+
+
+def correlated_closes(n_bars: int, n_pairs: int = len(PAIRS), seed: int = 0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 1e-3, (2, n_bars))
+    loadings = rng.uniform(-1, 1, (n_pairs, 2))
+    returns = loadings @ factors + rng.normal(0, 5e-4, (n_pairs, n_bars))
+
+    return np.exp(np.cumsum(returns, axis=1))
+
+
+@pt.mark.correlation
+class TestCrossPairCorrelation:
+    """
+    Class for testing the rolling cross-pair correlation engine
+    """
+
+    def test_matches_rolling_correlation(self):
+        """
+        The incremental matrix equals the pandas rolling correlation
+        """
+        close = correlated_closes(1000)
+        engine = CrossPairCorrelation(PAIRS, window=50)
+
+        correlations, _ = engine.calculate(close)
+
+        returns = pd.DataFrame(np.log(close.T)).diff()
+        expected = returns.rolling(50).corr().to_numpy().reshape(1000, 6, 6)
+        assert np.isnan(correlations[:50]).all()
+        np.testing.assert_allclose(correlations[50:], expected[50:], atol=1e-9)
+
+    def test_long_run_drift(self):
+        """
+        The periodic rebuild keeps the running sums exact over long histories
+        """
+        close = correlated_closes(20_000, seed=1)
+        engine = CrossPairCorrelation(PAIRS, window=100)
+        for bar in close.T:
+            engine.update(bar)
+
+        window = np.diff(np.log(close[:, -101:]), axis=1)
+        np.testing.assert_allclose(
+            engine.correlation(), np.corrcoef(window), atol=1e-10
+        )
+
+    def test_strength(self):
+        """
+        A rising base currency is the strongest, its quote counterparts weaken
+        """
+        close = np.ones((len(PAIRS), 30))
+        close[PAIRS.index("EURUSD")] = np.linspace(1.10, 1.12, 30)
+        engine = CrossPairCorrelation(PAIRS, window=10)
+
+        _, strength = engine.calculate(close)
+
+        last = strength.iloc[-1]
+        assert last.idxmax() == "EUR" and last.idxmin() == "USD"
+        assert np.isclose(last["EUR"], 100 * np.log(1.12 / close[0, -11]) / 2)
+        assert strength.iloc[:10].isna().all().all()
+
+    def test_universe_update_cost(self):
+        """
+        A bar of the registry universe updates in O(N^2) and stays exact
+        """
+        symbols = [instrument.symbol for instrument in DEFAULT_INSTRUMENTS]
+        close = correlated_closes(2000, n_pairs=len(symbols), seed=2)
+        engine = CrossPairCorrelation(symbols, window=500)
+
+        start = time.perf_counter()
+        for bar in close.T:
+            engine.update(bar)
+        per_bar = (time.perf_counter() - start) / close.shape[1]
+
+        logging.info(f"{len(symbols)} pairs: {per_bar * 1e6:.1f} us per bar")
+        window = np.diff(np.log(close[:, -501:]), axis=1)
+        np.testing.assert_allclose(
+            engine.correlation(), np.corrcoef(window), atol=1e-10
+        )
+
+    def test_snapshot_resume(self):
+        """
+        The engine resumes from a snapshot of its state
+        """
+        close = correlated_closes(300, seed=3)
+        live = CrossPairCorrelation(PAIRS, window=40)
+        for bar in close[:, :200].T:
+            live.update(bar)
+
+        resumed = CrossPairCorrelation(PAIRS, window=40)
+        resumed.state = loads_snapshot(dumps_snapshot(live.state), copy=True).state
+        for bar in close[:, 200:].T:
+            np.testing.assert_array_equal(resumed.update(bar), live.update(bar))
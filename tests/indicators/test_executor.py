@@ -0,0 +1,102 @@
+import threading
+import time
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.executor import IndicatorExecutor
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    DeMarkerOscillator,
+    DivergenceOscillator,
+    MACD,
+    RSIOscillator,
+)
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+class SlowOscillator(DivergenceOscillator):
+    """
+    Oscillator recording how many calculations run at the same time
+    """
+
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def calculate(self, fail: bool = False):
+        with SlowOscillator.lock:
+            SlowOscillator.running += 1
+            SlowOscillator.peak = max(SlowOscillator.peak, SlowOscillator.running)
+        time.sleep(0.01)
+        with SlowOscillator.lock:
+            SlowOscillator.running -= 1
+
+        if fail:
+            raise RuntimeError("Calculation failed")
+        return self.ohlcv["close"]
+
+
+@pt.mark.indicator_executor
+class TestIndicatorExecutor:
+    """
+    Class for testing the thread pool indicator executor
+    """
+
+    def test_results_match_serial(self):
+        """
+        Concurrent results equal the one by one calculations
+        """
+        universe = {
+            symbol: random_ohlcv(3000, seed=i) for i, symbol in enumerate("ABC")
+        }
+        jobs = {
+            "rsi": RSIOscillator(period=14),
+            "demarker": (DeMarkerOscillator(), {"average_demarker": True}),
+            "macd": MACD(),
+        }
+
+        with IndicatorExecutor(max_workers=3) as executor:
+            results = executor.run_universe(universe, jobs)
+
+        assert len(results) == 9
+        for symbol, ohlcv in universe.items():
+            assert np.allclose(
+                results[(symbol, "rsi")],
+                RSIOscillator(ohlcv=ohlcv, period=14).calculate(),
+                equal_nan=True,
+            )
+            assert np.allclose(
+                results[(symbol, "demarker")],
+                DeMarkerOscillator(ohlcv=ohlcv).calculate(average_demarker=True),
+                equal_nan=True,
+            )
+            assert np.allclose(
+                results[(symbol, "macd")],
+                np.array(MACD(ohlcv=ohlcv).calculate()),
+                equal_nan=True,
+            )
+
+    def test_concurrency_limit(self):
+        """
+        No more than `max_workers` jobs run at the same time, on read-only data
+        """
+        ohlcv = random_ohlcv(100)
+        jobs = {i: SlowOscillator() for i in range(12)}
+
+        with IndicatorExecutor(max_workers=2, max_pending=3) as executor:
+            results = executor.run(ohlcv, jobs)
+
+        assert SlowOscillator.peak <= 2
+        assert sorted(results) == list(range(12))
+        assert not results[0].flags.writeable
+
+    def test_failure(self):
+        """
+        Job failures are raised to the caller
+        """
+        with IndicatorExecutor(max_workers=2) as executor:
+            with pt.raises(RuntimeError):
+                executor.run(
+                    random_ohlcv(100),
+                    {"ok": SlowOscillator(), "ko": (SlowOscillator(), {"fail": True})},
+                )
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.utils import kernels
+from sk_fx.utils.indicators import TA
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def reference_wma(series: pd.Series, length: int) -> pd.Series:
+    weights = np.arange(1, length + 1)
+    return series.rolling(length).apply(lambda x: x @ weights / weights.sum(), raw=True)
+
+
+def reference_ema(series: pd.Series, length: int) -> pd.Series:
+    return series.ewm(span=length, adjust=False, ignore_na=True).mean()
+
+
+@pt.mark.moving_averages
+class TestMovingAverages:
+    """
+    Class for testing the moving average family of TA
+    """
+
+    LENGTHS = [2, 5, 9, 21, 50]
+
+    @pt.mark.parametrize(
+        "method, reference",
+        [
+            ("sma", lambda series, length: series.rolling(length).mean()),
+            ("ema", reference_ema),
+            ("wma", reference_wma),
+            (
+                "dema",
+                lambda series, length: 2 * reference_ema(series, length)
+                - reference_ema(reference_ema(series, length), length),
+            ),
+            (
+                "tema",
+                lambda series, length: 3 * reference_ema(series, length)
+                - 3 * reference_ema(reference_ema(series, length), length)
+                + reference_ema(
+                    reference_ema(reference_ema(series, length), length), length
+                ),
+            ),
+            (
+                "hma",
+                lambda series, length: reference_wma(
+                    2 * reference_wma(series, length // 2)
+                    - reference_wma(series, length),
+                    int(np.sqrt(length)),
+                ),
+            ),
+        ],
+    )
+    def test_matches_reference(self, method, reference):
+        """
+        Every length of the batched call equals the pandas reference
+        """
+        ohlcv = random_ohlcv(3000)
+        ohlcv.iloc[1000, ohlcv.columns.get_loc("close")] = np.nan
+
+        batched = getattr(TA, method)(ohlcv, length=self.LENGTHS)
+        assert batched.shape == (len(self.LENGTHS), len(ohlcv))
+
+        for row, length in zip(batched, self.LENGTHS):
+            expected = reference(ohlcv["close"], length).to_numpy()
+            assert np.allclose(row, expected, rtol=1e-9, equal_nan=True)
+
+        single = getattr(TA, method)(ohlcv, length=9)
+        pd.testing.assert_index_equal(single.index, ohlcv.index)
+        assert np.allclose(single, batched[2], equal_nan=True)
+
+    def test_vwap(self):
+        """
+        Rolling and session anchored VWAP equal their pandas definitions
+        """
+        ohlcv = random_ohlcv(500, freq="h")
+        typical = (ohlcv["high"] + ohlcv["low"] + ohlcv["close"]) / 3
+        price_volume = typical * ohlcv["volume"]
+
+        rolling = TA.vwap(ohlcv, length=[10, 20])
+        expected = (
+            price_volume.rolling(20).sum() / ohlcv["volume"].rolling(20).sum()
+        ).to_numpy()
+        assert np.allclose(rolling[1], expected, equal_nan=True)
+
+        day = ohlcv.index.floor("D")
+        expected = (
+            price_volume.groupby(day).cumsum() / ohlcv["volume"].groupby(day).cumsum()
+        )
+        pd.testing.assert_series_equal(
+            TA.vwap(ohlcv), expected, check_names=False, rtol=1e-9
+        )
+
+    def test_long_history_precision(self):
+        """
+        The windowed sums keep their precision over a long FX-like history
+        """
+        close = 1.1 + np.cumsum(np.random.default_rng(0).normal(0, 1e-4, 1_000_000))
+
+        assert (
+            np.nanmax(
+                np.abs(kernels.sma(close, 20) - pd.Series(close).rolling(20).mean())
+            )
+            < 1e-12
+        )
+        assert (
+            np.nanmax(
+                np.abs(
+                    kernels.wma(close[-50_000:], 5)
+                    - reference_wma(pd.Series(close[-50_000:]), 5)
+                )
+            )
+            < 1e-12
+        )
+
+    def test_panel(self):
+        """
+        Panels of symbols give one row of lines per symbol
+        """
+        panel = np.stack([random_ohlcv(400, seed=seed)["close"] for seed in range(3)])
+
+        lines = kernels.hma(panel, [9, 16])
+
+        assert lines.shape == (2, 3, 400)
+        for i in range(3):
+            assert np.allclose(
+                lines[:, i], kernels.hma(panel[i], [9, 16]), equal_nan=True
+            )
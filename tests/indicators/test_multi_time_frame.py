@@ -0,0 +1,103 @@
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.indicators.idtypes import TimeFrame
+from sk_fx.indicators.multi_time_frame import MultiTimeFrameAligner, align_to_lower
+
+
+def bar_index(start: str, n_bars: int, time_frame: TimeFrame) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(
+        np.datetime64(start, "ns")
+        + np.arange(n_bars) * np.timedelta64(time_frame.seconds, "s")
+    )
+
+
+@pt.mark.multi_time_frame
+class TestMultiTimeFrameAlignment:
+    """
+    Class for testing the higher to lower time frame alignment
+    """
+
+    def test_no_lookahead(self):
+        """
+        H1 bars only see the D1 value once the daily bar has closed
+        """
+        daily = pd.Series(
+            [1.0, 2.0, 3.0], index=bar_index("2024-01-01", 3, TimeFrame.D1)
+        )
+        hourly_index = bar_index("2024-01-01", 72, TimeFrame.H1)
+
+        aligned = align_to_lower(daily, hourly_index, TimeFrame.D1, TimeFrame.H1)
+
+        # The first 23 hours close before the first day closes
+        assert aligned.iloc[:23].isna().all()
+        # The 23:00 hour closes together with the day
+        assert (aligned.iloc[23:47] == 1.0).all()
+        assert (aligned.iloc[47:71] == 2.0).all()
+        assert aligned.iloc[71] == 3.0
+
+    def test_matches_merge_asof(self):
+        """
+        The vectorized alignment matches a pandas merge_asof on close times
+        """
+        rng = np.random.default_rng(0)
+        h4 = pd.DataFrame(
+            {"rsi": rng.random(500), "macd": rng.random(500)},
+            index=bar_index("2024-01-01", 500, TimeFrame.H4),
+        )
+        m15_index = bar_index("2024-01-01 02:00", 6000, TimeFrame.M15)
+
+        aligned = align_to_lower(h4, m15_index, TimeFrame.H4, TimeFrame.M15)
+
+        expected = pd.merge_asof(
+            pd.DataFrame({"close_time": m15_index + pd.Timedelta(minutes=15)}),
+            h4.assign(close_time=h4.index + pd.Timedelta(hours=4)),
+            on="close_time",
+        )
+        assert np.allclose(
+            aligned.values, expected[["rsi", "macd"]].values, equal_nan=True
+        )
+
+    def test_streaming_matches_vectorized(self):
+        """
+        Streaming alignment gives the same values as the vectorized alignment
+        """
+        daily = pd.Series(
+            np.arange(10, dtype=float), index=bar_index("2024-01-01", 10, TimeFrame.D1)
+        )
+        h4_index = bar_index("2024-01-01", 60, TimeFrame.H4)
+        expected = align_to_lower(daily, h4_index, TimeFrame.D1, TimeFrame.H4)
+
+        aligner = MultiTimeFrameAligner(TimeFrame.D1, TimeFrame.H4)
+        streamed = []
+        for h4_time in h4_index:
+            # A daily bar is pushed as soon as it has closed
+            for d1_time, value in daily.items():
+                if d1_time + pd.Timedelta(days=1) == h4_time + pd.Timedelta(hours=4):
+                    aligner.push_higher(d1_time.to_datetime64(), value)
+            streamed.append(aligner.value(h4_time.to_datetime64()))
+
+        streamed = np.array([np.nan if v is None else v for v in streamed])
+        assert np.allclose(streamed, expected.values, equal_nan=True)
+
+    def test_speed(self):
+        """
+        Log the alignment time for millions of lower time frame bars
+        """
+        m1_index = bar_index("2015-01-01", 5_000_000, TimeFrame.M1)
+        daily = pd.Series(
+            np.random.default_rng(1).random(3500),
+            index=bar_index("2015-01-01", 3500, TimeFrame.D1),
+        )
+
+        start = time.perf_counter()
+        aligned = align_to_lower(daily, m1_index, TimeFrame.D1, TimeFrame.M1)
+        logging.info(
+            f"Aligned {len(m1_index):,} bars in {time.perf_counter() - start:.3f}s"
+        )
+
+        assert len(aligned) == len(m1_index)
@@ -0,0 +1,119 @@
+import json
+import logging
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.oscillators.adaptive_oscillator import (
+    AdaptiveOscillator,
+    AdaptiveRSIOscillator,
+)
+from sk_fx.indicators.oscillators.divergence_oscillator import StochasticOscillator
+from sk_fx.utils.parity import (
+    MODES,
+    ParityCase,
+    adaptive_reference,
+    compare,
+    main,
+    run_parity,
+)
+from sk_fx.utils.test_utils import random_market
+
+
+@pt.mark.parity
+class TestParity:
+    """
+    Class for testing the golden-reference parity harness
+    """
+
+    def test_random_market(self):
+        """
+        The random markets carry weekend closures, gaps, flat bars and NaNs
+        """
+        ohlcv = random_market(5000, seed=1, gap_rate=0.02)
+
+        assert len(ohlcv) == 5000 and ohlcv.index.is_monotonic_increasing
+        assert not (ohlcv.index.dayofweek == 5).any()
+        steps = np.diff(ohlcv.index.to_numpy()) / np.timedelta64(1, "h")
+        assert (steps == 1).mean() > 0.9 and (steps >= 49).sum() >= 20
+        assert ((ohlcv["high"] == ohlcv["low"]) & ohlcv["high"].notna()).sum() > 10
+        assert ohlcv.isna().to_numpy().sum() > 50
+
+    def test_every_mode_matches(self):
+        """
+        Every execution mode of every oscillator matches the pandas reference
+        """
+        report = run_parity(n_bars=2000, n_symbols=2, seed=3)
+        summary = report.summary()
+        logging.info("\n" + summary)
+
+        assert report.failures == []
+        assert {result.mode for result in report.results} == set(MODES)
+        assert all(result.seconds > 0 for result in report.results)
+        # * Long case names keep their column
+        for line, result in zip(summary.splitlines()[1:], report.results):
+            assert line.split()[:2] == [result.case, result.mode]
+
+    def test_detects_mismatch(self, monkeypatch):
+        """
+        A mode off by one bar is reported, with its NaN mismatches
+        """
+
+        def shifted(oscillator, options, symbols):
+            values = MODES["numpy"](oscillator, options, symbols)
+            return [np.roll(line, 1, axis=-1) for line in values]
+
+        monkeypatch.setitem(MODES, "shifted", shifted)
+        case = ParityCase("stochastic", StochasticOscillator())
+        report = run_parity([case], ["numpy", "shifted"], n_bars=1000, n_symbols=1)
+
+        assert [result.mode for result in report.failures] == ["shifted"]
+        assert report.failures[0].nan_mismatches > 0
+        assert not report.to_dict()["passed"]
+
+    def test_adaptive_reference(self, monkeypatch):
+        """
+        The adaptive cases are checked against their own per-bar reference,
+        not against the NumPy path
+        """
+        case = ParityCase(
+            "adaptive_rsi", AdaptiveRSIOscillator(), reference=adaptive_reference
+        )
+        assert run_parity([case], ["numpy"], n_bars=1000, n_symbols=1).failures == []
+
+        periods = AdaptiveOscillator._periods
+        monkeypatch.setattr(
+            AdaptiveOscillator,
+            "_periods",
+            lambda self, *args: periods(self, *args) + 1,
+        )
+        report = run_parity([case], ["numpy"], n_bars=1000, n_symbols=1)
+        assert [result.mode for result in report.failures] == ["numpy"]
+
+    def test_compare(self):
+        """
+        NaN positions must agree, equal infinities match
+        """
+        reference = np.array([np.nan, 1.0, np.inf, 0.0])
+
+        assert compare(reference.copy(), reference) == (0.0, 0, True)
+        assert compare(np.array([0.0, 1.0, np.inf, 0.0]), reference)[1:] == (1, False)
+        assert not compare(reference + 1e-6, reference, rtol=1e-9)[2]
+        assert compare(reference + 1e-6, reference, rtol=0, atol=1e-5)[2]
+
+    def test_regressions(self, tmp_path, capsys):
+        """
+        The JSON report of a run is the baseline of the next one
+        """
+        baseline = tmp_path / "parity.json"
+        assert main(["-n", "500", "-s", "1", "-m", "numpy", "-o", str(baseline)]) == 0
+        logging.info(capsys.readouterr().out)
+
+        previous = json.loads(baseline.read_text())
+        assert previous["passed"] and "numpy" in previous["cases"]["rsi"]
+
+        # * A baseline 10 times faster flags every mode
+        for case in previous["cases"].values():
+            case["numpy"]["bars_per_second"] *= 10
+        report = run_parity(modes=["numpy"], n_bars=500, n_symbols=1)
+        assert len(report.regressions(previous)) == len(report.results)
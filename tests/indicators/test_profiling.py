@@ -0,0 +1,110 @@
+import logging
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    DeMarkerOscillator,
+    StochasticOscillator,
+)
+from sk_fx.utils import kernels
+from sk_fx.utils.profiling import MemoryProfiler, profile_indicator, stage
+from sk_fx.utils.test_utils import random_ohlcv
+
+OSCILLATORS = [
+    (DeMarkerOscillator, {"average_demarker": True}),
+    (StochasticOscillator, {}),
+]
+
+
+@pt.mark.profiling
+class TestProfiling:
+    """
+    Class for testing the stage profiling and the low-memory oscillator path
+    """
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_stages(self, oscillator, options):
+        """
+        Every stage of the pandas and NumPy paths is reported once
+        """
+        ohlcv = random_ohlcv(20_000, seed=1)
+        fields = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+        frame_report = profile_indicator(oscillator(ohlcv=ohlcv), **options)
+        numpy_report = profile_indicator(oscillator(ohlcv=fields), **options)
+
+        logging.info(frame_report.summary())
+        logging.info(numpy_report.summary())
+        assert list(frame_report.stages) == list(numpy_report.stages)
+        assert len(frame_report.stages) >= 4
+        for stats in numpy_report.stages.values():
+            assert stats.calls == 1 and stats.seconds >= 0
+        assert numpy_report.output_bytes == 20_000 * 8
+        assert numpy_report.peak < frame_report.peak
+
+    @pt.mark.parametrize("oscillator, options", OSCILLATORS)
+    def test_low_memory(self, oscillator, options):
+        """
+        With reused `out` and scratch arrays the peak stays at the input plus
+        output size, and the values are unchanged
+        """
+        n_bars = 200_000
+        fields = {
+            field: values.to_numpy()
+            for field, values in random_ohlcv(n_bars, seed=2).items()
+        }
+        expected = oscillator(ohlcv=fields).calculate(**options)
+
+        out, scratch = np.empty(n_bars), kernels.Scratch()
+        result = oscillator(ohlcv=fields).calculate(out=out, scratch=scratch, **options)
+        assert result is out and scratch.nbytes == out.nbytes
+        np.testing.assert_array_equal(result, expected)
+
+        report = profile_indicator(
+            oscillator(ohlcv=fields), out=out, scratch=scratch, **options
+        )
+        logging.info(report.summary())
+        assert report.preallocated == 2 * out.nbytes
+        assert report.stages["calculate"].peak < out.nbytes / 2
+        assert report.overhead < 1.25
+
+    def test_chunked_scratch(self):
+        """
+        The scratch buffers also serve the chunked calculation
+        """
+        fields = {
+            field: values.to_numpy()
+            for field, values in random_ohlcv(5000, seed=3).items()
+        }
+        expected = StochasticOscillator(ohlcv=fields).calculate()
+
+        state, scratch, blocks = {}, kernels.Scratch(), []
+        for start in range(0, 5000, 700):
+            block = {
+                field: values[start : start + 700] for field, values in fields.items()
+            }
+            result = StochasticOscillator(ohlcv=block).calculate(
+                state=state, scratch=scratch
+            )
+            blocks.append(result.copy())
+
+        np.testing.assert_allclose(np.concatenate(blocks), expected, rtol=1e-12)
+
+    def test_nested_stages(self):
+        """
+        Nested stages are named by path, stages outside a profiler are free
+        """
+        assert stage("outside") is stage("other")
+
+        with MemoryProfiler() as profiler:
+            with stage("outer"):
+                inner = np.ones(100_000)
+                with stage("inner"):
+                    temporary = np.ones(200_000)
+                    del temporary
+
+        assert set(profiler.stages) == {"outer", "outer/inner"}
+        assert profiler.stages["outer/inner"].peak >= 200_000 * 8
+        assert profiler.stages["outer"].peak >= 300_000 * 8
+        assert profiler.stages["outer"].retained >= inner.nbytes
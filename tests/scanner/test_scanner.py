@@ -0,0 +1,137 @@
+import logging
+from time import perf_counter_ns
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.scanner.rules import (
+    DeMarkerZoneRule,
+    MACDCrossRule,
+    RSIThresholdRule,
+    StochasticExtremeRule,
+)
+from sk_fx.scanner.service import ScannerService, scan_rows
+from sk_fx.scanner.shared_panel import SharedOHLCVPanel
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def random_panel(n_symbols: int, n_bars: int):
+    frames = [random_ohlcv(n_bars, seed=seed) for seed in range(n_symbols)]
+    bars = np.stack([frame.to_numpy().T for frame in frames], axis=1)
+
+    return frames[0].index.values, bars
+
+
+RULES = [
+    RSIThresholdRule(window=120),
+    MACDCrossRule(window=120),
+    StochasticExtremeRule(),
+    DeMarkerZoneRule(window=120),
+]
+
+
+@pt.mark.scanner
+class TestScanner:
+    """
+    Class for testing the shared memory universe scanner
+    """
+
+    def test_shared_panel(self):
+        """
+        The panel windows hold the latest bars of every symbol, in order
+        """
+        time, bars = random_panel(3, 50)
+
+        panel = SharedOHLCVPanel(3, capacity=20)
+        try:
+            panel.extend(time[:35], bars[..., :35])
+            for i in range(35, 50):
+                panel.append(time[i], bars[..., i])
+
+            reader = SharedOHLCVPanel.attach(panel.name, 3, 20)
+            window = reader.window(19, rows=slice(1, 3))
+            np.testing.assert_array_equal(window["time"], time[-19:])
+            np.testing.assert_array_equal(window["close"], bars[3, 1:, -19:])
+            assert panel.sequence == 50
+            reader.close()
+        finally:
+            panel.close()
+            panel.unlink()
+
+    def test_rules_match_single_symbol(self):
+        """
+        The rules evaluated on a panel flag the same symbols as one by one
+        """
+        _, bars = random_panel(40, 300)
+        fields = dict(zip(("open", "high", "low", "close", "volume"), bars))
+        symbols = [f"S{i}" for i in range(40)]
+
+        for end in range(250, 300):
+            window = {field: values[:, :end] for field, values in fields.items()}
+            panel_alerts = scan_rows(window, RULES, symbols)
+            single_alerts = [
+                alert
+                for i in range(40)
+                for alert in scan_rows(
+                    {field: values[i : i + 1] for field, values in window.items()},
+                    RULES,
+                    symbols[i : i + 1],
+                )
+            ]
+            assert sorted(panel_alerts) == sorted(single_alerts)
+
+    def test_service_alerts_and_latency(self):
+        """
+        The workers push the alerts of every bar close within the 100 ms
+        budget, checked with headroom for loaded runners
+        """
+        n_symbols, n_history = 200, 200
+        time, bars = random_panel(n_symbols, n_history + 30)
+        fields = dict(zip(("open", "high", "low", "close", "volume"), bars))
+        symbols = [f"S{i}" for i in range(n_symbols)]
+
+        with ScannerService(symbols, RULES, n_workers=2) as scanner:
+            scanner.load_history(time[:n_history], bars[..., :n_history])
+            for i in range(n_history, n_history + 30):
+                alerts = scanner.publish(time[i], bars[..., i])
+
+                window = {
+                    field: values[:, i - 120 : i + 1]
+                    for field, values in fields.items()
+                }
+                expected = scan_rows(window, RULES, symbols)
+                assert sorted((a.symbol, a.condition) for a in alerts) == sorted(
+                    expected
+                )
+                assert all(alert.time == time[i] for alert in alerts)
+
+            stats = scanner.latency_stats()
+
+        logging.info(f"Scanner latency: {stats}")
+        assert stats["count"] == 30
+        assert stats["p50"] < 0.5
+
+    def test_late_alerts_and_bar_close(self):
+        """
+        Late alerts of a timed out bar are discarded, the latencies start at
+        the bar close given by the caller
+        """
+        time, bars = random_panel(20, 160)
+        symbols = [f"S{i}" for i in range(20)]
+
+        with ScannerService(symbols, RULES, n_workers=2) as scanner:
+            scanner.load_history(time[:150], bars[..., :150])
+            scanner.publish(time[150], bars[..., 150])
+
+            # * Answers of the previous bar still queued
+            scanner._alerts.put((scanner.panel.sequence, []))
+            closed = perf_counter_ns() - 200_000_000
+            alerts = scanner.publish(time[151], bars[..., 151], closed=closed)
+
+        fields = dict(zip(("open", "high", "low", "close", "volume"), bars))
+        window = {field: values[:, 31:152] for field, values in fields.items()}
+        assert sorted((a.symbol, a.condition) for a in alerts) == sorted(
+            scan_rows(window, RULES, symbols)
+        )
+        assert all(alert.latency >= 0.2 for alert in alerts)
+        assert scanner.latencies[-1] >= 0.2
@@ -0,0 +1,241 @@
+import http.client
+import json
+import logging
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.oscillators.divergence_oscillator import MACD, RSIOscillator
+from sk_fx.service.client import ServiceClient, WebSocketClient, load_test
+from sk_fx.service.engine import INDICATORS, IndicatorService, IndicatorSpec
+from sk_fx.service.server import IndicatorServer
+from sk_fx.utils.test_utils import random_ohlcv
+
+SYMBOLS = [f"SYM{i}" for i in range(12)]
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+@pt.fixture(scope="module")
+def universe():
+    return {symbol: random_ohlcv(1500, seed=i) for i, symbol in enumerate(SYMBOLS)}
+
+
+def fields(ohlcv):
+    return {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+
+@pt.mark.service
+class TestIndicatorService:
+    """
+    Class for testing the coalescing, batching and caching indicator service
+    """
+
+    def test_coalesce_and_cache(self, universe):
+        """
+        Identical concurrent requests share one computation, later ones hit the cache
+        """
+        with IndicatorService(universe, batch_window=0.05) as service:
+            futures = [service.submit("SYM0", "rsi", period=14) for _ in range(10)]
+            assert all(future is futures[0] for future in futures)
+            futures[0].result()
+            service.compute("SYM0", "rsi", period=14)
+
+            stats = service.stats()
+
+        assert stats["coalesced"] == 9
+        assert stats["computed"] == 1
+        assert stats["cache_hits"] == 1
+
+    def test_batched_panel(self, universe):
+        """
+        Compatible requests are computed as one panel, equal to single computations
+        """
+        with IndicatorService(universe, batch_window=0.05) as service:
+            futures = {symbol: service.submit(symbol, "macd") for symbol in SYMBOLS}
+            results = {symbol: future.result() for symbol, future in futures.items()}
+            stats = service.stats()
+
+        assert stats["batches"] == 1
+        for symbol, result in results.items():
+            expected = MACD(ohlcv=fields(universe[symbol])).calculate()
+            for line, expected_line in zip(result, expected):
+                np.testing.assert_allclose(line, expected_line, equal_nan=True)
+            assert not result[0].flags.writeable
+
+    def test_invalidation_and_errors(self, universe):
+        """
+        New data replaces the cached results, unknown requests are rejected
+        """
+        with IndicatorService(universe) as service:
+            before = service.compute("SYM1", "rsi", period=14)
+            service.set_data("SYM1", universe["SYM2"])
+            after = service.compute("SYM1", "rsi", period=14)
+
+            with pt.raises(ValueError):
+                service.submit("SYM1", "unknown")
+            with pt.raises(ValueError):
+                service.submit("UNKNOWN", "rsi")
+
+        expected = RSIOscillator(ohlcv=fields(universe["SYM2"]), period=14).calculate()
+        np.testing.assert_allclose(after, expected, equal_nan=True)
+        assert not np.allclose(before, after, equal_nan=True)
+
+    def test_data_replaced_in_batch_window(self, universe):
+        """
+        A request is computed on the data of its submission, even when the
+        data is replaced while it waits for its batch
+        """
+        with IndicatorService(universe, batch_window=0.2) as service:
+            future = service.submit("SYM1", "rsi", period=14)
+            service.set_data("SYM1", universe["SYM2"])
+            before = future.result()
+            after = service.compute("SYM1", "rsi", period=14)
+
+        np.testing.assert_allclose(
+            before,
+            RSIOscillator(ohlcv=fields(universe["SYM1"]), period=14).calculate(),
+            equal_nan=True,
+        )
+        np.testing.assert_allclose(
+            after,
+            RSIOscillator(ohlcv=fields(universe["SYM2"]), period=14).calculate(),
+            equal_nan=True,
+        )
+
+    def test_failing_symbol_in_batch(self, universe, monkeypatch):
+        """
+        A symbol failing in a panel batch fails alone
+        """
+
+        def compute(fields, params):
+            if np.isnan(fields["close"]).any():
+                raise ValueError("NaN close")
+            return fields["close"] * 2
+
+        monkeypatch.setitem(INDICATORS, "double", IndicatorSpec(compute))
+        broken = {field: universe["SYM1"][field].to_numpy() for field in FIELDS}
+        broken["close"] = broken["close"].copy()
+        broken["close"][10] = np.nan
+        with IndicatorService(
+            {**universe, "BROKEN": broken}, batch_window=0.05
+        ) as service:
+            futures = {
+                symbol: service.submit(symbol, "double")
+                for symbol in SYMBOLS[:4] + ["BROKEN"]
+            }
+            with pt.raises(ValueError):
+                futures["BROKEN"].result()
+            for symbol in SYMBOLS[:4]:
+                np.testing.assert_array_equal(
+                    futures[symbol].result(), universe[symbol]["close"] * 2
+                )
+            stats = service.stats()
+
+        assert stats["errors"] == 1 and stats["computed"] == 4
+
+    def test_http_and_websocket(self, universe):
+        """
+        HTTP and WebSocket clients receive the same values, load test runs clean
+        """
+        with IndicatorService(universe) as service, IndicatorServer(
+            service, port=0
+        ) as server:
+            server.serve_in_background()
+            host, port = server.server_address
+
+            client = ServiceClient(host, port)
+            answer = client.indicator("SYM3", "stochastic", bars=5, k_length=14)
+            levels = client.indicator("SYM3", "fib_retracement", bars=2, lookback=20)
+            batch = client.batch(
+                [
+                    {"symbol": symbol, "indicator": "ema", "params": {"length": 20}}
+                    for symbol in SYMBOLS
+                ]
+            )
+            with pt.raises(ValueError):
+                client.indicator("SYM3", "unknown")
+            client.close()
+
+            ws_client = WebSocketClient(host, port)
+            ws_answer = ws_client.request("SYM3", "stochastic", bars=5, k_length=14)
+            ws_client.close()
+
+            requests = [
+                {"symbol": symbol, "indicator": name, "params": {}, "bars": 50}
+                for symbol in SYMBOLS
+                for name in ("rsi", "demarker", "stochastic")
+            ]
+            reports = [
+                load_test(host, port, requests, n_clients=4, n_requests=300),
+                load_test(
+                    host,
+                    port,
+                    requests,
+                    n_clients=4,
+                    n_requests=300,
+                    use_websocket=True,
+                ),
+            ]
+            server.shutdown()
+
+        assert answer["values"] == ws_answer["values"]
+        assert len(answer["values"]) == len(answer["time"]) == 5
+        assert np.shape(levels["values"]) == (2, 7)
+        assert len(batch) == len(SYMBOLS)
+        for report in reports:
+            logging.info(report.summary())
+            assert report.n_errors == 0
+
+    def test_http_errors(self, universe):
+        """
+        Bad parameters and timeouts answer with JSON errors, batch per request
+        """
+        with IndicatorService(universe) as service, IndicatorServer(
+            service, port=0, request_timeout=0.05
+        ) as server:
+            server.serve_in_background()
+            host, port = server.server_address
+            connection = http.client.HTTPConnection(host, port)
+
+            def get(path):
+                connection.request("GET", path)
+                response = connection.getresponse()
+                return response.status, json.loads(response.read())
+
+            unknown = get("/indicator?symbol=SYM1&indicator=rsi&foo=1")
+            not_numeric = get("/indicator?symbol=SYM1&indicator=rsi&period=abc")
+
+            body = {
+                "requests": [
+                    {"id": 0, "symbol": "SYM1", "indicator": "ema", "params": {}},
+                    {
+                        "id": 1,
+                        "symbol": "SYM1",
+                        "indicator": "rsi",
+                        "params": {"foo": 1},
+                    },
+                    {"id": 2, "symbol": "UNKNOWN", "indicator": "rsi"},
+                ]
+            }
+            connection.request("POST", "/batch", body=json.dumps(body).encode())
+            response = connection.getresponse()
+            batch = json.loads(response.read())
+            batch_status = response.status
+
+            # * The connection still serves requests after the errors
+            valid = get("/indicator?symbol=SYM1&indicator=rsi&period=14&bars=3")
+
+            # * Longer batching than the request timeout
+            service.batch_window = 0.5
+            slow = get("/indicator?symbol=SYM1&indicator=rsi&period=21")
+            connection.close()
+            server.shutdown()
+
+        assert slow[0] == 504 and "error" in slow[1]
+        assert unknown[0] == 400 and "foo" in unknown[1]["error"]
+        assert not_numeric[0] == 400 and "error" in not_numeric[1]
+        assert batch_status == 200
+        assert [answer["id"] for answer in batch] == [0, 1, 2]
+        assert "values" in batch[0]
+        assert "error" in batch[1] and "error" in batch[2]
+        assert valid[0] == 200 and len(valid[1]["values"]) == 3
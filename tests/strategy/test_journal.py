@@ -0,0 +1,190 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.strategy.journal import EventKind, TradeJournal
+from sk_fx.strategy.signal_fusion import Signal
+
+START = pd.Timestamp("2024-03-04")
+SYMBOLS = np.array(["EURUSD", "GBPUSD", "USDJPY", "AUDUSD"])
+
+
+def hours(n: int) -> pd.Timestamp:
+    return START + pd.Timedelta(hours=n)
+
+
+def random_events(n_events: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "time": START
+            + pd.to_timedelta(np.sort(rng.integers(0, 10**6, n_events)), "s"),
+            "symbol": SYMBOLS[rng.integers(0, len(SYMBOLS), n_events)],
+            "kind": rng.integers(0, 4, n_events),
+            "order_id": rng.integers(0, 1000, n_events),
+            "direction": rng.choice([-1, 1], n_events),
+            "price": rng.uniform(1, 2, n_events),
+            "quantity": rng.uniform(1, 10, n_events),
+        }
+    )
+
+
+def trade(journal: TradeJournal) -> None:
+    journal.record_signals("EURUSD", [Signal(hours(0), "long", 1, 2.5, 1)])
+    journal.order(hours(0), "EURUSD", 1, 1, 10_000.0, rule="long")
+    journal.fill(hours(1), "EURUSD", 1, 1, 4_000.0, 1.0841)
+    journal.order(hours(1), "GBPUSD", 2, -1, 5_000.0, price=1.27)
+    journal.fill(hours(2), "EURUSD", 1, 1, 6_000.0, 1.0843)
+    journal.order(hours(3), "USDJPY", 3, 1, 1_000.0)
+    journal.fill(hours(3), "USDJPY", 3, 1, 400.0, 150.2)
+    journal.cancel(hours(4), "USDJPY", 3)
+    journal.record_signals("GBPUSD", [Signal(hours(5), "short", -1, 1.5, 1)])
+
+
+@pt.mark.journal
+class TestJournal:
+    """
+    Class for testing the event-sourced trade journal
+    """
+
+    def test_state_after_restart(self, tmp_path):
+        """
+        A reopened journal rebuilds the positions, open orders and signals
+        """
+        with TradeJournal(tmp_path, block_size=4) as journal:
+            trade(journal)
+
+        journal = TradeJournal(tmp_path)
+        assert len(journal) == 9
+        state = journal.state()
+        assert state.positions.to_dict() == {"EURUSD": 10_000.0, "USDJPY": 400.0}
+        assert state.open_orders.index.tolist() == [2]
+        assert state.open_orders.loc[2, "remaining"] == 5_000.0
+        assert state.last_signals.loc[("GBPUSD", "short"), "score"] == 1.5
+        assert state.next_order_id == 4 and state.last_seq == 8
+
+        before = journal.state(end=hours(2))
+        assert before.positions.to_dict() == {"EURUSD": 4_000.0}
+        assert sorted(before.open_orders.index) == [1, 2]
+
+        replayed = list(journal.replay())
+        assert [event.seq for event in replayed] == list(range(9))
+        assert replayed[7].kind is EventKind.CANCEL and replayed[7].order_id == 3
+
+    def test_crash_loses_only_buffered(self, tmp_path):
+        """
+        Events appended after the last flush are the only ones lost
+        """
+        journal = TradeJournal(tmp_path, block_size=100)
+        trade(journal)
+        journal.flush()
+        journal.order(hours(6), "AUDUSD", 4, 1, 1_000.0)
+        assert journal.state().next_order_id == 5
+
+        # * No flush: the process dies with the order in the buffer
+        recovered = TradeJournal(tmp_path)
+        assert len(recovered) == 9
+        assert recovered.state().next_order_id == 4
+
+    def test_unflushed_out_of_order(self, tmp_path):
+        """
+        Buffered events appended out of time order are queried like flushed ones
+        """
+        journal = TradeJournal(tmp_path, block_size=100)
+        for order_id, day in enumerate(("2024-01-03", "2024-01-01", "2024-01-05")):
+            journal.order(pd.Timestamp(day), "EURUSD", order_id, 1, 1_000.0)
+
+        buffered = journal.events(start="2024-01-02")
+        state = journal.state(end="2024-01-04")
+        journal.flush()
+
+        assert buffered["order_id"].tolist() == [0, 2]
+        assert sorted(state.open_orders.index) == [0, 1]
+        pd.testing.assert_frame_equal(buffered, journal.events(start="2024-01-02"))
+
+    def test_queries(self, tmp_path):
+        """
+        Range, symbol and kind queries match a filter of every event and
+        skip the segments outside the range
+        """
+        events = random_events(20_000)
+        journal = TradeJournal(tmp_path)
+        for block in range(0, 20_000, 2_000):
+            journal.append_frame(events.iloc[block : block + 2_000])
+        journal.order(hours(300), "EURUSD", 5000, 1, 1.0)
+
+        frame = journal.events()
+        assert len(frame) == 20_001 and frame["time"].is_monotonic_increasing
+
+        start, end = hours(50), hours(80)
+        result = journal.events(start, end, symbols=["GBPUSD"], kinds=[EventKind.FILL])
+        expected = frame[
+            (frame["time"] >= start)
+            & (frame["time"] < end)
+            & (frame["symbol"] == "GBPUSD")
+            & (frame["kind"] == EventKind.FILL)
+        ]
+        pd.testing.assert_frame_equal(
+            result.reset_index(drop=True), expected.reset_index(drop=True)
+        )
+
+        read = []
+        original = journal._read_segment
+        journal._read_segment = lambda file: read.append(file) or original(file)
+        journal.query(start, end)
+        assert 1 <= len(read) <= 2
+
+    def test_compaction(self, tmp_path):
+        """
+        Compaction merges the segments without changing the events
+        """
+        journal = TradeJournal(tmp_path, block_size=500, max_segments=8)
+        events = random_events(6_000, seed=1)
+        for row in events.itertuples(index=False):
+            journal.fill(
+                row.time,
+                row.symbol,
+                row.order_id,
+                row.direction,
+                row.quantity,
+                row.price,
+            )
+        journal.flush()
+        assert len(journal._manifest["segments"]) <= 8
+
+        before = journal.events()
+        journal.compact()
+        assert len(journal._manifest["segments"]) == 1
+        assert len(list(tmp_path.glob("*.arrow"))) == 1
+        pd.testing.assert_frame_equal(TradeJournal(tmp_path).events(), before)
+
+    def test_throughput(self, tmp_path):
+        """
+        Bulk appends and symbol queries stay vectorized
+        """
+        events = random_events(500_000, seed=2)
+        journal = TradeJournal(tmp_path)
+
+        start = time.perf_counter()
+        for block in range(0, 500_000, 50_000):
+            journal.append_frame(events.iloc[block : block + 50_000])
+        append = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table = journal.query(hours(10), hours(200), symbols=["USDJPY"])
+        query = time.perf_counter() - start
+
+        start = time.perf_counter()
+        state = journal.state()
+        fold = time.perf_counter() - start
+
+        logging.info(
+            f"500k events: append {append * 1e3:.0f} ms, query {query * 1e3:.1f} ms, "
+            f"state {fold * 1e3:.0f} ms"
+        )
+        assert table.num_rows > 0
+        assert set(table.column("symbol").to_pylist()) == {"USDJPY"}
+        assert len(state.positions) == len(SYMBOLS)
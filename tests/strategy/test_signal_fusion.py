@@ -0,0 +1,134 @@
+import numpy as np
+import pytest as pt
+
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    MACD,
+    RSIOscillator,
+    StochasticOscillator,
+)
+from sk_fx.strategy.signal_fusion import (
+    Divergence,
+    FibConfluence,
+    Indicator,
+    Rule,
+    SignalFusion,
+)
+from sk_fx.strategy.trend_indicator import TrendIndicator
+from sk_fx.tools.fib_retracement import FibRetracement
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def sk_fx_fusion() -> SignalFusion:
+    trend = Indicator(TrendIndicator(fast_length=9, slow_length=21))
+    rsi = Indicator(RSIOscillator(period=14))
+    stochastic = Indicator(StochasticOscillator())
+    macd, macd_signal = Indicator(MACD(), output=0), Indicator(MACD(), output=1)
+    fib_up = FibConfluence(lookback=30, tolerance=0.5, is_increase=True)
+    fib_down = FibConfluence(lookback=30, tolerance=0.5, is_increase=False)
+    bullish = Divergence(rsi, lookback=14, bullish=True)
+
+    return SignalFusion(
+        [
+            Rule(
+                "long_pullback",
+                1,
+                (trend > 0) & (fib_up > 0) & ~(rsi > 70),
+                {fib_up: 1.0, macd > macd_signal: 0.5, stochastic < 20: 0.5},
+            ),
+            Rule("long_divergence", 1, (bullish > 0) | (rsi < 30), {bullish: 1.0}),
+            Rule(
+                "short_pullback",
+                -1,
+                (trend < 0) & (fib_down > 0),
+                {fib_down: 1.0, rsi > 60: 0.5},
+            ),
+        ]
+    )
+
+
+@pt.mark.signal_fusion
+class TestSignalFusion:
+    """
+    Class for testing the signal fusion engine of the SK-FX setup
+    """
+
+    def test_trend_indicator(self):
+        """
+        The NumPy trend state equals the `TA.ma` one once the slow MA is warm
+        """
+        ohlcv = random_ohlcv(1000)
+        fields = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+        expected = TrendIndicator(ohlcv=ohlcv).calculate().to_numpy()
+        result = TrendIndicator(ohlcv=fields).calculate()
+
+        assert np.isnan(result[:20]).all()
+        np.testing.assert_array_equal(result[20:], expected[20:])
+        assert set(np.unique(expected)) == {-1.0, 0.0, 1.0}
+
+    def test_fib_level_prices(self):
+        """
+        The vectorized Fibonacci levels equal the scalar ones
+        """
+        fib = FibRetracement()
+        for is_increase in (True, False):
+            prices = fib.fib_level_prices(
+                np.array([1997.0, 10.0]), np.array([2027.0, 12.0]), is_increase
+            )
+            expected = list(fib.fib_level_price(10.0, 12.0, is_increase).values())
+            assert np.allclose(prices[1], expected)
+
+    def test_rank(self):
+        """
+        Signals are sorted by bar then by decreasing score
+        """
+        ohlcv = random_ohlcv(2000)
+        fusion = sk_fx_fusion()
+
+        scores = fusion.scores(ohlcv)
+        signals = fusion.rank(ohlcv)
+
+        assert len(signals) == np.count_nonzero(~np.isnan(scores))
+        assert set(signals["rule"]) == {rule.name for rule in fusion.rules}
+        for _, bar in signals.groupby("time"):
+            assert list(bar["rank"]) == list(range(1, len(bar) + 1))
+            assert bar["score"].is_monotonic_decreasing
+
+    def test_streaming_matches_batch(self):
+        """
+        The per bar mode emits the same ranked signals as the batch mode
+        """
+        ohlcv = random_ohlcv(600, seed=3)
+        fusion = sk_fx_fusion()
+
+        expected = fusion.rank(ohlcv)
+        stream = fusion.stream()
+        streamed = [
+            signal
+            for time, bar in zip(ohlcv.index, ohlcv.to_numpy())
+            for signal in stream.update(time, *bar)
+        ]
+
+        assert [(s.time, s.rule, s.rank) for s in streamed] == list(
+            zip(expected["time"], expected["rule"], expected["rank"])
+        )
+        assert np.allclose([s.score for s in streamed], expected["score"])
+
+    def test_panel(self):
+        """
+        Panels of symbols are scored row by row in one pass
+        """
+        frames = [random_ohlcv(500, seed=seed) for seed in range(4)]
+        panel = {
+            field: np.stack([frame[field].to_numpy() for frame in frames])
+            for field in frames[0].columns
+        }
+        fusion = sk_fx_fusion()
+
+        scores = fusion.scores(panel)
+
+        assert scores.shape == (3, 4, 500)
+        for i, frame in enumerate(frames):
+            np.testing.assert_allclose(
+                scores[:, i], fusion.scores(frame), equal_nan=True
+            )
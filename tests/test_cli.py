@@ -0,0 +1,101 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest as pt
+
+from sk_fx.cli import expand_inputs, main, output_path, process_file
+from sk_fx.indicators.oscillators.divergence_oscillator import MACD, RSIOscillator
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+@pt.fixture
+def exports(tmp_path):
+    paths = []
+    for i in range(4):
+        ohlcv = random_ohlcv(3000, seed=i)
+        if i % 2:
+            path = tmp_path / f"PAIR{i}.csv"
+            ohlcv.to_csv(path)
+        else:
+            path = tmp_path / f"PAIR{i}.parquet"
+            ohlcv.to_parquet(path)
+        paths.append(str(path))
+
+    return tmp_path, paths
+
+
+@pt.mark.cli
+class TestBatchCLI:
+    """
+    Class for testing the sk-fx batch command line
+    """
+
+    def test_process_file(self, exports):
+        """
+        The results written next to the input equal the oscillators
+        """
+        _, paths = exports
+        stats = process_file(paths[1], [("rsi", {"period": 14}), ("macd", {})])
+
+        assert stats.error is None and stats.n_bars == 3000
+        ohlcv = random_ohlcv(3000, seed=1)
+        fields = {field: ohlcv[field].to_numpy() for field in ohlcv.columns}
+
+        rsi = pd.read_parquet(output_path(paths[1], "rsi", {"period": 14}, "parquet"))
+        np.testing.assert_allclose(
+            rsi["value"], RSIOscillator(ohlcv=fields, period=14).calculate()
+        )
+        np.testing.assert_array_equal(rsi["time"].to_numpy(), ohlcv.index.to_numpy())
+
+        macd = pd.read_parquet(output_path(paths[1], "macd", {}, "parquet"))
+        for i, line in enumerate(MACD(ohlcv=fields).calculate()):
+            np.testing.assert_allclose(macd[f"value_{i}"], line)
+
+    def test_main(self, exports, capsys):
+        """
+        The command processes a directory on a worker pool and reports throughput
+        """
+        directory, paths = exports
+
+        code = main(
+            [
+                str(directory),
+                "-i",
+                "rsi:period=14",
+                "-i",
+                "ema:length=[9,21]",
+                "-w",
+                "2",
+            ]
+        )
+
+        output = capsys.readouterr().out
+        logging.info(output)
+        assert code == 0
+        assert "4 files (0 failed), 8 outputs, 12000 bars" in output
+        for path in paths:
+            ema = pd.read_parquet(
+                output_path(path, "ema", {"length": [9, 21]}, "parquet")
+            )
+            assert list(ema.columns) == ["time", "value_0", "value_1"]
+
+        # * Outputs are not inputs of a second run
+        assert expand_inputs([str(directory)]) == sorted(paths)
+        assert (
+            main([os.path.join(str(directory), "*.csv"), "-i", "macd", "-f", "csv"])
+            == 0
+        )
+
+    def test_errors(self, exports, tmp_path):
+        """
+        Unreadable files are reported without stopping the others
+        """
+        _, paths = exports
+        broken = tmp_path / "BROKEN.csv"
+        broken.write_text("not,a,bar\n1,2,3\n")
+
+        assert main([str(broken), paths[0], "-i", "rsi", "-w", "1"]) == 1
+        with pt.raises(SystemExit):
+            main([paths[0], "-i", "unknown"])
@@ -58,11 +58,11 @@ class TestCalculationFibExtension:
             1.809: 75.965,
             2: 72.078,
         }
-        pip_value = 0.001
+        symbol = "USOIL"
 
         for fib_level, fib_price in fib_extend_dict.items():
             assert is_acceptable_error(
-                real_value_dict[fib_level], fib_price, pip_value
+                real_value_dict[fib_level], fib_price, symbol=symbol
             ), f"Level {fib_level} has wrong value: {fib_price}, expected {real_value_dict[fib_level]}"
 
     def test_case_XAUUSD_uptrend_extension(self):
@@ -112,9 +112,9 @@ class TestCalculationFibExtension:
             1.809: 2032.85,
             2: 2065.26,
         }
-        pip_value = 0.01
+        symbol = "XAUUSD"
 
         for fib_level, fib_price in fib_extend_dict.items():
             assert is_acceptable_error(
-                real_value_dict[fib_level], fib_price, pip_value
+                real_value_dict[fib_level], fib_price, symbol=symbol
             ), f"Level {fib_level} has wrong value: {fib_price}, expected {real_value_dict[fib_level]}"
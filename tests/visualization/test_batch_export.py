@@ -0,0 +1,57 @@
+import logging
+import os
+
+import numpy as np
+import pytest as pt
+
+from sk_fx.data.indicator_store import IndicatorStore
+from sk_fx.indicators.oscillators.divergence_oscillator import RSIOscillator
+from sk_fx.utils.test_utils import random_ohlcv
+from visualization.batch_export import PANELS, cached_indicators, export_charts
+
+
+@pt.mark.batch_export
+class TestBatchExport:
+    """
+    Class for testing the batch chart export
+    """
+
+    def test_cached_indicators(self, tmp_path):
+        """
+        Chart indicators come from the store, only new bars are computed
+        """
+        store = IndicatorStore(str(tmp_path / "store"))
+        ohlcv = random_ohlcv(1000)
+
+        values = cached_indicators(store, "EURUSD", ohlcv.iloc[:800], ["rsi", "macd"])
+        assert len(values["rsi"]) == 800
+        values = cached_indicators(store, "EURUSD", ohlcv, ["rsi", "macd"])
+
+        expected = RSIOscillator(period=14, ohlcv=ohlcv).calculate()
+        np.testing.assert_allclose(values["rsi"]["value"], expected, equal_nan=True)
+        assert list(values["macd"].columns[:2]) == list(PANELS["macd"].lines)
+        assert store.update("EURUSD", PANELS["rsi"].oscillator, ohlcv) == 0
+
+    def test_export_html(self, tmp_path):
+        """
+        Charts of many symbols are rendered in worker processes
+        """
+        pt.importorskip("plotly")
+        sources = {}
+        for i in range(6):
+            path = str(tmp_path / f"PAIR{i}.parquet")
+            random_ohlcv(2000, seed=i).to_parquet(path)
+            sources[f"PAIR{i}"] = path
+
+        stats = export_charts(
+            sources,
+            str(tmp_path / "charts"),
+            str(tmp_path / "store"),
+            panels=("rsi", "macd"),
+            bars=500,
+            workers=2,
+        )
+
+        logging.info(f"{len(stats)} charts in {sum(s.seconds for s in stats):.2f} s")
+        assert all(chart.error is None for chart in stats)
+        assert all(os.path.getsize(chart.output) > 0 for chart in stats)
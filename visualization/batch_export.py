@@ -0,0 +1,361 @@
+"""
+Batch export of candle + indicator charts for many symbols
+
+One figure template (subplots, traces, guide lines and layout) is built per
+worker process and reused for every chart: only the trace data and the title
+change between symbols. The indicator values are read from an
+`IndicatorStore`, which computes only the bars missing from the cache, and the
+charts are written as self-contained HTML or as images (with kaleido).
+
+    python -m visualization.batch_export exports/ -o report/ -s indicator-cache \
+        -i rsi -i stochastic --bars 500
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Mapping, NamedTuple, Sequence, Tuple
+
+import pandas as pd
+
+from sk_fx.cli import expand_inputs
+from sk_fx.data.indicator_store import IndicatorStore
+from sk_fx.data.replay import read_ohlcv
+from sk_fx.indicators.oscillators.divergence_oscillator import (
+    MACD,
+    DeMarkerOscillator,
+    DivergenceOscillator,
+    RSIOscillator,
+    StochasticOscillator,
+)
+
+IMAGE_FORMATS = ("png", "svg", "pdf", "jpeg", "webp")
+
+
+class Panel(NamedTuple):
+    oscillator: DivergenceOscillator
+    lines: Tuple[str, ...]  # Columns of the stored values drawn in the panel
+    levels: Tuple[float, ...] = ()  # Dashed guide lines
+    y_range: Tuple[float, float] = None
+
+
+PANELS: Dict[str, Panel] = {
+    "rsi": Panel(RSIOscillator(period=14), ("value",), (30, 70), (-10, 110)),
+    "stochastic": Panel(
+        StochasticOscillator(k_length=14, d_length=3), ("value",), (20, 80), (-10, 110)
+    ),
+    "demarker": Panel(DeMarkerOscillator(period=14), ("value",), (0.3, 0.7), (0, 1)),
+    "macd": Panel(MACD(), ("value_0", "value_1"), (0,)),
+}
+
+_LINE_COLORS = ("#ff9900", "#336699")
+
+
+class ExportStats(NamedTuple):
+    symbol: str
+    output: str
+    seconds: float
+    error: str = None
+
+
+def load_ohlcv(path: str) -> pd.DataFrame:
+    """
+    Bars of a CSV/Parquet export as a data frame indexed by time
+    """
+    fields = read_ohlcv(path)
+    time_index = pd.DatetimeIndex(fields.pop("time"), name="time")
+    return pd.DataFrame(fields, index=time_index)
+
+
+def cached_indicators(
+    store: IndicatorStore,
+    symbol: str,
+    ohlcv: pd.DataFrame,
+    panels: Sequence[str],
+) -> Dict[str, pd.DataFrame]:
+    """
+    Indicator values of the chart panels from the store, computing only the
+    bars the store does not have yet
+
+    Returns
+    -------
+    Dict[str, pd.DataFrame]
+        Panel name to the stored values indexed by time
+    """
+    values = {}
+    for name in panels:
+        oscillator = PANELS[name].oscillator
+        store.update(symbol, oscillator, ohlcv)
+        values[name] = store.load(symbol, oscillator)
+
+    return values
+
+
+def build_template(panels: Sequence[str], width: int = 1600, height: int = 900):
+    """
+    Figure with empty traces, reused by `render` for every symbol
+    """
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
+
+    n_rows = 1 + len(panels)
+    row_heights = [1.0]
+    if panels:
+        row_heights = [0.55] + [0.45 / len(panels)] * len(panels)
+    fig = make_subplots(
+        rows=n_rows,
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.02,
+        row_heights=row_heights,
+        subplot_titles=["Price Data"] + [name.upper() for name in panels],
+    )
+
+    # Create Candlestick chart for price data
+    fig.add_trace(
+        go.Candlestick(
+            increasing_line_color="#55B748",
+            decreasing_line_color="#ED3F3C",
+            showlegend=False,
+        ),
+        row=1,
+        col=1,
+    )
+
+    # Indicator lines, guide levels and ranges of every panel
+    for row, name in enumerate(panels, start=2):
+        panel = PANELS[name]
+        for line, color in zip(panel.lines, _LINE_COLORS):
+            fig.add_trace(
+                go.Scatter(line=dict(color=color, width=2), showlegend=False),
+                row=row,
+                col=1,
+            )
+        for level in panel.levels:
+            fig.add_hline(
+                y=level,
+                row=row,
+                col=1,
+                line_color="#336699",
+                line_width=2,
+                line_dash="dash",
+            )
+        if panel.y_range is not None:
+            fig.update_yaxes(range=list(panel.y_range), row=row, col=1)
+
+    # Customize font, colors, hide range slider
+    fig.update_layout(
+        plot_bgcolor="#efefef",
+        font_family="Monospace",
+        font_color="#000000",
+        font_size=14,
+        width=width,
+        height=height,
+        xaxis=dict(rangeslider=dict(visible=False)),
+    )
+
+    return fig
+
+
+def render(
+    fig,
+    symbol: str,
+    ohlcv: pd.DataFrame,
+    values: Mapping[str, pd.DataFrame],
+    panels: Sequence[str],
+    bars: int = None,
+):
+    """
+    Fill the template traces with the data of a symbol, in place
+    """
+    ohlcv = ohlcv if bars is None else ohlcv.iloc[-bars:]
+    with fig.batch_update():
+        fig.data[0].update(
+            x=ohlcv.index,
+            open=ohlcv["open"],
+            high=ohlcv["high"],
+            low=ohlcv["low"],
+            close=ohlcv["close"],
+        )
+
+        trace = 1
+        for name in panels:
+            panel_values = values[name].reindex(ohlcv.index)
+            for line in PANELS[name].lines:
+                fig.data[trace].update(x=panel_values.index, y=panel_values[line])
+                trace += 1
+
+        fig.update_layout(title_text=symbol)
+
+    return fig
+
+
+def write_chart(fig, path: str, include_plotlyjs=True) -> None:
+    """
+    Write a chart as HTML, or as an image for the `IMAGE_FORMATS` extensions
+    """
+    if os.path.splitext(path)[1][1:] in IMAGE_FORMATS:
+        fig.write_image(path)
+    else:
+        fig.write_html(path, include_plotlyjs=include_plotlyjs, full_html=True)
+
+
+# * Per process template and store, built once by the pool initializer
+_WORKER: dict = {}
+
+
+def _init_worker(
+    store_root: str,
+    panels: Sequence[str],
+    bars: int,
+    include_plotlyjs,
+    width: int,
+    height: int,
+) -> None:
+    _WORKER.update(
+        store=IndicatorStore(store_root),
+        template=build_template(panels, width, height),
+        panels=panels,
+        bars=bars,
+        include_plotlyjs=include_plotlyjs,
+    )
+
+
+def _export_chart(symbol: str, source: str, output: str) -> ExportStats:
+    start = time.perf_counter()
+    try:
+        ohlcv = load_ohlcv(source)
+        values = cached_indicators(_WORKER["store"], symbol, ohlcv, _WORKER["panels"])
+        fig = render(
+            _WORKER["template"],
+            symbol,
+            ohlcv,
+            values,
+            _WORKER["panels"],
+            _WORKER["bars"],
+        )
+        write_chart(fig, output, _WORKER["include_plotlyjs"])
+    except Exception as error:
+        return ExportStats(
+            symbol,
+            output,
+            time.perf_counter() - start,
+            f"{type(error).__name__}: {error}",
+        )
+
+    return ExportStats(symbol, output, time.perf_counter() - start)
+
+
+def export_charts(
+    sources: Mapping[str, str],
+    output_dir: str,
+    store_root: str,
+    panels: Sequence[str] = ("rsi", "stochastic"),
+    fmt: str = "html",
+    bars: int = None,
+    workers: int = None,
+    include_plotlyjs=True,
+    width: int = 1600,
+    height: int = 900,
+) -> List[ExportStats]:
+    """
+    Render the charts of many symbols in parallel worker processes
+
+    Parameters
+    ----------
+    sources : Mapping[str, str]
+        Symbol to its CSV/Parquet bar file
+    output_dir : str
+        Directory of the charts, `<symbol>.<fmt>`
+    store_root : str
+        Root of the `IndicatorStore` holding the indicator values
+    panels : Sequence[str], optional
+        Indicator subplots, names of `PANELS`, by default RSI and Stochastic
+    fmt : str, optional
+        'html' or an image format of `IMAGE_FORMATS`, by default 'html'
+    bars : int, optional
+        Only chart the last `bars` bars, by default the whole history
+    workers : int, optional
+        Number of processes, by default the CPU count
+    include_plotlyjs : optional
+        Plotly bundle of the HTML files, by default True (self-contained);
+        'directory' writes it once beside the charts, 'cdn' links to it
+    width, height : int, optional
+        Chart size in pixels, by default 1600 x 900
+
+    Returns
+    -------
+    List[ExportStats]
+        Timing and error of every chart, in completion order
+    """
+    assert fmt == "html" or fmt in IMAGE_FORMATS, f"Unsupported chart format {fmt}"
+    for name in panels:
+        assert name in PANELS, f"Unknown chart panel {name}"
+
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(store_root, exist_ok=True)
+
+    workers = min(workers or os.cpu_count() or 1, max(len(sources), 1))
+    initargs = (store_root, tuple(panels), bars, include_plotlyjs, width, height)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=initargs
+    ) as pool:
+        futures = [
+            pool.submit(
+                _export_chart,
+                symbol,
+                source,
+                os.path.join(output_dir, f"{symbol}.{fmt}"),
+            )
+            for symbol, source in sources.items()
+        ]
+        return [future.result() for future in as_completed(futures)]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch export of SK-FX charts")
+    parser.add_argument("inputs", nargs="+", help="Directories or globs of bar files")
+    parser.add_argument("-o", "--output", required=True, help="Chart directory")
+    parser.add_argument("-s", "--store", required=True, help="Indicator store root")
+    parser.add_argument(
+        "-i", "--indicator", action="append", choices=sorted(PANELS), default=None
+    )
+    parser.add_argument("-f", "--format", default="html")
+    parser.add_argument("-b", "--bars", type=int, default=None)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--plotlyjs", default="inline", choices=("inline", "directory", "cdn")
+    )
+    args = parser.parse_args(argv)
+
+    sources = {
+        os.path.splitext(os.path.basename(path))[0]: path
+        for path in expand_inputs(args.inputs)
+    }
+    start = time.perf_counter()
+    stats = export_charts(
+        sources,
+        args.output,
+        args.store,
+        panels=args.indicator or ("rsi", "stochastic"),
+        fmt=args.format,
+        bars=args.bars,
+        workers=args.workers,
+        include_plotlyjs=True if args.plotlyjs == "inline" else args.plotlyjs,
+    )
+    seconds = time.perf_counter() - start
+
+    for chart in stats:
+        if chart.error is not None:
+            print(f"FAILED {chart.symbol}: {chart.error}")
+    print(
+        f"{len(stats)} charts in {seconds:.2f} s "
+        f"({len(stats) / max(seconds, 1e-9):.1f} charts/s)"
+    )
+
+    return int(any(chart.error is not None for chart in stats))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
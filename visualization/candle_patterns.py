@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from plotly.subplots import make_subplots
+import plotly.graph_objects as go
+
+from sk_fx.indicators.candle_patterns import CandlePattern, candle_patterns
+from sk_fx.utils.test_utils import random_ohlcv
+
+
+def add_pattern_markers(fig, data: pd.DataFrame, mask: np.ndarray, row=1, col=1):
+    # Bullish patterns below the low, bearish ones above the high, others on the close
+    offset = 0.1 * (data["high"] - data["low"])
+    for pattern in CandlePattern:
+        marked = (mask & np.uint16(pattern)) != 0
+        if not marked.any():
+            continue
+
+        if pattern & CandlePattern.bullish():
+            y, symbol, color = data["low"] - offset, "triangle-up", "#55B748"
+        elif pattern & CandlePattern.bearish():
+            y, symbol, color = data["high"] + offset, "triangle-down", "#ED3F3C"
+        else:
+            y, symbol, color = data["close"], "circle-open", "#336699"
+
+        fig.add_trace(
+            go.Scatter(
+                x=data["time"][marked],
+                y=y[marked],
+                mode="markers",
+                marker=dict(symbol=symbol, color=color, size=10),
+                name=pattern.name.replace("_", " ").title(),
+            ),
+            row=row,
+            col=col,
+        )
+
+    return fig
+
+
+def candle_patterns_figure(data: pd.DataFrame):
+    # Create figure
+    fig = make_subplots(rows=1, cols=1)
+
+    # Create Candlestick chart for price data
+    fig.add_trace(
+        go.Candlestick(
+            x=data["time"],
+            open=data["open"],
+            high=data["high"],
+            low=data["low"],
+            close=data["close"],
+            increasing_line_color="#55B748",
+            decreasing_line_color="#ED3F3C",
+            showlegend=False,
+        ),
+        row=1,
+        col=1,
+    )
+
+    # Mark the patterns computed in one pass over the whole history
+    mask = candle_patterns(data["open"], data["high"], data["low"], data["close"])
+    add_pattern_markers(fig, data, mask)
+
+    # Customize font, colors, hide range slider
+    layout = go.Layout(
+        plot_bgcolor="#efefef",
+        # Font Families
+        font_family="Monospace",
+        font_color="#000000",
+        font_size=20,
+        xaxis=dict(rangeslider=dict(visible=False)),
+    )
+
+    # update and display
+    fig.update_layout(layout)
+    fig.show()
+
+
+if __name__ == "__main__":
+    stock_data = random_ohlcv(300).reset_index()
+
+    candle_patterns_figure(stock_data)